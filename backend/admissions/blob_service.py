@@ -0,0 +1,245 @@
+"""
+Content-addressed storage for admission documents.
+
+Every document is stored once under its SHA-256, no matter how many
+applications (or retries) upload the same bytes. `AdmissionApplication.documents`
+keeps pointing at storage paths; a blob's `ref_count` tracks how many
+document keys point at it. Thumbnails and previews are rendered later by the
+`generate_document_renditions` command so uploads never wait on image work.
+"""
+import hashlib
+import io
+import logging
+import mimetypes
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from utils.db import lock_rows, retry_if_locked
+from .models import AdmissionApplication, DocumentBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_ROOT = 'admissions/blobs'
+RENDITION_ROOT = 'admissions/renditions'
+
+THUMBNAIL_SIZE = (256, 256)
+PREVIEW_SIZE = (1280, 1280)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp', '.gif'}
+PDF_EXTENSIONS = {'.pdf'}
+
+
+def hash_file(file_obj):
+    """SHA-256 of a Django File, read through chunks() so it is never fully in memory"""
+    digest = hashlib.sha256()
+    for chunk in file_obj.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def blob_path(sha256, filename):
+    """Storage path of a blob, sharded by hash prefix"""
+    extension = os.path.splitext(filename)[1].lower()[:10]
+    return f"{BLOB_ROOT}/{sha256[:2]}/{sha256}{extension}"
+
+
+def store_blob(file_obj, filename, content_type='', sha256=None):
+    """
+    Return the blob for these bytes, writing them to storage only if new.
+
+    Reusing an existing blob refreshes its `updated_at`, which keeps it out of
+    the orphan purge while the caller attaches it.
+    """
+    sha256 = sha256 or hash_file(file_obj)
+
+    existing = DocumentBlob.objects.filter(sha256=sha256).first()
+    if existing:
+        DocumentBlob.objects.filter(pk=existing.pk).update(updated_at=timezone.now())
+        return existing, False
+
+    path = blob_path(sha256, filename)
+    if not default_storage.exists(path):
+        saved_path = default_storage.save(path, file_obj)
+        if saved_path != path:
+            # Another worker wrote the same content first; keep theirs
+            default_storage.delete(saved_path)
+
+    content_type = content_type or mimetypes.guess_type(filename)[0] or ''
+    try:
+        with transaction.atomic():
+            blob = DocumentBlob.objects.create(
+                sha256=sha256,
+                storage_path=path,
+                size=file_obj.size,
+                content_type=content_type,
+            )
+        return blob, True
+    except IntegrityError:
+        return DocumentBlob.objects.get(sha256=sha256), False
+
+
+def _adjust_ref_counts(paths, delta):
+    """Increment or decrement ref_count for the blobs stored at these paths"""
+    if not paths:
+        return
+    for path in paths:
+        queryset = DocumentBlob.objects.filter(storage_path=path)
+        if delta < 0:
+            queryset = queryset.filter(ref_count__gt=0)
+        queryset.update(ref_count=F('ref_count') + delta, updated_at=timezone.now())
+
+
+@retry_if_locked
+def attach_documents(application_id, blobs_by_key):
+    """
+    Point document keys of an application at blobs and update reference counts.
+
+    Runs under a row lock on the application so concurrent uploads of
+    different keys never overwrite each other.
+    """
+    with transaction.atomic():
+        lock_rows(AdmissionApplication.objects.filter(pk=application_id))
+        application = AdmissionApplication.objects.get(pk=application_id)
+        documents = application.documents or {}
+
+        added = []
+        released = []
+        for key, blob in blobs_by_key.items():
+            previous = documents.get(key)
+            if previous == blob.storage_path:
+                continue
+            if previous:
+                released.append(previous)
+            documents[key] = blob.storage_path
+            added.append(blob.storage_path)
+
+        application.documents = documents
+        application.save(update_fields=['documents'])
+
+        _adjust_ref_counts(added, 1)
+        _adjust_ref_counts(released, -1)
+
+    return application
+
+
+def release_documents(documents):
+    """Drop the references held by a documents mapping (e.g. a deleted application)"""
+    _adjust_ref_counts([path for path in (documents or {}).values() if isinstance(path, str)], -1)
+
+
+def get_blobs_by_path(paths):
+    """Fetch the blobs behind many document paths in a single query"""
+    paths = [path for path in paths if isinstance(path, str)]
+    if not paths:
+        return {}
+    return {blob.storage_path: blob for blob in DocumentBlob.objects.filter(storage_path__in=paths)}
+
+
+def build_document_renditions(documents, blobs_by_path):
+    """
+    Describe each document with its original and lightweight renditions.
+
+    Documents stored before content addressing have no blob and fall back to
+    the original path.
+    """
+    renditions = {}
+    for key, path in (documents or {}).items():
+        blob = blobs_by_path.get(path)
+        renditions[key] = {
+            'original': path,
+            'preview': blob.lightweight_path if blob else path,
+            'thumbnail': (blob.thumbnail_path or None) if blob else None,
+            'status': blob.rendition_status if blob else 'unavailable',
+        }
+    return renditions
+
+
+def _image_format():
+    """WebP when Pillow supports it, JPEG otherwise"""
+    from PIL import features
+    return ('WEBP', '.webp') if features.check('webp') else ('JPEG', '.jpg')
+
+
+def _open_source_image(blob):
+    """Load the first page/frame of a blob as a PIL image, or None if unsupported"""
+    from PIL import Image, ImageOps
+
+    extension = os.path.splitext(blob.storage_path)[1].lower()
+    if extension in IMAGE_EXTENSIONS or blob.content_type.startswith('image/'):
+        with default_storage.open(blob.storage_path, 'rb') as source:
+            image = Image.open(source)
+            image.load()
+        return ImageOps.exif_transpose(image)
+
+    if extension in PDF_EXTENSIONS or blob.content_type == 'application/pdf':
+        import fitz
+        with default_storage.open(blob.storage_path, 'rb') as source:
+            pdf_document = fitz.open(stream=source.read(), filetype='pdf')
+        try:
+            page = pdf_document[0]
+            # Render at a resolution just large enough for the preview size
+            scale = min(PREVIEW_SIZE[0] / page.rect.width, PREVIEW_SIZE[1] / page.rect.height, 2.0)
+            pixmap = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            return Image.frombytes('RGB', (pixmap.width, pixmap.height), pixmap.samples)
+        finally:
+            pdf_document.close()
+
+    return None
+
+
+def _save_rendition(image, size, path_without_extension, quality):
+    image_format, extension = _image_format()
+    rendition = image.copy()
+    rendition.thumbnail(size)
+    if rendition.mode not in ('RGB', 'L'):
+        rendition = rendition.convert('RGB')
+
+    buffer = io.BytesIO()
+    rendition.save(buffer, format=image_format, quality=quality, optimize=True)
+
+    path = f"{path_without_extension}{extension}"
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def generate_renditions(blob):
+    """Render the thumbnail and preview for one blob and record the result"""
+    try:
+        image = _open_source_image(blob)
+        if image is None:
+            blob.rendition_status = 'unsupported'
+        else:
+            base = f"{RENDITION_ROOT}/{blob.sha256[:2]}/{blob.sha256}"
+            blob.thumbnail_path = _save_rendition(image, THUMBNAIL_SIZE, f"{base}_thumb", quality=70)
+            blob.preview_path = _save_rendition(image, PREVIEW_SIZE, f"{base}_preview", quality=80)
+            blob.rendition_status = 'ready'
+    except Exception as e:
+        logger.error(f"Error generating renditions for blob {blob.sha256}: {str(e)}")
+        blob.rendition_status = 'failed'
+
+    blob.save(update_fields=['thumbnail_path', 'preview_path', 'rendition_status', 'updated_at'])
+    return blob
+
+
+def generate_pending_renditions(batch_size=50):
+    """Render renditions for the oldest pending blobs; returns the blobs processed"""
+    pending = DocumentBlob.objects.filter(rendition_status='pending').order_by('created_at')[:batch_size]
+    return [generate_renditions(blob) for blob in pending]
+
+
+def delete_blob_files(blob):
+    """Remove the original and rendition files of a blob from storage"""
+    for path in (blob.storage_path, blob.thumbnail_path, blob.preview_path):
+        if not path:
+            continue
+        try:
+            if default_storage.exists(path):
+                default_storage.delete(path)
+        except Exception as e:
+            logger.warning(f"Could not delete blob file {path}: {str(e)}")
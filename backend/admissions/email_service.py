@@ -1,7 +1,7 @@
 """
 Email service for admission-related communications
 """
-from django.core.mail import send_mail
+from django.core.mail import EmailMultiAlternatives, send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
 from django.utils.html import strip_tags
@@ -173,4 +173,74 @@ def send_admission_confirmation_email(application):
         
     except Exception as e:
         logger.error(f"Failed to send confirmation email to {application.email}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
+
+
+def send_offer_letter_email(decision, pdf, connection=None):
+    """
+    Send the offer letter of an accepted school decision with the PDF attached.
+    Pass an open `connection` to reuse one SMTP session across a batch.
+    """
+    application = decision.application
+    try:
+        subject = f"Offer of Admission - {decision.school.school_name} - Reference #{application.reference_id}"
+        track_url = f"{settings.FRONTEND_URL}/track?ref={application.reference_id}"
+
+        html_message = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #f0fdf4; padding: 20px; border-radius: 8px; border-left: 4px solid #16a34a;">
+                <h2 style="color: #15803d; margin-bottom: 20px;">Congratulations! You have an admission offer</h2>
+
+                <p style="color: #374151; font-size: 16px; margin-bottom: 15px;">
+                    Dear {application.applicant_name},
+                </p>
+
+                <p style="color: #374151; font-size: 16px; margin-bottom: 20px;">
+                    {decision.school.school_name} has accepted your application for {application.course_applied}.
+                    Your offer letter, including the annual fee, is attached to this email.
+                </p>
+
+                <p><strong>Reference ID:</strong> <span style="color: #15803d; font-family: monospace; font-size: 18px;">{application.reference_id}</span></p>
+
+                <div style="text-align: center; margin: 30px 0;">
+                    <a href="{track_url}"
+                       style="background-color: #16a34a; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; font-weight: bold; display: inline-block;">
+                        Confirm Your Admission
+                    </a>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        plain_message = f"""
+        Congratulations! You have an admission offer
+
+        Dear {application.applicant_name},
+
+        {decision.school.school_name} has accepted your application for {application.course_applied}.
+        Your offer letter, including the annual fee, is attached to this email.
+
+        Reference ID: {application.reference_id}
+
+        Confirm your admission at: {track_url}
+        """
+
+        message = EmailMultiAlternatives(
+            subject=subject,
+            body=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            to=[application.email],
+            connection=connection,
+        )
+        message.attach_alternative(html_message, 'text/html')
+        message.attach(f"offer-letter-{application.reference_id}.pdf", pdf, 'application/pdf')
+        message.send(fail_silently=False)
+
+        logger.info(f"Offer letter sent to {application.email} for application {application.reference_id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to send offer letter to {application.email}: {str(e)}")
+        return False
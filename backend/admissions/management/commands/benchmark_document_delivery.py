@@ -0,0 +1,122 @@
+"""
+Management command to benchmark how long a worker is held per document download.
+
+Runs concurrent downloads of a generated file through utils.file_delivery for
+each delivery backend and reports the worker seconds (wall and CPU) spent per
+download. With the Python fallback the worker is busy until the last byte is
+sent, so a slow client (--client-delay-ms) holds it for the whole transfer;
+with X-Accel-Redirect/X-Sendfile the worker returns immediately.
+"""
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory, override_settings
+
+from utils.file_delivery import serve_file
+
+
+class Command(BaseCommand):
+    help = 'Benchmark worker seconds per concurrent document download for each delivery backend'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size-mb', type=float, default=20, help='Size of the generated document')
+        parser.add_argument('--downloads', type=int, default=32, help='Total downloads per backend')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent downloads (worker threads)')
+        parser.add_argument(
+            '--client-delay-ms',
+            type=float,
+            default=0,
+            help='Simulated client delay per 64KB block (slow mobile links)'
+        )
+        parser.add_argument(
+            '--range-bytes',
+            type=int,
+            default=0,
+            help='Request only the first N bytes with a Range header (0 = full file)'
+        )
+        parser.add_argument(
+            '--backends',
+            nargs='+',
+            default=['python', 'nginx', 'sendfile'],
+            choices=['python', 'nginx', 'sendfile'],
+        )
+
+    def handle(self, *args, **options):
+        if options['downloads'] <= 0 or options['concurrency'] <= 0:
+            raise CommandError('--downloads and --concurrency must be positive')
+
+        media_root = tempfile.mkdtemp(prefix='acharya-delivery-bench-')
+        try:
+            with override_settings(MEDIA_ROOT=media_root):
+                storage_path = 'admissions/benchmark/document.pdf'
+                full_path = os.path.join(media_root, storage_path)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                with open(full_path, 'wb') as document:
+                    remaining = int(options['size_mb'] * 1024 * 1024)
+                    block = os.urandom(1024 * 1024)
+                    while remaining > 0:
+                        document.write(block[:remaining])
+                        remaining -= len(block)
+
+                self.stdout.write(
+                    f"Document: {default_storage.size(storage_path) / (1024 * 1024):.1f}MB, "
+                    f"{options['downloads']} downloads, concurrency {options['concurrency']}, "
+                    f"client delay {options['client_delay_ms']}ms/block\n"
+                )
+
+                for backend in options['backends']:
+                    self.run_backend(backend, storage_path, options)
+        finally:
+            shutil.rmtree(media_root, ignore_errors=True)
+
+    def download(self, backend, storage_path, options):
+        """One download as seen by the worker: returns (wall_seconds, cpu_seconds, bytes_sent)"""
+        headers = {}
+        if options['range_bytes']:
+            headers['HTTP_RANGE'] = f"bytes=0-{options['range_bytes'] - 1}"
+        request = RequestFactory().get('/download/', **headers)
+        delay = options['client_delay_ms'] / 1000
+
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+
+        response = serve_file(request, storage_path, content_hash='benchmark', backend=backend)
+        bytes_sent = 0
+        if response.streaming:
+            for block in response.streaming_content:
+                bytes_sent += len(block)
+                if delay:
+                    time.sleep(delay)
+            response.close()
+        else:
+            bytes_sent = len(response.content)
+
+        return time.perf_counter() - wall_start, time.thread_time() - cpu_start, bytes_sent
+
+    def run_backend(self, backend, storage_path, options):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(
+                lambda _: self.download(backend, storage_path, options),
+                range(options['downloads'])
+            ))
+        elapsed = time.perf_counter() - started
+
+        wall = sorted(result[0] for result in results)
+        cpu = [result[1] for result in results]
+        sent = sum(result[2] for result in results)
+        p95 = wall[min(len(wall) - 1, int(len(wall) * 0.95))]
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{backend}:') +
+            f'\n- Worker seconds per download: avg {statistics.mean(wall):.4f}s, p95 {p95:.4f}s'
+            f'\n- Worker CPU seconds per download: avg {statistics.mean(cpu):.4f}s'
+            f'\n- Total worker seconds: {sum(wall):.2f}s over {elapsed:.2f}s wall clock'
+            f'\n- Bytes streamed by Python: {sent / (1024 * 1024):.1f}MB\n'
+        )
@@ -0,0 +1,48 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from admissions.blob_service import generate_pending_renditions
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnail and preview renditions for newly uploaded admission documents'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of pending documents rendered per batch'
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=0,
+            help='Stop after this many batches (0 = until nothing is pending)'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+
+        started = time.monotonic()
+        counts = {'ready': 0, 'unsupported': 0, 'failed': 0}
+        batches = 0
+
+        while True:
+            processed = generate_pending_renditions(batch_size=options['batch_size'])
+            if not processed:
+                break
+            batches += 1
+            for blob in processed:
+                counts[blob.rendition_status] = counts.get(blob.rendition_status, 0) + 1
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Renditions completed in {time.monotonic() - started:.2f}s:'
+                f'\n- Ready: {counts["ready"]}'
+                f'\n- Unsupported: {counts["unsupported"]}'
+                f'\n- Failed: {counts["failed"]}'
+            )
+        )
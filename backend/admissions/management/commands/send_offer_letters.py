@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from admissions.offer_letter_service import BATCH_SIZE, CHUNK_SIZE, send_offer_letters
+
+
+class Command(BaseCommand):
+    help = 'Render and email offer letters for accepted applications that have not been notified'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Rendering processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Decisions selected per batch')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Letters per worker task')
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=0,
+            help='Stop after this many batches (0 = until nothing is pending)'
+        )
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] <= 0:
+            raise CommandError('--workers must be positive')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be positive')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        totals = {'rendered': 0, 'sent': 0, 'failed': 0, 'seconds': 0.0}
+        for report in send_offer_letters(
+            workers=options['workers'],
+            batch_size=options['batch_size'],
+            chunk_size=options['chunk_size'],
+            max_batches=options['max_batches'],
+        ):
+            self.stdout.write(
+                f"- Batch {report['batch']}: {report['decisions']} decisions, {report['rendered']} rendered, "
+                f"{report['sent']} sent, {report['failed']} failed in {report['seconds']:.2f}s "
+                f"({report['letters_per_minute']} per minute)"
+            )
+            for key in totals:
+                totals[key] += report[key]
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\nSent {totals['sent']} offer letters ({totals['rendered']} rendered, "
+                f"{totals['failed']} failed) in {totals['seconds']:.2f}s"
+            )
+        )
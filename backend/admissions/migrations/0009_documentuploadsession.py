@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:16
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0008_schooladmissiondecision_enrollment_date_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentUploadSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.UUIDField(default=uuid.uuid4, editable=False, unique=True)),
+                ('document_key', models.CharField(max_length=50)),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('total_size', models.PositiveBigIntegerField()),
+                ('chunk_size', models.PositiveIntegerField()),
+                ('received_chunks', models.JSONField(blank=True, default=list)),
+                ('checksum', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('active', 'Active'), ('completed', 'Completed'), ('failed', 'Failed')], default='active', max_length=20)),
+                ('file_path', models.CharField(blank=True, max_length=500)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField()),
+                ('application', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='admissions.admissionapplication')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['application', 'status'], name='admissions__applica_c11201_idx'), models.Index(fields=['status', 'expires_at'], name='admissions__status_29bbf3_idx')],
+            },
+        ),
+    ]
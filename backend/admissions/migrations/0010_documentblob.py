@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0009_documentuploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('storage_path', models.CharField(max_length=500, unique=True)),
+                ('size', models.PositiveBigIntegerField()),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('ref_count', models.PositiveIntegerField(default=0)),
+                ('thumbnail_path', models.CharField(blank=True, max_length=500)),
+                ('preview_path', models.CharField(blank=True, max_length=500)),
+                ('rendition_status', models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('unsupported', 'Unsupported'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['rendition_status', 'created_at'], name='admissions__renditi_97caa2_idx'), models.Index(fields=['ref_count', 'updated_at'], name='admissions__ref_cou_b1968b_idx')],
+            },
+        ),
+    ]
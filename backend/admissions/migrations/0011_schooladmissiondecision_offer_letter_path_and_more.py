@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0010_documentblob'),
+        ('schools', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schooladmissiondecision',
+            name='offer_letter_path',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='schooladmissiondecision',
+            name='offer_letter_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='schooladmissiondecision',
+            name='offer_notified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='schooladmissiondecision',
+            index=models.Index(fields=['decision', 'offer_notified_at'], name='admissions__decisio_6cf112_idx'),
+        ),
+    ]
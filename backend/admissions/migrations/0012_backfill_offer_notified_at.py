@@ -0,0 +1,23 @@
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Coalesce, Now
+
+
+def mark_existing_offers_notified(apps, schema_editor):
+    # Decisions accepted before offer letters existed were already communicated;
+    # only decisions made from now on should be queued for a letter
+    SchoolAdmissionDecision = apps.get_model('admissions', 'SchoolAdmissionDecision')
+    SchoolAdmissionDecision.objects.filter(decision='accepted', offer_notified_at__isnull=True).update(
+        offer_notified_at=Coalesce(F('decision_date'), Now())
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admissions', '0011_schooladmissiondecision_offer_letter_path_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(mark_existing_offers_notified, migrations.RunPython.noop),
+    ]
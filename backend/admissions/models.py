@@ -8,6 +8,8 @@ from datetime import timedelta
 from django.db import models
 from django.conf import settings
 
+from fees.fee_resolver import FeeTableQuerySet
+
 def generate_reference_id():
     """Generate a unique reference ID for admission applications"""
     # Format: ADM-YYYY-XXXXXX (e.g., ADM-2025-A1B2C3)
@@ -211,6 +213,107 @@ class AdmissionApplication(models.Model):
         return self.school_decisions.filter(enrollment_status='enrolled').first()
 
 
+class DocumentBlob(models.Model):
+    """Content-addressed admission document, shared by every application that uploaded the same bytes"""
+    
+    RENDITION_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('unsupported', 'Unsupported'),
+        ('failed', 'Failed'),
+    ]
+    
+    sha256 = models.CharField(max_length=64, unique=True)
+    storage_path = models.CharField(max_length=500, unique=True)
+    size = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    thumbnail_path = models.CharField(max_length=500, blank=True)
+    preview_path = models.CharField(max_length=500, blank=True)
+    rendition_status = models.CharField(max_length=20, choices=RENDITION_STATUS_CHOICES, default='pending')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['rendition_status', 'created_at']),
+            models.Index(fields=['ref_count', 'updated_at']),
+        ]
+    
+    @property
+    def lightweight_path(self):
+        """Preview rendition if generated, otherwise the original"""
+        return self.preview_path or self.storage_path
+    
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.size} bytes, {self.ref_count} refs)"
+
+
+class DocumentUploadSession(models.Model):
+    """Model for resumable chunked document uploads to an admission application"""
+    
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    
+    upload_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    application = models.ForeignKey(AdmissionApplication, on_delete=models.CASCADE, related_name='upload_sessions')
+    document_key = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    total_size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received_chunks = models.JSONField(default=list, blank=True)
+    checksum = models.CharField(max_length=64, blank=True)  # Expected SHA-256 (hex), optional until finalize
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='active')
+    file_path = models.CharField(max_length=500, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['application', 'status']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
+        ordering = ['-created_at']
+    
+    def save(self, *args, **kwargs):
+        """Set expiration time if not set"""
+        if not self.expires_at:
+            self.expires_at = timezone.now() + timedelta(hours=24)  # Sessions can be resumed for a day
+        super().save(*args, **kwargs)
+    
+    @property
+    def total_chunks(self):
+        """Number of chunks the client has to send"""
+        return max(1, -(-self.total_size // self.chunk_size))
+    
+    def expected_chunk_size(self, index):
+        """Size in bytes the chunk at this index must have"""
+        if index < self.total_chunks - 1:
+            return self.chunk_size
+        return self.total_size - self.chunk_size * (self.total_chunks - 1)
+    
+    def chunk_path(self, index):
+        """Storage path of a single uploaded chunk"""
+        return f"admissions/{self.application_id}/uploads/{self.upload_id}/{index:05d}.part"
+    
+    def missing_chunks(self):
+        """Chunk indexes that still have to be uploaded"""
+        received = set(self.received_chunks)
+        return [index for index in range(self.total_chunks) if index not in received]
+    
+    def is_expired(self):
+        """Check if the session can no longer be resumed"""
+        return timezone.now() > self.expires_at
+    
+    def __str__(self):
+        return f"Upload {self.upload_id} - {self.document_key} ({self.status}) [{self.application_id}]"
+
+
 class SchoolAdmissionDecision(models.Model):
     """Model to track individual school decisions for each application"""
     
@@ -256,6 +359,11 @@ class SchoolAdmissionDecision(models.Model):
         ('waived', 'Payment Waived'),
     ])
     payment_reference = models.CharField(max_length=100, blank=True)
+
+    # Offer letter sent to the applicant once the school accepts
+    offer_letter_path = models.CharField(max_length=500, blank=True)
+    offer_letter_sha256 = models.CharField(max_length=64, blank=True)
+    offer_notified_at = models.DateTimeField(null=True, blank=True)
     
     class Meta:
         unique_together = ['application', 'school']
@@ -265,6 +373,7 @@ class SchoolAdmissionDecision(models.Model):
             models.Index(fields=['decision', 'decision_date']),
             models.Index(fields=['enrollment_status', 'enrollment_date']),
             models.Index(fields=['application', 'enrollment_status']),
+            models.Index(fields=['decision', 'offer_notified_at']),
         ]
         ordering = ['preference_order', '-decision_date']
     
@@ -377,6 +486,8 @@ class FeeStructure(models.Model):
     category = models.CharField(max_length=20, choices=CATEGORY_CHOICES)
     annual_fee_min = models.DecimalField(max_digits=10, decimal_places=2)
     annual_fee_max = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    objects = FeeTableQuerySet.as_manager()
     
     class Meta:
         unique_together = ['class_range', 'category']
@@ -391,45 +502,6 @@ class FeeStructure(models.Model):
     @classmethod
     def get_fee_for_student(cls, course_applied, category):
         """Calculate fee for a student based on their course and category"""
-        import re
-        
-        # Map course to class range
-        class_mapping = {
-            '1': '1-8', '2': '1-8', '3': '1-8', '4': '1-8', 
-            '5': '1-8', '6': '1-8', '7': '1-8', '8': '1-8',
-            '9': '9-10', '10': '9-10',
-            '11': '11-12', '12': '11-12'
-        }
-        
-        # Extract class number from course_applied using regex
-        class_number = None
-        course_lower = course_applied.lower()
-        
-        # Look for patterns like "class-12", "class 12", "12", "12th", etc.
-        # Try to match 2-digit numbers first (11, 12), then single digits
-        patterns = [
-            r'(?:class[-\s]?)?(\d{2})(?:th|st|nd|rd)?',  # Matches "class-12", "12th", etc.
-            r'(?:class[-\s]?)?(\d{1})(?:th|st|nd|rd)?'   # Matches "class-9", "9th", etc.
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, course_lower)
-            if match:
-                potential_class = match.group(1)
-                if potential_class in class_mapping:
-                    class_number = potential_class
-                    break
-        
-        if not class_number:
-            return None
-        
-        class_range = class_mapping[class_number]
-        
-        # Map student category to fee category
-        fee_category = 'general' if category == 'general' else 'sc_st_obc_sbc'
-        
-        try:
-            fee_structure = cls.objects.get(class_range=class_range, category=fee_category)
-            return fee_structure
-        except cls.DoesNotExist:
-            return None
+        # Resolved from the in-process fee snapshot, without a query per call
+        from fees.fee_resolver import get_admission_fee
+        return get_admission_fee(course_applied, category)
@@ -0,0 +1,87 @@
+"""
+Admission offer letter PDF template.
+
+A letter is a plain dict built by `offer_letter_service.offer_letter_data`,
+so a letter rendered again after an interrupted run has the same bytes.
+"""
+import fitz
+
+from utils.pdf import BOLD, REGULAR, document_bytes, fit_text, text_width, wrap_text
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('a4')
+MARGIN = 56
+LINE_HEIGHT = 16
+
+
+def render_offer_letter(letter):
+    """Render one offer letter to PDF bytes"""
+    document = fitz.open()
+    try:
+        page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        shape = page.new_shape()
+        width = PAGE_WIDTH - 2 * MARGIN
+
+        school = fit_text(letter['school_name'], width, 16, BOLD)
+        shape.insert_text(
+            ((PAGE_WIDTH - text_width(school, BOLD, 16)) / 2, MARGIN + 16), school, fontname=BOLD, fontsize=16
+        )
+        if letter['school_address']:
+            address = fit_text(letter['school_address'], width, 9)
+            shape.insert_text(
+                ((PAGE_WIDTH - text_width(address, REGULAR, 9)) / 2, MARGIN + 32), address, fontname=REGULAR, fontsize=9
+            )
+        shape.draw_line((MARGIN, MARGIN + 42), (PAGE_WIDTH - MARGIN, MARGIN + 42))
+        shape.finish(color=(0, 0, 0), width=1)
+
+        y = MARGIN + 70
+        shape.insert_text((MARGIN, y), f"Reference ID: {letter['reference_id']}", fontname=BOLD, fontsize=10)
+        date = f"Date: {letter['issued_on']}"
+        shape.insert_text((PAGE_WIDTH - MARGIN - text_width(date, REGULAR, 10), y), date, fontname=REGULAR, fontsize=10)
+
+        y += 36
+        title = 'Offer of Admission'
+        shape.insert_text(((PAGE_WIDTH - text_width(title, BOLD, 14)) / 2, y), title, fontname=BOLD, fontsize=14)
+
+        y += 32
+        paragraphs = [
+            f"Dear {letter['applicant_name']},",
+            f"We are pleased to inform you that your application for admission to {letter['course_applied']} "
+            f"at {letter['school_name']} ({letter['preference_order']} preference) has been accepted.",
+            "To confirm your seat, please complete enrollment and fee payment through the admission portal "
+            "using the reference ID above.",
+        ]
+        lines = []
+        for paragraph in paragraphs:
+            lines.extend(wrap_text(paragraph, width, 10))
+            lines.append('')
+        shape.insert_text((MARGIN, y), lines, fontname=REGULAR, fontsize=10, lineheight=LINE_HEIGHT / 10)
+
+        y += len(lines) * LINE_HEIGHT + 8
+        shape.insert_text(
+            (MARGIN, y), ['Course:', 'Category:', 'Annual fee:'], fontname=BOLD, fontsize=10, lineheight=LINE_HEIGHT / 10
+        )
+        shape.insert_text(
+            (MARGIN + 90, y),
+            [fit_text(letter['course_applied'], width - 90, 10), letter['category'], letter['fee']],
+            fontname=REGULAR, fontsize=10, lineheight=LINE_HEIGHT / 10
+        )
+
+        y = PAGE_HEIGHT - MARGIN - 60
+        shape.draw_line((PAGE_WIDTH - MARGIN - 160, y), (PAGE_WIDTH - MARGIN, y))
+        shape.finish(color=(0, 0, 0), width=0.5)
+        shape.insert_text((PAGE_WIDTH - MARGIN - 160, y + 14), 'Principal', fontname=REGULAR, fontsize=9)
+        shape.insert_text(
+            (MARGIN, PAGE_HEIGHT - MARGIN),
+            'This is a computer-generated letter and does not require a signature.',
+            fontname=REGULAR, fontsize=7
+        )
+        shape.commit()
+
+        return document_bytes(document, f"Offer of Admission {letter['reference_id']}")
+    finally:
+        document.close()
+
+
+def render_offer_letters(letters):
+    """Render a batch of letters; returns [(decision_id, pdf_bytes)] (process-pool entry point)"""
+    return [(letter['decision_id'], render_offer_letter(letter)) for letter in letters]
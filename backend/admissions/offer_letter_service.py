@@ -0,0 +1,168 @@
+"""
+Batch offer letters for accepted applications.
+
+An accepted `SchoolAdmissionDecision` with no `offer_notified_at` whose
+applicant has neither enrolled nor withdrawn is the queue. Each batch is selected with one select_related query in primary-key
+order, fees are quoted from the in-process fee snapshot (no query per
+letter), letters are rendered by `offer_letter_renderer` in a process pool
+and stored content-addressed under their SHA-256, then emailed with the PDF
+attached over one SMTP connection.
+
+Runs are resumable and idempotent: a letter is recorded on its decision as
+soon as it is stored, so an interrupted run does not render it again, and
+`offer_notified_at` is set only after its email went out, with a guarded
+update so a letter is never marked twice. Decisions whose email failed stay
+queued for the next run.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.core.mail import get_connection
+from django.utils import timezone
+
+from utils.content_storage import store_content_addressed
+
+from .email_service import send_offer_letter_email
+from .models import FeeStructure, SchoolAdmissionDecision
+from .offer_letter_renderer import render_offer_letters
+
+OFFER_LETTER_ROOT = 'admissions/offer_letters'
+BATCH_SIZE = 200
+CHUNK_SIZE = 50
+
+
+def pending_offer_decisions():
+    """Accepted decisions still open to the applicant who has not been sent an offer letter yet"""
+    return SchoolAdmissionDecision.objects.filter(
+        decision='accepted', offer_notified_at__isnull=True, enrollment_status='not_enrolled'
+    ).select_related('application', 'school')
+
+
+def _fee_text(fee):
+    if fee is None:
+        return 'As per the school fee schedule'
+    if fee.annual_fee_max and fee.annual_fee_max != fee.annual_fee_min:
+        return f'Rs. {fee.annual_fee_min:,.2f} - Rs. {fee.annual_fee_max:,.2f}'
+    return f'Rs. {fee.annual_fee_min:,.2f}'
+
+
+def offer_letter_data(decision):
+    """Plain dict describing one decision's offer letter (picklable for pool workers)"""
+    application = decision.application
+    school = decision.school
+    fee = FeeStructure.get_fee_for_student(application.course_applied, application.category)
+    # Dated by the decision so a re-rendered letter has the same bytes
+    issued = timezone.localdate(decision.decision_date) if decision.decision_date else timezone.localdate()
+    return {
+        'decision_id': decision.id,
+        'reference_id': application.reference_id,
+        'applicant_name': application.applicant_name,
+        'course_applied': application.course_applied,
+        'category': application.get_category_display(),
+        'preference_order': decision.preference_order,
+        'school_name': school.school_name,
+        'school_address': ' '.join((school.address or '').split()),
+        'fee': _fee_text(fee),
+        'issued_on': issued.strftime('%d %b %Y'),
+    }
+
+
+def store_offer_letter(pdf):
+    """Write letter bytes under their SHA-256 unless already stored; returns (path, sha256)"""
+    return store_content_addressed(OFFER_LETTER_ROOT, pdf)
+
+
+def _stored_letter(decision):
+    """PDF bytes of a letter recorded by an earlier run, or None if it must be rendered"""
+    if not decision.offer_letter_path or not default_storage.exists(decision.offer_letter_path):
+        return None
+    with default_storage.open(decision.offer_letter_path, 'rb') as letter:
+        return letter.read()
+
+
+def _render_batch(decisions, executor, chunk_size):
+    """{decision_id: pdf} for a batch, rendering and recording only letters not stored yet"""
+    pdfs = {}
+    missing = []
+    for decision in decisions:
+        pdf = _stored_letter(decision)
+        if pdf is None:
+            missing.append(decision)
+        else:
+            pdfs[decision.id] = pdf
+    if not missing:
+        return pdfs, 0
+
+    letters = [offer_letter_data(decision) for decision in missing]
+    chunks = [letters[start:start + chunk_size] for start in range(0, len(letters), chunk_size)]
+    results = executor.map(render_offer_letters, chunks) if executor else map(render_offer_letters, chunks)
+    by_id = {decision.id: decision for decision in missing}
+    for rendered in results:
+        for decision_id, pdf in rendered:
+            decision = by_id[decision_id]
+            decision.offer_letter_path, decision.offer_letter_sha256 = store_offer_letter(pdf)
+            pdfs[decision_id] = pdf
+    SchoolAdmissionDecision.objects.bulk_update(missing, ['offer_letter_path', 'offer_letter_sha256'])
+    return pdfs, len(missing)
+
+
+def _notify_batch(decisions, pdfs):
+    """Email each letter; returns (sent, failed)"""
+    sent = failed = 0
+    connection = get_connection()
+    try:
+        connection.open()
+        for decision in decisions:
+            if not send_offer_letter_email(decision, pdfs[decision.id], connection=connection):
+                failed += 1
+                continue
+            # Guarded so an overlapping run cannot mark (or count) the letter twice
+            sent += SchoolAdmissionDecision.objects.filter(
+                id=decision.id, offer_notified_at__isnull=True
+            ).update(offer_notified_at=timezone.now())
+    finally:
+        connection.close()
+    return sent, failed
+
+
+def send_offer_letters(workers=None, batch_size=BATCH_SIZE, chunk_size=CHUNK_SIZE, max_batches=0):
+    """
+    Render and send pending offer letters, yielding a report per batch.
+
+    `workers` is the size of the rendering process pool (CPU count by
+    default; 1 renders in this process). Each report has the batch number,
+    decisions selected, letters rendered, emails sent and failed, seconds
+    spent and letters per minute.
+    """
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    last_id = 0
+    batch_number = 0
+    try:
+        while not max_batches or batch_number < max_batches:
+            started = time.perf_counter()
+            # Keyset pagination moves past decisions whose email failed in this run
+            decisions = list(pending_offer_decisions().filter(id__gt=last_id).order_by('id')[:batch_size])
+            if not decisions:
+                break
+            batch_number += 1
+            last_id = decisions[-1].id
+
+            pdfs, rendered = _render_batch(decisions, executor, chunk_size)
+            sent, failed = _notify_batch(decisions, pdfs)
+
+            elapsed = time.perf_counter() - started
+            yield {
+                'batch': batch_number,
+                'decisions': len(decisions),
+                'rendered': rendered,
+                'sent': sent,
+                'failed': failed,
+                'seconds': round(elapsed, 3),
+                'letters_per_minute': round(len(decisions) * 60 / elapsed) if elapsed else 0,
+            }
+    finally:
+        if executor:
+            executor.shutdown()
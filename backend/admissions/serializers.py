@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import AdmissionApplication, EmailVerification, SchoolAdmissionDecision
+from .models import AdmissionApplication, EmailVerification, SchoolAdmissionDecision, DocumentUploadSession
 from schools.serializers import SchoolSerializer
 
 
@@ -92,7 +92,10 @@ class SchoolAdmissionDecisionSerializer(serializers.ModelSerializer):
     class Meta:
         model = SchoolAdmissionDecision
         fields = '__all__'
-        read_only_fields = ['decision_date', 'student_choice_date', 'enrollment_date', 'withdrawal_date']
+        read_only_fields = [
+            'decision_date', 'student_choice_date', 'enrollment_date', 'withdrawal_date',
+            'offer_letter_path', 'offer_letter_sha256', 'offer_notified_at'
+        ]
     
     def get_can_enroll(self, obj):
         """Check if student can enroll in this school"""
@@ -144,8 +147,54 @@ class AdmissionApplicationWithDecisionsSerializer(serializers.ModelSerializer):
     second_preference_school = SchoolSerializer(read_only=True)
     third_preference_school = SchoolSerializer(read_only=True)
     school_decisions = SchoolAdmissionDecisionSerializer(many=True, read_only=True)
+    document_renditions = serializers.SerializerMethodField()
     
     class Meta:
         model = AdmissionApplication
         fields = '__all__'
-        read_only_fields = ['reference_id', 'application_date', 'reviewed_by', 'review_date']
\ No newline at end of file
+        read_only_fields = ['reference_id', 'application_date', 'reviewed_by', 'review_date']
+    
+    def get_document_renditions(self, obj):
+        """Lightweight preview/thumbnail paths for reviewers (blobs are passed in context)"""
+        from .blob_service import build_document_renditions, get_blobs_by_path
+        blobs = self.context.get('document_blobs')
+        if blobs is None:
+            blobs = get_blobs_by_path((obj.documents or {}).values())
+        return build_document_renditions(obj.documents, blobs)
+
+
+class DocumentUploadSessionCreateSerializer(serializers.Serializer):
+    """Serializer for starting a chunked document upload"""
+    document_key = serializers.RegexField(r'^[A-Za-z0-9_-]+$', max_length=50)
+    filename = serializers.CharField(max_length=255)
+    total_size = serializers.IntegerField(min_value=1)
+    chunk_size = serializers.IntegerField(min_value=1, required=False)
+    content_type = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    checksum = serializers.RegexField(r'^[A-Fa-f0-9]{64}$', required=False, allow_blank=True, default='')
+    
+    def validate_filename(self, value):
+        """Strip any client-side directory components"""
+        import os
+        filename = os.path.basename(value.replace('\\', '/')).strip()
+        if not filename:
+            raise serializers.ValidationError("Invalid filename.")
+        return filename
+
+
+class DocumentUploadSessionSerializer(serializers.ModelSerializer):
+    """Serializer for chunked upload session status"""
+    total_chunks = serializers.IntegerField(read_only=True)
+    missing_chunks = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = DocumentUploadSession
+        fields = [
+            'upload_id', 'application', 'document_key', 'filename', 'content_type',
+            'total_size', 'chunk_size', 'total_chunks', 'received_chunks', 'missing_chunks',
+            'checksum', 'status', 'file_path', 'created_at', 'expires_at'
+        ]
+        read_only_fields = fields
+    
+    def get_missing_chunks(self, obj):
+        """Chunk indexes the client still has to send"""
+        return obj.missing_chunks()
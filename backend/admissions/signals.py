@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from .models import AdmissionApplication, DocumentBlob, DocumentUploadSession
+from .blob_service import delete_blob_files, release_documents
+from .upload_service import discard_chunks
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(post_delete, sender=DocumentUploadSession)
+def remove_upload_session_chunks(sender, instance, **kwargs):
+    """
+    Remove leftover chunk files when an unfinished upload session is deleted
+    (e.g. by the housekeeping purge of expired sessions).
+    """
+    if instance.status != 'completed':
+        discard_chunks(instance)
+        logger.info(f"Discarded chunks for expired upload session {instance.upload_id}")
+
+
+@receiver(pre_delete, sender=AdmissionApplication)
+def release_application_documents(sender, instance, **kwargs):
+    """Drop the blob references held by an application being deleted"""
+    # Re-read the stored mapping; the instance may predate later uploads
+    documents = AdmissionApplication.objects.filter(pk=instance.pk).values_list('documents', flat=True).first()
+    release_documents(documents)
+
+
+@receiver(post_delete, sender=DocumentBlob)
+def remove_blob_files(sender, instance, **kwargs):
+    """Remove the stored original and renditions when an orphaned blob is purged"""
+    delete_blob_files(instance)
@@ -1,3 +1,200 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
+from datetime import date
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from schools.models import School
+from .models import AdmissionApplication, DocumentBlob, DocumentUploadSession
+
+
+@override_settings(PROTECTED_MEDIA_BACKEND='python')
+class AdmissionDocumentTestCase(TestCase):
+    """An application and helpers to upload its documents in chunks"""
+
+    CONTENT = b'0123456789' * 25  # 250 bytes: 3 chunks of 100, the last one 50
+    CHUNK_SIZE = 100
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.school = School.objects.create(
+            district='Test', block='Test', village='Test', school_name='Upload School', school_code='UPLOAD01'
+        )
+        self.application = AdmissionApplication.objects.create(
+            first_preference_school=self.school, applicant_name='Test Applicant', date_of_birth=date(2010, 1, 1),
+            email='applicant@test.local', phone_number='0000000000', address='Test', course_applied='Class 10'
+        )
+        self.client = APIClient()
+
+    def start_upload(self, content=CONTENT, **data):
+        response = self.client.post(f'/api/v1/admissions/documents/{self.application.id}/uploads/', {
+            'document_key': 'marksheet',
+            'filename': 'marksheet.txt',
+            'content_type': 'text/plain',
+            'total_size': len(content),
+            'chunk_size': self.CHUNK_SIZE,
+            **data
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data['data']['upload_id']
+
+    def put_chunk(self, upload_id, index, content=CONTENT):
+        part = content[index * self.CHUNK_SIZE:(index + 1) * self.CHUNK_SIZE]
+        return self.client.put(
+            f'/api/v1/admissions/documents/uploads/{upload_id}/chunks/{index}/',
+            {'chunk': SimpleUploadedFile('chunk', part)},
+            format='multipart'
+        )
+
+    def finalize(self, upload_id, checksum=None):
+        return self.client.post(
+            f'/api/v1/admissions/documents/uploads/{upload_id}/complete/',
+            {'checksum': checksum or hashlib.sha256(self.CONTENT).hexdigest()},
+            format='json'
+        )
+
+    def upload(self):
+        upload_id = self.start_upload()
+        for index in range(3):
+            self.assertEqual(self.put_chunk(upload_id, index).status_code, 200)
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['documents']['marksheet']
+
+
+class ChunkedUploadTests(AdmissionDocumentTestCase):
+    """Resumable uploads: chunks in any order, retries, then one verified finalize"""
+
+    def get_session(self, upload_id):
+        return self.client.get(f'/api/v1/admissions/documents/uploads/{upload_id}/').data['data']
+
+    def test_upload_resumes_and_finalizes_once(self):
+        upload_id = self.start_upload()
+        self.assertEqual(self.put_chunk(upload_id, 2).status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 200)
+
+        # A client reconnecting asks which chunks are still missing
+        session = self.get_session(upload_id)
+        self.assertEqual((session['total_chunks'], session['missing_chunks']), (3, [1]))
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing chunks', response.data['message'])
+
+        # Re-sending a chunk replaces it
+        self.assertEqual(self.put_chunk(upload_id, 1, b'x' * len(self.CONTENT)).status_code, 200)
+        self.assertEqual(self.put_chunk(upload_id, 1).status_code, 200)
+        self.assertEqual(self.get_session(upload_id)['received_chunks'], [0, 1, 2])
+
+        response = self.finalize(upload_id)
+        self.assertEqual(response.status_code, 200, response.data)
+        path = response.data['documents']['marksheet']
+        with default_storage.open(path, 'rb') as stored:
+            self.assertEqual(stored.read(), self.CONTENT)
+        self.assertEqual(DocumentBlob.objects.get(storage_path=path).ref_count, 1)
+
+        session = DocumentUploadSession.objects.get(upload_id=upload_id)
+        self.assertEqual(session.status, 'completed')
+        self.assertFalse(any(default_storage.exists(session.chunk_path(index)) for index in range(3)))
+
+        # A repeated finalize (e.g. a retried request) changes nothing
+        self.assertEqual(self.finalize(upload_id).status_code, 400)
+        self.assertEqual(self.put_chunk(upload_id, 0).status_code, 400)
+        self.assertEqual(DocumentBlob.objects.get(storage_path=path).ref_count, 1)
+
+    def test_checksum_mismatch_keeps_the_session_open(self):
+        upload_id = self.start_upload()
+        for index in range(3):
+            self.put_chunk(upload_id, index)
+
+        response = self.finalize(upload_id, checksum='0' * 64)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Checksum mismatch', response.data['message'])
+        self.assertEqual(self.get_session(upload_id)['status'], 'active')
+        self.assertEqual(self.finalize(upload_id).status_code, 200)
+
+    def test_chunks_must_have_the_expected_size_and_index(self):
+        upload_id = self.start_upload()
+        short = SimpleUploadedFile('chunk', b'short')
+        response = self.client.put(
+            f'/api/v1/admissions/documents/uploads/{upload_id}/chunks/0/', {'chunk': short}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.put_chunk(upload_id, 3).status_code, 400)
+        self.assertEqual(self.get_session(upload_id)['received_chunks'], [])
+
+
+class DocumentDownloadTests(AdmissionDocumentTestCase):
+    """Document delivery: access check, byte ranges and conditional requests"""
+
+    def setUp(self):
+        super().setUp()
+        self.upload()
+        self.url = f'/api/v1/admissions/documents/{self.application.id}/marksheet/download/'
+
+    def download(self, **headers):
+        params = {'reference_id': self.application.reference_id, 'rendition': 'original'}
+        return self.client.get(self.url, params, headers=headers)
+
+    def test_full_download(self):
+        response = self.download()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), self.CONTENT)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{hashlib.sha256(self.CONTENT).hexdigest()}"')
+
+    def test_access_needs_the_reference_id(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.assertEqual(self.client.get(self.url, {'reference_id': 'wrong'}).status_code, 403)
+
+    def test_byte_ranges(self):
+        response = self.download(Range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), self.CONTENT[10:20])
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.CONTENT)}')
+
+        # Open-ended and suffix ranges
+        self.assertEqual(self.download(Range='bytes=240-').getvalue(), self.CONTENT[240:])
+        self.assertEqual(self.download(Range='bytes=-5').getvalue(), self.CONTENT[-5:])
+
+        response = self.download(Range=f'bytes={len(self.CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.CONTENT)}')
+
+        # Multiple ranges are not supported: the whole file is sent
+        self.assertEqual(self.download(Range='bytes=0-1,5-6').status_code, 200)
+
+    def test_if_range_with_a_stale_etag_sends_the_whole_file(self):
+        etag = self.download()['ETag']
+        self.assertEqual(self.download(Range='bytes=0-9', If_Range=etag).status_code, 206)
+
+        response = self.download(Range='bytes=0-9', If_Range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.getvalue(), self.CONTENT)
+
+    def test_if_none_match(self):
+        etag = self.download()['ETag']
+        response = self.download(If_None_Match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(self.download(If_None_Match='"other", ' + etag).status_code, 304)
+        self.assertEqual(self.download(If_None_Match='"other"').status_code, 200)
+
+    def test_original_stands_in_for_a_pending_preview(self):
+        response = self.client.get(self.url, {'reference_id': self.application.reference_id})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Document-Rendition'], 'original')
+        self.assertEqual(response.getvalue(), self.CONTENT)
+
+        DocumentBlob.objects.update(rendition_status='failed')
+        response = self.client.get(self.url, {'reference_id': self.application.reference_id})
+        self.assertEqual(response.status_code, 404)
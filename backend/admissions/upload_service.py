@@ -0,0 +1,190 @@
+"""
+Chunked upload service for admission documents.
+
+Chunks are streamed straight to storage as they arrive and are only
+concatenated on finalize, through a temporary file on disk, so a document
+is never held fully in worker memory.
+"""
+import hashlib
+import logging
+import tempfile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from utils.db import lock_rows, retry_if_locked
+from .blob_service import attach_documents, store_blob
+from .models import DocumentUploadSession
+
+logger = logging.getLogger(__name__)
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """Raised when an upload session or chunk is invalid"""
+
+
+def get_upload_limits():
+    """Return (default_chunk_size, max_chunk_size, max_file_size) in bytes"""
+    return (
+        getattr(settings, 'ADMISSION_UPLOAD_CHUNK_SIZE', 1024 * 1024),
+        getattr(settings, 'ADMISSION_UPLOAD_MAX_CHUNK_SIZE', 5 * 1024 * 1024),
+        getattr(settings, 'ADMISSION_UPLOAD_MAX_FILE_SIZE', 25 * 1024 * 1024),
+    )
+
+
+def save_uploaded_document(uploaded_file):
+    """Store an UploadedFile as a content-addressed blob; it is read through chunks()"""
+    blob, _ = store_blob(uploaded_file, uploaded_file.name, uploaded_file.content_type or '')
+    return blob
+
+
+def create_upload_session(application, document_key, filename, total_size, chunk_size=None,
+                          content_type='', checksum=''):
+    """Start a resumable upload session for one document"""
+    default_chunk_size, max_chunk_size, max_file_size = get_upload_limits()
+    chunk_size = chunk_size or default_chunk_size
+
+    if total_size <= 0:
+        raise UploadError('total_size must be greater than zero')
+    if total_size > max_file_size:
+        raise UploadError(f'File too large. Maximum size is {max_file_size // (1024 * 1024)}MB')
+    if chunk_size <= 0 or chunk_size > max_chunk_size:
+        raise UploadError(f'chunk_size must be between 1 and {max_chunk_size} bytes')
+
+    return DocumentUploadSession.objects.create(
+        application=application,
+        document_key=document_key,
+        filename=filename,
+        content_type=content_type,
+        total_size=total_size,
+        chunk_size=chunk_size,
+        checksum=checksum.lower(),
+    )
+
+
+def _ensure_active(session):
+    if session.status != 'active':
+        raise UploadError(f'Upload session is {session.status}')
+    if session.is_expired():
+        raise UploadError('Upload session has expired. Please start a new upload.')
+
+
+def store_chunk(session, index, chunk_file):
+    """
+    Write one chunk to storage and record it on the session.
+
+    Re-sending a chunk that was already received replaces it, so clients can
+    simply retry whatever chunk failed.
+    """
+    _ensure_active(session)
+
+    if index < 0 or index >= session.total_chunks:
+        raise UploadError(f'Chunk index must be between 0 and {session.total_chunks - 1}')
+
+    expected_size = session.expected_chunk_size(index)
+    if chunk_file.size != expected_size:
+        raise UploadError(f'Chunk {index} must be {expected_size} bytes, got {chunk_file.size}')
+
+    chunk_path = session.chunk_path(index)
+    if default_storage.exists(chunk_path):
+        default_storage.delete(chunk_path)
+    saved_path = default_storage.save(chunk_path, chunk_file)
+    if saved_path != chunk_path:
+        default_storage.delete(saved_path)
+        raise UploadError(f'Chunk {index} is being written concurrently. Please retry.')
+
+    return _record_chunk(session, index)
+
+
+@retry_if_locked
+def _record_chunk(session, index):
+    """Add a stored chunk to the session's received list under a row lock"""
+    with transaction.atomic():
+        lock_rows(DocumentUploadSession.objects.filter(pk=session.pk))
+        locked = DocumentUploadSession.objects.get(pk=session.pk)
+        if index not in locked.received_chunks:
+            locked.received_chunks = sorted(locked.received_chunks + [index])
+            locked.save(update_fields=['received_chunks', 'updated_at'])
+    return locked
+
+
+def discard_chunks(session):
+    """Delete every chunk file stored for a session"""
+    for index in range(session.total_chunks):
+        chunk_path = session.chunk_path(index)
+        try:
+            if default_storage.exists(chunk_path):
+                default_storage.delete(chunk_path)
+        except Exception as e:
+            logger.warning(f"Could not delete chunk {chunk_path}: {str(e)}")
+
+
+def _assemble_chunks(session, destination):
+    """Stream all chunks into a file object and return the SHA-256 hex digest"""
+    digest = hashlib.sha256()
+    for index in range(session.total_chunks):
+        with default_storage.open(session.chunk_path(index), 'rb') as part:
+            for block in iter(lambda: part.read(READ_BLOCK_SIZE), b''):
+                digest.update(block)
+                destination.write(block)
+    return digest.hexdigest()
+
+
+def finalize_upload(session, checksum=''):
+    """
+    Assemble the chunks, verify size and checksum, and attach the document.
+
+    The assembled file is stored as a content-addressed blob, and the
+    application's documents field is updated under a row lock so parallel
+    finalizes for different document keys never overwrite each other.
+    """
+    _ensure_active(session)
+
+    missing = session.missing_chunks()
+    if missing:
+        raise UploadError(f'Missing chunks: {missing[:20]}')
+
+    expected_checksum = (checksum or session.checksum).lower()
+    if not expected_checksum:
+        raise UploadError('A SHA-256 checksum is required to finalize the upload')
+
+    with tempfile.TemporaryFile() as assembled:
+        actual_checksum = _assemble_chunks(session, assembled)
+        if assembled.tell() != session.total_size:
+            raise UploadError(f'Assembled size {assembled.tell()} does not match {session.total_size}')
+        if actual_checksum != expected_checksum:
+            raise UploadError('Checksum mismatch. Please re-upload the file.')
+
+        assembled.seek(0)
+        blob, _ = store_blob(
+            File(assembled, name=session.filename),
+            session.filename,
+            session.content_type,
+            sha256=actual_checksum
+        )
+
+    locked_session, application = _complete_session(session, blob, actual_checksum)
+    discard_chunks(locked_session)
+    return locked_session, application
+
+
+@retry_if_locked
+def _complete_session(session, blob, checksum):
+    """Attach the assembled blob and mark the session completed, once"""
+    with transaction.atomic():
+        lock_rows(DocumentUploadSession.objects.filter(pk=session.pk))
+        locked_session = DocumentUploadSession.objects.get(pk=session.pk)
+        if locked_session.status != 'active':
+            raise UploadError(f'Upload session is {locked_session.status}')
+
+        application = attach_documents(session.application_id, {session.document_key: blob})
+
+        locked_session.status = 'completed'
+        locked_session.checksum = checksum
+        locked_session.file_path = blob.storage_path
+        locked_session.save(update_fields=['status', 'checksum', 'file_path', 'updated_at'])
+    return locked_session, application
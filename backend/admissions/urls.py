@@ -17,6 +17,11 @@ urlpatterns = [
     path('fee-payment/init/', views.FeePaymentInitAPIView.as_view(), name='init-fee-payment'),
     path('fee-calculation/', views.FeeCalculationAPIView.as_view(), name='fee-calculation'),
     path('documents/<int:application_id>/', views.DocumentUploadAPIView.as_view(), name='upload-documents'),
+    path('documents/<int:application_id>/<str:document_key>/download/', views.DocumentDownloadAPIView.as_view(), name='download-document'),
+    path('documents/<int:application_id>/uploads/', views.DocumentUploadSessionCreateAPIView.as_view(), name='create-upload-session'),
+    path('documents/uploads/<uuid:upload_id>/', views.DocumentUploadSessionAPIView.as_view(), name='upload-session'),
+    path('documents/uploads/<uuid:upload_id>/chunks/<int:index>/', views.DocumentUploadChunkAPIView.as_view(), name='upload-chunk'),
+    path('documents/uploads/<uuid:upload_id>/complete/', views.DocumentUploadFinalizeAPIView.as_view(), name='finalize-upload'),
     path('ocr-extract/', views.OCRFormExtractionAPIView.as_view(), name='ocr-form-extraction'),
     path('enroll/', views.EnrollmentAPIView.as_view(), name='enroll-student'),
     path('withdraw/', views.WithdrawalAPIView.as_view(), name='withdraw-student'),
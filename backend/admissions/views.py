@@ -10,10 +10,10 @@ from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils import timezone
 from django.db.models import Q
 from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 import os
 from schools.models import School
-from .models import AdmissionApplication, EmailVerification, SchoolAdmissionDecision
+from utils.file_delivery import serve_file
+from .models import AdmissionApplication, EmailVerification, SchoolAdmissionDecision, DocumentUploadSession
 from .serializers import (
     AdmissionApplicationSerializer, 
     AdmissionApplicationCreateSerializer,
@@ -24,10 +24,20 @@ from .serializers import (
     SchoolAdmissionDecisionSerializer,
     SchoolDecisionUpdateSerializer,
     StudentChoiceSerializer,
-    AdmissionApplicationWithDecisionsSerializer
+    AdmissionApplicationWithDecisionsSerializer,
+    DocumentUploadSessionCreateSerializer,
+    DocumentUploadSessionSerializer
 )
 from .email_service import send_otp_email, send_admission_confirmation_email
 from .ocr_service import OCRService
+from .blob_service import attach_documents, build_document_renditions, get_blobs_by_path
+from .upload_service import (
+    UploadError,
+    create_upload_session,
+    finalize_upload,
+    save_uploaded_document,
+    store_chunk
+)
 
 logger = logging.getLogger(__name__)
 
@@ -224,7 +234,13 @@ class SchoolAdmissionReviewAPIView(APIView):
                 Q(third_preference_school_id=school_id)
             ).prefetch_related('school_decisions')
             
-            serializer = AdmissionApplicationWithDecisionsSerializer(applications, many=True)
+            # Resolve document renditions for every listed application in one query
+            document_paths = [path for app in applications for path in (app.documents or {}).values()]
+            serializer = AdmissionApplicationWithDecisionsSerializer(
+                applications,
+                many=True,
+                context={'document_blobs': get_blobs_by_path(document_paths)}
+            )
             
             return Response({
                 'success': True,
@@ -444,20 +460,21 @@ class FeePaymentInitAPIView(APIView):
         
         try:
             from fees.models import FeeStructure
+            from fees.fee_resolver import get_course_fee
             from decimal import Decimal
             
             application = AdmissionApplication.objects.get(reference_id=reference_id)
             
             # Get the selected school decision
             if school_decision_id:
-                school_decision = SchoolAdmissionDecision.objects.get(
+                school_decision = SchoolAdmissionDecision.objects.select_related('school').get(
                     id=school_decision_id,
                     application=application,
                     decision='accepted'
                 )
             else:
                 # If no specific school decision ID, get the student's choice
-                school_decision = SchoolAdmissionDecision.objects.filter(
+                school_decision = SchoolAdmissionDecision.objects.select_related('school').filter(
                     application=application,
                     decision='accepted',
                     is_student_choice=True
@@ -465,7 +482,7 @@ class FeePaymentInitAPIView(APIView):
                 
                 if not school_decision:
                     # If no student choice yet, get any accepted school
-                    school_decision = SchoolAdmissionDecision.objects.filter(
+                    school_decision = SchoolAdmissionDecision.objects.select_related('school').filter(
                         application=application,
                         decision='accepted'
                     ).first()
@@ -476,24 +493,21 @@ class FeePaymentInitAPIView(APIView):
                     'message': 'No accepted school found for this application'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Get fee structure for the school and course
-            try:
-                fee_structure = FeeStructure.objects.get(
-                    school=school_decision.school,
-                    course=application.course_applied,
-                    semester=1  # Default to first semester for admission
-                )
-            except FeeStructure.DoesNotExist:
+            # Get fee structure for the school and course (first semester for admission)
+            fee_structure = get_course_fee(school_decision.school_id, application.course_applied, 1)
+            if fee_structure is None:
                 # Create a default fee structure if none exists
-                fee_structure = FeeStructure.objects.create(
-                    school=school_decision.school,
+                fee_structure, _ = FeeStructure.objects.get_or_create(
+                    school_id=school_decision.school_id,
                     course=application.course_applied,
                     semester=1,
-                    tuition_fee=Decimal('5000.00'),  # Default admission fee
-                    library_fee=Decimal('500.00'),
-                    lab_fee=Decimal('1000.00'),
-                    exam_fee=Decimal('500.00'),
-                    total_fee=Decimal('7000.00')
+                    defaults={
+                        'tuition_fee': Decimal('5000.00'),  # Default admission fee
+                        'library_fee': Decimal('500.00'),
+                        'lab_fee': Decimal('1000.00'),
+                        'exam_fee': Decimal('500.00'),
+                        'total_fee': Decimal('7000.00')
+                    }
                 )
             
             # Calculate any additional fees (admission fee, etc.)
@@ -546,29 +560,18 @@ class DocumentUploadAPIView(APIView):
                 'message': 'Application not found'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        uploaded_documents = {}
+        uploaded_blobs = {}
         
-        # Process each uploaded file
+        # Store each uploaded file once per unique content (streamed chunk by chunk)
         for key, file in request.FILES.items():
             if file:
-                # Create a unique filename
-                filename = f"admission_{application_id}_{key}_{file.name}"
-                
-                # Save the file
-                file_path = default_storage.save(
-                    f"admissions/{application_id}/{filename}",
-                    ContentFile(file.read())
-                )
-                
-                # Store the path in the documents dict
-                uploaded_documents[key] = file_path
-        
-        # Update the application's documents field
-        if uploaded_documents:
-            if not application.documents:
-                application.documents = {}
-            application.documents.update(uploaded_documents)
-            application.save()
+                uploaded_blobs[key] = save_uploaded_document(file)
+        
+        # Update the application's documents field under a row lock
+        if uploaded_blobs:
+            attach_documents(application_id, uploaded_blobs)
+        
+        uploaded_documents = {key: blob.storage_path for key, blob in uploaded_blobs.items()}
         
         return Response({
             'success': True,
@@ -577,12 +580,15 @@ class DocumentUploadAPIView(APIView):
         })
         
     def get(self, request, application_id=None):
-        """Get documents for an admission application"""
+        """Get documents for an admission application with their lightweight renditions"""
         try:
             application = AdmissionApplication.objects.get(id=application_id)
+            documents = application.documents or {}
+            renditions = build_document_renditions(documents, get_blobs_by_path(documents.values()))
             return Response({
                 'success': True,
-                'documents': application.documents or {}
+                'documents': documents,
+                'renditions': renditions
             })
         except AdmissionApplication.DoesNotExist:
             return Response({
@@ -591,6 +597,221 @@ class DocumentUploadAPIView(APIView):
             }, status=status.HTTP_404_NOT_FOUND)
 
 
+class DocumentDownloadAPIView(APIView):
+    """
+    API view for downloading an admission document after an access check.
+    
+    The transfer itself is handed to the web server (X-Accel-Redirect/X-Sendfile)
+    when configured, otherwise streamed with Range and If-None-Match support.
+    """
+    permission_classes = [AllowAny]  # Access is checked per application below
+    
+    RENDITIONS = ('original', 'preview', 'thumbnail')
+    
+    def can_access(self, request, application):
+        """School staff of a preferred school, superusers, or the applicant via reference ID"""
+        user = request.user
+        if user and user.is_authenticated:
+            if user.is_superuser or getattr(user, 'role', None) == 'management':
+                return True
+            school_ids = {
+                application.first_preference_school_id,
+                application.second_preference_school_id,
+                application.third_preference_school_id,
+            }
+            if user.school_id and user.school_id in school_ids and user.role != 'student':
+                return True
+        
+        reference_id = request.query_params.get('reference_id')
+        return bool(reference_id) and reference_id == application.reference_id
+    
+    def get(self, request, application_id=None, document_key=None):
+        try:
+            application = AdmissionApplication.objects.get(id=application_id)
+        except AdmissionApplication.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Application not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if not self.can_access(request, application):
+            return Response({
+                'success': False,
+                'message': 'You do not have permission to view this document'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        storage_path = (application.documents or {}).get(document_key)
+        if not isinstance(storage_path, str) or not default_storage.exists(storage_path):
+            return Response({
+                'success': False,
+                'message': 'Document not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        # Lightweight by default; the original only when asked for explicitly
+        rendition = request.query_params.get('rendition', 'preview')
+        if rendition not in self.RENDITIONS:
+            return Response({
+                'success': False,
+                'message': f'Invalid rendition. Choose one of: {", ".join(self.RENDITIONS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        blob = get_blobs_by_path([storage_path]).get(storage_path)
+        content_type = blob.content_type if blob else None
+        content_hash = blob.sha256 if blob else None
+        filename = os.path.basename(storage_path)
+        
+        rendition_path = getattr(blob, f'{rendition}_path', '') if blob and rendition != 'original' else ''
+        if rendition_path:
+            storage_path = rendition_path
+            content_type = None
+            content_hash = f'{blob.sha256}-{rendition}'
+            filename = f'{document_key}_{rendition}{os.path.splitext(rendition_path)[1]}'
+        elif rendition != 'original':
+            # The original stands in while the rendition is being generated, and
+            # for files that have no renditions; a failed rendition is an error
+            if blob and blob.rendition_status not in ('pending', 'unsupported'):
+                return Response({
+                    'success': False,
+                    'message': f'The {rendition} of this document is not available; request rendition=original'
+                }, status=status.HTTP_404_NOT_FOUND)
+            rendition = 'original'
+        
+        response = serve_file(
+            request,
+            storage_path,
+            content_type=content_type,
+            filename=filename,
+            content_hash=content_hash,
+            as_attachment=request.query_params.get('download') == 'true'
+        )
+        response['X-Document-Rendition'] = rendition
+        return response
+
+
+class DocumentUploadSessionCreateAPIView(APIView):
+    """API view for starting a resumable chunked document upload"""
+    permission_classes = [AllowAny]  # Same access as direct document upload
+    
+    def post(self, request, application_id=None):
+        """Create an upload session for one document of an application"""
+        try:
+            application = AdmissionApplication.objects.get(id=application_id)
+        except AdmissionApplication.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Application not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = DocumentUploadSessionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                'success': False,
+                'errors': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            session = create_upload_session(application, **serializer.validated_data)
+        except UploadError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': DocumentUploadSessionSerializer(session).data
+        }, status=status.HTTP_201_CREATED)
+
+
+class DocumentUploadSessionAPIView(APIView):
+    """API view for checking a chunked upload so the client can resume it"""
+    permission_classes = [AllowAny]
+    
+    def get(self, request, upload_id=None):
+        try:
+            session = DocumentUploadSession.objects.get(upload_id=upload_id)
+        except DocumentUploadSession.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Upload session not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return Response({
+            'success': True,
+            'data': DocumentUploadSessionSerializer(session).data
+        })
+
+
+class DocumentUploadChunkAPIView(APIView):
+    """API view for uploading one numbered chunk of a document"""
+    parser_classes = [MultiPartParser, FormParser]
+    permission_classes = [AllowAny]
+    
+    def put(self, request, upload_id=None, index=None):
+        """Store the chunk sent in the multipart `chunk` field"""
+        chunk = request.FILES.get('chunk')
+        if not chunk:
+            return Response({
+                'success': False,
+                'message': 'No chunk provided. Send the bytes in the "chunk" field.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            session = DocumentUploadSession.objects.get(upload_id=upload_id)
+        except DocumentUploadSession.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Upload session not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            session = store_chunk(session, index, chunk)
+        except UploadError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'data': {
+                'upload_id': str(session.upload_id),
+                'received_chunks': len(session.received_chunks),
+                'total_chunks': session.total_chunks,
+                'missing_chunks': session.missing_chunks()
+            }
+        })
+
+
+class DocumentUploadFinalizeAPIView(APIView):
+    """API view for assembling a chunked upload and attaching it to the application"""
+    permission_classes = [AllowAny]
+    
+    def post(self, request, upload_id=None):
+        try:
+            session = DocumentUploadSession.objects.get(upload_id=upload_id)
+        except DocumentUploadSession.DoesNotExist:
+            return Response({
+                'success': False,
+                'message': 'Upload session not found'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            session, application = finalize_upload(session, checksum=request.data.get('checksum', ''))
+        except UploadError as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f'Successfully uploaded {session.document_key}',
+            'data': DocumentUploadSessionSerializer(session).data,
+            'documents': application.documents
+        })
+
+
 class FeeCalculationAPIView(APIView):
     """API view for calculating fee based on student's course and category"""
     permission_classes = [AllowAny]
@@ -1,3 +1,12 @@
 from django.contrib import admin
+from .models import AtRiskStudent
 
-# Register your models here.
+
+@admin.register(AtRiskStudent)
+class AtRiskStudentAdmin(admin.ModelAdmin):
+    """Admin configuration for AtRiskStudent"""
+    
+    list_display = ['student', 'school', 'risk_level', 'risk_score', 'attendance_rate_30d', 'overdue_invoices', 'computed_at']
+    list_filter = ['risk_level', 'school']
+    search_fields = ['student__admission_number', 'student__first_name', 'student__last_name']
+    readonly_fields = ['computed_at']
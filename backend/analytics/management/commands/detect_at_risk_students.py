@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from analytics.risk_service import RISK_LEVELS, detect_at_risk_students
+
+
+class Command(BaseCommand):
+    help = 'Score every student for dropout risk and refresh the at-risk table (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only assess students of this school ID')
+
+    def handle(self, *args, **options):
+        report = detect_at_risk_students(school_id=options['school'])
+
+        self.stdout.write(f"- Students assessed: {report['students']}")
+        for _, level in RISK_LEVELS:
+            self.stdout.write(f"- {level.capitalize()} risk: {report['levels'][level]}")
+        for phase, seconds in report['timings'].items():
+            self.stdout.write(f'- {phase.capitalize()}: {seconds:.2f}s')
+
+        total = sum(report['timings'].values())
+        self.stdout.write(self.style.SUCCESS(
+            f"\nAt-risk detection completed in {total:.2f}s: "
+            f"{sum(report['levels'].values())} students flagged"
+        ))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('schools', '0001_initial'),
+        ('users', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AtRiskStudent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('risk_score', models.FloatField()),
+                ('risk_level', models.CharField(choices=[('low', 'Low'), ('medium', 'Medium'), ('high', 'High')], max_length=10)),
+                ('attendance_rate_30d', models.FloatField(blank=True, null=True)),
+                ('attendance_rate_90d', models.FloatField(blank=True, null=True)),
+                ('recent_exam_percentage', models.FloatField(blank=True, null=True)),
+                ('exam_trend', models.FloatField(blank=True, help_text='Change in exam percentage points vs. the earlier period', null=True)),
+                ('overdue_invoices', models.PositiveIntegerField(default=0)),
+                ('overdue_amount', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reasons', models.JSONField(default=list)),
+                ('computed_at', models.DateTimeField()),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='schools.school')),
+                ('student', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='risk_assessment', to='users.studentprofile')),
+            ],
+            options={
+                'ordering': ['-risk_score'],
+                'indexes': [models.Index(fields=['school', '-risk_score'], name='analytics_a_school__e7f441_idx'), models.Index(fields=['school', 'risk_level'], name='analytics_a_school__74097a_idx')],
+            },
+        ),
+    ]
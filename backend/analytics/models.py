@@ -1,3 +1,39 @@
 from django.db import models
 
-# Create your models here.
+
+class AtRiskStudent(models.Model):
+    """
+    Student flagged by the nightly at-risk detection job.
+
+    The table is a snapshot: `detect_at_risk_students` replaces a school's
+    rows on every run, so it only ever holds the latest assessment.
+    """
+    
+    RISK_LEVELS = [
+        ('low', 'Low'),
+        ('medium', 'Medium'),
+        ('high', 'High'),
+    ]
+    
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, null=True, blank=True)
+    student = models.OneToOneField('users.StudentProfile', on_delete=models.CASCADE, related_name='risk_assessment')
+    risk_score = models.FloatField()
+    risk_level = models.CharField(max_length=10, choices=RISK_LEVELS)
+    attendance_rate_30d = models.FloatField(null=True, blank=True)
+    attendance_rate_90d = models.FloatField(null=True, blank=True)
+    recent_exam_percentage = models.FloatField(null=True, blank=True)
+    exam_trend = models.FloatField(null=True, blank=True, help_text="Change in exam percentage points vs. the earlier period")
+    overdue_invoices = models.PositiveIntegerField(default=0)
+    overdue_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reasons = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', '-risk_score']),
+            models.Index(fields=['school', 'risk_level']),
+        ]
+        ordering = ['-risk_score']
+    
+    def __str__(self):
+        return f"{self.student} - {self.risk_level} ({self.risk_score:.0f})"
@@ -0,0 +1,322 @@
+"""
+Nightly at-risk student detection.
+
+Signals for every student are loaded with a few grouped queries (attendance,
+exam results, overdue fees) into NumPy arrays aligned on student id, scored
+in one vectorized pass and written to `AtRiskStudent` school by school.
+
+Score (0-100):
+    attendance  up to 50 points, scaling from 90% attendance (0) down to 50% (50)
+    exams       up to 20 points for a low recent average (60% -> 30%)
+                up to 10 points for a drop against the earlier period (0 -> 20 points)
+    fees        up to 20 points, scaling with the number of overdue invoices (3+ -> 20)
+"""
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Avg, Count, F, FloatField, Q, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from attendance.archive_service import STATUS_CODES, decode_archive
+from attendance.models import ArchivedSessionAttendance, AttendanceRecord
+from exams.models import ExamResult
+from fees.models import FeeInvoice
+from users.models import StudentProfile
+from .models import AtRiskStudent
+
+RECENT_ATTENDANCE_DAYS = 30
+ATTENDANCE_DAYS = 90
+RECENT_EXAM_DAYS = 90
+EXAM_HISTORY_DAYS = 365
+
+LOW_ATTENDANCE = 75.0
+LOW_EXAM_PERCENTAGE = 40.0
+EXAM_DROP = 10.0
+
+RISK_LEVELS = [(60.0, 'high'), (35.0, 'medium'), (20.0, 'low')]
+MIN_STORED_SCORE = RISK_LEVELS[-1][0]
+
+ATTENDED_CODES = [STATUS_CODES['present'], STATUS_CODES['late']]
+
+
+def load_students(school_id=None):
+    """(student_ids, school_ids) arrays ordered by student id; school id -1 for students without a school"""
+    students = StudentProfile.objects.order_by('id')
+    if school_id is not None:
+        students = students.filter(school_id=school_id)
+    rows = students.values_list('id', 'school_id')
+    pairs = np.fromiter(
+        (value for student_id, school in rows.iterator(chunk_size=10000)
+         for value in (student_id, -1 if school is None else school)),
+        dtype=np.int64
+    ).reshape(-1, 2)
+    return pairs[:, 0].copy(), pairs[:, 1].copy()
+
+
+def _scatter(student_ids, rows, columns):
+    """
+    Place grouped query rows (student_id, value, ...) into arrays aligned on
+    `student_ids`; students without a row get NaN.
+    """
+    result = np.full((columns, len(student_ids)), np.nan)
+    if not rows or not len(student_ids):
+        return result
+    data = np.array(rows, dtype=np.float64).reshape(len(rows), columns + 1)
+    positions = np.searchsorted(student_ids, data[:, 0].astype(np.int64))
+    positions = np.minimum(positions, len(student_ids) - 1)
+    known = student_ids[positions] == data[:, 0]
+    result[:, positions[known]] = data[known, 1:].T
+    return result
+
+
+def load_attendance(student_ids, today, school_id=None):
+    """
+    Sessions and attended sessions per student in the last 30 and 90 days.
+
+    Returns a (4, n) array: sessions_30, attended_30, sessions_90, attended_90.
+    """
+    window_start = today - timedelta(days=ATTENDANCE_DAYS)
+    recent_start = today - timedelta(days=RECENT_ATTENDANCE_DAYS)
+    attended = Q(status__in=['present', 'late'])
+    recent = Q(session__date__gte=recent_start)
+
+    records = AttendanceRecord.objects.filter(session__date__gte=window_start, session__date__lte=today)
+    if school_id is not None:
+        records = records.filter(student__school_id=school_id)
+    rows = list(
+        records.values('student_id').annotate(
+            sessions_30=Count('id', filter=recent),
+            attended_30=Count('id', filter=recent & attended),
+            sessions_90=Count('id'),
+            attended_90=Count('id', filter=attended),
+        ).order_by().values_list('student_id', 'sessions_30', 'attended_30', 'sessions_90', 'attended_90')
+    )
+    counts = np.nan_to_num(_scatter(student_ids, rows, 4))
+    if not len(student_ids):
+        return counts
+
+    # Archived sessions are rare inside a 90 day window, but still count
+    archives = ArchivedSessionAttendance.objects.filter(
+        session__date__gte=window_start, session__date__lte=today
+    ).values_list('session__date', 'student_ids', 'statuses', 'record_count')
+    for session_date, packed_ids, packed_statuses, record_count in archives:
+        archive = ArchivedSessionAttendance(student_ids=packed_ids, statuses=packed_statuses, record_count=record_count)
+        archived_ids, codes = decode_archive(archive)
+        positions = np.minimum(np.searchsorted(student_ids, archived_ids), len(student_ids) - 1)
+        known = student_ids[positions] == archived_ids
+        positions, codes = positions[known], codes[known]
+        present = np.isin(codes, ATTENDED_CODES).astype(np.float64)
+        np.add.at(counts[2], positions, 1)
+        np.add.at(counts[3], positions, present)
+        if session_date >= recent_start:
+            np.add.at(counts[0], positions, 1)
+            np.add.at(counts[1], positions, present)
+    return counts
+
+
+def load_exam_percentages(student_ids, today, school_id=None):
+    """
+    Average exam percentage per student for the last 90 days and for the
+    rest of the year before. Returns a (2, n) array: recent, earlier (NaN
+    when the student has no result in the period).
+    """
+    recent = Q(exam__date__gte=today - timedelta(days=RECENT_EXAM_DAYS))
+    percentage = F('marks_obtained') * 100.0 / Cast('exam__max_marks', FloatField())
+
+    results = ExamResult.objects.filter(
+        exam__date__gte=today - timedelta(days=EXAM_HISTORY_DAYS),
+        exam__date__lte=today,
+        exam__max_marks__gt=0
+    )
+    if school_id is not None:
+        results = results.filter(student__school_id=school_id)
+    rows = list(
+        results.values('student_id').annotate(
+            recent_percentage=Avg(percentage, filter=recent, output_field=FloatField()),
+            earlier_percentage=Avg(percentage, filter=~recent, output_field=FloatField()),
+        ).order_by().values_list('student_id', 'recent_percentage', 'earlier_percentage')
+    )
+    rows = [tuple(np.nan if value is None else value for value in row) for row in rows]
+    return _scatter(student_ids, rows, 2)
+
+
+def load_overdue_fees(student_ids, today, school_id=None):
+    """Overdue invoice count and amount per student. Returns a (2, n) array."""
+    invoices = FeeInvoice.objects.filter(status__in=['pending', 'overdue'], due_date__lt=today)
+    if school_id is not None:
+        invoices = invoices.filter(student__school_id=school_id)
+    rows = list(
+        invoices.values('student_id').annotate(
+            overdue_count=Count('id'),
+            overdue_amount=Sum('amount'),
+        ).order_by().values_list('student_id', 'overdue_count', 'overdue_amount')
+    )
+    return np.nan_to_num(_scatter(student_ids, rows, 2))
+
+
+def score_students(attendance, exams, fees):
+    """
+    Vectorized risk scores.
+
+    Takes the arrays of the load_* functions and returns a dict of (n,)
+    arrays: attendance rates, recent exam percentage, exam trend, overdue
+    counts/amounts and the combined score.
+    """
+    sessions_30, attended_30, sessions_90, attended_90 = attendance
+    recent_exam, earlier_exam = exams
+    overdue_count, overdue_amount = fees
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate_30 = np.where(sessions_30 > 0, attended_30 * 100 / sessions_30, np.nan)
+        rate_90 = np.where(sessions_90 > 0, attended_90 * 100 / sessions_90, np.nan)
+    trend = recent_exam - earlier_exam
+
+    # The recent window wins when the student had classes in it
+    rate = np.where(np.isnan(rate_30), rate_90, rate_30)
+    attendance_points = 50 * np.clip((90 - np.nan_to_num(rate, nan=100.0)) / 40, 0, 1)
+    exam_points = 20 * np.clip((60 - np.nan_to_num(recent_exam, nan=100.0)) / 30, 0, 1)
+    trend_points = 10 * np.clip(-np.nan_to_num(trend) / 20, 0, 1)
+    fee_points = 20 * np.clip(overdue_count / 3, 0, 1)
+
+    return {
+        'attendance_rate_30d': rate_30,
+        'attendance_rate_90d': rate_90,
+        'recent_exam_percentage': recent_exam,
+        'exam_trend': trend,
+        'overdue_invoices': overdue_count,
+        'overdue_amount': overdue_amount,
+        'risk_score': np.round(attendance_points + exam_points + trend_points + fee_points, 1),
+    }
+
+
+def risk_levels(scores):
+    """Risk level per score ('' below the lowest stored level)"""
+    levels = np.full(len(scores), '', dtype=object)
+    for threshold, level in reversed(RISK_LEVELS):
+        levels[scores >= threshold] = level
+    return levels
+
+
+def _optional(value, digits=1):
+    return None if np.isnan(value) else round(float(value), digits)
+
+
+def build_reasons(metrics, index):
+    """Human readable reasons for one flagged student"""
+    reasons = []
+    rate_30 = metrics['attendance_rate_30d'][index]
+    rate_90 = metrics['attendance_rate_90d'][index]
+    recent_exam = metrics['recent_exam_percentage'][index]
+    trend = metrics['exam_trend'][index]
+    overdue = int(metrics['overdue_invoices'][index])
+
+    if rate_30 < LOW_ATTENDANCE:
+        reasons.append(f'Attendance {rate_30:.0f}% in the last {RECENT_ATTENDANCE_DAYS} days')
+    if rate_90 < LOW_ATTENDANCE:
+        reasons.append(f'Attendance {rate_90:.0f}% in the last {ATTENDANCE_DAYS} days')
+    if recent_exam < LOW_EXAM_PERCENTAGE:
+        reasons.append(f'Average exam score {recent_exam:.0f}% in the last {RECENT_EXAM_DAYS} days')
+    if trend <= -EXAM_DROP:
+        reasons.append(f'Exam scores dropped {-trend:.0f} points')
+    if overdue:
+        reasons.append(f'{overdue} overdue fee invoice{"s" if overdue > 1 else ""} '
+                       f'({float(metrics["overdue_amount"][index]):.2f})')
+    return reasons
+
+
+def write_assessments(student_ids, school_ids, metrics, computed_at, school_id=None, batch_size=2000):
+    """
+    Replace the stored assessments school by school, one transaction each.
+
+    Each school's transaction also drops any other row of the students it
+    writes, so students who moved school don't collide with their old row.
+
+    Returns {risk_level: count}.
+    """
+    scores = metrics['risk_score']
+    levels = risk_levels(scores)
+    flagged = np.flatnonzero(scores >= MIN_STORED_SCORE)
+
+    by_school = {}
+    for index in flagged[np.argsort(school_ids[flagged], kind='stable')].tolist():
+        by_school.setdefault(int(school_ids[index]), []).append(index)
+
+    if school_id is not None:
+        schools = {school_id}
+    else:
+        # Schools whose students all recovered still need their old rows removed
+        schools = set(by_school) | {
+            -1 if school is None else school
+            for school in AtRiskStudent.objects.values_list('school_id', flat=True).distinct()
+        }
+
+    counts = {level: 0 for _, level in RISK_LEVELS}
+    for school in sorted(schools):
+        rows = [
+            AtRiskStudent(
+                school_id=None if school == -1 else school,
+                student_id=int(student_ids[index]),
+                risk_score=float(scores[index]),
+                risk_level=levels[index],
+                attendance_rate_30d=_optional(metrics['attendance_rate_30d'][index]),
+                attendance_rate_90d=_optional(metrics['attendance_rate_90d'][index]),
+                recent_exam_percentage=_optional(metrics['recent_exam_percentage'][index]),
+                exam_trend=_optional(metrics['exam_trend'][index]),
+                overdue_invoices=int(metrics['overdue_invoices'][index]),
+                overdue_amount=round(float(metrics['overdue_amount'][index]), 2),
+                reasons=build_reasons(metrics, index),
+                computed_at=computed_at,
+            )
+            for index in by_school.get(school, [])
+        ]
+        existing = AtRiskStudent.objects.filter(school__isnull=True) if school == -1 \
+            else AtRiskStudent.objects.filter(school_id=school)
+        with transaction.atomic():
+            existing.delete()
+            # `student` is one-to-one: a student who changed school still has
+            # a row filed under the old school, which may not be replaced yet
+            for start in range(0, len(rows), batch_size):
+                AtRiskStudent.objects.filter(
+                    student_id__in=[row.student_id for row in rows[start:start + batch_size]]
+                ).delete()
+            AtRiskStudent.objects.bulk_create(rows, batch_size=batch_size)
+        for row in rows:
+            counts[row.risk_level] += 1
+    return counts
+
+
+def detect_at_risk_students(school_id=None, today=None):
+    """
+    Run the whole detection: load, score and store.
+
+    Returns a report dict with the number of students, flagged counts per
+    level and seconds spent per phase.
+    """
+    today = today or timezone.localdate()
+    computed_at = timezone.now()
+    timings = {}
+    last = time.perf_counter()
+
+    def lap(phase):
+        nonlocal last
+        now = time.perf_counter()
+        timings[phase] = now - last
+        last = now
+
+    student_ids, school_ids = load_students(school_id)
+    lap('students')
+    attendance = load_attendance(student_ids, today, school_id)
+    lap('attendance')
+    exams = load_exam_percentages(student_ids, today, school_id)
+    lap('exams')
+    fees = load_overdue_fees(student_ids, today, school_id)
+    lap('fees')
+    metrics = score_students(attendance, exams, fees)
+    lap('scoring')
+    counts = write_assessments(student_ids, school_ids, metrics, computed_at, school_id)
+    lap('writing')
+
+    return {'students': len(student_ids), 'levels': counts, 'timings': timings}
@@ -0,0 +1,23 @@
+from rest_framework import serializers
+from .models import AtRiskStudent
+
+
+class AtRiskStudentSerializer(serializers.ModelSerializer):
+    """Serializer for AtRiskStudent model"""
+    student_name = serializers.SerializerMethodField()
+    admission_number = serializers.CharField(source='student.admission_number', read_only=True)
+    course = serializers.CharField(source='student.course', read_only=True)
+    
+    class Meta:
+        model = AtRiskStudent
+        fields = [
+            'id', 'school', 'student', 'student_name', 'admission_number', 'course',
+            'risk_score', 'risk_level', 'attendance_rate_30d', 'attendance_rate_90d',
+            'recent_exam_percentage', 'exam_trend', 'overdue_invoices', 'overdue_amount',
+            'reasons', 'computed_at'
+        ]
+        read_only_fields = fields
+    
+    def get_student_name(self, obj):
+        name = f"{obj.student.first_name or ''} {obj.student.last_name or ''}".strip()
+        return name or f"Student {obj.student.admission_number}"
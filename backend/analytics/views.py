@@ -1,3 +1,33 @@
-from django.shortcuts import render
+from rest_framework import viewsets
+from rest_framework.permissions import IsAuthenticated
+from .models import AtRiskStudent
+from .serializers import AtRiskStudentSerializer
 
-# Create your views here.
+
+class AtRiskStudentViewSet(viewsets.ReadOnlyModelViewSet):
+    """Students flagged by the nightly at-risk detection, highest risk first"""
+    queryset = AtRiskStudent.objects.select_related('student')
+    serializer_class = AtRiskStudentSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        # Risk assessments are for school staff only
+        if user.role in ('student', 'parent'):
+            return queryset.none()
+        if not user.is_superuser:
+            queryset = queryset.filter(school_id=user.school_id) if user.school_id else queryset.none()
+        elif self.request.query_params.get('school', '').isdigit():
+            queryset = queryset.filter(school_id=self.request.query_params['school'])
+
+        # Additional filters: ?risk_level=high&course=<course>
+        risk_level = self.request.query_params.get('risk_level')
+        course = self.request.query_params.get('course')
+        if risk_level:
+            queryset = queryset.filter(risk_level=risk_level)
+        if course:
+            queryset = queryset.filter(student__course=course)
+
+        return queryset.order_by('-risk_score', 'student_id')
@@ -0,0 +1,225 @@
+"""
+Columnar archive for attendance of closed terms.
+
+Once a term is closed its attendance is only read, never edited. Instead of
+one `AttendanceRecord` row per mark, each session is stored as a single
+`ArchivedSessionAttendance` row holding two compressed columns:
+
+    student_ids  ascending student ids, delta-encoded as uint32, zlib-compressed
+    statuses     one 2-bit status code per student (4 per byte), zlib-compressed
+
+Remarks are kept sparsely and the session's most common marker is kept as
+`marked_by`. `get_session_records`/`iter_attendance` read hot and archived
+sessions alike, so reports do not need to know where a session lives.
+"""
+import zlib
+from collections import Counter
+
+import numpy as np
+from django.db import connection, transaction
+
+from utils.db import lock_rows
+from .models import ArchivedSessionAttendance, AttendanceRecord, ClassSession
+
+STATUSES = ['present', 'absent', 'late', 'excused']
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+DELETE_CHUNK_SIZE = 500
+
+
+class SessionArchivedError(Exception):
+    """Raised when attendance of an archived session would be written"""
+
+
+def ensure_not_archived(session_ids):
+    """
+    Raise SessionArchivedError if any of the sessions is archived. Call it
+    after locking the sessions with `lock_rows`, as `archive_sessions` does,
+    so an archive being written cannot be missed.
+    """
+    if ArchivedSessionAttendance.objects.filter(session_id__in=session_ids).exists():
+        raise SessionArchivedError('Attendance for this session has been archived with its closed term')
+
+
+def pack_student_ids(student_ids):
+    """Ascending ids -> compressed uint32 deltas"""
+    ids = np.asarray(student_ids, dtype=np.int64)
+    deltas = np.diff(ids, prepend=0).astype('<u4')
+    return zlib.compress(deltas.tobytes(), 9)
+
+
+def unpack_student_ids(data):
+    deltas = np.frombuffer(zlib.decompress(data), dtype='<u4')
+    return np.cumsum(deltas, dtype=np.int64)
+
+
+def pack_statuses(codes):
+    """2-bit status codes, four per byte, first code in the lowest bits"""
+    codes = np.asarray(codes, dtype=np.uint8)
+    padded = np.zeros(-(-len(codes) // 4) * 4, dtype=np.uint8)
+    padded[:len(codes)] = codes
+    quads = padded.reshape(-1, 4)
+    packed = quads[:, 0] | (quads[:, 1] << 2) | (quads[:, 2] << 4) | (quads[:, 3] << 6)
+    return zlib.compress(packed.astype(np.uint8).tobytes(), 9)
+
+
+def unpack_statuses(data, count):
+    packed = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    codes = np.stack([(packed >> shift) & 0b11 for shift in (0, 2, 4, 6)], axis=1).reshape(-1)
+    return codes[:count]
+
+
+def build_archive(session_id, term, records):
+    """
+    Build the (unsaved) archive row of one session.
+
+    `records` are (student_id, status, marked_by_id, marked_at, remarks)
+    tuples ordered by student_id.
+    """
+    student_ids = [record[0] for record in records]
+    codes = [STATUS_CODES[record[1]] for record in records]
+    markers = Counter(record[2] for record in records)
+
+    return ArchivedSessionAttendance(
+        session_id=session_id,
+        term=term,
+        student_ids=pack_student_ids(student_ids),
+        statuses=pack_statuses(codes),
+        record_count=len(records),
+        marked_by_id=markers.most_common(1)[0][0] if markers else None,
+        marked_at=max((record[3] for record in records), default=None),
+        remarks={str(record[0]): record[4] for record in records if record[4]},
+    )
+
+
+def decode_archive(archive):
+    """Return (student_ids, status_codes) NumPy arrays of an archived session"""
+    student_ids = unpack_student_ids(archive.student_ids)
+    codes = unpack_statuses(archive.statuses, archive.record_count)
+    return student_ids, codes
+
+
+def archive_records(archive):
+    """Reconstruct unsaved AttendanceRecord instances from an archived session"""
+    student_ids, codes = decode_archive(archive)
+    return [
+        AttendanceRecord(
+            session_id=archive.session_id,
+            student_id=int(student_id),
+            status=STATUSES[code],
+            marked_by_id=archive.marked_by_id,
+            marked_at=archive.marked_at,
+            remarks=archive.remarks.get(str(int(student_id)), '')
+        )
+        for student_id, code in zip(student_ids.tolist(), codes.tolist())
+    ]
+
+
+def get_session_records(session):
+    """Attendance records of a session, whether it is live or archived"""
+    archive = ArchivedSessionAttendance.objects.filter(session=session).first()
+    if archive is not None:
+        return archive_records(archive)
+    return list(AttendanceRecord.objects.filter(session=session).order_by('student_id'))
+
+
+def iter_attendance(session_ids):
+    """
+    Yield (session_id, student_id, status) for many sessions.
+
+    Live sessions are read with one values_list query and archived ones are
+    decoded from their compressed columns.
+    """
+    session_ids = list(session_ids)
+    yield from AttendanceRecord.objects.filter(session_id__in=session_ids).values_list(
+        'session_id', 'student_id', 'status'
+    ).order_by('session_id', 'student_id')
+
+    for archive in ArchivedSessionAttendance.objects.filter(session_id__in=session_ids).only(
+        'session_id', 'student_ids', 'statuses', 'record_count'
+    ):
+        student_ids, codes = decode_archive(archive)
+        for student_id, code in zip(student_ids.tolist(), codes.tolist()):
+            yield archive.session_id, student_id, STATUSES[code]
+
+
+def table_size_bytes(model):
+    """
+    Bytes used by a model's table and indexes, or None if the database cannot say.
+
+    On PostgreSQL deleted rows are only reusable after VACUUM; on SQLite the
+    freed pages go to the freelist until VACUUM shrinks the file.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT pg_total_relation_size(%s)', [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    'SELECT SUM(pgsize) FROM dbstat WHERE name IN '
+                    '(SELECT name FROM sqlite_master WHERE tbl_name = %s)',
+                    [table]
+                )
+            except Exception:
+                return None  # SQLite built without the dbstat virtual table
+            return cursor.fetchone()[0] or 0
+    return None
+
+
+def _delete_records(record_ids):
+    """Delete hot records by id, DELETE_CHUNK_SIZE per statement; returns the rows deleted"""
+    deleted = 0
+    table = connection.ops.quote_name(AttendanceRecord._meta.db_table)
+    with connection.cursor() as cursor:
+        for start in range(0, len(record_ids), DELETE_CHUNK_SIZE):
+            chunk = record_ids[start:start + DELETE_CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+            deleted += cursor.rowcount
+    return deleted
+
+
+def archive_sessions(sessions, term, batch_size=200):
+    """
+    Move the attendance of `sessions` into the archive, `batch_size` sessions per transaction.
+
+    Monthly rollups are left untouched (archived marks still count), so the
+    hot rows are removed without sending post_delete signals. The sessions
+    are locked before their records are read, and writers check for an
+    archive under the same lock (`ensure_not_archived`); only the records
+    that went into the archive are deleted. Returns a dict with sessions
+    archived, records moved and archive bytes written.
+    """
+    session_ids = list(
+        sessions.filter(attendance_archive__isnull=True)
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+    report = {'sessions': 0, 'records': 0, 'archive_bytes': 0}
+
+    for start in range(0, len(session_ids), batch_size):
+        batch = session_ids[start:start + batch_size]
+        with transaction.atomic():
+            lock_rows(ClassSession.objects.filter(id__in=batch))
+            rows = AttendanceRecord.objects.select_for_update().filter(session_id__in=batch).values_list(
+                'id', 'session_id', 'student_id', 'status', 'marked_by_id', 'marked_at', 'remarks'
+            ).order_by('session_id', 'student_id')
+
+            by_session = {}
+            record_ids = []
+            for record_id, session_id, *record in rows:
+                by_session.setdefault(session_id, []).append(record)
+                record_ids.append(record_id)
+
+            archives = [build_archive(session_id, term, records) for session_id, records in by_session.items()]
+            ArchivedSessionAttendance.objects.bulk_create(archives)
+
+            # Plain DELETE of exactly the archived rows, without firing rollup signals
+            deleted = _delete_records(record_ids)
+
+        report['sessions'] += len(archives)
+        report['records'] += deleted
+        report['archive_bytes'] += sum(len(archive.student_ids) + len(archive.statuses) for archive in archives)
+
+    return report
+
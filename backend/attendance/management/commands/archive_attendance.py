@@ -0,0 +1,80 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.archive_service import archive_sessions, table_size_bytes
+from attendance.models import ArchivedSessionAttendance, AttendanceRecord, ClassSession
+
+
+class Command(BaseCommand):
+    help = 'Move attendance of a closed term from AttendanceRecord into the compressed session archive'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--term', required=True, help='Label stored with the archive (e.g. 2024-25)')
+        parser.add_argument('--start', required=True, help='First day of the term (YYYY-MM-DD)')
+        parser.add_argument('--end', required=True, help='Last day of the term (YYYY-MM-DD)')
+        parser.add_argument('--school', type=int, help='Only archive sessions of this school ID')
+        parser.add_argument('--batch-size', type=int, default=200, help='Sessions archived per transaction')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many sessions and records would be archived'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options['start'])
+            end = date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError('--start and --end must be dates in YYYY-MM-DD format')
+
+        if start > end:
+            raise CommandError('--start must not be after --end')
+        if end >= timezone.localdate():
+            raise CommandError('Only closed terms can be archived: --end must be in the past')
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+
+        sessions = ClassSession.objects.filter(date__gte=start, date__lte=end)
+        if options['school'] is not None:
+            sessions = sessions.filter(school_id=options['school'])
+
+        pending_records = AttendanceRecord.objects.filter(session__in=sessions).count()
+        if options['dry_run']:
+            self.stdout.write(
+                f"Would archive {pending_records} records from "
+                f"{sessions.filter(attendance_archive__isnull=True).count()} sessions"
+            )
+            return
+
+        total_records = AttendanceRecord.objects.count()
+        hot_before = table_size_bytes(AttendanceRecord)
+        archive_before = table_size_bytes(ArchivedSessionAttendance)
+
+        report = archive_sessions(sessions, options['term'], batch_size=options['batch_size'])
+
+        hot_after = table_size_bytes(AttendanceRecord)
+        archive_after = table_size_bytes(ArchivedSessionAttendance)
+
+        self.stdout.write(f"- Sessions archived: {report['sessions']}")
+        self.stdout.write(f"- Records moved: {report['records']}")
+        self.stdout.write(f"- Compressed columns written: {report['archive_bytes'] / 1024:.1f}KB")
+
+        if hot_before is not None and total_records:
+            # Pages are only returned to the OS by VACUUM, so report by row share
+            reclaimable = hot_before * report['records'] / total_records
+            self.stdout.write(
+                f"- Hot table: {hot_before / 1024:.1f}KB before, {hot_after / 1024:.1f}KB after, "
+                f"~{reclaimable / 1024:.1f}KB reclaimable by VACUUM"
+            )
+            self.stdout.write(
+                f"- Archive table: {archive_before / 1024:.1f}KB before, {archive_after / 1024:.1f}KB after"
+            )
+            if report['archive_bytes']:
+                self.stdout.write(
+                    f"- Bytes per mark: ~{reclaimable / report['records']:.1f} in the hot table, "
+                    f"{report['archive_bytes'] / report['records']:.2f} in the archive columns"
+                )
+
+        self.stdout.write(self.style.SUCCESS(f"\nArchived term {options['term']}"))
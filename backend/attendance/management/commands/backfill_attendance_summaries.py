@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from attendance.models import ClassSession
+from attendance.rollup_service import month_start, next_month, parse_month, rebuild_month
+
+
+class Command(BaseCommand):
+    help = 'Rebuild monthly attendance summaries from raw attendance records (one grouped query per month)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Rebuild a single month (YYYY-MM)')
+        parser.add_argument('--from-month', help='First month to rebuild (YYYY-MM)')
+        parser.add_argument('--to-month', help='Last month to rebuild (YYYY-MM)')
+        parser.add_argument('--school', type=int, help='Only rebuild students of this school ID')
+
+    def parse_month(self, value):
+        month = parse_month(value)
+        if month is None:
+            raise CommandError(f'Invalid month "{value}", expected YYYY-MM')
+        return month
+
+    def handle(self, *args, **options):
+        sessions = ClassSession.objects.all()
+        if options['school'] is not None:
+            sessions = sessions.filter(school_id=options['school'])
+        bounds = sessions.aggregate(first=Min('date'), last=Max('date'))
+
+        if options['month']:
+            first = last = self.parse_month(options['month'])
+        else:
+            if bounds['first'] is None:
+                self.stdout.write('No class sessions found, nothing to backfill')
+                return
+            first = self.parse_month(options['from_month']) if options['from_month'] else month_start(bounds['first'])
+            last = self.parse_month(options['to_month']) if options['to_month'] else month_start(bounds['last'])
+
+        if first > last:
+            raise CommandError('--from-month must not be after --to-month')
+
+        total = 0
+        month = first
+        while month <= last:
+            written = rebuild_month(month, school_id=options['school'])
+            total += written
+            self.stdout.write(f'- {month:%Y-%m}: {written} student summaries')
+            month = next_month(month)
+
+        self.stdout.write(self.style.SUCCESS(f'\nBackfill completed: {total} summaries written'))
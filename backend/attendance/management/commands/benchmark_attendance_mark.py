@@ -0,0 +1,187 @@
+"""
+Management command to load test a school-wide 9am attendance burst.
+
+Creates a throwaway school with one session per class and a full roster per
+session, then has every class teacher mark attendance at the same time through
+the `mark` action (one request per class). With --compare-single the same
+burst is replayed through AttendanceRecordViewSet with one POST per student,
+which is how attendance was marked before the bulk endpoint existed.
+The school and everything created for it is deleted afterwards unless --keep
+is passed.
+"""
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time as dt_time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from attendance.models import AttendanceRecord, ClassSession
+from attendance.views import AttendanceRecordViewSet, ClassSessionViewSet
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+
+STATUSES = ['present', 'present', 'present', 'present', 'absent', 'late']
+
+
+class Command(BaseCommand):
+    help = 'Load test a school-wide burst of bulk attendance marking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classes', type=int, default=40, help='Class sessions marked at the same time')
+        parser.add_argument('--students', type=int, default=50, help='Students per class')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests (worker threads)')
+        parser.add_argument(
+            '--compare-single',
+            action='store_true',
+            help='Also replay the burst with one POST per student'
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the generated school and its data')
+
+    def handle(self, *args, **options):
+        if min(options['classes'], options['students'], options['concurrency']) <= 0:
+            raise CommandError('--classes, --students and --concurrency must be positive')
+
+        school, sessions = self.create_fixture(options['classes'], options['students'])
+        try:
+            self.stdout.write(
+                f"School {school.school_code}: {options['classes']} sessions x "
+                f"{options['students']} students, concurrency {options['concurrency']}\n"
+            )
+            self.run_burst('Bulk mark (one request per class)', self.mark_class, sessions, options)
+
+            if options['compare_single']:
+                AttendanceRecord.objects.filter(session__school=school).delete()
+                self.run_burst('Single records (one request per student)', self.post_records, sessions, options)
+        finally:
+            if not options['keep']:
+                school.delete()
+
+    def create_fixture(self, class_count, students_per_class):
+        suffix = uuid.uuid4().hex[:8]
+        school = School.objects.create(
+            district='BENCHMARK',
+            block='BENCHMARK',
+            village='BENCHMARK',
+            school_name=f'Attendance Benchmark School {suffix}',
+            school_code=f'BM{uuid.uuid4().int % 10 ** 8:08d}',
+            is_active=False
+        )
+
+        sessions = []
+        for class_index in range(class_count):
+            course = f'Class {class_index + 1}'
+            user = User.objects.create_user(
+                username=f'bench-{suffix}-{class_index}',
+                email=f'bench-{suffix}-{class_index}@benchmark.local',
+                password=uuid.uuid4().hex,
+                role='faculty',
+                school=school
+            )
+            faculty = StaffProfile.objects.create(
+                user=user,
+                employee_id=f'BM{suffix}{class_index:04d}',
+                department='Benchmark',
+                designation='Teacher',
+                date_of_joining=date.today()
+            )
+            StudentProfile.objects.bulk_create([
+                StudentProfile(
+                    school=school,
+                    admission_number=f'{class_index:04d}{roll:04d}',
+                    roll_number=str(roll),
+                    course=course,
+                    department='Benchmark',
+                    semester=1,
+                    date_of_birth=date(2010, 1, 1),
+                    address='Benchmark',
+                    emergency_contact='0000000000'
+                )
+                for roll in range(students_per_class)
+            ])
+            session = ClassSession.objects.create(
+                school=school,
+                course=course,
+                subject='Benchmark',
+                batch='A',
+                date=date.today(),
+                start_time=dt_time(9, 0),
+                end_time=dt_time(10, 0),
+                faculty=faculty
+            )
+            student_ids = list(
+                StudentProfile.objects.filter(school=school, course=course).values_list('id', flat=True)
+            )
+            sessions.append((session, user, student_ids))
+        return school, sessions
+
+    def mark_class(self, session, user, student_ids):
+        """Mark one class in a single request; returns (seconds, queries, requests)"""
+        payload = {
+            'attendance_data': [
+                {'student_id': student_id, 'status': STATUSES[index % len(STATUSES)]}
+                for index, student_id in enumerate(student_ids)
+            ]
+        }
+        request = APIRequestFactory().post(f'/api/v1/attendance/sessions/{session.id}/mark/', payload, format='json')
+        force_authenticate(request, user=user)
+        view = ClassSessionViewSet.as_view({'post': 'mark'})
+
+        started = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request, pk=session.id)
+        elapsed = time.perf_counter() - started
+        if response.status_code != 200:
+            raise CommandError(f'Mark failed for session {session.id}: {response.data}')
+        return elapsed, len(queries), 1
+
+    def post_records(self, session, user, student_ids):
+        """Mark one class with one request per student; returns (seconds, queries, requests)"""
+        view = AttendanceRecordViewSet.as_view({'post': 'create'})
+        staff_profile = user.staff_profile
+        query_count = 0
+
+        started = time.perf_counter()
+        for index, student_id in enumerate(student_ids):
+            request = APIRequestFactory().post('/api/v1/attendance/records/', {
+                'session': session.id,
+                'student': student_id,
+                'status': STATUSES[index % len(STATUSES)],
+                'marked_by': staff_profile.id
+            }, format='json')
+            force_authenticate(request, user=user)
+            with CaptureQueriesContext(connection) as queries:
+                response = view(request)
+            query_count += len(queries)
+            if response.status_code != 201:
+                raise CommandError(f'Record create failed for session {session.id}: {response.data}')
+        return time.perf_counter() - started, query_count, len(student_ids)
+
+    def run_burst(self, label, mark, sessions, options):
+        def run(item):
+            try:
+                return mark(*item)
+            finally:
+                connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(run, sessions))
+        elapsed = time.perf_counter() - started
+
+        per_class = sorted(result[0] for result in results)
+        p95 = per_class[min(len(per_class) - 1, int(len(per_class) * 0.95))]
+        requests = sum(result[2] for result in results)
+        queries = sum(result[1] for result in results)
+        marked = len(sessions) * options['students']
+
+        self.stdout.write(
+            self.style.SUCCESS(f'{label}:') +
+            f'\n- Burst finished in {elapsed:.2f}s ({marked / elapsed:.0f} students/s)'
+            f'\n- Seconds per class: avg {statistics.mean(per_class):.3f}s, p95 {p95:.3f}s'
+            f'\n- Requests: {requests}, queries: {queries} ({queries / len(sessions):.1f} per class)\n'
+        )
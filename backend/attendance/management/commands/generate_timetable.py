@@ -0,0 +1,137 @@
+import json
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from attendance.models import ClassSession
+from attendance.scheduling_service import find_clashes
+from attendance.timetable_solver import TimetableError, TimetableProblem, iter_term_dates, solve, timetable_rows
+from schools.models import School
+from users.models import StaffProfile
+
+
+class Command(BaseCommand):
+    help = 'Generate a weekly timetable from a JSON spec and create the class sessions of a term'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, required=True, help='School ID')
+        parser.add_argument('--spec', required=True, help='Timetable spec JSON file (see attendance/timetable_solver.py)')
+        parser.add_argument('--term-start', required=True, help='First day of the term (YYYY-MM-DD)')
+        parser.add_argument('--term-end', required=True, help='Last day of the term (YYYY-MM-DD)')
+        parser.add_argument('--holiday', action='append', default=[], help='Holiday to skip (YYYY-MM-DD), repeatable')
+        parser.add_argument('--restarts', type=int, default=8, help='Seeded searches to run')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+        parser.add_argument('--time-limit', type=int, default=60, help='Seconds allowed for the search')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Sessions per INSERT')
+        parser.add_argument('--dry-run', action='store_true', help='Print the weekly timetable without creating sessions')
+
+    def parse_date(self, value, option):
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Invalid {option} "{value}", expected YYYY-MM-DD')
+
+    def handle(self, *args, **options):
+        school = School.objects.filter(id=options['school']).first()
+        if school is None:
+            raise CommandError(f"School {options['school']} not found")
+
+        term_start = self.parse_date(options['term_start'], '--term-start')
+        term_end = self.parse_date(options['term_end'], '--term-end')
+        if term_start > term_end:
+            raise CommandError('--term-start must not be after --term-end')
+        holidays = [self.parse_date(value, '--holiday') for value in options['holiday']]
+
+        try:
+            with open(options['spec']) as spec_file:
+                spec = json.load(spec_file)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Cannot read spec: {error}')
+
+        faculty_ids = {teacher.get('id') for teacher in spec.get('faculty', [])}
+        known = set(StaffProfile.objects.filter(id__in=faculty_ids, user__school=school).values_list('id', flat=True))
+        if faculty_ids - known:
+            raise CommandError(f'Faculty not found in this school: {sorted(faculty_ids - known, key=str)}')
+
+        try:
+            problem = TimetableProblem(spec)
+        except TimetableError as error:
+            raise CommandError(str(error))
+
+        hard, soft, slots = solve(
+            problem,
+            restarts=options['restarts'],
+            workers=options['workers'],
+            time_limit=options['time_limit']
+        )
+        self.stdout.write(f'- Lessons per week: {len(problem.lessons)}')
+        self.stdout.write(f'- Clashes: {hard}, same-subject repeats: {soft} (minimum {problem.soft_floor})')
+        if hard:
+            raise CommandError('No clash-free timetable found; add teachers, relax availability or raise --time-limit')
+
+        weekly = timetable_rows(problem, slots)
+        if options['dry_run']:
+            for row in weekly:
+                self.stdout.write(
+                    f"  {row['course']} / {row['batch']} {row['weekday']} "
+                    f"{row['start_time']:%H:%M}-{row['end_time']:%H:%M} {row['subject']} (faculty {row['faculty_id']})"
+                )
+            return
+
+        by_weekday = {}
+        for row in weekly:
+            by_weekday.setdefault(row['weekday'], []).append(row)
+        generated = [
+            {**row, 'date': day, 'ref': f'new:{index}'}
+            for index, (day, row) in enumerate(
+                (day, row)
+                for day in iter_term_dates(term_start, term_end, holidays)
+                for row in by_weekday.get(day.weekday(), [])
+            )
+        ]
+
+        # Every generated date must fit around the sessions the school already has
+        term_sessions = ClassSession.objects.filter(school=school, date__gte=term_start, date__lte=term_end)
+        existing = [
+            {**session, 'ref': session['id']}
+            for session in term_sessions.values(
+                'id', 'date', 'start_time', 'end_time', 'faculty_id', 'course', 'batch', 'room', 'subject'
+            )
+        ]
+        clashes = [
+            clash for clash in find_clashes(existing + generated)
+            if any(isinstance(session['ref'], str) for session in clash['sessions'])
+        ]
+        if clashes:
+            days = sorted({clash['date'] for clash in clashes})
+            raise CommandError(
+                f'The timetable clashes {len(clashes)} times with existing sessions on {len(days)} days of the term '
+                f'(first on {days[0]}); nothing was created'
+            )
+
+        with transaction.atomic():
+            existing_count = term_sessions.count()
+            for start in range(0, len(generated), options['batch_size']):
+                ClassSession.objects.bulk_create(
+                    [
+                        ClassSession(
+                            school=school,
+                            course=row['course'],
+                            subject=row['subject'],
+                            batch=row['batch'],
+                            date=row['date'],
+                            start_time=row['start_time'],
+                            end_time=row['end_time'],
+                            faculty_id=row['faculty_id']
+                        )
+                        for row in generated[start:start + options['batch_size']]
+                    ],
+                    ignore_conflicts=True
+                )
+            # bulk_create cannot report rows skipped by ignore_conflicts (sessions created since the check)
+            created = term_sessions.count() - existing_count
+
+        self.stdout.write(f'- Sessions created: {created}')
+        self.stdout.write(f'- Skipped (already existed): {len(generated) - created}')
+        self.stdout.write(self.style.SUCCESS(f'\nTimetable generated: {created} class sessions from {term_start} to {term_end}'))
@@ -0,0 +1,45 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.models import SessionRecurrence
+from attendance.recurrence_service import materialize_sessions, pending_recurrences
+
+
+class Command(BaseCommand):
+    help = 'Create the class sessions of recurring timetables for the coming days (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Days ahead to create (default: SESSION_MATERIALIZE_DAYS)')
+        parser.add_argument('--school', type=int, help='Only this school ID')
+        parser.add_argument('--full-term', action='store_true', help='Create every session up to each term end')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Sessions per INSERT')
+
+    def handle(self, *args, **options):
+        days = settings.SESSION_MATERIALIZE_DAYS if options['days'] is None else options['days']
+        if days < 0 or options['chunk_size'] <= 0:
+            raise CommandError('--days must not be negative and --chunk-size must be positive')
+
+        today = timezone.localdate()
+        if options['full_term']:
+            recurrences = SessionRecurrence.objects.filter(is_active=True, term_end__gte=today)
+            if options['school'] is not None:
+                recurrences = recurrences.filter(school_id=options['school'])
+            recurrences = list(recurrences)
+            until = max((recurrence.term_end for recurrence in recurrences), default=today)
+        else:
+            until = today + timedelta(days=days)
+            recurrences = list(pending_recurrences(until, options['school']))
+
+        report = materialize_sessions(recurrences, until, chunk_size=options['chunk_size'])
+
+        self.stdout.write(f'- Recurrences expanded: {len(recurrences)}')
+        self.stdout.write(f"- Sessions generated: {report['generated']}")
+        for clash in report['clashes']:
+            self.stdout.write(self.style.WARNING(
+                f"- Skipped recurrence {clash['recurrence_id']} on {clash['date']}: "
+                f"{clash['type']} already booked by session {clash['session']}"
+            ))
+        self.stdout.write(self.style.SUCCESS(f'\nSessions materialized up to {until}'))
@@ -0,0 +1,102 @@
+"""
+Bulk attendance marking.
+
+A whole class roster is validated with one query and written with a single
+upsert on the (session, student) unique key, so marking a class costs a
+constant number of queries instead of one request and one insert per student.
+The monthly attendance rollup is updated in the same transaction.
+"""
+from django.db import transaction
+
+from users.models import StudentProfile
+from utils.db import lock_rows, retry_if_locked
+from .archive_service import ensure_not_archived
+from .models import AttendanceRecord, ClassSession
+from .rollup_service import apply_status_changes, month_start
+
+
+def get_eligible_student_ids(session, student_ids):
+    """
+    IDs among `student_ids` that belong to the session's school and course.
+
+    StudentProfile has no batch field, so the batch of a session cannot be
+    checked against the student.
+    """
+    return set(
+        StudentProfile.objects.filter(
+            id__in=student_ids,
+            school_id=session.school_id,
+            course=session.course
+        ).values_list('id', flat=True)
+    )
+
+
+@retry_if_locked
+def mark_session_attendance(session, entries, marked_by):
+    """
+    Create or update the attendance of every student in `entries` for a session.
+
+    `entries` is a list of dicts with `student_id`, `status` and optional
+    `remarks`. Returns (outcomes, summary): one outcome per entry with
+    `result` 'created', 'updated' or 'rejected', and counts per result.
+    Raises SessionArchivedError if the session's term has been archived.
+    """
+    student_ids = [entry['student_id'] for entry in entries]
+    eligible = get_eligible_student_ids(session, student_ids)
+
+    with transaction.atomic():
+        # Concurrent marks of the same session queue on the session row, so
+        # each applies its rollup deltas against the right previous status
+        lock_rows(ClassSession.objects.filter(id=session.id))
+        ensure_not_archived([session.id])
+        existing = dict(
+            AttendanceRecord.objects.filter(
+                session=session,
+                student_id__in=eligible
+            ).values_list('student_id', 'status')
+        )
+
+        records = [
+            AttendanceRecord(
+                session=session,
+                student_id=entry['student_id'],
+                status=entry['status'],
+                remarks=entry.get('remarks', ''),
+                marked_by=marked_by
+            )
+            for entry in entries
+            if entry['student_id'] in eligible
+        ]
+
+        if records:
+            AttendanceRecord.objects.bulk_create(
+                records,
+                update_conflicts=True,
+                unique_fields=['session', 'student'],
+                update_fields=['status', 'remarks', 'marked_by', 'marked_at', 'updated_at']
+            )
+
+        # bulk_create sends no signals, so the monthly rollup is updated here
+        apply_status_changes(
+            month_start(session.date),
+            [(record.student_id, existing.get(record.student_id), record.status) for record in records]
+        )
+
+    outcomes = []
+    summary = {'created': 0, 'updated': 0, 'rejected': 0}
+    for entry in entries:
+        student_id = entry['student_id']
+        if student_id not in eligible:
+            result = 'rejected'
+            outcome = {
+                'student_id': student_id,
+                'result': result,
+                'error': 'Student is not enrolled in this session\'s school and course'
+            }
+        else:
+            result = 'updated' if student_id in existing else 'created'
+            outcome = {'student_id': student_id, 'result': result, 'status': entry['status']}
+        summary[result] += 1
+        outcomes.append(outcome)
+
+    return outcomes, summary
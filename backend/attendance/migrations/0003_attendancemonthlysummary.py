@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_alter_classsession_unique_together_and_more'),
+        ('users', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceMonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('late', models.PositiveIntegerField(default=0)),
+                ('excused', models.PositiveIntegerField(default=0)),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_summaries', to='users.studentprofile')),
+            ],
+            options={
+                'ordering': ['-month'],
+                'indexes': [models.Index(fields=['month', 'student'], name='attendance__month_b9b92c_idx')],
+                'unique_together': {('student', 'month')},
+            },
+        ),
+    ]
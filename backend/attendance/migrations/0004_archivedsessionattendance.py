@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendancemonthlysummary'),
+        ('users', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSessionAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=50)),
+                ('student_ids', models.BinaryField(help_text='zlib-compressed delta-encoded uint32 student ids')),
+                ('statuses', models.BinaryField(help_text='zlib-compressed 2-bit status codes')),
+                ('record_count', models.PositiveIntegerField()),
+                ('marked_at', models.DateTimeField(blank=True, null=True)),
+                ('remarks', models.JSONField(blank=True, default=dict, help_text='Non-empty remarks by student id')),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('marked_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='users.staffprofile')),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_archive', to='attendance.classsession')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['term'], name='attendance__term_5a6b4a_idx')],
+            },
+        ),
+    ]
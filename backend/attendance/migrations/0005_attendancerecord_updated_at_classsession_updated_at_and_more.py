@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_archivedsessionattendance'),
+        ('schools', '0001_initial'),
+        ('users', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendancerecord',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='classsession',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='attendancerecord',
+            name='marked_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='When the mark was taken (device time for offline marks)'),
+        ),
+        migrations.AddIndex(
+            model_name='attendancerecord',
+            index=models.Index(fields=['updated_at', 'id'], name='attendance__updated_4a2954_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['school', 'updated_at', 'id'], name='attendance__school__6601a1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['faculty', 'updated_at', 'id'], name='attendance__faculty_03e35e_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_attendancerecord_updated_at_classsession_updated_at_and_more'),
+        ('schools', '0001_initial'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classsession',
+            name='room',
+            field=models.CharField(blank=True, max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name='classsession',
+            index=models.Index(fields=['faculty', 'date', 'start_time'], name='attendance__faculty_2e5a4a_idx'),
+        ),
+    ]
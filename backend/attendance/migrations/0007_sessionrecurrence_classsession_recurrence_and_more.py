@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_classsession_room_and_more'),
+        ('schools', '0001_initial'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(max_length=100)),
+                ('subject', models.CharField(max_length=100)),
+                ('batch', models.CharField(max_length=50)),
+                ('room', models.CharField(blank=True, max_length=50)),
+                ('weekdays', models.JSONField(help_text='Weekdays the class meets, 0 = Monday ... 6 = Sunday')),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('term_start', models.DateField()),
+                ('term_end', models.DateField()),
+                ('materialized_until', models.DateField(blank=True, help_text='Sessions exist up to and including this date', null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('faculty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='users.staffprofile')),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='session_recurrences', to='schools.school')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='classsession',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sessions', to='attendance.sessionrecurrence'),
+        ),
+        migrations.CreateModel(
+            name='SchoolHoliday',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('name', models.CharField(max_length=100)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holidays', to='schools.school')),
+            ],
+            options={
+                'ordering': ['date'],
+                'unique_together': {('school', 'date')},
+            },
+        ),
+        migrations.AddIndex(
+            model_name='sessionrecurrence',
+            index=models.Index(fields=['school', 'is_active', 'materialized_until'], name='attendance__school__8c99f9_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+from collections import defaultdict
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+
+from attendance.archive_service import STATUSES, unpack_statuses, unpack_student_ids
+
+STATUS_FIELDS = ['present', 'absent', 'late', 'excused']
+
+
+def backfill_summaries(apps, schema_editor):
+    # The rollup table was created empty; without this, edits and deletions of
+    # records older than the table lose their deltas until someone runs
+    # backfill_attendance_summaries
+    AttendanceRecord = apps.get_model('attendance', 'AttendanceRecord')
+    ArchivedSessionAttendance = apps.get_model('attendance', 'ArchivedSessionAttendance')
+    AttendanceMonthlySummary = apps.get_model('attendance', 'AttendanceMonthlySummary')
+
+    counts = defaultdict(lambda: defaultdict(int))
+    rows = AttendanceRecord.objects.annotate(month=TruncMonth('session__date')).values(
+        'student_id', 'month', 'status'
+    ).annotate(total=Count('id')).order_by()
+    for row in rows:
+        summary = counts[row['student_id'], row['month']]
+        if row['status'] in STATUS_FIELDS:
+            summary[row['status']] += row['total']
+        summary['sessions'] += row['total']
+
+    for archive in ArchivedSessionAttendance.objects.select_related('session').iterator():
+        month = archive.session.date.replace(day=1)
+        student_ids = unpack_student_ids(archive.student_ids)
+        codes = unpack_statuses(archive.statuses, archive.record_count)
+        for student_id, code in zip(student_ids.tolist(), codes.tolist()):
+            summary = counts[student_id, month]
+            summary[STATUSES[code]] += 1
+            summary['sessions'] += 1
+
+    AttendanceMonthlySummary.objects.all().delete()
+    AttendanceMonthlySummary.objects.bulk_create(
+        [
+            AttendanceMonthlySummary(student_id=student_id, month=month, **summary)
+            for (student_id, month), summary in counts.items()
+        ],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_sessionrecurrence_classsession_recurrence_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:06
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_backfill_attendance_summaries'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(choices=[('sessions', 'Sessions'), ('records', 'Records'), ('students', 'Students')], max_length=10)),
+                ('row_id', models.BigIntegerField()),
+                ('school_id', models.BigIntegerField(blank=True, null=True)),
+                ('faculty_id', models.BigIntegerField(blank=True, help_text='Faculty whose devices hold the row; empty for the whole school', null=True)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school_id', 'deleted_at', 'id'], name='attendance__school__382c54_idx'), models.Index(fields=['deleted_at'], name='attendance__deleted_3e9489_idx')],
+            },
+        ),
+    ]
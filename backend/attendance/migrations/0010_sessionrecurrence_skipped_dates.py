@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0009_synctombstone'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sessionrecurrence',
+            name='skipped_dates',
+            field=models.JSONField(blank=True, default=list, help_text='Dates up to materialized_until still without a session (clashed, or a holiday since removed); retried on every expansion'),
+        ),
+    ]
@@ -2,6 +2,7 @@ from django.db import models
 
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class ClassSession(models.Model):
     """Model for class sessions"""
@@ -13,13 +14,19 @@ class ClassSession(models.Model):
     start_time = models.TimeField()
     end_time = models.TimeField()
     faculty = models.ForeignKey('users.StaffProfile', on_delete=models.CASCADE)
+    room = models.CharField(max_length=50, blank=True)
+    recurrence = models.ForeignKey('SessionRecurrence', on_delete=models.SET_NULL, null=True, blank=True, related_name='sessions')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['school', 'course', 'subject', 'batch', 'date', 'start_time']
         indexes = [
             models.Index(fields=['school', 'date']),
             models.Index(fields=['school', 'course', 'subject']),
+            models.Index(fields=['school', 'updated_at', 'id']),
+            models.Index(fields=['faculty', 'updated_at', 'id']),
+            models.Index(fields=['faculty', 'date', 'start_time']),
         ]
     
     def __str__(self):
@@ -40,15 +47,156 @@ class AttendanceRecord(models.Model):
     student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     marked_by = models.ForeignKey('users.StaffProfile', on_delete=models.CASCADE)
-    marked_at = models.DateTimeField(auto_now_add=True)
+    marked_at = models.DateTimeField(default=timezone.now, help_text="When the mark was taken (device time for offline marks)")
     remarks = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         unique_together = ['session', 'student']
         indexes = [
             models.Index(fields=['session', 'student']),
             models.Index(fields=['status', 'marked_at']),
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
         return f"{self.student.user.full_name} - {self.session.subject} ({self.status}) [{self.session.school.school_name}]"
+
+
+class AttendanceMonthlySummary(models.Model):
+    """
+    Per-student attendance counts for one calendar month.
+
+    Kept up to date incrementally by bulk marking and the AttendanceRecord
+    signals, and rebuilt from raw records by `backfill_attendance_summaries`.
+    """
+    student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE, related_name='attendance_summaries')
+    month = models.DateField(help_text="First day of the month")
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    late = models.PositiveIntegerField(default=0)
+    excused = models.PositiveIntegerField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['student', 'month']
+        indexes = [
+            models.Index(fields=['month', 'student']),
+        ]
+        ordering = ['-month']
+    
+    def __str__(self):
+        return f"{self.student} - {self.month:%Y-%m}: {self.present}/{self.sessions}"
+    
+    @property
+    def attendance_percentage(self):
+        """Present and late count as attended"""
+        if not self.sessions:
+            return 0
+        return round((self.present + self.late) * 100 / self.sessions, 2)
+
+
+class ArchivedSessionAttendance(models.Model):
+    """
+    Attendance of one class session from a closed term, stored column-wise.
+
+    Written by `archive_attendance`; see attendance.archive_service for the
+    encoding and the read API.
+    """
+    session = models.OneToOneField(ClassSession, on_delete=models.CASCADE, related_name='attendance_archive')
+    term = models.CharField(max_length=50)
+    student_ids = models.BinaryField(help_text="zlib-compressed delta-encoded uint32 student ids")
+    statuses = models.BinaryField(help_text="zlib-compressed 2-bit status codes")
+    record_count = models.PositiveIntegerField()
+    marked_by = models.ForeignKey('users.StaffProfile', on_delete=models.SET_NULL, null=True, blank=True)
+    marked_at = models.DateTimeField(null=True, blank=True)
+    remarks = models.JSONField(default=dict, blank=True, help_text="Non-empty remarks by student id")
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.session_id} ({self.term}): {self.record_count} marks"
+
+
+class SchoolHoliday(models.Model):
+    """Day without classes; recurring sessions are not created on it"""
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, related_name='holidays')
+    date = models.DateField()
+    name = models.CharField(max_length=100)
+    
+    class Meta:
+        unique_together = ['school', 'date']
+        ordering = ['date']
+    
+    def __str__(self):
+        return f"{self.name} ({self.date}) [{self.school.school_name}]"
+
+
+class SessionRecurrence(models.Model):
+    """
+    Weekly pattern of a class for one term.
+
+    Expanded into ClassSession rows by attendance.recurrence_service up to a
+    rolling horizon, recorded in `materialized_until`.
+    """
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, related_name='session_recurrences')
+    course = models.CharField(max_length=100)
+    subject = models.CharField(max_length=100)
+    batch = models.CharField(max_length=50)
+    faculty = models.ForeignKey('users.StaffProfile', on_delete=models.CASCADE)
+    room = models.CharField(max_length=50, blank=True)
+    weekdays = models.JSONField(help_text="Weekdays the class meets, 0 = Monday ... 6 = Sunday")
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    term_start = models.DateField()
+    term_end = models.DateField()
+    materialized_until = models.DateField(null=True, blank=True, help_text="Sessions exist up to and including this date")
+    skipped_dates = models.JSONField(
+        default=list, blank=True,
+        help_text="Dates up to materialized_until still without a session (clashed, or a holiday since removed); retried on every expansion"
+    )
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['school', 'is_active', 'materialized_until']),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} - {self.course} / {self.batch} ({self.term_start} to {self.term_end})"
+
+
+class SyncTombstone(models.Model):
+    """
+    A synced row that was deleted, or moved out of the school or faculty it
+    was synced to, so offline devices can drop their copy.
+
+    Written by attendance.signals; school and faculty are plain ids because
+    tombstones outlive the rows (and often the faculty) they describe.
+    """
+    TABLE_CHOICES = [
+        ('sessions', 'Sessions'),
+        ('records', 'Records'),
+        ('students', 'Students'),
+    ]
+
+    table = models.CharField(max_length=10, choices=TABLE_CHOICES)
+    row_id = models.BigIntegerField()
+    school_id = models.BigIntegerField(null=True, blank=True)
+    faculty_id = models.BigIntegerField(null=True, blank=True, help_text="Faculty whose devices hold the row; empty for the whole school")
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['school_id', 'deleted_at', 'id']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.table} {self.row_id} (deleted {self.deleted_at})"
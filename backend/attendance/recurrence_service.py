@@ -0,0 +1,279 @@
+"""
+Expansion of weekly session recurrences into ClassSession rows.
+
+A term of daily periods is tens of thousands of sessions, so recurrences are
+expanded in memory and inserted with bulk_create in chunks; sessions that
+already exist (same school, course, subject, batch, date and start time) are
+skipped, and occurrences that would double-book a faculty member, class or
+room are left out and reported. Expansion is incremental: each recurrence
+remembers how far it has been materialized, and only the next few days are
+created, on save and by the nightly `materialize_sessions` command, which
+keeps the session table small. Reads never create sessions.
+
+Dates behind `materialized_until` that still lack their session (skipped
+for a clash, or freed by a holiday that was moved or deleted) are kept in
+the recurrence's `skipped_dates` and retried on every expansion until they
+fit or have passed.
+"""
+import logging
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import ClassSession, SchoolHoliday, SessionRecurrence
+from .scheduling_service import IntervalIndex
+
+logger = logging.getLogger(__name__)
+
+
+def iter_occurrences(recurrence, start, end, holidays=()):
+    """Dates in [start, end] on the recurrence's weekdays, within its term, skipping holidays"""
+    day = max(start, recurrence.term_start)
+    end = min(end, recurrence.term_end)
+    weekdays = set(recurrence.weekdays)
+    while day <= end:
+        if day.weekday() in weekdays and day not in holidays:
+            yield day
+        day += timedelta(days=1)
+
+
+def _holidays_by_school(recurrences):
+    holidays = defaultdict(set)
+    school_ids = {recurrence.school_id for recurrence in recurrences}
+    for school_id, day in SchoolHoliday.objects.filter(school_id__in=school_ids).values_list('school_id', 'date'):
+        holidays[school_id].add(day)
+    return holidays
+
+
+def _slot_resources(school_id, faculty_id, course, batch, room):
+    """Keys of the faculty, class and room a slot occupies (classes and rooms are per school)"""
+    resources = [('faculty', faculty_id), ('class', (school_id, course, batch))]
+    if room:
+        resources.append(('room', (school_id, room)))
+    return resources
+
+
+def _booked_slots(recurrences, start, end):
+    """
+    Interval indexes of the sessions already stored in [start, end] for the
+    schools and faculty of `recurrences`, one query. Returns
+    ({(date, resource_type, resource): IntervalIndex}, {session unique key}).
+    """
+    indexes = defaultdict(IntervalIndex)
+    keys = set()
+    sessions = ClassSession.objects.filter(
+        Q(school_id__in={recurrence.school_id for recurrence in recurrences}) |
+        Q(faculty_id__in={recurrence.faculty_id for recurrence in recurrences}),
+        date__gte=start,
+        date__lte=end
+    ).values_list('id', 'school_id', 'course', 'subject', 'batch', 'date', 'start_time', 'end_time', 'faculty_id', 'room')
+    for session_id, school_id, course, subject, batch, day, start_time, end_time, faculty_id, room in sessions:
+        keys.add((school_id, course, subject, batch, day, start_time))
+        for resource in _slot_resources(school_id, faculty_id, course, batch, room):
+            indexes[(day, *resource)].add(start_time, end_time, session_id)
+    return indexes, keys
+
+
+def _retry_dates(recurrence, today, holidays):
+    """The recurrence's skipped dates still worth creating: from today on, in its term and pattern"""
+    weekdays = set(recurrence.weekdays)
+    return sorted(
+        day for day in {date.fromisoformat(value) for value in recurrence.skipped_dates}
+        if max(today, recurrence.term_start) <= day <= recurrence.term_end
+        and day.weekday() in weekdays and day not in holidays
+    )
+
+
+def materialize_sessions(recurrences, until, chunk_size=1000):
+    """
+    Create the sessions of `recurrences` from where each was last expanded
+    up to `until` (capped at its term end), and retry their skipped dates.
+
+    Every occurrence is checked against the sessions already booked, and the
+    ones created before it, for its faculty, class and room, like a session
+    created through the API. Clashing occurrences are skipped, recorded in
+    `skipped_dates` for the next run and reported.
+    Returns {'generated': sessions created, 'clashes': [{'recurrence_id',
+    'date', 'type', 'session'}]}, where `session` is the clashing session's ID
+    (or 'recurrence:<id>' for one created in the same run).
+    """
+    recurrences = [recurrence for recurrence in recurrences if recurrence.weekdays]
+    holidays = _holidays_by_school(recurrences)
+    today = timezone.localdate()
+
+    ranges = {}
+    retries = {}
+    for recurrence in recurrences:
+        start = recurrence.term_start
+        if recurrence.materialized_until:
+            start = max(start, recurrence.materialized_until + timedelta(days=1))
+        ranges[recurrence.id] = (start, min(until, recurrence.term_end))
+        retries[recurrence.id] = _retry_dates(recurrence, today, holidays[recurrence.school_id])
+    expanding = [
+        recurrence for recurrence in recurrences
+        if ranges[recurrence.id][0] <= ranges[recurrence.id][1] or retries[recurrence.id]
+    ]
+    window = [day for days in retries.values() for day in days]
+    for start, end in ranges.values():
+        if start <= end:
+            window += [start, end]
+
+    generated = 0
+    clashes = []
+    chunk = []
+    expanded = []
+    with transaction.atomic():
+        booked, existing = defaultdict(IntervalIndex), set()
+        if expanding:
+            booked, existing = _booked_slots(expanding, min(window), max(window))
+
+        for recurrence in recurrences:
+            start, end = ranges[recurrence.id]
+            days = list(retries[recurrence.id])
+            if start <= end:
+                days.extend(iter_occurrences(recurrence, start, end, holidays[recurrence.school_id]))
+
+            resources = _slot_resources(
+                recurrence.school_id, recurrence.faculty_id, recurrence.course, recurrence.batch, recurrence.room
+            )
+            skipped = []
+            for day in days:
+                key = (recurrence.school_id, recurrence.course, recurrence.subject, recurrence.batch, day, recurrence.start_time)
+                if key in existing:
+                    continue
+                day_clashes = [
+                    {'recurrence_id': recurrence.id, 'date': day, 'type': resource_type, 'session': session}
+                    for resource_type, resource in resources
+                    for session in booked[(day, resource_type, resource)].conflicts(recurrence.start_time, recurrence.end_time)
+                ]
+                if day_clashes:
+                    clashes.extend(day_clashes)
+                    skipped.append(day.isoformat())
+                    continue
+                for resource in resources:
+                    booked[(day, *resource)].add(recurrence.start_time, recurrence.end_time, f'recurrence:{recurrence.id}')
+                existing.add(key)
+
+                chunk.append(ClassSession(
+                    school_id=recurrence.school_id,
+                    course=recurrence.course,
+                    subject=recurrence.subject,
+                    batch=recurrence.batch,
+                    date=day,
+                    start_time=recurrence.start_time,
+                    end_time=recurrence.end_time,
+                    faculty_id=recurrence.faculty_id,
+                    room=recurrence.room,
+                    recurrence=recurrence
+                ))
+                if len(chunk) >= chunk_size:
+                    ClassSession.objects.bulk_create(chunk, ignore_conflicts=True)
+                    generated += len(chunk)
+                    chunk = []
+
+            changed = skipped != recurrence.skipped_dates
+            recurrence.skipped_dates = skipped
+            if recurrence.materialized_until is None or recurrence.materialized_until < end:
+                # Also when the term has not started yet: record the horizon
+                # checked so it is not pending again until it moves
+                recurrence.materialized_until = end
+                changed = True
+            if changed:
+                expanded.append(recurrence)
+
+        if chunk:
+            ClassSession.objects.bulk_create(chunk, ignore_conflicts=True)
+            generated += len(chunk)
+        SessionRecurrence.objects.bulk_update(expanded, ['materialized_until', 'skipped_dates'], batch_size=chunk_size)
+
+    if clashes:
+        logger.warning(f"Skipped {len(clashes)} clashing recurring sessions")
+    return {'generated': generated, 'clashes': clashes}
+
+
+def pending_recurrences(until, school_id=None):
+    """
+    Active recurrences of current terms not yet materialized up to `until`
+    or their term end, or with skipped dates to retry
+    """
+    recurrences = SessionRecurrence.objects.filter(
+        Q(materialized_until__isnull=True) |
+        (Q(materialized_until__lt=until) & Q(materialized_until__lt=F('term_end'))) |
+        ~Q(skipped_dates=[]),
+        is_active=True,
+        term_end__gte=timezone.localdate()
+    )
+    if school_id is not None:
+        recurrences = recurrences.filter(school_id=school_id)
+    return recurrences
+
+
+def materialize_upcoming(recurrence, days=None):
+    """
+    Create the sessions of one recurrence for the next `days` days
+    (SESSION_MATERIALIZE_DAYS by default), e.g. right after it is saved.
+    """
+    days = settings.SESSION_MATERIALIZE_DAYS if days is None else days
+    return materialize_sessions([recurrence], timezone.localdate() + timedelta(days=days))
+
+
+def unmarked_sessions(sessions):
+    """Sessions without any attendance, live or archived, which are safe to delete"""
+    return sessions.filter(attendancerecord__isnull=True, attendance_archive__isnull=True)
+
+
+def reset_future_sessions(recurrence):
+    """
+    Delete the unmarked future sessions of a recurrence and rewind it to
+    today, so a changed pattern is re-expanded from tomorrow on.
+    Returns the number of sessions deleted.
+    """
+    today = timezone.localdate()
+    deleted, _ = unmarked_sessions(
+        ClassSession.objects.filter(recurrence=recurrence, date__gt=today)
+    ).delete()
+    if recurrence.materialized_until and recurrence.materialized_until > today:
+        recurrence.materialized_until = today
+        # Future dates are expanded again from scratch
+        recurrence.skipped_dates = [value for value in recurrence.skipped_dates if date.fromisoformat(value) <= today]
+        recurrence.save(update_fields=['materialized_until', 'skipped_dates'])
+    return deleted
+
+
+def apply_holiday_change(school_id, added=None, removed=None):
+    """
+    Bring recurring sessions in line with a holiday created, moved or deleted.
+
+    Unmarked recurring sessions on the `added` date are deleted. The
+    `removed` date is queued in `skipped_dates` of the recurrences already
+    expanded past it and created right away where it fits.
+    Returns the materialize report of the removed date.
+    """
+    if added is not None:
+        unmarked_sessions(ClassSession.objects.filter(
+            school_id=school_id,
+            date=added,
+            recurrence__isnull=False
+        )).delete()
+
+    if removed is None or removed < timezone.localdate():
+        return {'generated': 0, 'clashes': []}
+    recurrences = [
+        recurrence for recurrence in SessionRecurrence.objects.filter(
+            school_id=school_id,
+            is_active=True,
+            term_start__lte=removed,
+            term_end__gte=removed,
+            materialized_until__gte=removed
+        )
+        if removed.weekday() in recurrence.weekdays
+    ]
+    for recurrence in recurrences:
+        if removed.isoformat() not in recurrence.skipped_dates:
+            recurrence.skipped_dates = [*recurrence.skipped_dates, removed.isoformat()]
+    SessionRecurrence.objects.bulk_update(recurrences, ['skipped_dates'])
+    return materialize_sessions(recurrences, removed)
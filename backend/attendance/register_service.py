@@ -0,0 +1,165 @@
+"""
+Monthly attendance register (students x days).
+
+The marks of a month are fetched as flat (student_id, date, status) tuples and
+pivoted into a NumPy matrix; totals and percentages are computed on the whole
+matrix at once instead of per student or per day.
+"""
+import calendar
+
+import numpy as np
+
+from users.models import StudentProfile
+from utils.csv_stream import csv_writer, student_name
+from .archive_service import STATUSES as ARCHIVE_STATUSES, decode_archive
+from .models import ArchivedSessionAttendance, AttendanceRecord, ClassSession
+from .rollup_service import next_month
+
+# Cell codes, ordered so that when a day has several sessions the most
+# severe mark wins (np.maximum): no mark < present < excused < late < absent
+NO_MARK, PRESENT, EXCUSED, LATE, ABSENT = range(5)
+STATUS_CELL_CODES = {'present': PRESENT, 'excused': EXCUSED, 'late': LATE, 'absent': ABSENT}
+CELL_LETTERS = np.array(['-', 'P', 'E', 'L', 'A'])
+
+
+def _register_marks(sessions):
+    """(student_id, day_of_month, status) tuples for the sessions, live and archived"""
+    marks = list(
+        AttendanceRecord.objects.filter(session__in=sessions).values_list(
+            'student_id', 'session__date__day', 'status'
+        )
+    )
+    archives = ArchivedSessionAttendance.objects.filter(session__in=sessions).select_related('session').only(
+        'student_ids', 'statuses', 'record_count', 'session__date'
+    )
+    for archive in archives:
+        student_ids, codes = decode_archive(archive)
+        day = archive.session.date.day
+        marks.extend(
+            (student_id, day, ARCHIVE_STATUSES[code])
+            for student_id, code in zip(student_ids.tolist(), codes.tolist())
+        )
+    return marks
+
+
+def build_register(school_id, course, batch, month, subject=None):
+    """
+    Build the register of one class for one month.
+
+    Returns a dict with the students (rows), the days of the month (columns),
+    the cell code matrix and vectorized row/column totals.
+    """
+    days_in_month = calendar.monthrange(month.year, month.month)[1]
+
+    students = list(
+        StudentProfile.objects.filter(school_id=school_id, course=course)
+        .order_by('roll_number', 'id')
+        .values('id', 'first_name', 'last_name', 'admission_number', 'roll_number')
+    )
+    row_index = {student['id']: index for index, student in enumerate(students)}
+
+    sessions = ClassSession.objects.filter(
+        school_id=school_id,
+        course=course,
+        batch=batch,
+        date__gte=month,
+        date__lt=next_month(month)
+    )
+    if subject:
+        sessions = sessions.filter(subject=subject)
+
+    matrix = np.zeros((len(students), days_in_month), dtype=np.int8)
+    marks = _register_marks(sessions)
+    if marks and students:
+        rows = np.fromiter((row_index.get(mark[0], -1) for mark in marks), dtype=np.int64, count=len(marks))
+        days = np.fromiter((mark[1] - 1 for mark in marks), dtype=np.int64, count=len(marks))
+        codes = np.fromiter((STATUS_CELL_CODES.get(mark[2], NO_MARK) for mark in marks), dtype=np.int8, count=len(marks))
+        # Marks of students no longer in the course are dropped
+        known = rows >= 0
+        np.maximum.at(matrix, (rows[known], days[known]), codes[known])
+
+    counts = {
+        status: (matrix == code)
+        for status, code in STATUS_CELL_CODES.items()
+    }
+    marked = matrix != NO_MARK
+    attended = counts['present'] | counts['late']
+
+    row_marked = marked.sum(axis=1)
+    row_attended = attended.sum(axis=1)
+    column_marked = marked.sum(axis=0)
+    column_attended = attended.sum(axis=0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        row_percentage = np.where(row_marked > 0, np.round(row_attended * 100 / row_marked, 2), 0.0)
+        column_percentage = np.where(column_marked > 0, np.round(column_attended * 100 / column_marked, 2), 0.0)
+
+    return {
+        'month': month,
+        'days': days_in_month,
+        'students': students,
+        'matrix': matrix,
+        'row_totals': {status: mask.sum(axis=1) for status, mask in counts.items()},
+        'row_marked': row_marked,
+        'row_percentage': row_percentage,
+        'column_totals': {status: mask.sum(axis=0) for status, mask in counts.items()},
+        'column_marked': column_marked,
+        'column_percentage': column_percentage,
+        'overall_percentage': round(float(row_attended.sum()) * 100 / row_marked.sum(), 2) if row_marked.sum() else 0,
+    }
+
+
+def register_to_json(register):
+    """
+    Compact JSON encoding: one mark string per student with a letter per day
+    ('P', 'A', 'L', 'E', '-' for no mark) and totals as parallel arrays.
+    """
+    letters = CELL_LETTERS[register['matrix']]
+    return {
+        'month': register['month'].strftime('%Y-%m'),
+        'days': register['days'],
+        'legend': {'P': 'present', 'A': 'absent', 'L': 'late', 'E': 'excused', '-': 'not marked'},
+        'students': [
+            {
+                'id': student['id'],
+                'name': student_name(student),
+                'roll_number': student['roll_number'],
+                'marks': ''.join(row)
+            }
+            for student, row in zip(register['students'], letters.tolist())
+        ],
+        'row_totals': {
+            **{status: totals.tolist() for status, totals in register['row_totals'].items()},
+            'marked': register['row_marked'].tolist(),
+            'percentage': register['row_percentage'].tolist(),
+        },
+        'column_totals': {
+            **{status: totals.tolist() for status, totals in register['column_totals'].items()},
+            'marked': register['column_marked'].tolist(),
+            'percentage': register['column_percentage'].tolist(),
+        },
+        'overall_percentage': register['overall_percentage'],
+    }
+
+
+def iter_register_csv(register):
+    """Yield the register as CSV lines: one row per student, then per-day totals"""
+    writer = csv_writer()
+    days = list(range(1, register['days'] + 1))
+    yield writer.writerow(['Roll No', 'Name', *days, 'Present', 'Absent', 'Late', 'Excused', 'Attendance %'])
+
+    letters = CELL_LETTERS[register['matrix']].tolist()
+    row_totals = {status: totals.tolist() for status, totals in register['row_totals'].items()}
+    row_percentage = register['row_percentage'].tolist()
+    for index, (student, row) in enumerate(zip(register['students'], letters)):
+        yield writer.writerow([
+            student['roll_number'], student_name(student), *row,
+            row_totals['present'][index], row_totals['absent'][index],
+            row_totals['late'][index], row_totals['excused'][index], row_percentage[index]
+        ])
+
+    column_totals = register['column_totals']
+    yield writer.writerow(['', 'Present', *column_totals['present'].tolist()])
+    yield writer.writerow(['', 'Absent', *column_totals['absent'].tolist()])
+    yield writer.writerow(['', 'Attendance %', *register['column_percentage'].tolist(), '', '', '', '',
+                           register['overall_percentage']])
@@ -0,0 +1,175 @@
+"""
+Monthly attendance rollups.
+
+`AttendanceMonthlySummary` holds per-student, per-month counts so dashboards
+never count raw `AttendanceRecord` rows. Writers report status changes as
+(student_id, old_status, new_status) tuples; the changes are folded into one
+delta per student and applied with F() updates, one UPDATE per distinct delta
+(a roster marked in one request usually produces a handful). Decrements are
+clamped at zero, so a count that drifted from the records cannot make a
+write fail; `rebuild_month` puts it right.
+"""
+from collections import defaultdict
+from datetime import date, datetime
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Greatest
+
+from users.models import StudentProfile
+from .archive_service import STATUSES as ARCHIVE_STATUSES, decode_archive
+from .models import ArchivedSessionAttendance, AttendanceMonthlySummary, AttendanceRecord
+
+STATUS_FIELDS = ['present', 'absent', 'late', 'excused']
+
+
+def month_start(day):
+    """First day of the month a date belongs to"""
+    return day.replace(day=1)
+
+
+def parse_month(value):
+    """Parse a YYYY-MM string into the first day of that month, or None if invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        return None
+
+
+def next_month(month):
+    return date(month.year + (month.month == 12), month.month % 12 + 1, 1)
+
+
+def _fold_changes(changes):
+    """Reduce (student_id, old_status, new_status) changes to a delta per student"""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for student_id, old_status, new_status in changes:
+        if old_status == new_status:
+            continue
+        delta = deltas[student_id]
+        if old_status in STATUS_FIELDS:
+            delta[old_status] -= 1
+        if new_status in STATUS_FIELDS:
+            delta[new_status] += 1
+        if old_status is None:
+            delta['sessions'] += 1
+        elif new_status is None:
+            delta['sessions'] -= 1
+    return deltas
+
+
+def apply_status_changes(month, changes):
+    """
+    Apply attendance status changes of one month to the rollup.
+
+    `old_status` is None for a newly created record and `new_status` is None
+    for a deleted one.
+    """
+    deltas = _fold_changes(changes)
+
+    students_by_delta = defaultdict(list)
+    for student_id, delta in deltas.items():
+        signature = tuple(sorted((field, value) for field, value in delta.items() if value))
+        if signature:
+            students_by_delta[signature].append(student_id)
+
+    if not students_by_delta:
+        return
+
+    # Only new records can need a new summary row; deletions (including the
+    # cascade of a student being deleted) must never recreate one
+    new_rows = [
+        AttendanceMonthlySummary(student_id=student_id, month=month)
+        for student_id, delta in deltas.items()
+        if delta['sessions'] > 0
+    ]
+
+    with transaction.atomic():
+        if new_rows:
+            AttendanceMonthlySummary.objects.bulk_create(new_rows, ignore_conflicts=True)
+        for signature, student_ids in students_by_delta.items():
+            AttendanceMonthlySummary.objects.filter(month=month, student_id__in=student_ids).update(**{
+                field: F(field) + value if value > 0 else Greatest(F(field) + value, 0)
+                for field, value in signature
+            })
+
+
+def rebuild_month(month, school_id=None):
+    """
+    Recompute the rollup of one month from raw records with a single grouped
+    query, plus the archived sessions of the month.
+
+    Returns the number of summary rows written.
+    """
+    records = AttendanceRecord.objects.filter(
+        session__date__gte=month,
+        session__date__lt=next_month(month)
+    )
+    summaries = AttendanceMonthlySummary.objects.filter(month=month)
+    if school_id is not None:
+        records = records.filter(student__school_id=school_id)
+        summaries = summaries.filter(student__school_id=school_id)
+
+    counts = defaultdict(lambda: AttendanceMonthlySummary(month=month))
+    for row in records.values('student_id', 'status').annotate(total=Count('id')).order_by():
+        summary = counts[row['student_id']]
+        summary.student_id = row['student_id']
+        if row['status'] in STATUS_FIELDS:
+            setattr(summary, row['status'], getattr(summary, row['status']) + row['total'])
+        summary.sessions += row['total']
+
+    # Sessions of closed terms live in the columnar archive
+    archives = ArchivedSessionAttendance.objects.filter(
+        session__date__gte=month,
+        session__date__lt=next_month(month)
+    )
+    student_filter = None
+    if school_id is not None:
+        student_filter = set(StudentProfile.objects.filter(school_id=school_id).values_list('id', flat=True))
+    for archive in archives:
+        student_ids, codes = decode_archive(archive)
+        for student_id, code in zip(student_ids.tolist(), codes.tolist()):
+            if student_filter is not None and student_id not in student_filter:
+                continue
+            summary = counts[student_id]
+            summary.student_id = student_id
+            status = ARCHIVE_STATUSES[code]
+            setattr(summary, status, getattr(summary, status) + 1)
+            summary.sessions += 1
+
+    with transaction.atomic():
+        summaries.delete()
+        AttendanceMonthlySummary.objects.bulk_create(counts.values(), batch_size=1000)
+
+    return len(counts)
+
+
+def get_attendance_totals(student_ids, month=None, since=None, until=None):
+    """
+    Attendance totals per student from the rollup, optionally for one month
+    or for the months from `since` to `until` (inclusive, either may be open).
+
+    Returns {student_id: {'present', 'absent', 'late', 'excused', 'sessions',
+    'attendance_percentage'}} with zeroes for students without attendance.
+    """
+    summaries = AttendanceMonthlySummary.objects.filter(student_id__in=student_ids)
+    if month is not None:
+        summaries = summaries.filter(month=month)
+    if since is not None:
+        summaries = summaries.filter(month__gte=month_start(since))
+    if until is not None:
+        summaries = summaries.filter(month__lte=month_start(until))
+
+    fields = STATUS_FIELDS + ['sessions']
+    rows = summaries.values('student_id').annotate(
+        **{f'total_{field}': Sum(field) for field in fields}
+    ).order_by()
+
+    totals = {student_id: {field: 0 for field in fields} for student_id in student_ids}
+    for row in rows:
+        totals[row['student_id']] = {field: row[f'total_{field}'] for field in fields}
+
+    for values in totals.values():
+        attended = values['present'] + values['late']
+        values['attendance_percentage'] = round(attended * 100 / values['sessions'], 2) if values['sessions'] else 0
+    return totals
@@ -0,0 +1,189 @@
+"""
+Timetable clash detection.
+
+A session occupies three resources for its time slot: its faculty member,
+its class (course + batch) and, when set, its room. Sessions of one resource
+on one day are held in an `IntervalIndex` sorted by start time, so a new slot
+is checked against the day with a binary search instead of one query or one
+comparison per existing session.
+"""
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import timedelta
+from itertools import accumulate
+
+from django.db.models import Q
+
+from .models import ClassSession
+
+RESOURCE_TYPES = ['faculty', 'class', 'room']
+
+
+class IntervalIndex:
+    """
+    Half-open [start, end) intervals sorted by start, with a running maximum
+    of end times so overlap queries stay O(log n) even if the stored
+    intervals already overlap each other.
+    """
+
+    def __init__(self, intervals=()):
+        self._items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in self._items]
+        self._max_ends = list(accumulate((item[1] for item in self._items), max))
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, start, end, key):
+        if not self._items or start >= self._starts[-1]:
+            # Appending in start order (the common case) keeps the index sorted in O(1)
+            self._items.append((start, end, key))
+            self._starts.append(start)
+            self._max_ends.append(max(end, self._max_ends[-1]) if self._max_ends else end)
+            return
+        insort(self._items, (start, end, key), key=lambda item: (item[0], item[1]))
+        self._starts = [item[0] for item in self._items]
+        self._max_ends = list(accumulate((item[1] for item in self._items), max))
+
+    def overlaps(self, start, end):
+        """Whether [start, end) overlaps any stored interval"""
+        position = bisect_left(self._starts, end)
+        return position > 0 and self._max_ends[position - 1] > start
+
+    def conflicts(self, start, end):
+        """Keys of the stored intervals overlapping [start, end)"""
+        found = []
+        position = bisect_left(self._starts, end) - 1
+        # Walk back only while some earlier interval can still reach `start`
+        while position >= 0 and self._max_ends[position] > start:
+            item_start, item_end, key = self._items[position]
+            if item_end > start:
+                found.append(key)
+            position -= 1
+        found.reverse()
+        return found
+
+
+def session_resources(session):
+    """(resource_type, resource) pairs a session occupies"""
+    resources = [
+        ('faculty', session['faculty_id']),
+        ('class', f"{session['course']} / {session['batch']}"),
+    ]
+    if session.get('room'):
+        resources.append(('room', session['room']))
+    return resources
+
+
+def find_clashes(sessions):
+    """
+    Every clash among `sessions` in one pass.
+
+    `sessions` are dicts with `ref` (anything identifying the session to the
+    caller), `date`, `start_time`, `end_time`, `faculty_id`, `course`,
+    `batch` and optional `room`. Sessions are swept in start order per
+    (date, resource); each is checked against the ones already indexed.
+    Returns a list of clash dicts.
+    """
+    ordered = sorted(sessions, key=lambda session: (session['date'], session['start_time'], session['end_time']))
+    indexes = defaultdict(IntervalIndex)
+    by_ref = {}
+    clashes = []
+
+    for session in ordered:
+        by_ref[session['ref']] = session
+        for resource_type, resource in session_resources(session):
+            index = indexes[(session['date'], resource_type, resource)]
+            for other_ref in index.conflicts(session['start_time'], session['end_time']):
+                other = by_ref[other_ref]
+                clashes.append({
+                    'type': resource_type,
+                    'resource': resource,
+                    'date': session['date'],
+                    'sessions': [_describe(other), _describe(session)],
+                })
+            index.add(session['start_time'], session['end_time'], session['ref'])
+    return clashes
+
+
+def _describe(session):
+    return {
+        'ref': session['ref'],
+        'subject': session.get('subject'),
+        'course': session['course'],
+        'batch': session['batch'],
+        'start_time': session['start_time'],
+        'end_time': session['end_time'],
+    }
+
+
+SESSION_FIELDS = ['id', 'date', 'start_time', 'end_time', 'faculty_id', 'course', 'batch', 'room', 'subject']
+
+
+def load_day_indexes(school_id, day, faculty_id, course, batch, room='', exclude_id=None):
+    """
+    Interval indexes of the faculty, class and room of a slot for one day,
+    loaded with a single query. Returns ({resource_type: IntervalIndex}, sessions by id).
+    """
+    resources = Q(faculty_id=faculty_id) | Q(school_id=school_id, course=course, batch=batch)
+    if room:
+        resources |= Q(school_id=school_id, room=room)
+    sessions = ClassSession.objects.filter(resources, date=day)
+    if exclude_id is not None:
+        sessions = sessions.exclude(id=exclude_id)
+
+    indexes = {resource_type: IntervalIndex() for resource_type in RESOURCE_TYPES}
+    by_id = {}
+    for session in sessions.values(*SESSION_FIELDS):
+        by_id[session['id']] = session
+        if session['faculty_id'] == faculty_id:
+            indexes['faculty'].add(session['start_time'], session['end_time'], session['id'])
+        if (session['course'], session['batch']) == (course, batch):
+            indexes['class'].add(session['start_time'], session['end_time'], session['id'])
+        if room and session['room'] == room:
+            indexes['room'].add(session['start_time'], session['end_time'], session['id'])
+    return indexes, by_id
+
+
+def check_session_clashes(school_id, day, start_time, end_time, faculty_id, course, batch, room='', exclude_id=None):
+    """
+    Clashes of one proposed slot with the stored sessions of that day.
+
+    Returns a list of {'type', 'session'} dicts, empty when the slot is free.
+    """
+    indexes, by_id = load_day_indexes(school_id, day, faculty_id, course, batch, room, exclude_id)
+    return [
+        {'type': resource_type, 'session': by_id[session_id]}
+        for resource_type, index in indexes.items()
+        for session_id in index.conflicts(start_time, end_time)
+    ]
+
+
+def week_bounds(day):
+    """Monday and Sunday of the week containing `day`"""
+    monday = day - timedelta(days=day.weekday())
+    return monday, monday + timedelta(days=6)
+
+
+def validate_week(school_id, week_start, proposed=()):
+    """
+    Check the stored sessions of a school's week, plus optional proposed
+    sessions, for clashes in one pass.
+
+    Proposed sessions are dicts like the ones of `find_clashes` without
+    `ref`; they are referred to as 'new:<index>', stored ones by id.
+    """
+    week_end = week_start + timedelta(days=6)
+    sessions = [
+        {**session, 'ref': session['id']}
+        for session in ClassSession.objects.filter(
+            school_id=school_id, date__gte=week_start, date__lte=week_end
+        ).values(*SESSION_FIELDS)
+    ]
+    sessions.extend({**session, 'ref': f'new:{index}'} for index, session in enumerate(proposed))
+    return {
+        'week_start': week_start,
+        'week_end': week_end,
+        'sessions_checked': len(sessions),
+        'conflicts': find_clashes(sessions),
+    }
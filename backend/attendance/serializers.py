@@ -1,6 +1,7 @@
 from rest_framework import serializers
-from .models import ClassSession, AttendanceRecord
+from .models import ClassSession, AttendanceRecord, AttendanceMonthlySummary, SchoolHoliday, SessionRecurrence
 from users.serializers import StudentProfileSerializer, StaffProfileSerializer
+from .scheduling_service import check_session_clashes
 
 
 class ClassSessionSerializer(serializers.ModelSerializer):
@@ -10,7 +11,44 @@ class ClassSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = ClassSession
         fields = '__all__'
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'updated_at']
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        
+        # Merge with the stored values so partial updates are checked too
+        def value(field):
+            if field in attrs:
+                return attrs[field]
+            return getattr(self.instance, field, None)
+        
+        start_time, end_time = value('start_time'), value('end_time')
+        if start_time and end_time and start_time >= end_time:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time'})
+        
+        faculty = value('faculty')
+        school = value('school')
+        clashes = check_session_clashes(
+            school_id=school.id if school else None,
+            day=value('date'),
+            start_time=start_time,
+            end_time=end_time,
+            faculty_id=faculty.id if faculty else None,
+            course=value('course'),
+            batch=value('batch'),
+            room=value('room') or '',
+            exclude_id=self.instance.id if self.instance else None
+        )
+        if clashes:
+            raise serializers.ValidationError({
+                'non_field_errors': [
+                    f"{clash['type'].capitalize()} is already booked from "
+                    f"{clash['session']['start_time']:%H:%M} to {clash['session']['end_time']:%H:%M} "
+                    f"({clash['session']['subject']}, {clash['session']['course']} / {clash['session']['batch']})"
+                    for clash in clashes
+                ]
+            })
+        return attrs
 
 
 class AttendanceRecordSerializer(serializers.ModelSerializer):
@@ -26,6 +64,17 @@ class AttendanceRecordSerializer(serializers.ModelSerializer):
         model = AttendanceRecord
         fields = '__all__'
         read_only_fields = ['marked_at']
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        
+        # The edited record's current session counts too, so records cannot be moved out of the archive either
+        sessions = {attrs.get('session'), getattr(self.instance, 'session', None)} - {None}
+        if any(hasattr(session, 'attendance_archive') for session in sessions):
+            raise serializers.ValidationError(
+                "Attendance for this session has been archived with its closed term."
+            )
+        return attrs
 
 
 class AttendanceRecordDetailSerializer(AttendanceRecordSerializer):
@@ -38,11 +87,114 @@ class AttendanceRecordDetailSerializer(AttendanceRecordSerializer):
         fields = '__all__'
 
 
+class AttendanceMonthlySummarySerializer(serializers.ModelSerializer):
+    """Serializer for AttendanceMonthlySummary model"""
+    attendance_percentage = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = AttendanceMonthlySummary
+        fields = [
+            'id', 'student', 'month', 'present', 'absent', 'late', 'excused',
+            'sessions', 'attendance_percentage', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
+class AttendanceEntrySerializer(serializers.Serializer):
+    """One student's attendance within a bulk mark request"""
+    student_id = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=AttendanceRecord.STATUS_CHOICES)
+    remarks = serializers.CharField(required=False, allow_blank=True, default='')
+
+
 class AttendanceMarkSerializer(serializers.Serializer):
     """Serializer for marking attendance"""
-    session_id = serializers.IntegerField()
-    attendance_data = serializers.ListField(
-        child=serializers.DictField(
-            child=serializers.CharField()
-        )
-    )
\ No newline at end of file
+    MAX_ROSTER_SIZE = 500
+
+    session_id = serializers.IntegerField(required=False)
+    attendance_data = AttendanceEntrySerializer(many=True, allow_empty=False, max_length=MAX_ROSTER_SIZE)
+
+    def validate_attendance_data(self, value):
+        student_ids = [entry['student_id'] for entry in value]
+        if len(student_ids) != len(set(student_ids)):
+            raise serializers.ValidationError('Each student can only appear once per session')
+        return value
+
+
+class SyncMarkSerializer(serializers.Serializer):
+    """One attendance mark taken offline"""
+    session = serializers.IntegerField()
+    student = serializers.IntegerField()
+    status = serializers.ChoiceField(choices=AttendanceRecord.STATUS_CHOICES)
+    remarks = serializers.CharField(required=False, allow_blank=True, default='')
+    marked_at = serializers.DateTimeField(help_text="Device time the mark was taken")
+
+
+class SyncPushSerializer(serializers.Serializer):
+    """Batch of offline marks pushed by a device"""
+    MAX_BATCH_SIZE = 5000
+
+    marks = SyncMarkSerializer(many=True, allow_empty=False, max_length=MAX_BATCH_SIZE)
+
+
+class ProposedSessionSerializer(serializers.Serializer):
+    """A session that is not stored yet, checked by timetable validation"""
+    course = serializers.CharField(max_length=100)
+    subject = serializers.CharField(max_length=100)
+    batch = serializers.CharField(max_length=50)
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    faculty_id = serializers.IntegerField()
+    room = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError({'end_time': 'End time must be after start time'})
+        return attrs
+
+
+class TimetableValidationSerializer(serializers.Serializer):
+    """Week to validate and optional proposed sessions for it"""
+    MAX_PROPOSED_SESSIONS = 5000
+
+    week_start = serializers.DateField(help_text="Any date in the week; the week runs Monday to Sunday")
+    sessions = ProposedSessionSerializer(many=True, required=False, default=list, max_length=MAX_PROPOSED_SESSIONS)
+
+
+class SchoolHolidaySerializer(serializers.ModelSerializer):
+    """Serializer for SchoolHoliday model"""
+    
+    class Meta:
+        model = SchoolHoliday
+        fields = ['id', 'school', 'date', 'name']
+        read_only_fields = ['school']
+
+
+class SessionRecurrenceSerializer(serializers.ModelSerializer):
+    """Serializer for SessionRecurrence model"""
+    faculty_name = serializers.CharField(source='faculty.user.get_full_name', read_only=True)
+    
+    class Meta:
+        model = SessionRecurrence
+        fields = '__all__'
+        read_only_fields = ['school', 'materialized_until', 'skipped_dates', 'created_at']
+    
+    def validate_weekdays(self, value):
+        if not isinstance(value, list) or not value or any(
+            not isinstance(day, int) or isinstance(day, bool) or not 0 <= day <= 6 for day in value
+        ):
+            raise serializers.ValidationError('Weekdays must be a non-empty list of integers from 0 (Monday) to 6 (Sunday)')
+        return sorted(set(value))
+    
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        
+        def value(field):
+            return attrs[field] if field in attrs else getattr(self.instance, field, None)
+        
+        if value('start_time') >= value('end_time'):
+            raise serializers.ValidationError({'end_time': 'End time must be after start time'})
+        if value('term_start') > value('term_end'):
+            raise serializers.ValidationError({'term_end': 'Term end must not be before term start'})
+        return attrs
@@ -0,0 +1,108 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from users.models import StudentProfile
+from .models import AttendanceRecord, ClassSession, SyncTombstone
+from .rollup_service import apply_status_changes, month_start
+
+
+def record_tombstone(table, row_id, school_id, faculty_id=None):
+    """Tell offline devices of the school (or one faculty) to drop a synced row"""
+    SyncTombstone.objects.create(table=table, row_id=row_id, school_id=school_id, faculty_id=faculty_id)
+
+
+@receiver(pre_save, sender=AttendanceRecord)
+def remember_previous_attendance(sender, instance, **kwargs):
+    """Keep the stored status and month so post_save can compute the rollup delta"""
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = AttendanceRecord.objects.filter(pk=instance.pk).values_list(
+            'student_id', 'status', 'session__date', 'session_id', 'session__school_id', 'session__faculty_id'
+        ).first()
+
+
+@receiver(post_save, sender=AttendanceRecord)
+def update_rollup_on_save(sender, instance, created, **kwargs):
+    """Fold a single created or edited record into the monthly rollup"""
+    month = month_start(instance.session.date)
+    previous = getattr(instance, '_rollup_previous', None)
+
+    if created or previous is None:
+        apply_status_changes(month, [(instance.student_id, None, instance.status)])
+        return
+
+    previous_student, previous_status, previous_date, previous_session, previous_school, previous_faculty = previous
+    if previous_session != instance.session_id:
+        record_tombstone('records', instance.pk, previous_school, previous_faculty)
+    previous_month = month_start(previous_date)
+    if previous_student == instance.student_id and previous_month == month:
+        apply_status_changes(month, [(instance.student_id, previous_status, instance.status)])
+    else:
+        apply_status_changes(previous_month, [(previous_student, previous_status, None)])
+        apply_status_changes(month, [(instance.student_id, None, instance.status)])
+
+
+@receiver(post_delete, sender=AttendanceRecord)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Remove a deleted record from the monthly rollup and from offline devices"""
+    session = ClassSession.objects.filter(pk=instance.session_id).values_list('date', 'school_id', 'faculty_id').first()
+    if session:
+        apply_status_changes(month_start(session[0]), [(instance.student_id, instance.status, None)])
+        record_tombstone('records', instance.pk, session[1], session[2])
+
+
+@receiver(pre_save, sender=ClassSession)
+def remember_previous_session_date(sender, instance, **kwargs):
+    instance._rollup_previous_date = None
+    instance._sync_previous_owner = None
+    if instance.pk:
+        previous = ClassSession.objects.filter(pk=instance.pk).values_list('date', 'school_id', 'faculty_id').first()
+        if previous:
+            instance._rollup_previous_date = previous[0]
+            instance._sync_previous_owner = previous[1:]
+
+
+@receiver(post_save, sender=ClassSession)
+def tombstone_reassigned_session(sender, instance, created, **kwargs):
+    """A session given to another faculty (or school) leaves the previous owner's devices"""
+    previous_owner = getattr(instance, '_sync_previous_owner', None)
+    if not created and previous_owner and previous_owner != (instance.school_id, instance.faculty_id):
+        record_tombstone('sessions', instance.pk, *previous_owner)
+
+
+@receiver(post_delete, sender=ClassSession)
+def tombstone_deleted_session(sender, instance, **kwargs):
+    record_tombstone('sessions', instance.pk, instance.school_id, instance.faculty_id)
+
+
+@receiver(pre_save, sender=StudentProfile)
+def remember_previous_student_scope(sender, instance, **kwargs):
+    instance._sync_previous_scope = None
+    if instance.pk:
+        instance._sync_previous_scope = StudentProfile.objects.filter(pk=instance.pk).values_list(
+            'school_id', 'course'
+        ).first()
+
+
+@receiver(post_save, sender=StudentProfile)
+def tombstone_moved_student(sender, instance, created, **kwargs):
+    """A student moved to another school or course leaves the devices that synced them there"""
+    previous_scope = getattr(instance, '_sync_previous_scope', None)
+    if not created and previous_scope and previous_scope != (instance.school_id, instance.course):
+        record_tombstone('students', instance.pk, previous_scope[0])
+
+
+@receiver(post_delete, sender=StudentProfile)
+def tombstone_deleted_student(sender, instance, **kwargs):
+    record_tombstone('students', instance.pk, instance.school_id)
+
+
+@receiver(post_save, sender=ClassSession)
+def move_rollup_on_reschedule(sender, instance, created, **kwargs):
+    """A session moved to another month takes its attendance with it"""
+    previous_date = getattr(instance, '_rollup_previous_date', None)
+    if created or previous_date is None or month_start(previous_date) == month_start(instance.date):
+        return
+
+    statuses = list(AttendanceRecord.objects.filter(session=instance).values_list('student_id', 'status'))
+    apply_status_changes(month_start(previous_date), [(student_id, status, None) for student_id, status in statuses])
+    apply_status_changes(month_start(instance.date), [(student_id, None, status) for student_id, status in statuses])
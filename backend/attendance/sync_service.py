@@ -0,0 +1,293 @@
+"""
+Delta sync for offline teacher devices.
+
+Devices keep a local copy of their sessions, rosters and attendance. A pull
+returns only the rows changed since the device's cursor, read by keyset on the
+indexed (updated_at, id) of each table, as compact column lists. A push
+applies a batch of offline marks in bulk with last-writer-wins resolution on
+the time each mark was taken (`marked_at`).
+
+Deleted rows, and rows that moved to another school or faculty, are
+recorded as `SyncTombstone`s and pulled the same way under `deleted`, as
+row ids per table. A tombstone is only served while its row is not (again)
+in the device's scope, so devices apply `deleted` after the changed rows.
+Tombstones are purged by housekeeping after `sync_tombstones` days; a device
+whose cursor is older than that is told to `resync` from scratch.
+
+The cursor is opaque to clients: one `<updated_at in microseconds>-<id>`
+position per table and one for tombstones, joined with dots.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from users.models import StudentProfile
+from utils.db import lock_rows, retry_if_locked
+from utils.housekeeping import get_retention_days
+from .models import ArchivedSessionAttendance, AttendanceRecord, ClassSession, SyncTombstone
+from .rollup_service import apply_status_changes, month_start
+
+# Rows are served once they are this old, so a transaction that committed
+# late with an older updated_at is not skipped by a cursor that moved past it
+SYNC_SETTLE_SECONDS = 5
+# Devices only keep sessions of the recent past
+SYNC_WINDOW_DAYS = 90
+
+SYNC_TABLES = {
+    'sessions': ['id', 'course', 'subject', 'batch', 'date', 'start_time', 'end_time', 'faculty_id'],
+    'records': ['id', 'session_id', 'student_id', 'status', 'remarks', 'marked_at', 'marked_by_id'],
+    'students': ['id', 'admission_number', 'roll_number', 'first_name', 'last_name', 'course', 'semester'],
+}
+# Cursor positions: the synced tables, then the tombstones
+CURSOR_KEYS = [*SYNC_TABLES, 'deleted']
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class SyncScope:
+    """
+    Rows a user syncs: a faculty member gets their own sessions and the
+    students of those courses; other school staff get their whole school.
+    """
+
+    def __init__(self, school_id, faculty_id=None):
+        self.school_id = school_id
+        self.faculty_id = faculty_id
+
+    def sessions(self):
+        sessions = ClassSession.objects.filter(
+            school_id=self.school_id,
+            date__gte=timezone.localdate() - timedelta(days=SYNC_WINDOW_DAYS)
+        )
+        if self.faculty_id is not None:
+            sessions = sessions.filter(faculty_id=self.faculty_id)
+        return sessions
+
+    def records(self):
+        records = AttendanceRecord.objects.filter(
+            session__school_id=self.school_id,
+            session__date__gte=timezone.localdate() - timedelta(days=SYNC_WINDOW_DAYS)
+        )
+        if self.faculty_id is not None:
+            records = records.filter(session__faculty_id=self.faculty_id)
+        return records
+
+    def students(self):
+        students = StudentProfile.objects.filter(school_id=self.school_id)
+        if self.faculty_id is not None:
+            students = students.filter(
+                course__in=ClassSession.objects.filter(faculty_id=self.faculty_id).values('course')
+            )
+        return students
+
+    def queryset(self, table):
+        return getattr(self, table)()
+
+    def tombstones(self):
+        """Tombstones for this scope whose rows are not visible in it any more"""
+        tombstones = SyncTombstone.objects.filter(school_id=self.school_id)
+        if self.faculty_id is not None:
+            tombstones = tombstones.filter(Q(faculty_id=self.faculty_id) | Q(faculty_id__isnull=True))
+        for table in SYNC_TABLES:
+            tombstones = tombstones.exclude(table=table, row_id__in=self.queryset(table).values('id'))
+        return tombstones
+
+
+def parse_cursor(value):
+    """
+    Decode a cursor into {key: (updated_at, id)} for every CURSOR_KEYS
+    entry; an empty cursor starts from the beginning. Cursors issued before
+    tombstones existed start their tombstones from the beginning. Raises
+    ValueError for a malformed cursor.
+    """
+    positions = {key: (EPOCH, 0) for key in CURSOR_KEYS}
+    if not value:
+        return positions
+    parts = value.split('.')
+    if len(parts) not in (len(SYNC_TABLES), len(CURSOR_KEYS)):
+        raise ValueError('Invalid sync cursor')
+    for table, part in zip(CURSOR_KEYS, parts):
+        micros, _, row_id = part.partition('-')
+        positions[table] = (EPOCH + timedelta(microseconds=int(micros)), int(row_id))
+    return positions
+
+
+def format_cursor(positions):
+    return '.'.join(
+        f'{(updated_at - EPOCH) // timedelta(microseconds=1)}-{row_id}'
+        for updated_at, row_id in (positions[key] for key in CURSOR_KEYS)
+    )
+
+
+def _encode(value):
+    """Dates, times and datetimes as ISO strings, everything else as is"""
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def pull_changes(scope, cursor=None, limit=500):
+    """
+    Rows changed since `cursor`, at most `limit` per table.
+
+    Returns {'cursor', 'has_more', 'resync', <table>: {'fields', 'rows'},
+    'deleted': {<table>: [ids]}}; rows are lists in the order of `fields`.
+    Clients repeat the pull with the new cursor while `has_more` is true.
+    `resync` is true (and nothing else is returned) when tombstones the
+    device has not seen may already be purged: the device must drop its
+    copy and pull again without a cursor.
+    """
+    positions = parse_cursor(cursor)
+    now = timezone.now()
+    if cursor and positions['deleted'][0] < now - timedelta(days=get_retention_days()['sync_tombstones']):
+        return {'resync': True, 'has_more': False, 'cursor': None}
+    settled = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    payload = {'has_more': False, 'resync': False}
+
+    for table, fields in SYNC_TABLES.items():
+        since, last_id = positions[table]
+        rows = list(
+            scope.queryset(table)
+            .filter(Q(updated_at__gt=since) | Q(updated_at=since, id__gt=last_id), updated_at__lte=settled)
+            .order_by('updated_at', 'id')
+            .values_list('updated_at', *fields)[:limit]
+        )
+        if rows:
+            positions[table] = (rows[-1][0], rows[-1][1])
+        payload['has_more'] = payload['has_more'] or len(rows) == limit
+        payload[table] = {
+            'fields': fields,
+            'rows': [[_encode(value) for value in row[1:]] for row in rows],
+        }
+
+    since, last_id = positions['deleted']
+    tombstones = list(
+        scope.tombstones()
+        .filter(Q(deleted_at__gt=since) | Q(deleted_at=since, id__gt=last_id), deleted_at__lte=settled)
+        .order_by('deleted_at', 'id')
+        .values_list('deleted_at', 'id', 'table', 'row_id')[:limit]
+    )
+    if len(tombstones) == limit:
+        positions['deleted'] = tombstones[-1][:2]
+    else:
+        # Every settled tombstone has been served: move up to `settled` so a
+        # device that never sees a deletion is not told to resync
+        positions['deleted'] = max(tuple(tombstones[-1][:2]) if tombstones else (EPOCH, 0), (settled, 0))
+    payload['has_more'] = payload['has_more'] or len(tombstones) == limit
+    deleted = {table: [] for table in SYNC_TABLES}
+    for _, _, table, row_id in tombstones:
+        deleted[table].append(row_id)
+    payload['deleted'] = deleted
+
+    payload['cursor'] = format_cursor(positions)
+    return payload
+
+
+@retry_if_locked
+def push_marks(scope, marks, marked_by_id=None):
+    """
+    Apply offline attendance marks in bulk, last writer wins.
+
+    `marks` are dicts with `session`, `student`, `status`, `remarks` and the
+    device time `marked_at`. A mark is applied when there is no record yet
+    or the stored one was taken at or before it; otherwise it is returned as
+    stale with the server's current value. Marks for sessions outside the
+    scope, archived sessions or students not in the session's school and
+    course are rejected. `marked_by_id` defaults to each session's faculty.
+
+    Returns {'created', 'updated', 'stale': [...], 'rejected': [...]}.
+    """
+    sessions = {
+        session['id']: session
+        for session in scope.sessions().filter(
+            id__in={mark['session'] for mark in marks},
+            attendance_archive__isnull=True
+        ).values('id', 'school_id', 'course', 'date', 'faculty_id')
+    }
+    students = {
+        student_id: (school_id, course)
+        for student_id, school_id, course in StudentProfile.objects.filter(
+            id__in={mark['student'] for mark in marks}
+        ).values_list('id', 'school_id', 'course')
+    }
+
+    result = {'created': 0, 'updated': 0, 'stale': [], 'rejected': []}
+
+    # Several devices (or one device twice) may carry the same mark: the latest wins
+    latest = {}
+    for index, mark in enumerate(marks):
+        session = sessions.get(mark['session'])
+        if session is None:
+            result['rejected'].append({'index': index, 'error': 'Session is not available for sync'})
+            continue
+        if students.get(mark['student']) != (session['school_id'], session['course']):
+            result['rejected'].append({'index': index, 'error': 'Student is not enrolled in this session\'s school and course'})
+            continue
+        key = (mark['session'], mark['student'])
+        if key not in latest or latest[key][1]['marked_at'] <= mark['marked_at']:
+            latest[key] = (index, mark)
+
+    if not latest:
+        return result
+
+    with transaction.atomic():
+        # Same lock as bulk marking, so the two never interleave on a session
+        lock_rows(ClassSession.objects.filter(id__in={key[0] for key in latest}))
+        # Sessions archived since they were read above; the lock keeps new archives out
+        archived = set(
+            ArchivedSessionAttendance.objects.filter(session_id__in={key[0] for key in latest})
+            .values_list('session_id', flat=True)
+        )
+        existing = {
+            (session_id, student_id): (status, marked_at)
+            for session_id, student_id, status, marked_at in AttendanceRecord.objects.filter(
+                session_id__in={key[0] for key in latest},
+                student_id__in={key[1] for key in latest}
+            ).values_list('session_id', 'student_id', 'status', 'marked_at')
+            if (session_id, student_id) in latest
+        }
+
+        records = []
+        changes = defaultdict(list)
+        for key, (index, mark) in latest.items():
+            if key[0] in archived:
+                result['rejected'].append({'index': index, 'error': 'Session is not available for sync'})
+                continue
+            current = existing.get(key)
+            if current is not None and current[1] > mark['marked_at']:
+                result['stale'].append({
+                    'session': key[0],
+                    'student': key[1],
+                    'status': current[0],
+                    'marked_at': current[1].isoformat()
+                })
+                continue
+            session = sessions[key[0]]
+            records.append(AttendanceRecord(
+                session_id=key[0],
+                student_id=key[1],
+                status=mark['status'],
+                remarks=mark.get('remarks', ''),
+                marked_by_id=marked_by_id or session['faculty_id'],
+                marked_at=mark['marked_at']
+            ))
+            changes[month_start(session['date'])].append(
+                (key[1], current[0] if current else None, mark['status'])
+            )
+            result['updated' if current else 'created'] += 1
+
+        if records:
+            AttendanceRecord.objects.bulk_create(
+                records,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=['session', 'student'],
+                update_fields=['status', 'remarks', 'marked_by', 'marked_at', 'updated_at']
+            )
+
+        # bulk_create sends no signals, so the monthly rollups are updated here
+        for month, month_changes in changes.items():
+            apply_status_changes(month, month_changes)
+
+    result['rejected'].sort(key=lambda item: item['index'])
+    return result
@@ -1,3 +1,357 @@
+from datetime import date, time, timedelta
+from unittest import mock
+
+import numpy as np
 from django.test import TestCase
+from django.utils import timezone
+
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+from .archive_service import (
+    SessionArchivedError, archive_sessions, get_session_records, iter_attendance, pack_statuses,
+    pack_student_ids, unpack_statuses, unpack_student_ids
+)
+from .marking_service import mark_session_attendance
+from .models import ArchivedSessionAttendance, AttendanceMonthlySummary, AttendanceRecord, ClassSession
+from .rollup_service import get_attendance_totals, rebuild_month
+from .scheduling_service import IntervalIndex, find_clashes, validate_week
+from .serializers import ClassSessionSerializer
+from .sync_service import SyncScope, format_cursor, parse_cursor, pull_changes, push_marks
+
+
+class AttendanceFixtureMixin:
+    """A school with two faculty members and a Class 10 roster"""
+
+    STUDENTS = 4
+
+    def setUp(self):
+        self.school = School.objects.create(
+            district='Test', block='Test', village='Test', school_name='Attendance School', school_code='ATTEND01'
+        )
+        self.faculty, self.other_faculty = [
+            StaffProfile.objects.create(
+                user=User.objects.create_user(
+                    username=f'faculty-{index}', email=f'faculty-{index}@test.local', password='test',
+                    role='faculty', school=self.school
+                ),
+                employee_id=f'ATT00{index}', department='Science', designation='Teacher',
+                date_of_joining=date(2020, 1, 1)
+            )
+            for index in range(2)
+        ]
+        self.students = StudentProfile.objects.bulk_create([
+            StudentProfile(
+                school=self.school, admission_number=f'ATT-{index}', roll_number=str(index),
+                course='Class 10', department='Science', semester=1, date_of_birth=date(2010, 1, 1),
+                address='Test', emergency_contact='0000000000'
+            )
+            for index in range(self.STUDENTS)
+        ])
+
+    def create_session(self, day, start=9, end=10, faculty=None, batch='A', room='', subject='Maths'):
+        return ClassSession.objects.create(
+            school=self.school, course='Class 10', subject=subject, batch=batch, date=day,
+            start_time=time(start), end_time=time(end), faculty=faculty or self.faculty, room=room
+        )
+
+    def mark(self, session, *statuses):
+        entries = [
+            {'student_id': student.id, 'status': status}
+            for student, status in zip(self.students, statuses)
+        ]
+        return mark_session_attendance(session, entries, self.faculty)
+
+
+class MonthlyRollupTests(AttendanceFixtureMixin, TestCase):
+    """Every write path applies its delta to the monthly rollup"""
+
+    MARCH = date(2026, 3, 1)
+    APRIL = date(2026, 4, 1)
+
+    def summaries(self, month):
+        return {
+            student_id: (present, absent, late, excused, sessions)
+            for student_id, present, absent, late, excused, sessions in AttendanceMonthlySummary.objects.filter(
+                month=month
+            ).values_list('student_id', 'present', 'absent', 'late', 'excused', 'sessions')
+        }
+
+    def assertMatchesRebuild(self, *months):
+        # A rebuild leaves out the emptied rows the deltas keep
+        def counts():
+            return {
+                month: {student_id: row for student_id, row in self.summaries(month).items() if any(row)}
+                for month in months
+            }
+
+        incremental = counts()
+        for month in months:
+            rebuild_month(month)
+        self.assertEqual(counts(), incremental)
+
+    def test_bulk_marks_apply_deltas(self):
+        first = self.create_session(date(2026, 3, 10))
+        second = self.create_session(date(2026, 3, 11))
+        self.mark(first, 'present', 'absent', 'late', 'excused')
+        self.mark(second, 'present', 'present', 'present', 'present')
+
+        alice, bob = self.students[0].id, self.students[1].id
+        self.assertEqual(self.summaries(self.MARCH)[alice], (2, 0, 0, 0, 2))
+        self.assertEqual(self.summaries(self.MARCH)[bob], (1, 1, 0, 0, 2))
+
+        # Re-marking moves counts between statuses without adding sessions
+        _, summary = self.mark(first, 'absent', 'present', 'late', 'excused')
+        self.assertEqual(summary, {'created': 0, 'updated': 4, 'rejected': 0})
+        self.assertEqual(self.summaries(self.MARCH)[alice], (1, 1, 0, 0, 2))
+        self.assertEqual(self.summaries(self.MARCH)[bob], (2, 0, 0, 0, 2))
+        self.assertMatchesRebuild(self.MARCH)
+
+    def test_edits_deletes_and_reschedules(self):
+        session = self.create_session(date(2026, 3, 31))
+        self.mark(session, 'present', 'present', 'absent', 'absent')
+
+        record = AttendanceRecord.objects.get(session=session, student=self.students[0])
+        record.status = 'late'
+        record.save()
+        AttendanceRecord.objects.get(session=session, student=self.students[2]).delete()
+        self.assertEqual(self.summaries(self.MARCH)[self.students[0].id], (0, 0, 1, 0, 1))
+        self.assertEqual(self.summaries(self.MARCH)[self.students[2].id], (0, 0, 0, 0, 0))
+
+        # The session moves to April and takes its attendance with it
+        session.date = date(2026, 4, 1)
+        session.save()
+        self.assertEqual(set(self.summaries(self.MARCH).values()), {(0, 0, 0, 0, 0)})
+        self.assertEqual(self.summaries(self.APRIL)[self.students[3].id], (0, 1, 0, 0, 1))
+        self.assertMatchesRebuild(self.MARCH, self.APRIL)
+
+    def test_decrements_are_clamped_at_zero(self):
+        session = self.create_session(date(2026, 3, 10))
+        self.mark(session, 'present', 'present', 'present', 'present')
+        AttendanceMonthlySummary.objects.update(present=0, sessions=0)
+
+        AttendanceRecord.objects.filter(session=session).first().delete()
+        self.assertEqual(set(self.summaries(self.MARCH).values()), {(0, 0, 0, 0, 0)})
+
+    def test_totals(self):
+        self.mark(self.create_session(date(2026, 3, 10)), 'present', 'absent')
+        self.mark(self.create_session(date(2026, 4, 10)), 'late', 'absent')
+        student_ids = [student.id for student in self.students]
+
+        totals = get_attendance_totals(student_ids)
+        self.assertEqual(totals[student_ids[0]]['attendance_percentage'], 100)
+        self.assertEqual(totals[student_ids[1]]['attendance_percentage'], 0)
+        self.assertEqual(totals[student_ids[2]]['sessions'], 0)
+        self.assertEqual(get_attendance_totals(student_ids, since=self.APRIL)[student_ids[0]]['late'], 1)
+
+
+class AttendanceArchiveTests(AttendanceFixtureMixin, TestCase):
+    """Closed-term attendance survives the trip into the columnar archive"""
+
+    def test_columns_round_trip(self):
+        rng = np.random.default_rng(7)
+        for count in (1, 3, 4, 5, 257):
+            student_ids = np.sort(rng.choice(10 ** 6, size=count, replace=False))
+            codes = rng.integers(0, 4, size=count)
+            with self.subTest(count=count):
+                self.assertEqual(unpack_student_ids(pack_student_ids(student_ids)).tolist(), student_ids.tolist())
+                self.assertEqual(unpack_statuses(pack_statuses(codes), count).tolist(), codes.tolist())
+
+    def test_archived_sessions_read_like_live_ones(self):
+        sessions = [self.create_session(date(2026, 3, day)) for day in (10, 11)]
+        self.mark(sessions[0], 'present', 'absent', 'late', 'excused')
+        self.mark(sessions[1], 'absent', 'present')
+        AttendanceRecord.objects.filter(session=sessions[0], student=self.students[2]).update(remarks='Bus was late')
+
+        def snapshot():
+            return (
+                [
+                    (record.student_id, record.status, record.remarks, record.marked_by_id)
+                    for session in sessions for record in get_session_records(session)
+                ],
+                sorted(iter_attendance([session.id for session in sessions])),
+                list(AttendanceMonthlySummary.objects.order_by('student_id').values_list('student_id', 'present', 'sessions')),
+            )
+
+        before = snapshot()
+        report = archive_sessions(ClassSession.objects.filter(id__in=[session.id for session in sessions]), '2025-26')
+
+        self.assertEqual((report['sessions'], report['records']), (2, 6))
+        self.assertFalse(AttendanceRecord.objects.exists())
+        self.assertEqual(snapshot(), before)
+
+        # The rollup rebuilt from the archive matches the one kept while marking
+        rebuild_month(date(2026, 3, 1))
+        self.assertEqual(snapshot(), before)
+
+        # Archived sessions are read-only and archived once
+        with self.assertRaises(SessionArchivedError):
+            self.mark(sessions[0], 'present')
+        self.assertEqual(archive_sessions(ClassSession.objects.all(), '2025-26')['sessions'], 0)
+        self.assertEqual(ArchivedSessionAttendance.objects.count(), 2)
+
+
+@mock.patch('attendance.sync_service.SYNC_SETTLE_SECONDS', 0)
+class DeltaSyncTests(AttendanceFixtureMixin, TestCase):
+    """Cursor paging of changed rows and tombstones for offline devices"""
+
+    def pull_all(self, scope, cursor=None, limit=2):
+        """Pull pages until has_more is false; returns (rows by table, deleted by table, cursor, pages)"""
+        rows = {'sessions': [], 'records': [], 'students': []}
+        deleted = {table: [] for table in rows}
+        pages = 0
+        while True:
+            payload = pull_changes(scope, cursor, limit)
+            pages += 1
+            for table in rows:
+                rows[table].extend(row[0] for row in payload[table]['rows'])
+                deleted[table].extend(payload['deleted'][table])
+            cursor = payload['cursor']
+            if not payload['has_more']:
+                return rows, deleted, cursor, pages
+
+    def test_cursor_pages_through_every_row_once(self):
+        today = timezone.localdate()
+        sessions = [self.create_session(today, start=8 + index, end=9 + index) for index in range(5)]
+        # Rows written in the same instant are told apart by id
+        ClassSession.objects.filter(id__in=[session.id for session in sessions[:3]]).update(
+            updated_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        rows, deleted, cursor, pages = self.pull_all(SyncScope(self.school.id, self.faculty.id))
+        self.assertEqual(sorted(rows['sessions']), [session.id for session in sessions])
+        self.assertEqual(len(rows['students']), self.STUDENTS)
+        self.assertEqual(pages, 3)
+
+        # Nothing changed: nothing to pull
+        rows, deleted, cursor, _ = self.pull_all(SyncScope(self.school.id, self.faculty.id), cursor)
+        self.assertEqual(rows, {'sessions': [], 'records': [], 'students': []})
+
+        self.mark(sessions[0], 'present', 'absent')
+        rows, _, _, _ = self.pull_all(SyncScope(self.school.id, self.faculty.id), cursor)
+        self.assertEqual((rows['sessions'], len(rows['records'])), ([], 2))
+
+    def test_deletions_and_moves_are_pulled_as_tombstones(self):
+        today = timezone.localdate()
+        kept, deleted_session, moved = [self.create_session(today, start=8 + index, end=9 + index) for index in range(3)]
+        self.mark(deleted_session, 'present', 'present')
+        record_ids = list(AttendanceRecord.objects.filter(session=deleted_session).values_list('id', flat=True))
+        faculty_scope = SyncScope(self.school.id, self.faculty.id)
+        other_scope = SyncScope(self.school.id, self.other_faculty.id)
+        _, _, cursor, _ = self.pull_all(faculty_scope)
+        _, _, other_cursor, _ = self.pull_all(other_scope)
+
+        deleted_id = deleted_session.id
+        deleted_session.delete()
+        moved.faculty = self.other_faculty
+        moved.save()
+        student = self.students[3]
+        student.course = 'Class 11'
+        student.save()
+
+        rows, deleted, cursor, _ = self.pull_all(faculty_scope, cursor)
+        self.assertEqual(sorted(deleted['sessions']), sorted([deleted_id, moved.id]))
+        self.assertEqual(sorted(deleted['records']), sorted(record_ids))
+        self.assertEqual(deleted['students'], [student.id])
+
+        # The session's new faculty gets it as a change; other faculty's deletions are not theirs
+        rows, deleted, _, _ = self.pull_all(other_scope, other_cursor)
+        self.assertEqual((rows['sessions'], deleted['sessions']), ([moved.id], []))
+
+        # A row that came back into scope is not deleted again
+        moved.faculty = self.faculty
+        moved.save()
+        rows, deleted, _, _ = self.pull_all(faculty_scope, cursor)
+        self.assertEqual((rows['sessions'], deleted['sessions']), ([moved.id], []))
+        self.assertNotIn(kept.id, deleted['sessions'])
+
+    def test_cursors_older_than_the_tombstone_retention_resync(self):
+        positions = parse_cursor(None)
+        self.assertTrue(pull_changes(SyncScope(self.school.id), format_cursor(positions))['resync'])
+        self.assertFalse(pull_changes(SyncScope(self.school.id))['resync'])
+        with self.assertRaises(ValueError):
+            parse_cursor('not-a-cursor')
+
+    def test_offline_marks_last_writer_wins(self):
+        session = self.create_session(timezone.localdate())
+        scope = SyncScope(self.school.id, self.faculty.id)
+        now = timezone.now()
+        mark = {'session': session.id, 'student': self.students[0].id, 'status': 'present', 'marked_at': now}
+
+        result = push_marks(scope, [mark, {**mark, 'status': 'late', 'marked_at': now - timedelta(minutes=5)}])
+        self.assertEqual((result['created'], result['stale']), (1, []))
+        self.assertEqual(AttendanceRecord.objects.get().status, 'present')
+
+        result = push_marks(scope, [{**mark, 'status': 'absent', 'marked_at': now - timedelta(minutes=1)}])
+        self.assertEqual(result['stale'][0]['status'], 'present')
+        result = push_marks(scope, [{**mark, 'status': 'absent', 'marked_at': now + timedelta(minutes=1)}])
+        self.assertEqual(result['updated'], 1)
+        self.assertEqual(AttendanceRecord.objects.get().status, 'absent')
+        self.assertEqual(AttendanceMonthlySummary.objects.get(student=self.students[0]).absent, 1)
+
+
+class ClashDetectionTests(AttendanceFixtureMixin, TestCase):
+    """Faculty, class and room clashes of the timetable"""
+
+    DAY = date(2026, 3, 10)
+
+    def test_interval_index(self):
+        index = IntervalIndex([(time(8), time(12), 'long'), (time(9), time(10), 'short')])
+        index.add(time(13), time(14), 'after')
+        self.assertEqual(index.conflicts(time(11), time(11, 30)), ['long'])
+        self.assertEqual(index.conflicts(time(9, 30), time(13, 30)), ['long', 'short', 'after'])
+        # Intervals are half-open: back-to-back slots do not clash
+        self.assertFalse(index.overlaps(time(12), time(13)))
+        self.assertTrue(index.overlaps(time(7), time(8, 1)))
+
+    def test_find_clashes(self):
+        def slot(ref, start, end, faculty_id, batch, room=''):
+            return {
+                'ref': ref, 'date': self.DAY, 'start_time': time(*start), 'end_time': time(*end),
+                'faculty_id': faculty_id, 'course': 'Class 10', 'batch': batch, 'room': room
+            }
+
+        clashes = find_clashes([
+            slot(1, (9,), (10,), 1, 'A', 'Lab'),
+            slot(2, (9, 30), (10, 30), 1, 'B'),
+            slot(3, (10,), (11,), 2, 'A', 'Lab'),
+            slot(4, (9,), (9, 45), 3, 'C', 'Lab'),
+        ])
+        self.assertEqual(
+            sorted((clash['type'], [session['ref'] for session in clash['sessions']]) for clash in clashes),
+            [('faculty', [1, 2]), ('room', [4, 1])]
+        )
+
+    def test_sessions_cannot_double_book(self):
+        existing = self.create_session(self.DAY, 9, 10, room='Lab')
+
+        def validate(instance=None, **data):
+            data = {
+                'school': self.school.id, 'course': 'Class 10', 'subject': 'Science', 'batch': 'B',
+                'date': self.DAY, 'start_time': '09:30', 'end_time': '10:30', 'faculty': self.other_faculty.id,
+                **data
+            }
+            serializer = ClassSessionSerializer(instance, data=data, partial=instance is not None)
+            return serializer.is_valid(), serializer.errors
+
+        self.assertEqual(validate(), (True, {}))
+        valid, errors = validate(faculty=self.faculty.id)
+        self.assertFalse(valid)
+        self.assertIn('Faculty is already booked from 09:00 to 10:00', errors['non_field_errors'][0])
+        self.assertFalse(validate(batch='A')[0])
+        self.assertFalse(validate(room='Lab')[0])
+        self.assertTrue(validate(room='Lab', start_time='10:00', end_time='11:00')[0])
+
+        # A session never clashes with itself
+        self.assertTrue(validate(existing, start_time='09:15', end_time='10:15')[0])
 
-# Create your tests here.
+    def test_week_validation_includes_proposed_sessions(self):
+        self.create_session(self.DAY, 9, 10)
+        self.create_session(self.DAY + timedelta(days=1), 9, 10)
+        proposed = {
+            'date': self.DAY, 'start_time': time(9, 30), 'end_time': time(10, 30),
+            'faculty_id': self.other_faculty.id, 'course': 'Class 10', 'batch': 'A', 'room': ''
+        }
+        report = validate_week(self.school.id, date(2026, 3, 9), [proposed])
+        self.assertEqual(report['sessions_checked'], 3)
+        self.assertEqual([clash['type'] for clash in report['conflicts']], ['class'])
+        self.assertEqual(report['conflicts'][0]['sessions'][1]['ref'], 'new:0')
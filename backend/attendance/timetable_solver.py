@@ -0,0 +1,403 @@
+"""
+Weekly timetable generator.
+
+Input is a spec of period slots, sections with their weekly subject hours and
+faculty with the subjects they teach and the slots they are unavailable:
+
+    {
+      "days": ["mon", "tue", "wed", "thu", "fri", "sat"],
+      "periods": [["09:00", "09:45"], ["09:45", "10:30"], ...],
+      "sections": [{"course": "Class 9", "batch": "A", "subjects": {"Maths": 7, "English": 6}}],
+      "faculty": [{"id": 12, "subjects": ["Maths"], "unavailable": [["sat", 5]], "max_periods": 30}]
+    }
+
+Solving happens in two stages:
+
+1. Constraint propagation: every (section, subject) gets one teacher, most
+   constrained pairs first, and each lesson's domain is narrowed to the slots
+   its teacher is available. Infeasible specs (too many hours for a section
+   or a teacher) are rejected before any search.
+2. Local search: lessons are placed greedily, then conflicts are repaired by
+   min-conflict moves and swaps. Several independently seeded searches run
+   in a process pool and the first conflict-free timetable wins.
+
+Hard constraints: a section or a teacher is never in two places at once.
+Soft constraint: a section does not get the same subject twice a day.
+"""
+import multiprocessing
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+HARD_WEIGHT = 1000
+SOFT_WEIGHT = 1
+
+
+class TimetableError(ValueError):
+    """The spec is invalid or cannot be satisfied"""
+
+
+class TimetableProblem:
+    """
+    A spec reduced to integers: slots are numbered day * periods + period,
+    lessons are (section, subject, teacher) triples with their allowed slots.
+    Plain attributes only, so problems pickle cheaply to worker processes.
+    """
+
+    def __init__(self, spec):
+        try:
+            self.days = [WEEKDAYS.index(day.lower()[:3]) for day in spec['days']]
+            self.periods = [
+                (datetime.strptime(start, '%H:%M').time(), datetime.strptime(end, '%H:%M').time())
+                for start, end in spec['periods']
+            ]
+            self.sections = [
+                (section['course'], section['batch'], {subject: int(hours) for subject, hours in dict(section['subjects']).items()})
+                for section in spec['sections']
+            ]
+            if not self.days or not self.periods or not self.sections:
+                raise TimetableError('The spec needs days, periods and sections')
+
+            self.slot_count = len(self.days) * len(self.periods)
+            all_slots = frozenset(range(self.slot_count))
+            day_positions = {weekday: position for position, weekday in enumerate(self.days)}
+
+            self.teachers = {}
+            for teacher in spec['faculty']:
+                unavailable = set()
+                for day, period in teacher.get('unavailable', []):
+                    weekday = WEEKDAYS.index(day.lower()[:3])
+                    if weekday in day_positions and 0 <= period < len(self.periods):
+                        unavailable.add(day_positions[weekday] * len(self.periods) + period)
+                self.teachers[teacher['id']] = {
+                    'subjects': set(teacher['subjects']),
+                    'slots': all_slots - unavailable,
+                    'max_periods': int(teacher.get('max_periods', self.slot_count)),
+                }
+        except TimetableError:
+            raise
+        except (AttributeError, KeyError, TypeError, ValueError) as error:
+            raise TimetableError(f'Invalid timetable spec: {error!r}')
+
+        for course, batch, subjects in self.sections:
+            hours = sum(subjects.values())
+            if hours > self.slot_count:
+                raise TimetableError(
+                    f'{course} / {batch} needs {hours} periods but the week only has {self.slot_count}'
+                )
+
+        self.assignments = self._assign_teachers()
+        self.lessons = []
+        for (section, subject), teacher in sorted(self.assignments.items()):
+            hours = self.sections[section][2][subject]
+            self.lessons.extend([(section, subject, teacher)] * hours)
+        self.domains = [sorted(self.teachers[teacher]['slots']) for _, _, teacher in self.lessons]
+        self.soft_floor = self._soft_floor()
+
+    def _assign_teachers(self):
+        """Give every (section, subject) one teacher, most constrained pairs first"""
+        pairs = [
+            (section, subject, hours)
+            for section, (_, _, subjects) in enumerate(self.sections)
+            for subject, hours in subjects.items()
+            if hours > 0
+        ]
+        candidates = {
+            (section, subject): [
+                teacher_id for teacher_id, teacher in self.teachers.items() if subject in teacher['subjects']
+            ]
+            for section, subject, _ in pairs
+        }
+        load = {teacher_id: 0 for teacher_id in self.teachers}
+        capacity = {
+            teacher_id: min(teacher['max_periods'], len(teacher['slots']))
+            for teacher_id, teacher in self.teachers.items()
+        }
+
+        assignments = {}
+        # Fewest qualified teachers first, then the biggest hour blocks
+        for section, subject, hours in sorted(pairs, key=lambda pair: (len(candidates[pair[:2]]), -pair[2])):
+            options = [teacher_id for teacher_id in candidates[(section, subject)] if load[teacher_id] + hours <= capacity[teacher_id]]
+            if not options:
+                course, batch, _ = self.sections[section]
+                raise TimetableError(f'No teacher has {hours} free periods for {subject} in {course} / {batch}')
+            teacher_id = max(options, key=lambda option: (capacity[option] - load[option], -option))
+            assignments[(section, subject)] = teacher_id
+            load[teacher_id] += hours
+        return assignments
+
+    def _soft_floor(self):
+        """
+        Fewest same-subject-same-day pairs possible: a subject with more hours
+        than days must repeat on some days even when spread evenly.
+        """
+        day_count = len(self.days)
+        floor = 0
+        for _, _, subjects in self.sections:
+            for hours in subjects.values():
+                per_day, extra = divmod(hours, day_count)
+                floor += extra * (per_day + 1) * per_day // 2 + (day_count - extra) * per_day * (per_day - 1) // 2
+        return floor
+
+    def is_optimal(self, hard, soft):
+        return hard == 0 and soft <= self.soft_floor
+
+
+class _Search:
+    """Occupancy counters of one local search run"""
+
+    def __init__(self, problem, rng):
+        self.problem = problem
+        self.rng = rng
+        self.period_count = len(problem.periods)
+        self.section_occupancy = [[0] * problem.slot_count for _ in problem.sections]
+        self.teacher_occupancy = {teacher_id: [0] * problem.slot_count for teacher_id in problem.teachers}
+        self.subject_day = {}
+        self.slots = [None] * len(problem.lessons)
+        self.by_section_slot = {}
+
+    def cost_at(self, lesson, slot):
+        """Cost of placing `lesson` at `slot` given everything else currently placed"""
+        section, subject, teacher = self.problem.lessons[lesson]
+        hard = self.section_occupancy[section][slot] + self.teacher_occupancy[teacher][slot]
+        soft = self.subject_day.get((section, subject, slot // self.period_count), 0)
+        return hard * HARD_WEIGHT + soft * SOFT_WEIGHT
+
+    def place(self, lesson, slot):
+        section, subject, teacher = self.problem.lessons[lesson]
+        self.section_occupancy[section][slot] += 1
+        self.teacher_occupancy[teacher][slot] += 1
+        key = (section, subject, slot // self.period_count)
+        self.subject_day[key] = self.subject_day.get(key, 0) + 1
+        self.by_section_slot.setdefault((section, slot), set()).add(lesson)
+        self.slots[lesson] = slot
+
+    def remove(self, lesson):
+        slot = self.slots[lesson]
+        section, subject, teacher = self.problem.lessons[lesson]
+        self.section_occupancy[section][slot] -= 1
+        self.teacher_occupancy[teacher][slot] -= 1
+        self.subject_day[(section, subject, slot // self.period_count)] -= 1
+        self.by_section_slot[(section, slot)].discard(lesson)
+        self.slots[lesson] = None
+
+    def lesson_cost(self, lesson):
+        slot = self.slots[lesson]
+        self.remove(lesson)
+        cost = self.cost_at(lesson, slot)
+        self.place(lesson, slot)
+        return cost
+
+    def total_cost(self):
+        """(hard conflicts, soft conflicts) counted as pairs"""
+        def pairs(counts):
+            return sum(count * (count - 1) // 2 for count in counts if count > 1)
+
+        hard = sum(pairs(row) for row in self.section_occupancy)
+        hard += sum(pairs(row) for row in self.teacher_occupancy.values())
+        soft = pairs(self.subject_day.values())
+        return hard, soft
+
+    def initial_placement(self):
+        order = list(range(len(self.problem.lessons)))
+        self.rng.shuffle(order)
+        order.sort(key=lambda lesson: len(self.problem.domains[lesson]))
+        for lesson in order:
+            domain = self.problem.domains[lesson]
+            best = min(domain, key=lambda slot: (self.cost_at(lesson, slot), self.rng.random()))
+            self.place(lesson, best)
+
+    def best_move(self, lesson):
+        """
+        Best (delta, target_slot, swap_lesson) for a lesson: moving it to any
+        slot of its domain, or swapping it with a lesson of the same section
+        already there.
+        """
+        problem = self.problem
+        current = self.slots[lesson]
+        section = problem.lessons[lesson][0]
+        self.remove(lesson)
+        current_cost = self.cost_at(lesson, current)
+
+        best = None
+        for slot in problem.domains[lesson]:
+            if slot == current:
+                continue
+            delta = self.cost_at(lesson, slot) - current_cost
+            candidate = (delta, self.rng.random(), slot, None)
+            if best is None or candidate < best:
+                best = candidate
+
+            # Swapping keeps fully booked sections consistent
+            for other in list(self.by_section_slot.get((section, slot), ())):
+                if current not in problem.teachers[problem.lessons[other][2]]['slots']:
+                    continue
+                self.remove(other)
+                other_before = self.cost_at(other, slot)
+                other_after = self.cost_at(other, current)
+                self.place(other, current)
+                lesson_after = self.cost_at(lesson, slot)
+                self.remove(other)
+                self.place(other, slot)
+                delta = lesson_after + other_after - current_cost - other_before
+                candidate = (delta, self.rng.random(), slot, other)
+                if candidate < best:
+                    best = candidate
+
+        self.place(lesson, current)
+        if best is None:
+            return None
+        return best[0], best[2], best[3]
+
+    def apply(self, lesson, slot, swap):
+        current = self.slots[lesson]
+        self.remove(lesson)
+        if swap is not None:
+            self.remove(swap)
+            self.place(swap, current)
+        self.place(lesson, slot)
+
+    def pick_lesson(self, hard):
+        """A conflicted lesson while hard conflicts remain, otherwise a random one"""
+        lesson_count = len(self.problem.lessons)
+        if hard:
+            for _ in range(30):
+                lesson = self.rng.randrange(lesson_count)
+                if self.lesson_cost(lesson) >= HARD_WEIGHT:
+                    return lesson
+            conflicted = [lesson for lesson in range(lesson_count) if self.lesson_cost(lesson) >= HARD_WEIGHT]
+            if conflicted:
+                return self.rng.choice(conflicted)
+        return self.rng.randrange(lesson_count)
+
+
+# Set in each pool worker so a finished solve() can call off running searches
+_stop_event = None
+
+
+def _init_worker(stop_event):
+    global _stop_event
+    _stop_event = stop_event
+
+
+def _pool_search(problem, seed, max_steps, deadline):
+    return local_search(problem, seed, max_steps, deadline, stop_event=_stop_event)
+
+
+def local_search(problem, seed, max_steps=200000, deadline=None, noise=0.05, stop_event=None):
+    """
+    One seeded search. Returns (hard, soft, slots): the remaining conflict
+    pair counts and the slot of every lesson in `problem.lessons`. Gives up
+    early, keeping its best placement so far, once `deadline` passes or
+    `stop_event` is set.
+    """
+    rng = random.Random(seed)
+    search = _Search(problem, rng)
+    search.initial_placement()
+    hard, soft = search.total_cost()
+    cost = hard * HARD_WEIGHT + soft * SOFT_WEIGHT
+    best_cost, best_slots = cost, list(search.slots)
+    target = problem.soft_floor * SOFT_WEIGHT
+
+    for step in range(max_steps):
+        if cost <= target:
+            break
+        if step % 200 == 0 and (
+            (deadline is not None and time.monotonic() > deadline)
+            or (stop_event is not None and stop_event.is_set())
+        ):
+            break
+
+        lesson = search.pick_lesson(cost >= HARD_WEIGHT)
+        move = search.best_move(lesson)
+        if move is None:
+            continue
+        delta, slot, swap = move
+        # Sideways moves walk plateaus; uphill moves only as occasional noise
+        if delta > 0 and rng.random() > noise:
+            continue
+        search.apply(lesson, slot, swap)
+        cost += delta
+        if cost < best_cost:
+            best_cost, best_slots = cost, list(search.slots)
+
+    for lesson in range(len(problem.lessons)):
+        search.remove(lesson)
+    for lesson, slot in enumerate(best_slots):
+        search.place(lesson, slot)
+    hard, soft = search.total_cost()
+    return hard, soft, best_slots
+
+
+def solve(problem, restarts=8, workers=None, time_limit=60, max_steps=200000, seed=0):
+    """
+    Run `restarts` seeded searches across a process pool (in-process when
+    `workers` is 1) and return the best (hard, soft, slots); stops as soon
+    as a search finds a conflict-free timetable with subjects spread as
+    evenly as possible.
+    """
+    deadline = time.monotonic() + time_limit
+    seeds = [seed + index for index in range(restarts)]
+
+    if workers == 1:
+        best = None
+        for run_seed in seeds:
+            result = local_search(problem, run_seed, max_steps, deadline)
+            if best is None or result[:2] < best[:2]:
+                best = result
+            if problem.is_optimal(*best[:2]) or time.monotonic() > deadline:
+                break
+        return best
+
+    best = None
+    stop_event = multiprocessing.Event()
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(stop_event,))
+    try:
+        pending = {executor.submit(_pool_search, problem, run_seed, max_steps, deadline) for run_seed in seeds}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                if best is None or result[:2] < best[:2]:
+                    best = result
+            if problem.is_optimal(*best[:2]):
+                break
+    finally:
+        # Searches still running return within a few hundred steps
+        stop_event.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+    return best
+
+
+def timetable_rows(problem, slots):
+    """Weekly timetable as dicts sorted by section, day and period"""
+    period_count = len(problem.periods)
+    rows = []
+    for lesson, slot in enumerate(slots):
+        section, subject, teacher = problem.lessons[lesson]
+        course, batch, _ = problem.sections[section]
+        period = slot % period_count
+        rows.append({
+            'course': course,
+            'batch': batch,
+            'subject': subject,
+            'faculty_id': teacher,
+            'weekday': problem.days[slot // period_count],
+            'period': period,
+            'start_time': problem.periods[period][0],
+            'end_time': problem.periods[period][1],
+        })
+    rows.sort(key=lambda row: (row['course'], row['batch'], row['weekday'], row['period']))
+    return rows
+
+
+def iter_term_dates(term_start, term_end, holidays=()):
+    """Dates of a term, skipping holidays"""
+    holidays = set(holidays)
+    day = term_start
+    while day <= term_end:
+        if day not in holidays:
+            yield day
+        day += timedelta(days=1)
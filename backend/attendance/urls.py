@@ -5,7 +5,11 @@ from . import views
 router = DefaultRouter()
 router.register(r'sessions', views.ClassSessionViewSet)
 router.register(r'records', views.AttendanceRecordViewSet)
+router.register(r'summaries', views.AttendanceMonthlySummaryViewSet)
+router.register(r'recurrences', views.SessionRecurrenceViewSet)
+router.register(r'holidays', views.SchoolHolidayViewSet)
 
 urlpatterns = [
+    path('sync/', views.AttendanceSyncAPIView.as_view(), name='attendance-sync'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
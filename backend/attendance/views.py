@@ -1,11 +1,40 @@
+import json
+import zlib
+
 from django.shortcuts import render
-from rest_framework import viewsets, status, filters
+from rest_framework import viewsets, status, filters, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from django.db import transaction
 from django.db.models import Q
-from .models import ClassSession, AttendanceRecord
-from .serializers import ClassSessionSerializer, AttendanceRecordSerializer
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_date
+from django.utils.decorators import method_decorator
+from django.views.decorators.gzip import gzip_page
+from users.models import StaffProfile
+from utils.db import lock_rows
+from .models import ClassSession, AttendanceRecord, AttendanceMonthlySummary, SchoolHoliday, SessionRecurrence
+from .serializers import (
+    ClassSessionSerializer,
+    AttendanceRecordSerializer,
+    AttendanceMarkSerializer,
+    AttendanceMonthlySummarySerializer,
+    SyncPushSerializer,
+    TimetableValidationSerializer,
+    SchoolHolidaySerializer,
+    SessionRecurrenceSerializer
+)
+from .marking_service import mark_session_attendance
+from .rollup_service import parse_month
+from .archive_service import SessionArchivedError, ensure_not_archived, get_session_records
+from .register_service import build_register, iter_register_csv, register_to_json
+from .sync_service import SyncScope, pull_changes, push_marks
+from .scheduling_service import validate_week, week_bounds
+from .recurrence_service import (
+    apply_holiday_change, materialize_sessions, materialize_upcoming, reset_future_sessions
+)
 
 
 class ClassSessionViewSet(viewsets.ModelViewSet):
@@ -36,6 +65,157 @@ class ClassSessionViewSet(viewsets.ModelViewSet):
         
         return queryset.order_by('-date', '-start_time')
 
+    @action(detail=False, methods=['get'])
+    def register(self, request):
+        """
+        Monthly register for a class: students x days with totals.
+
+        Query params: course, batch, month (YYYY-MM), optional subject and
+        school (superusers only), and export=csv for a streamed CSV download.
+        """
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can view attendance registers'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        course = params.get('course')
+        batch = params.get('batch')
+        month = parse_month(params.get('month'))
+        if not course or not batch or month is None:
+            return Response(
+                {'error': 'course, batch and month (YYYY-MM) are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        school_id = request.user.school_id
+        if request.user.is_superuser and params.get('school'):
+            school_id = params.get('school')
+        if not school_id:
+            return Response({'error': 'school is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        register = build_register(school_id, course, batch, month, subject=params.get('subject'))
+
+        if params.get('export') == 'csv':
+            response = StreamingHttpResponse(iter_register_csv(register), content_type='text/csv')
+            filename = f"register_{course}_{batch}_{month:%Y-%m}.csv".replace(' ', '_')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        return Response(register_to_json(register))
+
+    @action(detail=True, methods=['get'])
+    def attendance(self, request, pk=None):
+        """Attendance of a session, read from the live table or the closed-term archive"""
+        session = self.get_object()
+        records = get_session_records(session)
+        return Response({
+            'session_id': session.id,
+            'archived': hasattr(session, 'attendance_archive'),
+            'records': [
+                {
+                    'student_id': record.student_id,
+                    'status': record.status,
+                    'remarks': record.remarks,
+                    'marked_by': record.marked_by_id,
+                    'marked_at': record.marked_at
+                } for record in records
+            ]
+        })
+
+    @action(detail=False, methods=['get', 'post'])
+    def validate_timetable(self, request):
+        """
+        Check a school's week for double-booked faculty, classes and rooms.
+
+        GET ?week=YYYY-MM-DD checks the stored sessions of that week; POST
+        {"week_start", "sessions": [...]} also checks proposed sessions
+        against them. Every conflict is returned, not just the first.
+        """
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can validate timetables'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        school_id = request.user.school_id
+        if request.user.is_superuser and request.query_params.get('school', '').isdigit():
+            school_id = int(request.query_params['school'])
+        if not school_id:
+            return Response({'error': 'school is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if request.method == 'GET':
+            data = {'week_start': request.query_params.get('week')}
+        else:
+            data = request.data
+        serializer = TimetableValidationSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        week_start, week_end = week_bounds(serializer.validated_data['week_start'])
+        proposed = serializer.validated_data['sessions']
+        outside = [index for index, session in enumerate(proposed) if not week_start <= session['date'] <= week_end]
+        if outside:
+            return Response(
+                {'error': f'Proposed sessions {outside} are outside the week {week_start} to {week_end}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = validate_week(school_id, week_start, proposed)
+        return Response({**report, 'valid': not report['conflicts']})
+
+    @action(detail=True, methods=['post'])
+    def mark(self, request, pk=None):
+        """Mark attendance for the whole roster of a session in one request"""
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can mark attendance'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        session = self.get_object()
+
+        staff_profile = getattr(request.user, 'staff_profile', None)
+        if not request.user.is_superuser:
+            if request.user.school_id != session.school_id:
+                return Response(
+                    {'error': 'You can only mark attendance for your own school'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+            if request.user.role == 'faculty' and (not staff_profile or staff_profile.id != session.faculty_id):
+                return Response(
+                    {'error': 'You can only mark attendance for your own sessions'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+
+        serializer = AttendanceMarkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        session_id = serializer.validated_data.get('session_id')
+        if session_id is not None and session_id != session.id:
+            return Response(
+                {'error': 'session_id does not match the session being marked'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Staff without a profile (e.g. school admins) mark on behalf of the session's faculty
+        marked_by = staff_profile or session.faculty
+
+        try:
+            outcomes, summary = mark_session_attendance(
+                session,
+                serializer.validated_data['attendance_data'],
+                marked_by
+            )
+        except SessionArchivedError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'session_id': session.id,
+            'summary': summary,
+            'results': outcomes
+        })
+
 
 class AttendanceRecordViewSet(viewsets.ModelViewSet):
     """ViewSet for attendance records"""
@@ -68,6 +248,24 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         
         return queryset.select_related('student__user', 'session').order_by('-session__date', '-session__start_time')
 
+    def save_unarchived(self, serializer):
+        """Save under the session lock, re-checking that no archive was written since validation"""
+        sessions = {serializer.validated_data.get('session'), getattr(serializer.instance, 'session', None)} - {None}
+        session_ids = [session.id for session in sessions]
+        with transaction.atomic():
+            lock_rows(ClassSession.objects.filter(id__in=session_ids))
+            try:
+                ensure_not_archived(session_ids)
+            except SessionArchivedError as error:
+                raise serializers.ValidationError(str(error))
+            serializer.save()
+
+    def perform_create(self, serializer):
+        self.save_unarchived(serializer)
+
+    def perform_update(self, serializer):
+        self.save_unarchived(serializer)
+
     @action(detail=False, methods=['get'])
     def records(self, request):
         """Get attendance records with filtering"""
@@ -96,3 +294,272 @@ class AttendanceRecordViewSet(viewsets.ModelViewSet):
         
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+
+class AttendanceMonthlySummaryViewSet(viewsets.ReadOnlyModelViewSet):
+    """Monthly attendance rollups, so clients never page through raw records for totals"""
+    queryset = AttendanceMonthlySummary.objects.all()
+    serializer_class = AttendanceMonthlySummarySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        # Filter by user role
+        if user.role == 'student':
+            student_profile = getattr(user, 'student_profile', None)
+            queryset = queryset.filter(student=student_profile) if student_profile else queryset.none()
+        elif user.role == 'parent':
+            parent_profile = getattr(user, 'parent_profile', None)
+            if parent_profile:
+                children_ids = parent_profile.children.values_list('id', flat=True)
+                queryset = queryset.filter(student__id__in=children_ids)
+            else:
+                queryset = queryset.none()
+        elif not user.is_superuser and user.school_id:
+            queryset = queryset.filter(student__school_id=user.school_id)
+
+        # Additional filters: ?student=<id>&month_from=YYYY-MM&month_to=YYYY-MM
+        student_id = self.request.query_params.get('student')
+        month_from = parse_month(self.request.query_params.get('month_from'))
+        month_to = parse_month(self.request.query_params.get('month_to'))
+        if student_id and student_id.isdigit():
+            queryset = queryset.filter(student_id=student_id)
+        if month_from:
+            queryset = queryset.filter(month__gte=month_from)
+        if month_to:
+            queryset = queryset.filter(month__lte=month_to)
+
+        return queryset.order_by('student_id', '-month')
+
+
+@method_decorator(gzip_page, name='dispatch')
+class AttendanceSyncAPIView(APIView):
+    """
+    Delta sync for offline devices.
+
+    GET ?since=<cursor>&limit=<n> returns sessions, attendance records and
+    students changed since the cursor; POST applies a batch of offline marks.
+    Responses are gzip-compressed when the client accepts it, and POST bodies
+    may be sent with `Content-Encoding: gzip`.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_PULL_LIMIT = 2000
+    MAX_BODY_BYTES = 10 * 1024 * 1024
+
+    def get_scope(self, request):
+        """Return (scope, error_response)"""
+        user = request.user
+        if user.role in ('student', 'parent'):
+            return None, Response({'error': 'Only staff can sync attendance'}, status=status.HTTP_403_FORBIDDEN)
+
+        school_id = user.school_id
+        if user.is_superuser and request.query_params.get('school', '').isdigit():
+            school_id = int(request.query_params['school'])
+        if not school_id:
+            return None, Response({'error': 'school is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if user.role == 'faculty' and not user.is_superuser:
+            staff_profile = getattr(user, 'staff_profile', None)
+            if staff_profile is None:
+                return None, Response({'error': 'Staff profile not found'}, status=status.HTTP_403_FORBIDDEN)
+            return SyncScope(school_id, faculty_id=staff_profile.id), None
+        return SyncScope(school_id), None
+
+    def get(self, request):
+        scope, error = self.get_scope(request)
+        if error:
+            return error
+
+        limit = request.query_params.get('limit', '500')
+        if not limit.isdigit() or not 0 < int(limit) <= self.MAX_PULL_LIMIT:
+            return Response(
+                {'error': f'limit must be between 1 and {self.MAX_PULL_LIMIT}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            payload = pull_changes(scope, request.query_params.get('since'), int(limit))
+        except ValueError:
+            return Response({'error': 'Invalid sync cursor'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(payload)
+
+    def read_payload(self, request):
+        """Request data, decompressing gzip-encoded bodies"""
+        if request.META.get('HTTP_CONTENT_ENCODING', '').lower() != 'gzip':
+            return request.data
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = decompressor.decompress(request.body, self.MAX_BODY_BYTES)
+        if decompressor.unconsumed_tail:
+            raise ValueError('Decompressed body is too large')
+        return json.loads(body)
+
+    def post(self, request):
+        scope, error = self.get_scope(request)
+        if error:
+            return error
+
+        try:
+            data = self.read_payload(request)
+        except (ValueError, zlib.error):
+            return Response({'error': 'Invalid gzip or JSON body'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = SyncPushSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+
+        staff_profile = getattr(request.user, 'staff_profile', None)
+        result = push_marks(
+            scope,
+            serializer.validated_data['marks'],
+            marked_by_id=staff_profile.id if staff_profile else None
+        )
+        return Response(result)
+
+
+class SchoolScopedStaffMixin:
+    """Read access for the user's school, writes for its staff only"""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        if user.is_superuser:
+            return queryset
+        if user.role in ('student', 'parent') or not user.school_id:
+            return queryset.none()
+        return queryset.filter(school_id=user.school_id)
+
+    def staff_error(self, request):
+        if request.user.role in ('student', 'parent'):
+            return Response({'error': 'Only staff can manage timetables'}, status=status.HTTP_403_FORBIDDEN)
+        if not request.user.school_id:
+            return Response({'error': 'User is not assigned to a school'}, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def create(self, request, *args, **kwargs):
+        error = self.staff_error(request)
+        if error:
+            return error
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        instance = serializer.save(school_id=request.user.school_id)
+        self.after_create(instance)
+        return Response(self.get_serializer(instance).data, status=status.HTTP_201_CREATED)
+
+    def after_create(self, instance):
+        pass
+
+
+class SessionRecurrenceViewSet(SchoolScopedStaffMixin, viewsets.ModelViewSet):
+    """
+    Weekly class patterns of a term. Their sessions are created for the next
+    SESSION_MATERIALIZE_DAYS days when a pattern is saved and nightly after
+    that, or for the whole term with the `materialize` action.
+    """
+    queryset = SessionRecurrence.objects.select_related('faculty__user')
+    serializer_class = SessionRecurrenceSerializer
+    permission_classes = [IsAuthenticated]
+
+    def faculty_error(self, request):
+        faculty_id = request.data.get('faculty')
+        if faculty_id and not request.user.is_superuser and not StaffProfile.objects.filter(
+            id=faculty_id, user__school_id=request.user.school_id
+        ).exists():
+            return Response({'error': 'Faculty does not belong to your school'}, status=status.HTTP_400_BAD_REQUEST)
+        return None
+
+    def create(self, request, *args, **kwargs):
+        error = self.faculty_error(request)
+        if error:
+            return error
+        response = super().create(request, *args, **kwargs)
+        if response.status_code == status.HTTP_201_CREATED:
+            # Occurrences skipped because they would double-book someone
+            response.data['clashes'] = self.materialize_report['clashes']
+        return response
+
+    def after_create(self, recurrence):
+        self.materialize_report = materialize_upcoming(recurrence)
+
+    def update(self, request, *args, **kwargs):
+        error = self.staff_error(request) or self.faculty_error(request)
+        if error:
+            return error
+        response = super().update(request, *args, **kwargs)
+        # Future sessions follow the new pattern; marked ones are kept
+        recurrence = self.get_object()
+        reset_future_sessions(recurrence)
+        response.data['clashes'] = materialize_upcoming(recurrence)['clashes']
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        error = self.staff_error(request)
+        if error:
+            return error
+        reset_future_sessions(self.get_object())
+        return super().destroy(request, *args, **kwargs)
+
+    @action(detail=True, methods=['post'])
+    def materialize(self, request, pk=None):
+        """Create the sessions of the whole term (or up to ?until=YYYY-MM-DD) in bulk"""
+        error = self.staff_error(request)
+        if error:
+            return error
+        recurrence = self.get_object()
+        until = recurrence.term_end
+        if request.query_params.get('until'):
+            try:
+                until = parse_date(request.query_params['until'])
+            except ValueError:
+                until = None
+            if until is None:
+                return Response({'error': 'until must be YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        report = materialize_sessions([recurrence], until)
+        recurrence.refresh_from_db()
+        return Response({
+            'recurrence_id': recurrence.id,
+            'sessions_generated': report['generated'],
+            'clashes': report['clashes'],
+            'materialized_until': recurrence.materialized_until
+        })
+
+
+class SchoolHolidayViewSet(SchoolScopedStaffMixin, viewsets.ModelViewSet):
+    """School holidays; recurring sessions are not created on them"""
+    queryset = SchoolHoliday.objects.all()
+    serializer_class = SchoolHolidaySerializer
+    permission_classes = [IsAuthenticated]
+
+    def create(self, request, *args, **kwargs):
+        if request.user.school_id and SchoolHoliday.objects.filter(
+            school_id=request.user.school_id, date=request.data.get('date')
+        ).exists():
+            return Response({'error': 'A holiday already exists on this date'}, status=status.HTTP_400_BAD_REQUEST)
+        return super().create(request, *args, **kwargs)
+
+    def after_create(self, holiday):
+        # Drop unmarked recurring sessions already created for the day
+        apply_holiday_change(holiday.school_id, added=holiday.date)
+
+    def update(self, request, *args, **kwargs):
+        error = self.staff_error(request)
+        if error:
+            return error
+        previous = self.get_object().date
+        response = super().update(request, *args, **kwargs)
+        holiday = self.get_object()
+        if holiday.date != previous:
+            # Sessions move off the new date and back onto the old one
+            response.data['clashes'] = apply_holiday_change(
+                holiday.school_id, added=holiday.date, removed=previous
+            )['clashes']
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        error = self.staff_error(request)
+        if error:
+            return error
+        holiday = self.get_object()
+        response = super().destroy(request, *args, **kwargs)
+        apply_holiday_change(holiday.school_id, removed=holiday.date)
+        return response
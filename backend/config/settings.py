@@ -150,6 +150,17 @@ DATABASES = {
 }
 
 
+# Cache shared by all workers, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+# and CACHE_LOCATION=redis://127.0.0.1:6379/1. Required in production: fee snapshot
+# invalidations reach other workers only through it (checked by `check --deploy`)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -198,6 +209,16 @@ AUTH_USER_MODEL = 'users.User'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Protected document delivery: 'python' (stream from Django with Range support),
+# 'nginx' (X-Accel-Redirect) or 'sendfile' (X-Sendfile for Apache/Lighttpd)
+PROTECTED_MEDIA_BACKEND = os.getenv('PROTECTED_MEDIA_BACKEND', 'python')
+PROTECTED_MEDIA_INTERNAL_URL = os.getenv('PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+
+# Chunked admission document uploads
+ADMISSION_UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB default chunk
+ADMISSION_UPLOAD_MAX_CHUNK_SIZE = 5 * 1024 * 1024
+ADMISSION_UPLOAD_MAX_FILE_SIZE = 25 * 1024 * 1024
+
 # Email Configuration
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
@@ -209,3 +230,41 @@ DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'admissions@acharya.edu')
 
 # Frontend URL for email links
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:8080')
+
+# Housekeeping retention (days past expiry before rows are purged by `manage.py housekeeping`)
+HOUSEKEEPING_RETENTION_DAYS = {
+    'email_verifications': int(os.getenv('HOUSEKEEPING_EMAIL_VERIFICATION_DAYS', '7')),
+    'document_upload_sessions': int(os.getenv('HOUSEKEEPING_UPLOAD_SESSION_DAYS', '1')),
+    'orphan_document_blobs': int(os.getenv('HOUSEKEEPING_ORPHAN_BLOB_DAYS', '7')),
+    'blacklisted_tokens': int(os.getenv('HOUSEKEEPING_BLACKLISTED_TOKEN_DAYS', '1')),
+    'outstanding_tokens': int(os.getenv('HOUSEKEEPING_OUTSTANDING_TOKEN_DAYS', '1')),
+    'sync_tombstones': int(os.getenv('HOUSEKEEPING_SYNC_TOMBSTONE_DAYS', '90')),
+}
+
+# Seconds a worker may serve fee quotes from its in-process fee snapshot before
+# re-reading the fee tables (changes made through the ORM invalidate it immediately
+# in every worker sharing CACHES; raw SQL changes only through this)
+FEE_SNAPSHOT_MAX_AGE = int(os.getenv('FEE_SNAPSHOT_MAX_AGE', '300'))
+
+# Lowest percentage of each exam grade, as "grade:percentage" pairs (grades must be ExamResult grades)
+EXAM_GRADE_BOUNDARIES = [
+    (float(percentage), grade)
+    for grade, percentage in (
+        pair.split(':') for pair in os.getenv(
+            'EXAM_GRADE_BOUNDARIES', 'F:0,D:33,C-:40,C:45,C+:50,B-:55,B:60,B+:65,A-:70,A:80,A+:90'
+        ).split(',')
+    )
+]
+
+# Library fine per overdue day and grace period for schools without their own fine policy
+LIBRARY_FINE_DAILY_RATE = os.getenv('LIBRARY_FINE_DAILY_RATE', '1.00')
+LIBRARY_FINE_GRACE_DAYS = int(os.getenv('LIBRARY_FINE_GRACE_DAYS', '0'))
+
+# Days a returned copy stays set aside for a library hold before passing to the next in the queue
+LIBRARY_HOLD_PICKUP_DAYS = int(os.getenv('LIBRARY_HOLD_PICKUP_DAYS', '3'))
+
+# Minutes without a heartbeat (sent every quarter of this) after which a running report-card job is taken over by another worker
+REPORT_CARD_JOB_STALE_MINUTES = int(os.getenv('REPORT_CARD_JOB_STALE_MINUTES', '10'))
+
+# Days ahead for which class sessions of recurring timetables are created
+SESSION_MATERIALIZE_DAYS = int(os.getenv('SESSION_MATERIALIZE_DAYS', '14'))
@@ -38,6 +38,8 @@ urlpatterns = [
     path('api/v1/library/', include('library.urls')),
     path('api/v1/notifications/', include('notifications.urls')),
     path('api/v1/dashboard/', include('dashboard.urls')),
+    path('api/v1/analytics/', include('analytics.urls')),
+    path('api/v1/reports/', include('reports.urls')),
 ]
 
 # Serve media files in development
@@ -7,7 +7,8 @@ from datetime import datetime, timedelta
 from users.models import StudentProfile, StaffProfile, ParentProfile
 from admissions.models import AdmissionApplication
 from fees.models import FeeInvoice
-from attendance.models import AttendanceRecord
+from attendance.models import AttendanceMonthlySummary
+from attendance.rollup_service import get_attendance_totals, month_start
 from exams.models import Exam, ExamResult
 from hostel.models import HostelAllocation
 from library.models import BookBorrowRecord
@@ -188,18 +189,20 @@ class StudentDashboardAPIView(APIView):
         try:
             student = StudentProfile.objects.get(id=student_id)
             
-            # Attendance summary
+            # Attendance summary (read from the monthly rollup, not raw records)
+            overall = get_attendance_totals([student.id])[student.id]
+            this_month = get_attendance_totals(
+                [student.id], month=month_start(timezone.localdate())
+            )[student.id]
             attendance_data = {
-                'total_present': AttendanceRecord.objects.filter(
-                    student=student, status='present'
-                ).count(),
-                'total_absent': AttendanceRecord.objects.filter(
-                    student=student, status='absent'
-                ).count(),
-                'this_month': AttendanceRecord.objects.filter(
-                    student=student,
-                    date__gte=timezone.now().replace(day=1)
-                ).count()
+                'total_present': overall['present'],
+                'total_absent': overall['absent'],
+                'total_late': overall['late'],
+                'total_excused': overall['excused'],
+                'total_sessions': overall['sessions'],
+                'attendance_percentage': overall['attendance_percentage'],
+                'this_month': this_month['sessions'],
+                'this_month_percentage': this_month['attendance_percentage']
             }
             
             # Fee status
@@ -212,16 +215,17 @@ class StudentDashboardAPIView(APIView):
                 ).aggregate(total=Sum('amount'))['total'] or 0
             }
             
-            # Library books
+            # Library books: open loans only, with the overdue flag and fines
+            # precomputed by the nightly fine run
+            loans = BookBorrowRecord.objects.filter(student=student, status='borrowed').aggregate(
+                borrowed=Count('id'),
+                overdue=Count('id', filter=Q(is_overdue=True)),
+                fines=Sum('fine_amount', filter=Q(is_overdue=True))
+            )
             library_data = {
-                'borrowed_books': BookBorrowRecord.objects.filter(
-                    student=student, status='borrowed'
-                ).count(),
-                'overdue_books': BookBorrowRecord.objects.filter(
-                    student=student, 
-                    status='borrowed',
-                    due_date__lt=timezone.now().date()
-                ).count()
+                'borrowed_books': loans['borrowed'],
+                'overdue_books': loans['overdue'],
+                'overdue_fines': loans['fines'] or 0
             }
             
             # Exam results
@@ -263,13 +267,17 @@ class ParentDashboardAPIView(APIView):
             parent = ParentProfile.objects.get(id=parent_id)
             children = parent.children.all()
             
+            # Monthly attendance rollups for all children in one query
+            child_ids = [child.id for child in children]
+            recent_months = {}
+            for summary in AttendanceMonthlySummary.objects.filter(
+                student_id__in=child_ids,
+                month__gte=month_start(timezone.localdate() - timedelta(days=93))
+            ).order_by('-month'):
+                recent_months.setdefault(summary.student_id, []).append(summary)
+            
             children_data = []
             for child in children:
-                # Get latest attendance
-                recent_attendance = AttendanceRecord.objects.filter(
-                    student=child
-                ).order_by('-date')[:10]
-                
                 # Get pending fees
                 pending_fees = FeeInvoice.objects.filter(
                     student=child, status='pending'
@@ -281,9 +289,14 @@ class ParentDashboardAPIView(APIView):
                     'class': child.current_class,
                     'recent_attendance': [
                         {
-                            'date': record.date,
-                            'status': record.status
-                        } for record in recent_attendance
+                            'month': summary.month.strftime('%Y-%m'),
+                            'present': summary.present,
+                            'absent': summary.absent,
+                            'late': summary.late,
+                            'excused': summary.excused,
+                            'sessions': summary.sessions,
+                            'attendance_percentage': summary.attendance_percentage
+                        } for summary in recent_months.get(child.id, [])
                     ],
                     'pending_fees': pending_fees
                 })
@@ -0,0 +1,159 @@
+"""
+Management command to time ranking of a district-wide common exam.
+
+Creates throwaway schools with one class of students each, a single common
+exam (not tied to a school) written by all of them, and random marks. Times
+the first materialization on finalize, then an incremental re-rank after a
+batch of mark corrections, and the indexed reads the rankings are for.
+The schools and everything created for them are deleted afterwards unless
+--keep is passed.
+"""
+import time
+import uuid
+from datetime import date
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from exams.models import Exam, ExamRanking, ExamResult
+from exams.ranking_service import compute_rankings, finalize_exam, rank_exam
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+
+
+class Command(BaseCommand):
+    help = 'Time ranking materialization and incremental re-ranking of a district-wide exam'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schools', type=int, default=50, help='Schools writing the common exam')
+        parser.add_argument('--students', type=int, default=2000, help='Candidates per school')
+        parser.add_argument('--corrections', type=int, default=25, help='Marks corrected after finalization')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated schools and their data')
+
+    def handle(self, *args, **options):
+        if min(options['schools'], options['students'], options['corrections']) <= 0:
+            raise CommandError('--schools, --students and --corrections must be positive')
+
+        rng = np.random.default_rng(options['seed'])
+        started = time.perf_counter()
+        schools, exam = self.create_fixture(options['schools'], options['students'], rng)
+        candidates = options['schools'] * options['students']
+        self.stdout.write(
+            f"Common exam {exam.id}: {options['schools']} schools x {options['students']} students "
+            f"({candidates} candidates), fixture built in {time.perf_counter() - started:.1f}s\n"
+        )
+        try:
+            self.run(exam, rng, options['corrections'])
+        finally:
+            if not options['keep']:
+                exam.delete()
+                for school in schools:
+                    school.delete()
+
+    def create_fixture(self, school_count, students_per_school, rng):
+        suffix = uuid.uuid4().hex[:8]
+        schools = []
+        for index in range(school_count):
+            school = School.objects.create(
+                district='BENCHMARK',
+                block=f'Block {index % 8}',
+                village='BENCHMARK',
+                school_name=f'Ranking Benchmark School {suffix}-{index}',
+                school_code=f'BR{uuid.uuid4().int % 10 ** 8:08d}',
+                is_active=False
+            )
+            StudentProfile.objects.bulk_create([
+                StudentProfile(
+                    school=school,
+                    admission_number=f'{index:04d}{roll:05d}',
+                    roll_number=str(roll),
+                    course='Class 10',
+                    department='Benchmark',
+                    semester=2,
+                    date_of_birth=date(2010, 1, 1),
+                    address='Benchmark',
+                    emergency_contact='0000000000'
+                )
+                for roll in range(students_per_school)
+            ], batch_size=2000)
+            schools.append(school)
+
+        user = User.objects.create_user(
+            username=f'bench-{suffix}',
+            email=f'bench-{suffix}@benchmark.local',
+            password=uuid.uuid4().hex,
+            role='admin',
+            school=schools[0]
+        )
+        examiner = StaffProfile.objects.create(
+            user=user,
+            employee_id=f'BR{suffix}',
+            department='Benchmark',
+            designation='Examiner',
+            date_of_joining=date.today()
+        )
+        exam = Exam.objects.create(
+            name=f'District Common Exam {suffix}',
+            exam_type='external',
+            course='Class 10',
+            subject='Mathematics',
+            semester=2,
+            date=date.today(),
+            max_marks=100,
+            duration_minutes=180,
+            created_by=examiner
+        )
+
+        student_ids = list(
+            StudentProfile.objects.filter(school__in=schools).order_by('id').values_list('id', flat=True)
+        )
+        # Half marks, so the cohort has many ties
+        marks = np.round(rng.normal(58, 16, len(student_ids)).clip(0, 100) * 2) / 2
+        ExamResult.objects.bulk_create([
+            ExamResult(exam=exam, student_id=student_id, marks_obtained=float(mark), grade='F', entered_by=examiner)
+            for student_id, mark in zip(student_ids, marks.tolist())
+        ], batch_size=2000)
+        return schools, exam
+
+    def run(self, exam, rng, correction_count):
+        marks = np.array(ExamResult.objects.filter(exam=exam).values_list('marks_obtained', flat=True))
+        started = time.perf_counter()
+        rank, _, _ = compute_rankings(marks)
+        computed = time.perf_counter() - started
+
+        report = finalize_exam(exam)
+        self.stdout.write(
+            self.style.SUCCESS('Finalize (full materialization):') +
+            f"\n- Vectorized ranks/percentiles/z-scores: {computed * 1000:.1f}ms for {len(marks)} marks, "
+            f"{int(rank.max())} distinct ranks"
+            f"\n- Rank and store: {report['seconds']:.2f}s ({report['created']} rows created)\n"
+        )
+
+        results = list(ExamResult.objects.filter(exam=exam).order_by('?')[:correction_count])
+        for result in results:
+            # Rounding corrections of a mark or two, saved one by one as a teacher would
+            result.marks_obtained = float(np.clip(result.marks_obtained + rng.choice([-1.0, -0.5, 0.5, 1.0]), 0, 100))
+            result.save(update_fields=['marks_obtained'])
+        exam.refresh_from_db()
+
+        report = rank_exam(exam.id)
+        self.stdout.write(
+            self.style.SUCCESS(f'Incremental re-rank after {len(results)} corrections:') +
+            f"\n- Stale flag set: {exam.rankings_stale}"
+            f"\n- Re-rank: {report['seconds']:.2f}s, {report['updated']} of {report['students']} rows rewritten\n"
+        )
+
+        student_id = results[0].student_id if results else None
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            top = list(ExamRanking.objects.filter(exam=exam).order_by('rank', 'student_id')[:100])
+            card = ExamRanking.objects.filter(exam=exam, student_id=student_id).first()
+            elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS('Indexed reads:') +
+            f"\n- Top 100 and one student's rank: {elapsed * 1000:.1f}ms in {len(queries)} queries "
+            f"(topper rank {top[0].rank if top else '-'}, student percentile {card.percentile if card else '-'})\n"
+        )
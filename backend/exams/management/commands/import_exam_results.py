@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Exam
+from exams.results_service import import_results, read_result_rows
+from users.models import StaffProfile
+
+
+class Command(BaseCommand):
+    help = 'Import the results of an exam from a CSV or XLSX sheet (admission_number, marks_obtained, remarks)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--exam', type=int, required=True, help='Exam ID')
+        parser.add_argument('--file', required=True, help='Path to a .csv or .xlsx file')
+        parser.add_argument('--entered-by', type=int, help='StaffProfile ID recorded as entering the marks (default: exam creator)')
+
+    def handle(self, *args, **options):
+        exam = Exam.objects.filter(id=options['exam']).first()
+        if exam is None:
+            raise CommandError(f"Exam {options['exam']} not found")
+
+        entered_by = exam.created_by
+        if options['entered_by'] is not None:
+            entered_by = StaffProfile.objects.filter(id=options['entered_by']).first()
+            if entered_by is None:
+                raise CommandError(f"Staff profile {options['entered_by']} not found")
+
+        try:
+            with open(options['file'], 'rb') as sheet:
+                rows = read_result_rows(options['file'], sheet.read())
+        except OSError as error:
+            raise CommandError(f'Cannot read file: {error}')
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        result = import_results(exam, rows, entered_by)
+
+        self.stdout.write(f"- Rows read: {len(rows)}")
+        self.stdout.write(f"- Created: {result['created']}")
+        self.stdout.write(f"- Updated: {result['updated']}")
+        for row in result['invalid']:
+            self.stdout.write(self.style.WARNING(f"- Row {row['row']} ({row['admission_number'] or 'no admission number'}): {row['error']}"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nImported {result['created'] + result['updated']} results for {exam.name}, "
+            f"{len(result['invalid'])} invalid rows skipped"
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from exams.models import Exam
+from exams.ranking_service import finalize_exam, rerank_stale_exams
+
+
+class Command(BaseCommand):
+    help = 'Re-rank finalized exams whose results were corrected (run every few minutes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only re-rank exams of this school ID')
+        parser.add_argument('--exam', type=int, help='Finalize (if needed) and re-rank this exam ID now')
+
+    def handle(self, *args, **options):
+        if options['exam'] is not None:
+            exam = Exam.objects.filter(id=options['exam']).first()
+            if exam is None:
+                raise CommandError(f"Exam {options['exam']} not found")
+            reports = {exam.id: finalize_exam(exam)}
+        else:
+            reports = rerank_stale_exams(school_id=options['school'])
+
+        for exam_id, report in reports.items():
+            self.stdout.write(
+                f"- Exam {exam_id}: {report['students']} students, {report['created']} created, "
+                f"{report['updated']} updated, {report['deleted']} deleted in {report['seconds']:.2f}s"
+            )
+        self.stdout.write(self.style.SUCCESS(f'\nRe-ranked {len(reports)} exams'))
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0002_exam_school_exam_exams_exam_school__dddeed_idx_and_more'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exam',
+            name='rankings_stale',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='exam',
+            name='results_finalized_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ExamRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('marks_obtained', models.FloatField()),
+                ('rank', models.PositiveIntegerField(help_text='Dense rank, 1 for the highest marks')),
+                ('percentile', models.FloatField(help_text='Percentage of candidates scoring at or below these marks')),
+                ('z_score', models.FloatField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('exam', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='exams.exam')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exam_rankings', to='users.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['exam', 'rank'], name='exams_examr_exam_id_14cd36_idx'), models.Index(fields=['student', 'exam'], name='exams_examr_student_25e25e_idx')],
+                'unique_together': {('exam', 'student')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.6 on 2026-10-19 05:21
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def flag_finalized_exams(apps, schema_editor):
+    # The next rank_exams run re-ranks them, which also builds their classes' rankings
+    Exam = apps.get_model('exams', 'Exam')
+    Exam.objects.filter(results_finalized_at__isnull=False).update(rankings_stale=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('exams', '0003_exam_rankings_stale_exam_results_finalized_at_and_more'),
+        ('schools', '0001_initial'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(max_length=100)),
+                ('semester', models.IntegerField()),
+                ('total_marks', models.FloatField()),
+                ('max_marks', models.FloatField(help_text="Combined max marks of the class's finalized exams")),
+                ('percentage', models.FloatField()),
+                ('exams_taken', models.PositiveIntegerField()),
+                ('rank', models.PositiveIntegerField(help_text='Dense rank, 1 for the highest total')),
+                ('percentile', models.FloatField(help_text='Percentage of the class scoring at or below this total')),
+                ('z_score', models.FloatField()),
+                ('computed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('school', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='schools.school')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_rankings', to='users.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'course', 'semester', 'rank'], name='exams_class_school__2cc792_idx'), models.Index(fields=['student', 'semester'], name='exams_class_student_5152b1_idx')],
+                'unique_together': {('school', 'course', 'semester', 'student')},
+            },
+        ),
+        migrations.RunPython(flag_finalized_exams, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,5 @@
 from django.db import models
-
-from django.db import models
+from django.utils import timezone
 
 class Exam(models.Model):
     """Model for exams"""
@@ -23,6 +22,10 @@ class Exam(models.Model):
     duration_minutes = models.IntegerField()
     created_by = models.ForeignKey('users.StaffProfile', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Rankings are materialized once results are finalized; corrections made
+    # afterwards mark them stale until the next re-rank
+    results_finalized_at = models.DateTimeField(null=True, blank=True)
+    rankings_stale = models.BooleanField(default=False)
     
     class Meta:
         indexes = [
@@ -68,3 +71,55 @@ class ExamResult(models.Model):
     
     def __str__(self):
         return f"{self.student.user.full_name} - {self.exam.name} ({self.marks_obtained}/{self.exam.max_marks}) [{self.exam.school.school_name}]"
+
+
+class ExamRanking(models.Model):
+    """Materialized rank, percentile and z-score of a student's result in a finalized exam"""
+    
+    exam = models.ForeignKey(Exam, on_delete=models.CASCADE, related_name='rankings')
+    student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE, related_name='exam_rankings')
+    marks_obtained = models.FloatField()
+    rank = models.PositiveIntegerField(help_text="Dense rank, 1 for the highest marks")
+    percentile = models.FloatField(help_text="Percentage of candidates scoring at or below these marks")
+    z_score = models.FloatField()
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ['exam', 'student']
+        indexes = [
+            models.Index(fields=['exam', 'rank']),
+            models.Index(fields=['student', 'exam']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - {self.exam.name}: rank {self.rank}"
+
+
+class ClassRanking(models.Model):
+    """
+    Materialized cumulative rank of a student over every finalized exam of a
+    class (school, course, semester); an exam the student missed counts as zero
+    """
+    
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, null=True, blank=True, related_name='class_rankings')
+    course = models.CharField(max_length=100)
+    semester = models.IntegerField()
+    student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE, related_name='class_rankings')
+    total_marks = models.FloatField()
+    max_marks = models.FloatField(help_text="Combined max marks of the class's finalized exams")
+    percentage = models.FloatField()
+    exams_taken = models.PositiveIntegerField()
+    rank = models.PositiveIntegerField(help_text="Dense rank, 1 for the highest total")
+    percentile = models.FloatField(help_text="Percentage of the class scoring at or below this total")
+    z_score = models.FloatField()
+    computed_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        unique_together = ['school', 'course', 'semester', 'student']
+        indexes = [
+            models.Index(fields=['school', 'course', 'semester', 'rank']),
+            models.Index(fields=['student', 'semester']),
+        ]
+    
+    def __str__(self):
+        return f"{self.student} - {self.course} semester {self.semester}: rank {self.rank}"
@@ -0,0 +1,260 @@
+"""
+Materialized exam rankings.
+
+When an exam's results are finalized its marks are loaded into NumPy once and
+dense ranks, percentiles and z-scores are computed for the whole cohort in a
+few vectorized passes, then stored as `ExamRanking` rows so rank lists,
+student cards and subject toppers are plain indexed reads.
+
+Corrections made after finalization only flag the exam as stale (signals and
+the bulk import call `mark_rankings_stale`). Re-ranking recomputes the arrays,
+diffs them against the stored rows and writes only the rows that changed, one
+UPDATE per distinct mark, so fixing a few marks in a district-wide exam does
+not rewrite the cohort.
+
+Each (re-)rank of an exam also re-ranks its class (school, course, semester)
+on the cumulative total over all of the class's finalized exams, stored as
+`ClassRanking` rows. A class is a few hundred students at most, so its rows
+are simply rewritten.
+"""
+import time
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from utils.db import lock_rows, retry_if_locked
+from .models import ClassRanking, Exam, ExamRanking, ExamResult
+
+# Stored precision; rounding also keeps tiny mean/std shifts from a single
+# correction from rewriting every z-score
+PERCENTILE_DECIMALS = 2
+Z_SCORE_DECIMALS = 3
+UPDATE_BATCH_SIZE = 500
+
+
+def compute_rankings(marks):
+    """
+    Dense ranks (1 = highest), percentiles and z-scores of an array of marks.
+
+    The percentile is the percentage of candidates scoring at or below the
+    mark, so toppers are at 100. Returns (rank, percentile, z_score) arrays.
+    """
+    marks = np.asarray(marks, dtype=np.float64)
+    if not marks.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    distinct, inverse = np.unique(marks, return_inverse=True)
+    rank = distinct.size - inverse
+
+    at_or_below = np.searchsorted(np.sort(marks), marks, side='right')
+    percentile = np.round(at_or_below * 100 / marks.size, PERCENTILE_DECIMALS)
+
+    deviation = marks.std()
+    if deviation > 0:
+        z_score = np.round((marks - marks.mean()) / deviation, Z_SCORE_DECIMALS)
+    else:
+        z_score = np.zeros(marks.size)
+    return rank, percentile, z_score
+
+
+def mark_rankings_stale(exam_ids):
+    """Flag finalized exams whose results changed for re-ranking"""
+    return Exam.objects.filter(
+        id__in=exam_ids, results_finalized_at__isnull=False, rankings_stale=False
+    ).update(rankings_stale=True)
+
+
+@retry_if_locked
+def rank_exam(exam_id):
+    """
+    Compute and store the rankings of one exam, writing only what changed.
+
+    Returns a dict with the number of students ranked, rows created, updated
+    and deleted, and the seconds spent.
+    """
+    started = time.perf_counter()
+    with transaction.atomic():
+        # Serializes re-ranks of the same exam; a correction committed while
+        # this runs flags the exam again once the lock is released
+        lock_rows(Exam.objects.filter(id=exam_id))
+
+        results = np.array(
+            ExamResult.objects.filter(exam_id=exam_id).order_by('student_id').values_list('student_id', 'marks_obtained'),
+            dtype=np.float64
+        ).reshape(-1, 2)
+        student_ids = results[:, 0].astype(np.int64)
+        marks = results[:, 1]
+        rank, percentile, z_score = compute_rankings(marks)
+
+        stored = np.array(
+            ExamRanking.objects.filter(exam_id=exam_id).order_by('student_id').values_list(
+                'id', 'student_id', 'marks_obtained', 'rank', 'percentile', 'z_score'
+            ),
+            dtype=np.float64
+        ).reshape(-1, 6)
+        stored_ids = stored[:, 0].astype(np.int64)
+        stored_students = stored[:, 1].astype(np.int64)
+
+        # Align stored rows with results by student id (both sorted)
+        if len(stored_students):
+            positions = np.minimum(np.searchsorted(stored_students, student_ids), len(stored_students) - 1)
+            found = stored_students[positions] == student_ids
+            previous = stored[positions]
+            changed = found & (
+                (previous[:, 2] != marks) | (previous[:, 3] != rank) |
+                (previous[:, 4] != percentile) | (previous[:, 5] != z_score)
+            )
+        else:
+            positions = np.zeros(len(student_ids), dtype=np.int64)
+            found = changed = np.zeros(len(student_ids), dtype=bool)
+        removed = ~np.isin(stored_students, student_ids)
+
+        now = timezone.now()
+
+        def ranking(index):
+            return ExamRanking(
+                exam_id=exam_id,
+                student_id=int(student_ids[index]),
+                marks_obtained=float(marks[index]),
+                rank=int(rank[index]),
+                percentile=float(percentile[index]),
+                z_score=float(z_score[index]),
+                computed_at=now
+            )
+
+        created = np.flatnonzero(~found)
+        updated = np.flatnonzero(changed)
+        deleted = stored_ids[removed]
+
+        if len(updated) > len(student_ids) // 2:
+            # Most rows moved (e.g. a re-import): rewriting the exam beats patching it
+            ExamRanking.objects.filter(exam_id=exam_id).delete()
+            ExamRanking.objects.bulk_create(
+                [ranking(index) for index in range(len(student_ids))], batch_size=2000
+            )
+        else:
+            if len(deleted):
+                ExamRanking.objects.filter(id__in=deleted.tolist()).delete()
+            if len(created):
+                ExamRanking.objects.bulk_create([ranking(index) for index in created.tolist()], batch_size=2000)
+            # Students with equal marks share rank, percentile and z-score, so
+            # changed rows collapse into one UPDATE per distinct mark
+            groups = defaultdict(list)
+            for index in updated.tolist():
+                values = (float(marks[index]), int(rank[index]), float(percentile[index]), float(z_score[index]))
+                groups[values].append(int(stored_ids[positions[index]]))
+            for (mark, mark_rank, mark_percentile, mark_z_score), ids in groups.items():
+                for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+                    ExamRanking.objects.filter(id__in=ids[start:start + UPDATE_BATCH_SIZE]).update(
+                        marks_obtained=mark, rank=mark_rank, percentile=mark_percentile,
+                        z_score=mark_z_score, computed_at=now
+                    )
+
+        Exam.objects.filter(id=exam_id).update(rankings_stale=False)
+
+    return {
+        'students': len(student_ids),
+        'created': len(created),
+        'updated': len(updated),
+        'deleted': len(deleted),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+@retry_if_locked
+def rank_class(school_id, course, semester):
+    """
+    Compute and store the cumulative rankings of one class over its
+    finalized exams, replacing the previous ones.
+
+    Returns a dict with the number of students and exams ranked and the
+    seconds spent.
+    """
+    started = time.perf_counter()
+    exams = Exam.objects.filter(
+        school_id=school_id, course=course, semester=semester, results_finalized_at__isnull=False
+    )
+    with transaction.atomic():
+        # Serializes re-ranks of the class with those of its exams
+        lock_rows(exams)
+        exam_rows = list(exams.values_list('id', 'max_marks'))
+        max_marks = float(sum(exam_max for _, exam_max in exam_rows))
+
+        totals = list(
+            ExamResult.objects.filter(exam_id__in=[exam_id for exam_id, _ in exam_rows])
+            .values('student_id').annotate(total=Sum('marks_obtained'), taken=Count('id'))
+            .order_by('student_id').values_list('student_id', 'total', 'taken')
+        )
+        marks = np.array([total for _, total, _ in totals], dtype=np.float64)
+        rank, percentile, z_score = compute_rankings(marks)
+        percentage = np.round(marks * 100 / max_marks, 2) if max_marks else np.zeros(len(totals))
+
+        now = timezone.now()
+        ClassRanking.objects.filter(school_id=school_id, course=course, semester=semester).delete()
+        ClassRanking.objects.bulk_create(
+            [
+                ClassRanking(
+                    school_id=school_id,
+                    course=course,
+                    semester=semester,
+                    student_id=student_id,
+                    total_marks=float(marks[index]),
+                    max_marks=max_marks,
+                    percentage=float(percentage[index]),
+                    exams_taken=taken,
+                    rank=int(rank[index]),
+                    percentile=float(percentile[index]),
+                    z_score=float(z_score[index]),
+                    computed_at=now
+                )
+                for index, (student_id, _, taken) in enumerate(totals)
+            ],
+            batch_size=2000
+        )
+
+    return {
+        'students': len(totals),
+        'exams': len(exam_rows),
+        'seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def finalize_exam(exam):
+    """Finalize the results of an exam and materialize its and its class's rankings"""
+    if exam.results_finalized_at is None:
+        exam.results_finalized_at = timezone.now()
+        Exam.objects.filter(id=exam.id).update(results_finalized_at=exam.results_finalized_at)
+    report = rank_exam(exam.id)
+    exam.rankings_stale = False
+    rank_class(exam.school_id, exam.course, exam.semester)
+    return report
+
+
+def rerank_stale_exams(school_id=None):
+    """
+    Re-rank every finalized exam flagged stale, then each of their classes
+    once; returns {exam_id: report}
+    """
+    exams = Exam.objects.filter(results_finalized_at__isnull=False, rankings_stale=True)
+    if school_id is not None:
+        exams = exams.filter(school_id=school_id)
+    exams = list(exams.order_by('id').values_list('id', 'school_id', 'course', 'semester'))
+    reports = {exam_id: rank_exam(exam_id) for exam_id, _, _, _ in exams}
+    for school, course, semester in sorted({exam[1:] for exam in exams}, key=str):
+        rank_class(school, course, semester)
+    return reports
+
+
+
+def subject_toppers(school_id, course, semester):
+    """Rank-1 rankings of every finalized exam of a class, one query"""
+    return ExamRanking.objects.filter(
+        rank=1,
+        exam__school_id=school_id,
+        exam__course=course,
+        exam__semester=semester,
+        exam__results_finalized_at__isnull=False
+    ).select_related('exam', 'student').order_by('exam__subject', '-exam__date', 'student_id')
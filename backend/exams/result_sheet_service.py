@@ -0,0 +1,173 @@
+"""
+Class result sheet (students x subjects).
+
+The exams of a (school, course, semester) and their results are fetched as
+flat tuples, pivoted into a NumPy marks matrix and totalled on the whole
+matrix at once, so building a sheet takes the same three queries for a class
+of ten or of a thousand. Subjects with several exams (internal, external,
+practical) are summed into one column out of their combined max marks.
+"""
+import json
+
+import numpy as np
+from django.db.models import Q
+
+from users.models import StudentProfile
+from utils.csv_stream import csv_writer, student_name
+from .models import Exam, ExamResult
+from .results_service import grades_for
+
+
+def build_result_sheet(school_id, course, semester):
+    """
+    Build the result sheet of one class for one semester.
+
+    Returns a dict with the subjects (columns) and their max marks, the
+    students (rows), the marks matrix (NaN where a student has no result in a
+    subject) and vectorized totals, percentages and grades.
+    """
+    # Read the exams once and key everything on their ids: an exam created or
+    # renamed while the sheet is built must not add a column the pivot lacks
+    exams = list(
+        Exam.objects.filter(school_id=school_id, course=course, semester=semester).values_list('id', 'subject', 'max_marks')
+    )
+    exam_ids = [exam_id for exam_id, _, _ in exams]
+
+    subject_max = {}
+    for _, subject, max_marks in exams:
+        subject_max[subject] = subject_max.get(subject, 0) + max_marks
+    subjects = sorted(subject_max)
+    column_index = {subject: index for index, subject in enumerate(subjects)}
+    exam_column = {exam_id: column_index[subject] for exam_id, subject, _ in exams}
+
+    results = list(
+        ExamResult.objects.filter(exam_id__in=exam_ids).values_list('student_id', 'exam_id', 'marks_obtained')
+    )
+
+    # Current students of the class plus anyone who wrote its exams (students
+    # promoted since still appear on past semesters' sheets)
+    students = list(
+        StudentProfile.objects.filter(
+            Q(school_id=school_id, course=course, semester=semester) |
+            Q(id__in=ExamResult.objects.filter(exam_id__in=exam_ids).values('student_id'))
+        )
+        .order_by('roll_number', 'id')
+        .values('id', 'first_name', 'last_name', 'admission_number', 'roll_number')
+    )
+    row_index = {student['id']: index for index, student in enumerate(students)}
+
+    marks = np.zeros((len(students), len(subjects)), dtype=np.float64)
+    appeared = np.zeros((len(students), len(subjects)), dtype=bool)
+    if results:
+        rows = np.fromiter((row_index.get(result[0], -1) for result in results), dtype=np.int64, count=len(results))
+        columns = np.fromiter((exam_column[result[1]] for result in results), dtype=np.int64, count=len(results))
+        values = np.fromiter((result[2] for result in results), dtype=np.float64, count=len(results))
+        # A student deleted between the results and students queries has no row
+        known = rows >= 0
+        np.add.at(marks, (rows[known], columns[known]), values[known])
+        appeared[rows[known], columns[known]] = True
+    marks[~appeared] = np.nan
+
+    max_marks = np.array([subject_max[subject] for subject in subjects], dtype=np.float64)
+    total_max = float(max_marks.sum())
+    totals = np.nansum(marks, axis=1)
+    percentage = np.round(totals * 100 / total_max, 2) if total_max else np.zeros(len(students))
+    grades = [''] * len(students)
+    if total_max and len(students):
+        # Students without any result are left ungraded
+        grades = np.where(appeared.any(axis=1), grades_for(totals, total_max), '').tolist()
+
+    with np.errstate(invalid='ignore'):
+        column_appeared = appeared.sum(axis=0)
+        column_average = np.where(
+            column_appeared > 0, np.round(np.nansum(marks, axis=0) / np.maximum(column_appeared, 1), 2), np.nan
+        )
+        column_highest = np.where(
+            column_appeared > 0, np.where(appeared, marks, -np.inf).max(axis=0, initial=-np.inf), np.nan
+        )
+
+    return {
+        'course': course,
+        'semester': semester,
+        'subjects': subjects,
+        'max_marks': max_marks,
+        'total_max': total_max,
+        'students': students,
+        'marks': marks,
+        'totals': totals,
+        'percentage': percentage,
+        'grades': grades,
+        'column_appeared': column_appeared,
+        'column_average': column_average,
+        'column_highest': column_highest,
+    }
+
+
+def _cells(values):
+    """Matrix row as a list with None for missing marks"""
+    return [None if np.isnan(value) else value for value in values]
+
+
+def iter_result_sheet_json(sheet):
+    """
+    Yield the sheet as JSON text in chunks: the header, one object per student
+    (marks as an array aligned with `subjects`, null where absent), then the
+    per-subject summary.
+    """
+    yield json.dumps({
+        'course': sheet['course'],
+        'semester': sheet['semester'],
+        'subjects': [
+            {'subject': subject, 'max_marks': max_marks}
+            for subject, max_marks in zip(sheet['subjects'], sheet['max_marks'].tolist())
+        ],
+        'total_max_marks': sheet['total_max'],
+    })[:-1] + ', "students": ['
+
+    marks = sheet['marks'].tolist()
+    totals = sheet['totals'].tolist()
+    percentage = sheet['percentage'].tolist()
+    for index, student in enumerate(sheet['students']):
+        yield (',' if index else '') + json.dumps({
+            'id': student['id'],
+            'name': student_name(student),
+            'admission_number': student['admission_number'],
+            'roll_number': student['roll_number'],
+            'marks': _cells(marks[index]),
+            'total': totals[index],
+            'percentage': percentage[index],
+            'grade': sheet['grades'][index],
+        })
+
+    yield '], "subject_summary": ' + json.dumps([
+        {'subject': subject, 'appeared': appeared, 'average': average, 'highest': highest}
+        for subject, appeared, average, highest in zip(
+            sheet['subjects'],
+            sheet['column_appeared'].tolist(),
+            _cells(sheet['column_average'].tolist()),
+            _cells(sheet['column_highest'].tolist()),
+        )
+    ]) + '}'
+
+
+def iter_result_sheet_csv(sheet):
+    """Yield the sheet as CSV lines: one row per student, then per-subject averages"""
+    writer = csv_writer()
+    yield writer.writerow([
+        'Roll No', 'Admission No', 'Name',
+        *[f'{subject} ({max_marks:g})' for subject, max_marks in zip(sheet['subjects'], sheet['max_marks'].tolist())],
+        f"Total ({sheet['total_max']:g})", 'Percentage', 'Grade'
+    ])
+
+    marks = sheet['marks'].tolist()
+    totals = sheet['totals'].tolist()
+    percentage = sheet['percentage'].tolist()
+    for index, student in enumerate(sheet['students']):
+        yield writer.writerow([
+            student['roll_number'], student['admission_number'], student_name(student),
+            *['AB' if value is None else f'{value:g}' for value in _cells(marks[index])],
+            f'{totals[index]:g}', percentage[index], sheet['grades'][index]
+        ])
+
+    yield writer.writerow(['', '', 'Average', *['' if value is None else value for value in _cells(sheet['column_average'].tolist())]])
+    yield writer.writerow(['', '', 'Highest', *['' if value is None else f'{value:g}' for value in _cells(sheet['column_highest'].tolist())]])
@@ -0,0 +1,278 @@
+"""
+Bulk entry of exam results.
+
+A class's marks arrive as rows of (admission_number, marks_obtained, remarks),
+typed into the API or read from a CSV/XLSX sheet. Students are resolved with
+one query, grades are looked up for all rows at once with np.searchsorted in
+the EXAM_GRADE_BOUNDARIES table, and valid rows are written with a single
+upsert on the (exam, student) unique key. Invalid rows are reported, not
+written.
+"""
+import csv
+import io
+import re
+import zipfile
+from xml.etree import ElementTree
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+
+from users.models import StudentProfile
+from .models import ExamResult
+from .ranking_service import mark_rankings_stale
+
+MAX_ROWS = 5000
+# Largest uncompressed workbook part read from an XLSX upload
+MAX_XLSX_PART_SIZE = 20 * 1024 * 1024
+COLUMN_ALIASES = {
+    'admission_number': 'admission_number',
+    'admission_no': 'admission_number',
+    'marks_obtained': 'marks_obtained',
+    'marks': 'marks_obtained',
+    'remarks': 'remarks',
+}
+# Key of the sheet line a row was read from (header names are normalized
+# without a leading underscore, so no column can collide with it)
+LINE_KEY = '_line'
+
+
+def grade_boundaries():
+    """
+    The EXAM_GRADE_BOUNDARIES setting as (percentages, grades) arrays sorted
+    by the lowest percentage of each grade.
+    """
+    table = sorted(getattr(settings, 'EXAM_GRADE_BOUNDARIES', []))
+    known = {grade for grade, _ in ExamResult.GRADE_CHOICES}
+    if not table or any(grade not in known for _, grade in table):
+        raise ImproperlyConfigured(
+            f'EXAM_GRADE_BOUNDARIES needs (percentage, grade) pairs with grades among {sorted(known)}'
+        )
+    percentages = np.array([percentage for percentage, _ in table], dtype=np.float64)
+    grades = np.array([grade for _, grade in table])
+    return percentages, grades
+
+
+def grades_for(marks, max_marks):
+    """Grade of every mark, looked up in the boundary table in one vectorized pass"""
+    boundary_percentages, boundary_grades = grade_boundaries()
+    percentages = np.asarray(marks, dtype=np.float64) * 100 / max_marks
+    positions = np.searchsorted(boundary_percentages, percentages, side='right') - 1
+    return boundary_grades[np.clip(positions, 0, len(boundary_grades) - 1)].tolist()
+
+
+def import_results(exam, rows, entered_by):
+    """
+    Create or update the results of `exam` from `rows`.
+
+    `rows` are dicts with `admission_number`, `marks_obtained` and optional
+    `remarks`. Returns {'created', 'updated', 'invalid': [{'row', 'admission_number', 'error'}]}
+    where `row` is the sheet line for rows read from a file (the header is
+    line 1) and otherwise the 1-based position in `rows`.
+    """
+    invalid = []
+    candidates = []
+    seen = set()
+    for index, row in enumerate(rows, start=1):
+        position = row.get(LINE_KEY, index)
+        admission_number = str(row.get('admission_number') or '').strip()
+        error = None
+        marks = None
+        if not admission_number:
+            error = 'Admission number is required'
+        elif admission_number in seen:
+            error = 'Student appears more than once'
+        else:
+            try:
+                marks = float(row.get('marks_obtained'))
+            except (TypeError, ValueError):
+                error = 'Marks must be a number'
+            else:
+                if not np.isfinite(marks) or not 0 <= marks <= exam.max_marks:
+                    error = f'Marks must be between 0 and {exam.max_marks}'
+        if error:
+            invalid.append({'row': position, 'admission_number': admission_number, 'error': error})
+            continue
+        seen.add(admission_number)
+        candidates.append((position, admission_number, marks, str(row.get('remarks') or '').strip()))
+
+    students = {
+        admission_number: (student_id, course)
+        for admission_number, student_id, course in StudentProfile.objects.filter(
+            school_id=exam.school_id,
+            admission_number__in=[candidate[1] for candidate in candidates]
+        ).values_list('admission_number', 'id', 'course')
+    }
+
+    valid = []
+    for position, admission_number, marks, remarks in candidates:
+        student = students.get(admission_number)
+        if student is None:
+            invalid.append({'row': position, 'admission_number': admission_number, 'error': 'Student not found in this school'})
+        elif student[1] != exam.course:
+            invalid.append({'row': position, 'admission_number': admission_number, 'error': f'Student is not in {exam.course}'})
+        else:
+            valid.append((student[0], marks, remarks))
+
+    invalid.sort(key=lambda item: item['row'])
+    result = {'created': 0, 'updated': 0, 'invalid': invalid}
+    if not valid:
+        return result
+
+    grades = grades_for([marks for _, marks, _ in valid], exam.max_marks) if exam.max_marks > 0 else ['F'] * len(valid)
+    records = [
+        ExamResult(
+            exam=exam,
+            student_id=student_id,
+            marks_obtained=marks,
+            grade=grade,
+            remarks=remarks,
+            entered_by=entered_by
+        )
+        for (student_id, marks, remarks), grade in zip(valid, grades)
+    ]
+
+    with transaction.atomic():
+        existing = set(
+            ExamResult.objects.filter(exam=exam, student_id__in=[record.student_id for record in records])
+            .values_list('student_id', flat=True)
+        )
+        ExamResult.objects.bulk_create(
+            records,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['exam', 'student'],
+            update_fields=['marks_obtained', 'grade', 'remarks', 'entered_by']
+        )
+        # bulk_create sends no signals
+        mark_rankings_stale([exam.id])
+
+    result['updated'] = len(existing)
+    result['created'] = len(records) - len(existing)
+    return result
+
+
+def _normalize_header(header):
+    columns = []
+    for name in header:
+        # "Admission No." -> "admission_no"
+        key = re.sub(r'[\s.]+', '_', str(name or '').strip().lower()).strip('_')
+        columns.append(COLUMN_ALIASES.get(key, key))
+    if 'admission_number' not in columns or 'marks_obtained' not in columns:
+        raise ValueError('The sheet needs admission_number and marks_obtained columns')
+    return columns
+
+
+def _rows_from_table(table):
+    """
+    Dicts keyed by normalized column names, skipping blank lines. `table`
+    yields (line, values) with the header first; each row keeps its line
+    under LINE_KEY for error reports.
+    """
+    table = iter(table)
+    try:
+        _, header = next(table)
+    except StopIteration:
+        raise ValueError('The sheet is empty')
+    columns = _normalize_header(header)
+    rows = []
+    for line, values in table:
+        if not any(str(value or '').strip() for value in values):
+            continue
+        rows.append({**dict(zip(columns, values)), LINE_KEY: line})
+        if len(rows) > MAX_ROWS:
+            raise ValueError(f'At most {MAX_ROWS} rows can be imported at once')
+    return rows
+
+
+def read_csv_rows(data):
+    """Rows of a CSV file given as bytes"""
+    text = data.decode('utf-8-sig')
+    reader = csv.reader(io.StringIO(text))
+
+    def numbered():
+        # A quoted value can span lines; a row is numbered by its first line
+        line = 1
+        for values in reader:
+            yield line, values
+            line = reader.line_num + 1
+
+    return _rows_from_table(numbered())
+
+
+SPREADSHEET_NS = {'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'}
+CELL_REFERENCE = re.compile(r'([A-Z]+)(\d+)')
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+def _read_part(workbook, name):
+    """One workbook part, refusing parts that inflate past MAX_XLSX_PART_SIZE"""
+    if workbook.getinfo(name).file_size > MAX_XLSX_PART_SIZE:
+        raise ValueError('The XLSX file is too large to import')
+    with workbook.open(name) as part:
+        # The declared size can lie; never inflate more than the cap
+        content = part.read(MAX_XLSX_PART_SIZE + 1)
+    if len(content) > MAX_XLSX_PART_SIZE:
+        raise ValueError('The XLSX file is too large to import')
+    return content
+
+
+def read_xlsx_rows(data):
+    """
+    Rows of the first worksheet of an XLSX file given as bytes.
+
+    Reads the sheet XML directly (shared and inline strings, numbers) so no
+    spreadsheet library is needed; formulas are read as their cached values.
+    """
+    try:
+        workbook = zipfile.ZipFile(io.BytesIO(data))
+        names = set(workbook.namelist())
+        shared_strings = []
+        if 'xl/sharedStrings.xml' in names:
+            root = ElementTree.fromstring(_read_part(workbook, 'xl/sharedStrings.xml'))
+            shared_strings = [
+                ''.join(text.text or '' for text in item.iter(f"{{{SPREADSHEET_NS['main']}}}t"))
+                for item in root.findall('main:si', SPREADSHEET_NS)
+            ]
+        sheet = ElementTree.fromstring(_read_part(workbook, 'xl/worksheets/sheet1.xml'))
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError):
+        raise ValueError('Not a readable XLSX file')
+
+    table = []
+    line = 0
+    for row in sheet.iterfind('main:sheetData/main:row', SPREADSHEET_NS):
+        # Rows without cells may be left out of the XML; `r` is the sheet row number
+        line = int(row.get('r')) if (row.get('r') or '').isdigit() else line + 1
+        values = {}
+        for cell in row.findall('main:c', SPREADSHEET_NS):
+            match = CELL_REFERENCE.match(cell.get('r', ''))
+            column = _column_index(match.group(1)) if match else len(values)
+            cell_type = cell.get('t')
+            if cell_type == 'inlineStr':
+                value = ''.join(text.text or '' for text in cell.iter(f"{{{SPREADSHEET_NS['main']}}}t"))
+            else:
+                raw = cell.findtext('main:v', default='', namespaces=SPREADSHEET_NS)
+                value = shared_strings[int(raw)] if cell_type == 's' and raw else raw
+            values[column] = value
+        width = max(values, default=-1) + 1
+        table.append((line, [values.get(column, '') for column in range(width)]))
+    return _rows_from_table(table)
+
+
+def read_result_rows(filename, data):
+    """Rows of an uploaded CSV or XLSX sheet; raises ValueError if unreadable"""
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx_rows(data)
+    if filename.lower().endswith('.csv'):
+        try:
+            return read_csv_rows(data)
+        except UnicodeDecodeError:
+            raise ValueError('CSV files must be UTF-8 encoded')
+    raise ValueError('Only .csv and .xlsx files are supported')
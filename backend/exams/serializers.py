@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Exam, ExamResult
+from .models import ClassRanking, Exam, ExamRanking, ExamResult
+from .results_service import MAX_ROWS
 from users.serializers import StudentProfileSerializer, StaffProfileSerializer
 
 
@@ -10,7 +11,7 @@ class ExamSerializer(serializers.ModelSerializer):
     class Meta:
         model = Exam
         fields = '__all__'
-        read_only_fields = ['created_at']
+        read_only_fields = ['created_at', 'results_finalized_at', 'rankings_stale']
 
 
 class ExamResultSerializer(serializers.ModelSerializer):
@@ -44,4 +45,55 @@ class ExamResultDetailSerializer(ExamResultSerializer):
     entered_by = StaffProfileSerializer(read_only=True)
     
     class Meta(ExamResultSerializer.Meta):
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class BulkResultRowSerializer(serializers.Serializer):
+    """One student's marks within a bulk result entry; values are checked by the import"""
+    admission_number = serializers.CharField(allow_blank=True)
+    marks_obtained = serializers.JSONField()
+    remarks = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class BulkResultSerializer(serializers.Serializer):
+    """Results of a whole class for one exam"""
+    results = BulkResultRowSerializer(many=True, allow_empty=False, max_length=MAX_ROWS)
+
+
+class ExamRankingSerializer(serializers.ModelSerializer):
+    """Serializer for materialized exam rankings"""
+    exam_name = serializers.CharField(source='exam.name', read_only=True)
+    exam_subject = serializers.CharField(source='exam.subject', read_only=True)
+    exam_max_marks = serializers.IntegerField(source='exam.max_marks', read_only=True)
+    student_name = serializers.SerializerMethodField()
+    student_admission_number = serializers.CharField(source='student.admission_number', read_only=True)
+    
+    class Meta:
+        model = ExamRanking
+        fields = [
+            'id', 'exam', 'exam_name', 'exam_subject', 'exam_max_marks', 'student', 'student_name',
+            'student_admission_number', 'marks_obtained', 'rank', 'percentile', 'z_score', 'computed_at'
+        ]
+        read_only_fields = fields
+    
+    def get_student_name(self, obj):
+        student = obj.student
+        return f"{student.first_name or ''} {student.last_name or ''}".strip() or f"Student {student.admission_number}"
+
+
+class ClassRankingSerializer(serializers.ModelSerializer):
+    """Serializer for materialized cumulative class rankings"""
+    student_name = serializers.SerializerMethodField()
+    student_admission_number = serializers.CharField(source='student.admission_number', read_only=True)
+    
+    class Meta:
+        model = ClassRanking
+        fields = [
+            'id', 'school', 'course', 'semester', 'student', 'student_name', 'student_admission_number',
+            'total_marks', 'max_marks', 'percentage', 'exams_taken', 'rank', 'percentile', 'z_score', 'computed_at'
+        ]
+        read_only_fields = fields
+    
+    def get_student_name(self, obj):
+        student = obj.student
+        return f"{student.first_name or ''} {student.last_name or ''}".strip() or f"Student {student.admission_number}"
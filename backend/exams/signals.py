@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import ExamResult
+from .ranking_service import mark_rankings_stale
+
+
+@receiver(post_save, sender=ExamResult)
+@receiver(post_delete, sender=ExamResult)
+def flag_rankings_on_result_change(sender, instance, **kwargs):
+    """A result corrected after finalization makes the exam's rankings stale"""
+    mark_rankings_stale([instance.exam_id])
@@ -1,3 +1,104 @@
+from datetime import date
+
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+from .models import Exam, ExamResult
+
+
+class ExamResultSummaryTests(TestCase):
+    """ExamResultViewSet.summary"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(
+            district='Test', block='Test', village='Test',
+            school_name='Summary Test School', school_code='SUMTEST01'
+        )
+        cls.staff_user = User.objects.create_user(
+            username='summary-staff', email='summary-staff@test.local', password='test-pass',
+            role='faculty', school=cls.school
+        )
+        cls.staff = StaffProfile.objects.create(
+            user=cls.staff_user, employee_id='SUM001', department='Science',
+            designation='Teacher', date_of_joining=date(2020, 1, 1)
+        )
+        cls.student_user = User.objects.create_user(
+            username='summary-student', email='summary-student@test.local', password='test-pass',
+            role='student', school=cls.school
+        )
+        cls.student = StudentProfile.objects.create(
+            user=cls.student_user, school=cls.school, admission_number='SUM-1', roll_number='1',
+            course='Class 10', department='Science', semester=1, date_of_birth=date(2010, 1, 1),
+            address='Test', emergency_contact='0000000000'
+        )
+        cls.other_student = StudentProfile.objects.create(
+            school=cls.school, admission_number='SUM-2', roll_number='2',
+            course='Class 10', department='Science', semester=1, date_of_birth=date(2010, 1, 1),
+            address='Test', emergency_contact='0000000000'
+        )
+
+        def exam(subject, semester, max_marks, day):
+            return Exam.objects.create(
+                school=cls.school, name=f'{subject} {semester}', exam_type='midterm', course='Class 10',
+                subject=subject, semester=semester, date=date(2025, 1, day), max_marks=max_marks,
+                duration_minutes=60, created_by=cls.staff
+            )
+
+        maths_1 = exam('Maths', 1, 50, 10)
+        science_1 = exam('Science', 1, 100, 11)
+        maths_2 = exam('Maths', 2, 100, 20)
+        for result_exam, student, marks, grade in [
+            (maths_1, cls.student, 45, 'A+'),
+            (science_1, cls.student, 10, 'F'),
+            (maths_2, cls.student, 70, 'B+'),
+            (maths_1, cls.other_student, 20, 'D'),
+        ]:
+            ExamResult.objects.create(
+                exam=result_exam, student=student, marks_obtained=marks, grade=grade, entered_by=cls.staff
+            )
+
+    def get_summary(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.get('/api/v1/exams/results/summary/')
+
+    def test_averages_are_weighted_by_max_marks(self):
+        response = self.get_summary(self.student_user)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.data
+        self.assertEqual(data['total_exams'], 3)
+        # (45 + 10 + 70) / (50 + 100 + 100), not the average of per-exam ratios
+        self.assertEqual(data['average_percentage'], 50.0)
+        self.assertEqual(data['grade_distribution'], {'A+': 1, 'B+': 1, 'F': 1})
+        self.assertEqual(data['subject_breakdown'], [
+            {'subject': 'Maths', 'exams': 2, 'average_percentage': 76.67},
+            {'subject': 'Science', 'exams': 1, 'average_percentage': 10.0},
+        ])
+        self.assertEqual(data['semester_breakdown'], [
+            {'semester': 1, 'exams': 2, 'average_percentage': 36.67},
+            {'semester': 2, 'exams': 1, 'average_percentage': 70.0},
+        ])
+        self.assertEqual([result['exam_name'] for result in data['recent_results']], ['Maths 2', 'Science 1', 'Maths 1'])
+
+    def test_query_count_does_not_grow_with_results(self):
+        # Grade distribution, (subject, semester) totals and recent rows with
+        # their exam, student and staff joined in
+        with self.assertNumQueries(3):
+            response = self.get_summary(self.staff_user)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_exams'], 4)
+        self.assertEqual(len(response.data['recent_results']), 4)
+
+    def test_empty_summary(self):
+        ExamResult.objects.all().delete()
+
+        response = self.get_summary(self.staff_user)
 
-# Create your tests here.
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_exams'], 0)
+        self.assertEqual(response.data['recent_results'], [])
@@ -5,6 +5,8 @@ from . import views
 router = DefaultRouter()
 router.register(r'exams', views.ExamViewSet, basename='exam')
 router.register(r'results', views.ExamResultViewSet, basename='exam-result')
+router.register(r'rankings', views.ExamRankingViewSet, basename='exam-ranking')
+router.register(r'class-rankings', views.ClassRankingViewSet, basename='class-ranking')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,11 +1,18 @@
 from django.shortcuts import render
 from django.db import models
+from django.http import StreamingHttpResponse
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from .models import Exam, ExamResult
-from .serializers import ExamSerializer, ExamResultSerializer, ExamResultDetailSerializer
+from .models import ClassRanking, Exam, ExamRanking, ExamResult
+from .serializers import (
+    ExamSerializer, ExamResultSerializer, ExamResultDetailSerializer, BulkResultSerializer, ExamRankingSerializer,
+    ClassRankingSerializer
+)
+from .ranking_service import finalize_exam, subject_toppers
+from .result_sheet_service import build_result_sheet, iter_result_sheet_csv, iter_result_sheet_json
+from .results_service import import_results, read_result_rows
 
 
 class ExamViewSet(viewsets.ModelViewSet):
@@ -17,6 +24,85 @@ class ExamViewSet(viewsets.ModelViewSet):
     search_fields = ['exam_type', 'course', 'subject', 'semester']
     ordering = ['-date', '-created_at']
 
+    @action(detail=True, methods=['post'])
+    def bulk_results(self, request, pk=None):
+        """
+        Enter the results of a whole class in one request.
+
+        Accepts JSON {"results": [{"admission_number", "marks_obtained", "remarks"}]}
+        or a multipart `file` (.csv or .xlsx with the same columns). Grades are
+        derived from the marks. Valid rows are saved; invalid ones are returned
+        with their row number and error.
+        """
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can enter exam results'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        exam = self.get_object()
+        if not request.user.is_superuser and request.user.school_id != exam.school_id:
+            return Response(
+                {'error': 'You can only enter results for your own school'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        upload = request.FILES.get('file')
+        if upload is not None:
+            try:
+                rows = read_result_rows(upload.name, upload.read())
+            except ValueError as error:
+                return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            serializer = BulkResultSerializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            rows = serializer.validated_data['results']
+
+        entered_by = getattr(request.user, 'staff_profile', None) or exam.created_by
+        result = import_results(exam, rows, entered_by)
+
+        return Response({
+            'exam_id': exam.id,
+            'created': result['created'],
+            'updated': result['updated'],
+            'invalid_rows': result['invalid']
+        }, status=status.HTTP_200_OK if not result['invalid'] else status.HTTP_207_MULTI_STATUS)
+
+    @action(detail=True, methods=['post'])
+    def finalize(self, request, pk=None):
+        """
+        Finalize the exam's results and materialize ranks, percentiles and
+        z-scores. Calling it again re-ranks immediately instead of waiting for
+        the scheduled re-rank of corrected exams.
+        """
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can finalize exam results'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        exam = self.get_object()
+        if not request.user.is_superuser and request.user.school_id != exam.school_id:
+            return Response(
+                {'error': 'You can only finalize exams of your own school'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        if not ExamResult.objects.filter(exam=exam).exists():
+            return Response(
+                {'error': 'The exam has no results to finalize'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        report = finalize_exam(exam)
+        return Response({
+            'exam_id': exam.id,
+            'results_finalized_at': exam.results_finalized_at,
+            'ranked_students': report['students'],
+            'created': report['created'],
+            'updated': report['updated'],
+            'deleted': report['deleted']
+        })
+
 
 class ExamResultViewSet(viewsets.ModelViewSet):
     """ViewSet for ExamResult model"""
@@ -33,18 +119,14 @@ class ExamResultViewSet(viewsets.ModelViewSet):
         # Filter based on user role
         if user.role == 'student':
             # Students can only see their own results
-            try:
-                student_profile = user.studentprofile
-                queryset = queryset.filter(student=student_profile)
-            except:
-                queryset = queryset.none()
+            student_profile = getattr(user, 'student_profile', None)
+            queryset = queryset.filter(student=student_profile) if student_profile else queryset.none()
         elif user.role == 'parent':
             # Parents can see their children's results
-            try:
-                parent_profile = user.parentprofile
-                children = parent_profile.children.all()
-                queryset = queryset.filter(student__in=children)
-            except:
+            parent_profile = getattr(user, 'parent_profile', None)
+            if parent_profile:
+                queryset = queryset.filter(student__in=parent_profile.children.all())
+            else:
                 queryset = queryset.none()
         # Staff and admin can see all results
         
@@ -82,49 +164,217 @@ class ExamResultViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='result-sheet')
+    def result_sheet(self, request):
+        """
+        Result sheet of a class: students x subjects with totals, percentage and grade.
+
+        Query params: course, semester, optional school (superusers only) and
+        export=csv for a CSV download; JSON is streamed as well. Built from a
+        constant number of queries whatever the class size.
+        """
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can view result sheets'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        course = params.get('course')
+        semester = params.get('semester')
+        if not course or not semester or not semester.isdigit():
+            return Response(
+                {'error': 'course and a numeric semester are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        school_id = request.user.school_id
+        if request.user.is_superuser and params.get('school'):
+            school_id = params.get('school')
+        if not school_id:
+            return Response({'error': 'school is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        sheet = build_result_sheet(school_id, course, int(semester))
+
+        if params.get('export') == 'csv':
+            response = StreamingHttpResponse(iter_result_sheet_csv(sheet), content_type='text/csv')
+            filename = f"result_sheet_{course}_sem{semester}.csv".replace(' ', '_')
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+
+        return StreamingHttpResponse(iter_result_sheet_json(sheet), content_type='application/json')
+
     @action(detail=False, methods=['get'])
     def summary(self, request):
-        """Get exam results summary for the current user"""
+        """
+        Get exam results summary for the current user.
+
+        Averages are weighted by max marks (total marks obtained over total max
+        marks), so exams out of 50 and out of 100 are not averaged as equals.
+        """
         queryset = self.get_queryset()
         
-        # Calculate summary statistics
-        total_exams = queryset.count()
+        # Grade distribution, one grouped query
+        grade_distribution = {
+            row['grade']: row['count']
+            for row in queryset.values('grade').annotate(count=models.Count('id')).order_by('grade')
+        }
+        total_exams = sum(grade_distribution.values())
         if total_exams == 0:
             return Response({
                 'total_exams': 0,
                 'average_percentage': 0,
                 'grade_distribution': {},
+                'subject_breakdown': [],
+                'semester_breakdown': [],
                 'recent_results': []
             })
         
-        # Calculate average percentage
-        avg_percentage = queryset.aggregate(
-            avg_marks=models.Avg('marks_obtained'),
-            avg_max_marks=models.Avg('exam__max_marks')
-        )
+        # Marks per (subject, semester) in one grouped query; overall, subject
+        # and semester totals are rolled up from it
+        groups = queryset.values('exam__subject', 'exam__semester').annotate(
+            count=models.Count('id'),
+            total_marks=models.Sum('marks_obtained'),
+            total_max_marks=models.Sum('exam__max_marks')
+        ).order_by()
         
-        if avg_percentage['avg_max_marks'] and avg_percentage['avg_max_marks'] > 0:
-            average_percentage = round(
-                (avg_percentage['avg_marks'] / avg_percentage['avg_max_marks']) * 100, 2
-            )
-        else:
-            average_percentage = 0
+        overall = {'count': 0, 'total_marks': 0, 'total_max_marks': 0}
+        by_subject = {}
+        by_semester = {}
+        for row in groups:
+            for totals in (
+                overall,
+                by_subject.setdefault(row['exam__subject'], {'count': 0, 'total_marks': 0, 'total_max_marks': 0}),
+                by_semester.setdefault(row['exam__semester'], {'count': 0, 'total_marks': 0, 'total_max_marks': 0}),
+            ):
+                totals['count'] += row['count']
+                totals['total_marks'] += row['total_marks'] or 0
+                totals['total_max_marks'] += row['total_max_marks'] or 0
         
-        # Grade distribution
-        grade_distribution = {}
-        for choice in ExamResult.GRADE_CHOICES:
-            grade = choice[0]
-            count = queryset.filter(grade=grade).count()
-            if count > 0:
-                grade_distribution[grade] = count
+        def percentage(totals):
+            if not totals['total_max_marks']:
+                return 0
+            return round(totals['total_marks'] * 100 / totals['total_max_marks'], 2)
         
         # Recent results (last 5)
-        recent_results = queryset[:5]
+        recent_results = queryset.select_related(
+            'exam', 'student__user', 'entered_by__user'
+        ).order_by('-exam__date', '-entered_at')[:5]
         recent_serializer = self.get_serializer(recent_results, many=True)
         
         return Response({
             'total_exams': total_exams,
-            'average_percentage': average_percentage,
+            'average_percentage': percentage(overall),
             'grade_distribution': grade_distribution,
+            'subject_breakdown': [
+                {'subject': subject, 'exams': totals['count'], 'average_percentage': percentage(totals)}
+                for subject, totals in sorted(by_subject.items())
+            ],
+            'semester_breakdown': [
+                {'semester': semester, 'exams': totals['count'], 'average_percentage': percentage(totals)}
+                for semester, totals in sorted(by_semester.items())
+            ],
             'recent_results': recent_serializer.data
         })
+
+
+class ExamRankingViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only access to materialized exam rankings.
+
+    Filter with ?exam= (ordered by rank) or ?student=; students only see their
+    own rankings and staff those of their school.
+    """
+    serializer_class = ExamRankingSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = ExamRanking.objects.select_related('exam', 'student')
+        user = self.request.user
+        
+        if user.role == 'student':
+            student_profile = getattr(user, 'student_profile', None)
+            queryset = queryset.filter(student=student_profile) if student_profile else queryset.none()
+        elif user.role == 'parent':
+            parent_profile = getattr(user, 'parent_profile', None)
+            if parent_profile:
+                queryset = queryset.filter(student__in=parent_profile.children.all())
+            else:
+                queryset = queryset.none()
+        elif not user.is_superuser:
+            queryset = queryset.filter(exam__school_id=user.school_id)
+        
+        exam_id = self.request.query_params.get('exam')
+        if exam_id:
+            queryset = queryset.filter(exam_id=exam_id)
+        student_id = self.request.query_params.get('student')
+        if student_id:
+            queryset = queryset.filter(student_id=student_id)
+        return queryset.order_by('exam_id', 'rank', 'student_id')
+    
+    @action(detail=False, methods=['get'])
+    def toppers(self, request):
+        """Subject toppers (rank 1 of every finalized exam) of a class: ?course=&semester="""
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can view class toppers'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        course = request.query_params.get('course')
+        semester = request.query_params.get('semester')
+        if not course or not semester or not semester.isdigit():
+            return Response(
+                {'error': 'course and a numeric semester are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        school_id = request.user.school_id
+        if request.user.is_superuser and request.query_params.get('school'):
+            school_id = request.query_params.get('school')
+        
+        toppers = subject_toppers(school_id, course, int(semester))
+        return Response({
+            'course': course,
+            'semester': int(semester),
+            'toppers': self.get_serializer(toppers, many=True).data
+        })
+
+
+class ClassRankingViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Read-only access to materialized cumulative class rankings (all finalized
+    exams of a school, course and semester).
+
+    Filter with ?course=&semester= (ordered by rank) or ?student=; students
+    only see their own rankings and staff those of their school.
+    """
+    serializer_class = ClassRankingSerializer
+    permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = ClassRanking.objects.select_related('student')
+        user = self.request.user
+        
+        if user.role == 'student':
+            student_profile = getattr(user, 'student_profile', None)
+            queryset = queryset.filter(student=student_profile) if student_profile else queryset.none()
+        elif user.role == 'parent':
+            parent_profile = getattr(user, 'parent_profile', None)
+            if parent_profile:
+                queryset = queryset.filter(student__in=parent_profile.children.all())
+            else:
+                queryset = queryset.none()
+        elif not user.is_superuser:
+            queryset = queryset.filter(school_id=user.school_id)
+        
+        course = self.request.query_params.get('course')
+        if course:
+            queryset = queryset.filter(course=course)
+        semester = self.request.query_params.get('semester')
+        if semester and semester.isdigit():
+            queryset = queryset.filter(semester=int(semester))
+        student_id = self.request.query_params.get('student')
+        if student_id:
+            queryset = queryset.filter(student_id=student_id)
+        return queryset.order_by('school_id', 'course', 'semester', 'rank', 'student_id')
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """Fee snapshot invalidations only reach other workers through a shared cache"""
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        'The default cache is local to each process, so fee changes reach other workers only '
+        'after FEE_SNAPSHOT_MAX_AGE seconds.',
+        hint='Set CACHE_BACKEND and CACHE_LOCATION to a cache shared by all workers (e.g. Redis or Memcached).',
+        id='fees.E001',
+    )]
@@ -0,0 +1,155 @@
+"""
+In-process fee resolver.
+
+Fee quotes are requested far more often than fee structures change, and both
+fee tables are tiny (a handful of admission class/category rows and one row
+per school/course/semester). The resolver keeps a snapshot of both tables in
+memory and answers quotes without touching the database.
+
+The snapshot is versioned: committing a save, delete or queryset write
+(`FeeTableQuerySet`) of a fee structure bumps a version counter in the
+Django cache, and every process rebuilds its snapshot the next time it sees
+a newer version. That needs a cache shared by all workers, which
+`check --deploy` requires (fees.E001): with a per-process backend such as
+the default LocMemCache other workers would only notice through
+FEE_SNAPSHOT_MAX_AGE. The snapshot is also rebuilt once it is older than
+that many seconds, which covers changes made outside the ORM.
+"""
+import re
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
+
+VERSION_CACHE_KEY = 'fees:fee_snapshot_version'
+
+# Course name -> admission fee class range
+CLASS_RANGE_MAPPING = {
+    '1': '1-8', '2': '1-8', '3': '1-8', '4': '1-8',
+    '5': '1-8', '6': '1-8', '7': '1-8', '8': '1-8',
+    '9': '9-10', '10': '9-10',
+    '11': '11-12', '12': '11-12'
+}
+
+# Try 2-digit numbers first (11, 12), then single digits; matches "class-12", "12th", "class 9"...
+CLASS_NUMBER_PATTERNS = [
+    re.compile(r'(?:class[-\s]?)?(\d{2})(?:th|st|nd|rd)?'),
+    re.compile(r'(?:class[-\s]?)?(\d{1})(?:th|st|nd|rd)?'),
+]
+
+
+@lru_cache(maxsize=1024)
+def parse_class_range(course_applied):
+    """Map a free-text course name (e.g. "Class 12 Science") to its fee class range"""
+    if not course_applied:
+        return None
+    course_lower = course_applied.lower()
+    for pattern in CLASS_NUMBER_PATTERNS:
+        match = pattern.search(course_lower)
+        if match and match.group(1) in CLASS_RANGE_MAPPING:
+            return CLASS_RANGE_MAPPING[match.group(1)]
+    return None
+
+
+def fee_category_for(category):
+    """Admission fee tables only distinguish general from reserved categories"""
+    return 'general' if category == 'general' else 'sc_st_obc_sbc'
+
+
+class FeeSnapshot:
+    """Immutable view of both fee tables at one version"""
+
+    def __init__(self, version, admission_fees, course_fees):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.admission_fees = admission_fees  # (class_range, category) -> admissions.FeeStructure
+        self.course_fees = course_fees        # (school_id, course, semester) -> fees.FeeStructure
+
+    @classmethod
+    def build(cls, version):
+        from admissions.models import FeeStructure as AdmissionFeeStructure
+        from .models import FeeStructure
+
+        admission_fees = {
+            (fee.class_range, fee.category): fee
+            for fee in AdmissionFeeStructure.objects.all()
+        }
+        course_fees = {
+            (fee.school_id, fee.course, fee.semester): fee
+            for fee in FeeStructure.objects.all()
+        }
+        return cls(version, admission_fees, course_fees)
+
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _max_age():
+    return getattr(settings, 'FEE_SNAPSHOT_MAX_AGE', 300)
+
+
+def _current_version():
+    return cache.get(VERSION_CACHE_KEY, 0)
+
+
+def get_snapshot():
+    """Return the current snapshot, rebuilding it if it is stale"""
+    global _snapshot
+    version = _current_version()
+    snapshot = _snapshot
+    if snapshot is not None and snapshot.version == version \
+            and time.monotonic() - snapshot.built_at < _max_age():
+        return snapshot
+
+    with _lock:
+        snapshot = _snapshot
+        if snapshot is None or snapshot.version != version \
+                or time.monotonic() - snapshot.built_at >= _max_age():
+            snapshot = FeeSnapshot.build(version)
+            _snapshot = snapshot
+    return snapshot
+
+
+def invalidate_snapshot():
+    """Drop the local snapshot and tell other processes to rebuild theirs"""
+    global _snapshot
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, _current_version() + 1, None)
+    _snapshot = None
+
+
+class FeeTableQuerySet(models.QuerySet):
+    """
+    QuerySet of a fee table whose bulk writes, which send no model signals,
+    invalidate the snapshot once committed like a save does (bulk_update
+    goes through update).
+    """
+
+    def update(self, **kwargs):
+        rows = super().update(**kwargs)
+        transaction.on_commit(invalidate_snapshot, using=self.db)
+        return rows
+
+    def bulk_create(self, objs, *args, **kwargs):
+        created = super().bulk_create(objs, *args, **kwargs)
+        transaction.on_commit(invalidate_snapshot, using=self.db)
+        return created
+
+
+def get_admission_fee(course_applied, category):
+    """admissions.FeeStructure for a course name and student category, or None"""
+    class_range = parse_class_range(course_applied)
+    if class_range is None:
+        return None
+    return get_snapshot().admission_fees.get((class_range, fee_category_for(category)))
+
+
+def get_course_fee(school_id, course, semester):
+    """fees.FeeStructure for a school, course and semester, or None"""
+    return get_snapshot().course_fees.get((school_id, course, semester))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.receipt_service import BATCH_SIZE, generate_pending_receipts
+
+
+class Command(BaseCommand):
+    help = 'Render receipts of payments waiting for one (run every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Receipts rendered per batch')
+        parser.add_argument('--max-batches', type=int, default=50, help='Stop after this many batches')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0 or options['max_batches'] <= 0:
+            raise CommandError('--batch-size and --max-batches must be positive')
+
+        ready = failed = 0
+        for _ in range(options['max_batches']):
+            report = generate_pending_receipts(batch_size=options['batch_size'])
+            ready += report['ready']
+            failed += report['failed']
+            if report['ready'] + report['failed'] < options['batch_size']:
+                break
+
+        self.stdout.write(f'- Receipts rendered: {ready}')
+        self.stdout.write(f'- Failed: {failed}')
+        self.stdout.write(self.style.SUCCESS(f'\nReceipt generation completed: {ready} receipts'))
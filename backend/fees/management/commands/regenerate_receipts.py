@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fees.models import Payment
+from fees.receipt_service import CHUNK_SIZE, regenerate_receipts
+
+
+class Command(BaseCommand):
+    help = 'Re-render fee receipts in a process pool (e.g. after a template change)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, help='Only payments of this school ID')
+        parser.add_argument('--since', help='Only payments made on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--failed-only', action='store_true', help='Only payments whose receipt failed')
+        parser.add_argument('--workers', type=int, help='Rendering processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Receipts per worker task')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] <= 0:
+            raise CommandError('--workers must be positive')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        payments = Payment.objects.all()
+        if options['school'] is not None:
+            payments = payments.filter(invoice__fee_structure__school_id=options['school'])
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format')
+            payments = payments.filter(payment_date__date__gte=since)
+        if options['failed_only']:
+            payments = payments.filter(receipt_status='failed')
+
+        report = regenerate_receipts(payments, workers=options['workers'], chunk_size=options['chunk_size'])
+
+        self.stdout.write(f"- Receipts rendered: {report['receipts']}")
+        self.stdout.write(f"- Failed: {report['failed']}")
+        self.stdout.write(f"- Throughput: {report['receipts_per_minute']} per minute")
+        self.stdout.write(self.style.SUCCESS(f"\nRegenerated {report['receipts']} receipts in {report['seconds']:.2f}s"))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fees', '0002_alter_feestructure_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='receipt_generated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='receipt_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='payment',
+            name='receipt_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['receipt_status', 'payment_date'], name='fees_paymen_receipt_ff4a65_idx'),
+        ),
+    ]
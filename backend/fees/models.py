@@ -3,6 +3,8 @@ from django.db import models
 from django.db import models
 from django.conf import settings
 
+from .fee_resolver import FeeTableQuerySet
+
 class FeeStructure(models.Model):
     """Model for fee structure by course/semester"""
     school = models.ForeignKey('schools.School', on_delete=models.CASCADE, null=True, blank=True)
@@ -13,6 +15,8 @@ class FeeStructure(models.Model):
     lab_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     exam_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     total_fee = models.DecimalField(max_digits=10, decimal_places=2)
+
+    objects = FeeTableQuerySet.as_manager()
     
     class Meta:
         unique_together = ['school', 'course', 'semester']
@@ -63,12 +67,30 @@ class Payment(models.Model):
         ('bank_transfer', 'Bank Transfer'),
     ]
     
+    RECEIPT_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('rendering', 'Rendering'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
     invoice = models.ForeignKey(FeeInvoice, on_delete=models.CASCADE)
     transaction_id = models.CharField(max_length=100, unique=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     payment_date = models.DateTimeField(auto_now_add=True)
     receipt_path = models.CharField(max_length=500, blank=True)  # S3 path for receipt
+    # Receipts are rendered by the `generate_receipts` worker, not during payment
+    receipt_status = models.CharField(max_length=20, choices=RECEIPT_STATUS_CHOICES, default='pending')
+    receipt_sha256 = models.CharField(max_length=64, blank=True)
+    receipt_generated_at = models.DateTimeField(null=True, blank=True)
+    # When a worker claimed the payment ('rendering'); stale claims are picked up again
+    receipt_claimed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['receipt_status', 'payment_date']),
+        ]
     
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.amount}"
@@ -0,0 +1,112 @@
+"""
+Fee receipt PDF template.
+
+A receipt is a plain dict built by `receipt_service.receipt_data`, so the
+same payment always renders to the same bytes.
+"""
+import fitz
+
+from utils.pdf import BOLD, REGULAR, document_bytes
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('a5')
+MARGIN = 36
+ROW_HEIGHT = 16
+GRID_COLOR = (0.6, 0.6, 0.6)
+
+
+def _amount(value):
+    return f'Rs. {value:,.2f}'
+
+
+def _right(shape, x, y, text, fontname=REGULAR, fontsize=10):
+    """Insert text right-aligned at x"""
+    shape.insert_text((x - fitz.get_text_length(text, fontname, fontsize), y), text, fontname=fontname, fontsize=fontsize)
+
+
+def render_receipt(receipt):
+    """Render one receipt to PDF bytes"""
+    document = fitz.open()
+    try:
+        page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        shape = page.new_shape()
+        right = PAGE_WIDTH - MARGIN
+
+        school = receipt['school_name']
+        if fitz.get_text_length(school, BOLD, 13) > right - MARGIN:
+            school = school[:48] + '...'
+        shape.insert_text(
+            ((PAGE_WIDTH - fitz.get_text_length(school, BOLD, 13)) / 2, MARGIN + 12), school, fontname=BOLD, fontsize=13
+        )
+        title = 'Fee Receipt'
+        shape.insert_text(
+            ((PAGE_WIDTH - fitz.get_text_length(title, REGULAR, 11)) / 2, MARGIN + 28), title, fontname=REGULAR, fontsize=11
+        )
+        shape.draw_line((MARGIN, MARGIN + 36), (right, MARGIN + 36))
+        shape.finish(color=(0, 0, 0), width=1)
+
+        y = MARGIN + 54
+        shape.insert_text(
+            (MARGIN, y),
+            ['Receipt No:', 'Date:', 'Student:', 'Admission No:', 'Course:', 'Invoice No:'],
+            fontname=BOLD, fontsize=9, lineheight=ROW_HEIGHT / 9
+        )
+        shape.insert_text(
+            (MARGIN + 80, y),
+            [
+                receipt['receipt_number'], receipt['payment_date'], receipt['student_name'][:50],
+                receipt['admission_number'], f"{receipt['course']}, Semester {receipt['semester']}",
+                receipt['invoice_number'],
+            ],
+            fontname=REGULAR, fontsize=9, lineheight=ROW_HEIGHT / 9
+        )
+
+        y += 6 * ROW_HEIGHT + 8
+        items = receipt['items']
+        for row in range(len(items) + 2):
+            shape.draw_rect(fitz.Rect(MARGIN, y + row * ROW_HEIGHT, right, y + (row + 1) * ROW_HEIGHT))
+        shape.finish(color=GRID_COLOR, width=0.5)
+        shape.insert_text((MARGIN + 6, y + 12), 'Particulars', fontname=BOLD, fontsize=9)
+        _right(shape, right - 6, y + 12, 'Amount', BOLD, 9)
+        if items:
+            shape.insert_text(
+                (MARGIN + 6, y + ROW_HEIGHT + 12), [label for label, _ in items],
+                fontname=REGULAR, fontsize=9, lineheight=ROW_HEIGHT / 9
+            )
+            for row, (_, value) in enumerate(items, start=1):
+                _right(shape, right - 6, y + row * ROW_HEIGHT + 12, _amount(value), REGULAR, 9)
+        total_y = y + (len(items) + 1) * ROW_HEIGHT + 12
+        shape.insert_text((MARGIN + 6, total_y), 'Amount Paid', fontname=BOLD, fontsize=9)
+        _right(shape, right - 6, total_y, _amount(receipt['amount']), BOLD, 9)
+
+        y = total_y + 24
+        shape.insert_text(
+            (MARGIN, y),
+            [f"Payment method: {receipt['payment_method']}", f"Transaction ID: {receipt['transaction_id'][:60]}"],
+            fontname=REGULAR, fontsize=9, lineheight=ROW_HEIGHT / 9
+        )
+        shape.insert_text(
+            (MARGIN, PAGE_HEIGHT - MARGIN),
+            'This is a computer-generated receipt and does not require a signature.',
+            fontname=REGULAR, fontsize=7
+        )
+        shape.commit()
+
+        return document_bytes(document, f"Fee Receipt {receipt['receipt_number']}")
+    finally:
+        document.close()
+
+
+def render_receipts(receipts):
+    """
+    Render a batch of receipts (process-pool entry point).
+
+    Returns [(payment_id, pdf_bytes, error)]: a receipt that fails to render
+    has no bytes and the error message, and doesn't stop the others.
+    """
+    rendered = []
+    for receipt in receipts:
+        try:
+            rendered.append((receipt['payment_id'], render_receipt(receipt), None))
+        except Exception as e:
+            rendered.append((receipt['payment_id'], None, str(e)))
+    return rendered
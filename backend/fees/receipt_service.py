@@ -0,0 +1,206 @@
+"""
+Fee receipt pipeline.
+
+Paying an invoice only records the payment with `receipt_status='pending'`;
+that row is the queue. The `generate_receipts` worker claims pending
+payments in batches by flipping them to 'rendering' (so overlapping runs
+never render the same payment twice), loads everything a receipt shows with
+one select_related query, renders the PDFs with `receipt_renderer` and
+stores them content-addressed under their SHA-256 (identical bytes are
+written once), then fills `receipt_path` for the whole batch with one bulk
+update. A claim older than RENDER_TIMEOUT belongs to a worker that died and
+is claimed again. `regenerate_receipts` re-renders existing receipts the
+same way in a process pool. A receipt that fails to render or store marks
+its payment failed without holding up the rest.
+"""
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.content_storage import store_content_addressed
+from utils.db import retry_if_locked
+
+from .models import Payment
+from .receipt_renderer import render_receipt, render_receipts
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_ROOT = 'fees/receipts'
+BATCH_SIZE = 100
+CHUNK_SIZE = 50
+RENDER_TIMEOUT = timedelta(minutes=10)
+RECEIPT_FIELDS = ['receipt_path', 'receipt_sha256', 'receipt_status', 'receipt_generated_at']
+
+
+def receipt_payments():
+    """Payments with everything a receipt shows, for one query per batch"""
+    return Payment.objects.select_related('invoice__student', 'invoice__fee_structure__school')
+
+
+def receipt_data(payment):
+    """Plain dict describing one payment's receipt (picklable for pool workers)"""
+    invoice = payment.invoice
+    student = invoice.student
+    structure = invoice.fee_structure
+    school = structure.school
+    name = f"{student.first_name or ''} {student.last_name or ''}".strip() or f"Student {student.admission_number}"
+    items = [
+        ('Tuition fee', structure.tuition_fee),
+        ('Library fee', structure.library_fee),
+        ('Lab fee', structure.lab_fee),
+        ('Exam fee', structure.exam_fee),
+    ]
+    return {
+        'payment_id': payment.id,
+        'receipt_number': f'R-{payment.id:08d}',
+        'school_name': school.school_name if school else 'Acharya',
+        'payment_date': timezone.localtime(payment.payment_date).strftime('%d %b %Y %H:%M'),
+        'student_name': name,
+        'admission_number': student.admission_number,
+        'course': structure.course,
+        'semester': structure.semester,
+        'invoice_number': invoice.invoice_number,
+        'items': [(label, float(value)) for label, value in items if value],
+        'amount': float(payment.amount),
+        'payment_method': payment.get_payment_method_display(),
+        'transaction_id': payment.transaction_id,
+    }
+
+
+def store_receipt(pdf):
+    """Write receipt bytes under their SHA-256 unless already stored; returns (path, sha256)"""
+    return store_content_addressed(RECEIPT_ROOT, pdf)
+
+
+def _save_rendered(payments_by_id, rendered):
+    """
+    Store rendered receipts and record them on their payments with one bulk
+    update; payments whose receipt failed to render or store are marked
+    failed. Returns (ready, failed).
+    """
+    now = timezone.now()
+    updated = []
+    failed = 0
+    for payment_id, pdf, error in rendered:
+        payment = payments_by_id[payment_id]
+        if error is None:
+            try:
+                payment.receipt_path, payment.receipt_sha256 = store_receipt(pdf)
+            except Exception as e:
+                error = str(e)
+        if error is None:
+            payment.receipt_status = 'ready'
+            payment.receipt_generated_at = now
+        else:
+            logger.error(f"Error rendering receipt for payment {payment_id}: {error}")
+            payment.receipt_status = 'failed'
+            failed += 1
+        updated.append(payment)
+    Payment.objects.bulk_update(updated, RECEIPT_FIELDS)
+    return len(updated) - failed, failed
+
+
+@retry_if_locked
+def claim_pending_payments(batch_size=BATCH_SIZE):
+    """
+    Claim the oldest pending payments (and stale claims) for this worker by
+    flipping them to 'rendering'; returns their ids.
+
+    Rows another worker is claiming are skipped where the database has row
+    locks; on SQLite the second claimer fails on the lock and retries.
+    """
+    now = timezone.now()
+    claimable = Q(receipt_status='pending') | Q(receipt_status='rendering', receipt_claimed_at__lt=now - RENDER_TIMEOUT)
+    with transaction.atomic():
+        payment_ids = list(
+            Payment.objects.select_for_update(skip_locked=True).filter(claimable)
+            .order_by('payment_date', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        Payment.objects.filter(id__in=payment_ids).update(receipt_status='rendering', receipt_claimed_at=now)
+    return payment_ids
+
+
+def generate_pending_receipts(batch_size=BATCH_SIZE):
+    """
+    Claim and render the receipts of the oldest pending payments.
+
+    A payment whose receipt cannot be rendered is marked failed and logged
+    without holding up the rest of the batch. Returns {'ready', 'failed'}.
+    """
+    payment_ids = claim_pending_payments(batch_size)
+    payments = receipt_payments().filter(id__in=payment_ids).order_by('payment_date', 'id')
+    rendered = []
+    for payment in payments:
+        try:
+            rendered.append((payment.id, render_receipt(receipt_data(payment)), None))
+        except Exception as e:
+            rendered.append((payment.id, None, str(e)))
+
+    ready, failed = _save_rendered({payment.id: payment for payment in payments}, rendered)
+    return {'ready': ready, 'failed': failed}
+
+
+def regenerate_receipts(payments, workers=None, chunk_size=CHUNK_SIZE, batch_size=1000):
+    """
+    Re-render the receipts of `payments` (a queryset) in a process pool.
+
+    Payments are loaded `batch_size` at a time and rendered in chunks of
+    `chunk_size`; storage and database writes stay in this process. Returns a
+    dict with receipts rendered and failed, seconds spent and receipts per
+    minute. A failing receipt (or a chunk whose worker died) marks those
+    payments failed and the run goes on.
+    """
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    payment_ids = list(payments.order_by('id').values_list('id', flat=True))
+    rendered_count = failed_count = 0
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for start in range(0, len(payment_ids), batch_size):
+            batch = {payment.id: payment for payment in receipt_payments().filter(id__in=payment_ids[start:start + batch_size])}
+            receipts = []
+            unreadable = []
+            for payment in batch.values():
+                try:
+                    receipts.append(receipt_data(payment))
+                except Exception as e:
+                    unreadable.append((payment.id, None, str(e)))
+            chunks = [receipts[index:index + chunk_size] for index in range(0, len(receipts), chunk_size)]
+            if unreadable:
+                _, failed = _save_rendered(batch, unreadable)
+                failed_count += failed
+            if executor:
+                pending = [(chunk, executor.submit(render_receipts, chunk)) for chunk in chunks]
+            else:
+                pending = [(chunk, None) for chunk in chunks]
+            for chunk, future in pending:
+                try:
+                    rendered = future.result() if future else render_receipts(chunk)
+                except Exception as e:
+                    rendered = [(receipt['payment_id'], None, str(e)) for receipt in chunk]
+                ready, failed = _save_rendered(batch, rendered)
+                rendered_count += ready
+                failed_count += failed
+            if executor and any(isinstance(future.exception(), BrokenProcessPool) for _, future in pending):
+                # A receipt crashed its worker; later batches need a working pool
+                executor.shutdown()
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        if executor:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'receipts': rendered_count,
+        'failed': failed_count,
+        'seconds': round(elapsed, 3),
+        'receipts_per_minute': round(rendered_count * 60 / elapsed) if elapsed else 0,
+    }
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from admissions.models import FeeStructure as AdmissionFeeStructure
+from .models import FeeStructure
+from .fee_resolver import invalidate_snapshot
+
+
+@receiver(post_save, sender=FeeStructure)
+@receiver(post_delete, sender=FeeStructure)
+@receiver(post_save, sender=AdmissionFeeStructure)
+@receiver(post_delete, sender=AdmissionFeeStructure)
+def invalidate_fee_snapshot(sender, **kwargs):
+    """
+    Any change to a fee table makes the cached fee snapshot stale, once it is
+    committed: a rolled-back change keeps the snapshot, and no reader can
+    rebuild it from rows that are not committed yet.
+    """
+    transaction.on_commit(invalidate_snapshot)
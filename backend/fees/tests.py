@@ -1,3 +1,94 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from schools.models import School
+from users.models import StudentProfile
+from utils.content_storage import store_content_addressed
+from .models import FeeInvoice, FeeStructure, Payment
+from .receipt_service import (
+    RECEIPT_ROOT, RENDER_TIMEOUT, claim_pending_payments, generate_pending_receipts, regenerate_receipts
+)
+
+
+class ReceiptPipelineTests(TestCase):
+    """Each receipt is rendered by one worker and stored once per distinct PDF"""
+
+    PAYMENTS = 3
+
+    def setUp(self):
+        # A storage of its own per test, so stored receipts can be counted
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        school = School.objects.create(
+            district='Test', block='Test', village='Test', school_name='Receipt School', school_code='RECEIPT01'
+        )
+        student = StudentProfile.objects.create(
+            school=school, admission_number='REC-1', roll_number='1', course='Class 10', department='Science',
+            semester=1, date_of_birth=date(2010, 1, 1), address='Test', emergency_contact='0000000000'
+        )
+        structure = FeeStructure.objects.create(
+            school=school, course='Class 10', semester=1, tuition_fee=Decimal('1000'), total_fee=Decimal('1000')
+        )
+        invoice = FeeInvoice.objects.create(
+            invoice_number='INV-1', student=student, fee_structure=structure, amount=Decimal('1000'),
+            due_date=date(2026, 4, 1)
+        )
+        self.payments = [
+            Payment.objects.create(
+                invoice=invoice, transaction_id=f'TXN-{index}', amount=Decimal('250'), payment_method='cash'
+            )
+            for index in range(self.PAYMENTS)
+        ]
+
+    def stored_receipts(self):
+        root = os.path.join(settings.MEDIA_ROOT, RECEIPT_ROOT)
+        return sorted(name for _, _, names in os.walk(root) for name in names)
+
+    def test_claims_never_overlap(self):
+        first = claim_pending_payments(2)
+        second = claim_pending_payments(10)
+        self.assertEqual(first, [payment.id for payment in self.payments[:2]])
+        self.assertEqual(second, [self.payments[2].id])
+        self.assertEqual(claim_pending_payments(10), [])
+
+        # A claim older than the render timeout belongs to a dead worker
+        Payment.objects.filter(id=first[0]).update(receipt_claimed_at=timezone.now() - RENDER_TIMEOUT * 2)
+        self.assertEqual(claim_pending_payments(10), [first[0]])
+
+    def test_pending_receipts_are_rendered_once(self):
+        self.assertEqual(generate_pending_receipts(), {'ready': self.PAYMENTS, 'failed': 0})
+        self.assertEqual(generate_pending_receipts(), {'ready': 0, 'failed': 0})
+
+        for payment in Payment.objects.all():
+            self.assertEqual(payment.receipt_status, 'ready')
+            self.assertTrue(default_storage.exists(payment.receipt_path))
+            self.assertIn(payment.receipt_sha256, payment.receipt_path)
+        self.assertEqual(len(self.stored_receipts()), self.PAYMENTS)
+
+    def test_regenerated_receipts_reuse_the_stored_copy(self):
+        generate_pending_receipts()
+        before = list(Payment.objects.order_by('id').values_list('receipt_path', 'receipt_sha256'))
+        files = self.stored_receipts()
+
+        report = regenerate_receipts(Payment.objects.all(), workers=1)
+        self.assertEqual((report['receipts'], report['failed']), (self.PAYMENTS, 0))
+        self.assertEqual(list(Payment.objects.order_by('id').values_list('receipt_path', 'receipt_sha256')), before)
+        self.assertEqual(self.stored_receipts(), files)
+
+    def test_identical_bytes_are_stored_once(self):
+        path, sha256 = store_content_addressed(RECEIPT_ROOT, b'%PDF receipt')
+        self.assertEqual(store_content_addressed(RECEIPT_ROOT, b'%PDF receipt'), (path, sha256))
+        self.assertNotEqual(store_content_addressed(RECEIPT_ROOT, b'%PDF other')[0], path)
+        self.assertEqual(len(self.stored_receipts()), 2)
@@ -5,6 +5,7 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 # from django_filters.rest_framework import DjangoFilterBackend
+from utils.file_delivery import serve_file
 from .models import FeeStructure, FeeInvoice, Payment
 from .serializers import (
     FeeStructureSerializer, FeeInvoiceSerializer, 
@@ -108,10 +109,13 @@ class FeeInvoiceViewSet(viewsets.ModelViewSet):
         invoice.status = 'paid'
         invoice.save()
         
+        # The receipt is rendered by the `generate_receipts` worker; clients
+        # poll the payment's receipt_status and then download it
         return Response({
             'message': 'Payment successful',
             'payment': PaymentSerializer(payment).data,
-            'invoice': FeeInvoiceSerializer(invoice).data
+            'invoice': FeeInvoiceSerializer(invoice).data,
+            'receipt_status': payment.receipt_status
         })
 
 
@@ -120,3 +124,37 @@ class PaymentViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+        
+        # Students only see their own payments (and receipts)
+        if user.role == 'student':
+            student_profile = getattr(user, 'student_profile', None)
+            queryset = queryset.filter(invoice__student=student_profile) if student_profile else queryset.none()
+        elif user.role == 'parent':
+            parent_profile = getattr(user, 'parent_profile', None)
+            if parent_profile:
+                queryset = queryset.filter(invoice__student__in=parent_profile.children.all())
+            else:
+                queryset = queryset.none()
+        
+        return queryset
+    
+    @action(detail=True, methods=['get'])
+    def receipt(self, request, pk=None):
+        """Download the payment's receipt PDF once the worker has rendered it"""
+        payment = self.get_object()
+        if payment.receipt_status != 'ready' or not payment.receipt_path:
+            return Response(
+                {'error': 'Receipt is not ready yet', 'receipt_status': payment.receipt_status},
+                status=status.HTTP_409_CONFLICT
+            )
+        return serve_file(
+            request,
+            payment.receipt_path,
+            content_type='application/pdf',
+            filename=f'receipt_{payment.transaction_id}.pdf',
+            content_hash=payment.receipt_sha256
+        )
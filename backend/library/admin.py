@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import FinePolicy
 
-# Register your models here.
+
+@admin.register(FinePolicy)
+class FinePolicyAdmin(admin.ModelAdmin):
+    """Admin configuration for per-school library fine rates"""
+    
+    list_display = ['school', 'daily_rate', 'grace_days', 'max_fine', 'updated_at']
+    search_fields = ['school__school_name', 'school__school_code']
@@ -0,0 +1,283 @@
+"""
+Circulation desk: issuing and returning books.
+
+Every change to `Book.available_copies` is one guarded UPDATE: a copy is
+taken only `WHERE available_copies > 0` and returned copies never push the
+count above `total_copies`, so concurrent desks cannot oversubscribe a book
+or drive its inventory negative, whatever they read earlier. A return flips
+the borrow record with a `status = 'borrowed'` guard in the same
+transaction, so a record returned twice puts back one copy. The fine of a
+late return is settled in the same transaction.
+
+A batch of barcodes (ISBNs) for one student runs in a single transaction
+and reports a result per item. Items that fail (unknown barcode, no copy
+left, not borrowed by the student) do not undo the others.
+
+When no copy is left, students can place a hold. Holds of a book form a
+FIFO queue served by the partial index on waiting holds, and
+`Book.hold_queue_length` is kept in step with every change to the queue.
+A returned copy goes to the oldest waiting hold in the return's own
+transaction instead of back on the shelf, and the student is emailed once
+that transaction commits. The copy stays set aside until the student
+checks it out or the pickup window (`LIBRARY_HOLD_PICKUP_DAYS`) passes;
+an expired or cancelled ready hold passes its copy to the next in line.
+"""
+from collections import Counter, defaultdict, deque
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+
+from utils.db import lock_rows, retry_if_locked
+from .email_service import send_hold_ready_email
+from .fine_service import settle_fines
+from .models import Book, BookBorrowRecord, BookHold
+
+LOAN_PERIOD = timedelta(days=14)
+MAX_BATCH_SIZE = 50
+
+
+class CirculationError(Exception):
+    """Raised when a book cannot be issued or returned"""
+
+
+def take_copies(book_id, count=1):
+    """Atomically take `count` copies of a book; False (and nothing taken) if fewer are available"""
+    return bool(
+        Book.objects.filter(id=book_id, available_copies__gte=count)
+        .update(available_copies=F('available_copies') - count)
+    )
+
+
+def put_back_copies(book_id, count=1):
+    """Atomically return `count` copies of a book to the shelf"""
+    Book.objects.filter(id=book_id).update(
+        available_copies=Least(F('available_copies') + count, F('total_copies'))
+    )
+
+
+def claim_hold(book_id, student_id):
+    """Atomically fulfil the student's ready hold on a book; False if there is none"""
+    return bool(
+        BookHold.objects.filter(book_id=book_id, student_id=student_id, status='ready')
+        .update(status='fulfilled', closed_at=timezone.now())
+    )
+
+
+def allocate_copies(book_id, count=1):
+    """
+    Set aside up to `count` returned copies for the oldest waiting holds of a
+    book, emailing their students after commit. Returns the number of copies
+    left over for the shelf.
+    """
+    now = timezone.now()
+    holds = list(
+        BookHold.objects.select_for_update(skip_locked=True)
+        .filter(book_id=book_id, status='waiting')
+        .order_by('created_at', 'id')[:count]
+    )
+    if not holds:
+        return count
+
+    expires_at = now + timedelta(days=int(getattr(settings, 'LIBRARY_HOLD_PICKUP_DAYS', 3)))
+    allocated = BookHold.objects.filter(id__in=[hold.id for hold in holds], status='waiting').update(
+        status='ready', ready_at=now, expires_at=expires_at
+    )
+    Book.objects.filter(id=book_id).update(hold_queue_length=F('hold_queue_length') - allocated)
+    hold_ids = [hold.id for hold in holds]
+    # Robust: a failed email must not look like a failed (and retried) return
+    transaction.on_commit(lambda: _notify_ready_holds(hold_ids), robust=True)
+    return count - allocated
+
+
+def release_copies(book_id, count=1):
+    """
+    Hand returned copies to waiting holds first and put the rest back on the
+    shelf. Returns the number handed to holds.
+    """
+    # Lock the book first, as place_hold does, so a hold placed while the copy
+    # comes back is either seen here or sees the copy on the shelf
+    lock_rows(Book.objects.filter(id=book_id))
+    remaining = allocate_copies(book_id, count)
+    if remaining:
+        put_back_copies(book_id, remaining)
+    return count - remaining
+
+
+def _notify_ready_holds(hold_ids):
+    for hold in BookHold.objects.filter(id__in=hold_ids, status='ready').select_related(
+        'book__school', 'student__user'
+    ):
+        send_hold_ready_email(hold)
+
+
+@retry_if_locked
+def place_hold(book, student):
+    """
+    Queue `student` for a copy of `book`; raises CirculationError if a copy
+    is on the shelf or the student already holds the book.
+    """
+    with transaction.atomic():
+        # Lock the book row so a concurrent return cannot slip a copy onto the shelf unseen
+        lock_rows(Book.objects.filter(id=book.id))
+        book = Book.objects.get(id=book.id)
+        if book.available_copies > 0:
+            raise CirculationError('Copies are available; check the book out instead')
+        if BookHold.objects.filter(book=book, student=student, status__in=BookHold.ACTIVE_STATUSES).exists():
+            raise CirculationError('Student already has a hold on this book')
+        hold = BookHold.objects.create(book=book, student=student)
+        Book.objects.filter(id=book.id).update(hold_queue_length=F('hold_queue_length') + 1)
+    return hold
+
+
+@retry_if_locked
+def cancel_hold(hold):
+    """Cancel an active hold; a copy set aside for it passes to the next hold or the shelf"""
+    with transaction.atomic():
+        if BookHold.objects.filter(id=hold.id, status='waiting').update(status='cancelled', closed_at=timezone.now()):
+            Book.objects.filter(id=hold.book_id).update(hold_queue_length=F('hold_queue_length') - 1)
+        elif BookHold.objects.filter(id=hold.id, status='ready').update(status='cancelled', closed_at=timezone.now()):
+            release_copies(hold.book_id)
+        else:
+            raise CirculationError('Hold is no longer active')
+    hold.status = 'cancelled'
+    return hold
+
+
+@retry_if_locked
+def expire_holds(now=None):
+    """
+    Expire ready holds whose pickup window has passed and pass their copies
+    on. Returns {'expired', 'reallocated'}.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        holds = list(
+            BookHold.objects.select_for_update(skip_locked=True)
+            .filter(status='ready', expires_at__lt=now)
+            .values_list('id', 'book_id')
+        )
+        BookHold.objects.filter(id__in=[hold_id for hold_id, _ in holds], status='ready').update(
+            status='expired', closed_at=now
+        )
+        reallocated = sum(
+            release_copies(book_id, count)
+            for book_id, count in sorted(Counter(book_id for _, book_id in holds).items())
+        )
+    return {'expired': len(holds), 'reallocated': reallocated}
+
+
+@retry_if_locked
+def checkout_book(book, student, issued_by, due_date=None):
+    """
+    Issue one copy of `book` to `student`, the copy set aside for their hold
+    if they have one; raises CirculationError if none is available.
+    """
+    with transaction.atomic():
+        if not claim_hold(book.id, student.id) and not take_copies(book.id):
+            raise CirculationError('No copies available')
+        return BookBorrowRecord.objects.create(
+            book=book,
+            student=student,
+            issued_by=issued_by,
+            due_date=due_date or timezone.localdate() + LOAN_PERIOD
+        )
+
+
+@retry_if_locked
+def checkin_book(record):
+    """Return a borrowed book; raises CirculationError if it is not currently borrowed"""
+    today = timezone.localdate()
+    with transaction.atomic():
+        if not BookBorrowRecord.objects.filter(id=record.id, status='borrowed').update(
+            status='returned', returned_date=today
+        ):
+            raise CirculationError('Book is not currently borrowed')
+        release_copies(record.book_id)
+        if record.due_date < today:
+            settle_fines([record.id], today)
+    record.status = 'returned'
+    record.returned_date = today
+    return record
+
+
+@retry_if_locked
+def checkout_batch(student, barcodes, issued_by, due_date=None):
+    """
+    Issue the books with the given barcodes in the student's school, using
+    the copies set aside for the student's ready holds first.
+
+    A barcode listed twice issues two copies. Returns one result dict per
+    barcode, in request order, with status 'issued' (and the record ID) or
+    'failed' (and the error).
+    """
+    due_date = due_date or timezone.localdate() + LOAN_PERIOD
+    books = {
+        book.isbn: book
+        for book in Book.objects.filter(school_id=student.school_id, isbn__in=set(barcodes))
+    }
+    results = []
+    records = []
+    with transaction.atomic():
+        ready_holds = set(
+            BookHold.objects.filter(student=student, status='ready', book__in=books.values())
+            .values_list('book_id', flat=True)
+        )
+        for barcode in barcodes:
+            book = books.get(barcode)
+            if book is None:
+                results.append({'barcode': barcode, 'status': 'failed', 'error': 'Book not found'})
+            elif not ((book.id in ready_holds and claim_hold(book.id, student.id)) or take_copies(book.id)):
+                results.append({'barcode': barcode, 'status': 'failed', 'error': 'No copies available'})
+            else:
+                ready_holds.discard(book.id)
+                record = BookBorrowRecord(book=book, student=student, issued_by=issued_by, due_date=due_date)
+                records.append(record)
+                results.append({'barcode': barcode, 'status': 'issued', 'book_id': book.id, 'record': record})
+        BookBorrowRecord.objects.bulk_create(records)
+
+    for result in results:
+        record = result.pop('record', None)
+        if record is not None:
+            result['record_id'] = record.id
+            result['due_date'] = due_date
+    return results
+
+
+@retry_if_locked
+def checkin_batch(student, barcodes):
+    """
+    Return the student's borrowed books with the given barcodes, oldest due
+    first when a title was borrowed more than once. Returns one result dict
+    per barcode, in request order, with status 'returned' or 'failed'.
+    """
+    today = timezone.localdate()
+    results = []
+    with transaction.atomic():
+        open_records = defaultdict(deque)
+        for record in BookBorrowRecord.objects.select_for_update(of=('self',)).filter(
+            student=student, status='borrowed', book__isbn__in=set(barcodes)
+        ).select_related('book').order_by('due_date', 'id'):
+            open_records[record.book.isbn].append(record)
+
+        returned = []
+        for barcode in barcodes:
+            if not open_records[barcode]:
+                results.append({'barcode': barcode, 'status': 'failed', 'error': 'Book is not borrowed by this student'})
+                continue
+            record = open_records[barcode].popleft()
+            returned.append(record)
+            results.append({'barcode': barcode, 'status': 'returned', 'book_id': record.book_id, 'record_id': record.id})
+
+        if returned:
+            BookBorrowRecord.objects.filter(
+                id__in=[record.id for record in returned], status='borrowed'
+            ).update(status='returned', returned_date=today)
+            # Books in ID order so concurrent batches lock them in the same order
+            for book_id, count in sorted(Counter(record.book_id for record in returned).items()):
+                release_copies(book_id, count)
+            settle_fines([record.id for record in returned if record.due_date < today], today)
+    return results
@@ -0,0 +1,69 @@
+"""
+Email service for library notifications
+"""
+from django.core.mail import send_mail
+from django.conf import settings
+from django.utils import timezone
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def send_hold_ready_email(hold):
+    """
+    Tell a student that a copy of the book they hold is set aside for them.
+    Students without an account (or email) are skipped.
+    """
+    user = hold.student.user
+    if user is None or not user.email:
+        return False
+    try:
+        book = hold.book
+        pickup_by = timezone.localtime(hold.expires_at).strftime('%d %b %Y, %I:%M %p')
+        subject = f"Ready for pickup: {book.title}"
+
+        html_message = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto; padding: 20px;">
+            <div style="background-color: #eff6ff; padding: 20px; border-radius: 8px; border-left: 4px solid #2563eb;">
+                <h2 style="color: #1d4ed8; margin-bottom: 20px;">Your library hold is ready</h2>
+
+                <p style="color: #374151; font-size: 16px; margin-bottom: 15px;">
+                    Dear {hold.student.full_name},
+                </p>
+
+                <p style="color: #374151; font-size: 16px; margin-bottom: 20px;">
+                    A copy of <strong>{book.title}</strong> by {book.author} has been set aside for you at the
+                    {book.school.school_name} library. Please collect it by <strong>{pickup_by}</strong>,
+                    after which it will go to the next student in the queue.
+                </p>
+            </div>
+        </body>
+        </html>
+        """
+
+        plain_message = f"""
+        Your library hold is ready
+
+        Dear {hold.student.full_name},
+
+        A copy of {book.title} by {book.author} has been set aside for you at the
+        {book.school.school_name} library. Please collect it by {pickup_by},
+        after which it will go to the next student in the queue.
+        """
+
+        send_mail(
+            subject=subject,
+            message=plain_message,
+            from_email=settings.DEFAULT_FROM_EMAIL,
+            recipient_list=[user.email],
+            html_message=html_message,
+            fail_silently=False,
+        )
+
+        logger.info(f"Hold ready email sent to {user.email} for hold {hold.id}")
+        return True
+
+    except Exception as e:
+        logger.error(f"Failed to send hold ready email to {user.email}: {str(e)}")
+        return False
@@ -0,0 +1,164 @@
+"""
+Management command to time catalog search on a large synthetic catalog.
+
+Creates throwaway schools holding a catalog of generated books (1M by
+default, titles and authors drawn from a Zipf-distributed vocabulary, so
+common words match many books), indexing them through the sync triggers as
+they are inserted. Then times prefix, multi-word, misspelt and ISBN searches
+(count plus the first page) against the full-text index, and a sample of the
+same searches with the previous `icontains` filters for comparison. The
+schools and their books are deleted afterwards unless --keep is passed.
+"""
+import string
+import time
+import uuid
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from library.models import Book
+from library.search_service import BookSearch
+from schools.models import School
+
+PAGE_SIZE = 20
+CATEGORIES = ['Fiction', 'Science', 'Mathematics', 'History', 'Geography', 'Biography', 'Reference', 'Poetry']
+PUBLISHERS = ['Pearson', 'Oxford', 'Macmillan', 'Penguin', 'NCERT', 'Arihant', 'S Chand', 'Rupa']
+
+
+class Command(BaseCommand):
+    help = 'Time full-text catalog search against icontains filters on a large synthetic catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=1_000_000, help='Books in the catalog')
+        parser.add_argument('--schools', type=int, default=20, help='Schools the catalog is spread over')
+        parser.add_argument('--queries', type=int, default=50, help='Searches timed per kind')
+        parser.add_argument('--legacy-queries', type=int, default=5, help='Searches timed with icontains filters')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+        parser.add_argument('--keep', action='store_true', help='Keep the generated schools and books')
+
+    def handle(self, *args, **options):
+        if min(options['books'], options['schools'], options['queries']) <= 0:
+            raise CommandError('--books, --schools and --queries must be positive')
+
+        rng = np.random.default_rng(options['seed'])
+        vocabulary = self.vocabulary(rng, 20000)
+        started = time.perf_counter()
+        schools = self.create_fixture(options['books'], options['schools'], vocabulary, rng)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Catalog of {options['books']} books in {options['schools']} schools built and indexed in "
+            f"{elapsed:.1f}s ({options['books'] / elapsed:,.0f} books/s)\n"
+        )
+        try:
+            self.run(schools, rng, options['queries'], options['legacy_queries'])
+        finally:
+            if not options['keep']:
+                for school in schools:
+                    school.delete()
+
+    def vocabulary(self, rng, size):
+        """Distinct pronounceable words, most frequent first"""
+        consonants = list('bcdfghjklmnprstvwy')
+        vowels = list('aeiou')
+        words = set()
+        while len(words) < size:
+            syllables = rng.integers(2, 5)
+            words.add(''.join(rng.choice(consonants) + rng.choice(vowels) for _ in range(syllables)))
+        return sorted(words, key=lambda word: rng.random())
+
+    def create_fixture(self, book_count, school_count, vocabulary, rng):
+        suffix = uuid.uuid4().hex[:8]
+        schools = [
+            School.objects.create(
+                district='BENCHMARK',
+                block=f'Block {index % 8}',
+                village='BENCHMARK',
+                school_name=f'Search Benchmark School {suffix}-{index}',
+                school_code=f'BL{uuid.uuid4().int % 10 ** 8:08d}',
+                is_active=False
+            )
+            for index in range(school_count)
+        ]
+        # Zipf-like word frequencies: a few very common words, a long tail of rare ones
+        weights = 1 / np.arange(1, len(vocabulary) + 1) ** 0.9
+        weights /= weights.sum()
+        batch_size = 5000
+        for start in range(0, book_count, batch_size):
+            count = min(batch_size, book_count - start)
+            title_words = rng.choice(len(vocabulary), size=(count, 4), p=weights)
+            title_lengths = rng.integers(1, 5, count)
+            author_words = rng.choice(len(vocabulary), size=(count, 2), p=weights)
+            Book.objects.bulk_create([
+                Book(
+                    school=schools[(start + offset) % school_count],
+                    isbn=f'978{start + offset:010d}',
+                    title=' '.join(vocabulary[word] for word in title_words[offset, :title_lengths[offset]]).title(),
+                    author=' '.join(vocabulary[word] for word in author_words[offset]).title(),
+                    publisher=PUBLISHERS[(start + offset) % len(PUBLISHERS)],
+                    publication_year=1950 + (start + offset) % 75,
+                    category=CATEGORIES[(start + offset) % len(CATEGORIES)],
+                    total_copies=2,
+                    available_copies=2,
+                    shelf_location=f'R{(start + offset) % 40}'
+                )
+                for offset in range(count)
+            ], batch_size=batch_size)
+        return schools
+
+    def search_samples(self, schools, rng, count):
+        books = list(
+            Book.objects.filter(school__in=schools).order_by('?').values_list('title', 'author', 'isbn')[:count]
+        )
+        letters = string.ascii_lowercase
+        samples = {'prefix': [], 'two words': [], 'misspelt': [], 'isbn prefix': []}
+        for title, author, isbn in books:
+            word = title.split()[0].lower()
+            samples['prefix'].append(word[:4])
+            samples['two words'].append(f"{word} {author.split()[0].lower()[:3]}")
+            position = int(rng.integers(2, len(word)))
+            typo = word[:position] + letters[int(rng.integers(0, 26))] + word[position + 1:]
+            samples['misspelt'].append(typo)
+            samples['isbn prefix'].append(isbn[:10])
+        return samples
+
+    def timed(self, search):
+        started = time.perf_counter()
+        total, page = search()
+        return time.perf_counter() - started, total, len(page)
+
+    def run(self, schools, rng, query_count, legacy_count):
+        samples = self.search_samples(schools, rng, query_count)
+        school_id = schools[0].id
+
+        self.stdout.write(self.style.SUCCESS('Full-text index (count + first page):'))
+        for kind, queries in samples.items():
+            for scope, scope_school in (('all schools', None), ('one school', school_id)):
+                timings, totals = [], []
+                for query in queries:
+                    def search():
+                        results = BookSearch(query, school_id=scope_school)
+                        return results.count(), results[0:PAGE_SIZE]
+                    elapsed, total, _ = self.timed(search)
+                    timings.append(elapsed)
+                    totals.append(total)
+                timings = np.array(timings) * 1000
+                self.stdout.write(
+                    f"- {kind}, {scope}: p50 {np.percentile(timings, 50):.1f}ms, "
+                    f"p95 {np.percentile(timings, 95):.1f}ms, median {int(np.median(totals))} matches"
+                )
+
+        if legacy_count > 0:
+            timings = []
+            for query in samples['prefix'][:legacy_count]:
+                def search():
+                    queryset = Book.objects.filter(
+                        Q(title__icontains=query) | Q(author__icontains=query) | Q(isbn__icontains=query)
+                    ).order_by('title')
+                    return queryset.count(), list(queryset[:PAGE_SIZE])
+                timings.append(self.timed(search)[0])
+            timings = np.array(timings) * 1000
+            self.stdout.write(
+                self.style.SUCCESS('\nPrevious icontains filters (count + first page, prefix searches):') +
+                f"\n- p50 {np.percentile(timings, 50):.1f}ms, max {timings.max():.1f}ms"
+            )
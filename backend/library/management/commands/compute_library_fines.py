@@ -0,0 +1,25 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from library.fine_service import compute_fines
+
+
+class Command(BaseCommand):
+    help = 'Accrue overdue fines on library borrowings and refresh their overdue flags'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Compute fines as of this date (YYYY-MM-DD, default: today)')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = datetime.strptime(options['date'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--date must be a date in YYYY-MM-DD format')
+
+        report = compute_fines(today)
+
+        self.stdout.write(f"- Borrowings updated: {report['updated']}")
+        self.stdout.write(self.style.SUCCESS(f"\nLibrary fines computed in {report['seconds']:.2f}s"))
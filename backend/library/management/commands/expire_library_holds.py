@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from library.circulation_service import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Expire library holds not picked up in time and pass their copies to the next hold in the queue'
+
+    def handle(self, *args, **options):
+        report = expire_holds()
+
+        self.stdout.write(f"- Holds expired: {report['expired']}")
+        self.stdout.write(f"- Copies passed to the next hold: {report['reallocated']}")
+        self.stdout.write(self.style.SUCCESS('\nLibrary holds expired'))
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0003_book_search_index'),
+        ('schools', '0001_initial'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FinePolicy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_rate', models.DecimalField(decimal_places=2, help_text='Fine per day overdue', max_digits=6)),
+                ('grace_days', models.PositiveIntegerField(default=0, help_text='Days after the due date before fines accrue')),
+                ('max_fine', models.DecimalField(blank=True, decimal_places=2, help_text='Cap per borrowing (no cap if empty)', max_digits=8, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'fine policies',
+            },
+        ),
+        migrations.AddField(
+            model_name='bookborrowrecord',
+            name='is_overdue',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='bookborrowrecord',
+            index=models.Index(fields=['status', 'due_date'], name='library_boo_status_c988e3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookborrowrecord',
+            index=models.Index(fields=['student', 'status'], name='library_boo_student_f59f3d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookborrowrecord',
+            index=models.Index(condition=models.Q(('is_overdue', True)), fields=['student'], name='library_borrow_overdue_idx'),
+        ),
+        migrations.AddField(
+            model_name='finepolicy',
+            name='school',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='library_fine_policy', to='schools.school'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 04:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('library', '0004_finepolicy_bookborrowrecord_is_overdue_and_more'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='hold_queue_length',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='BookHold',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('waiting', 'Waiting'), ('ready', 'Ready for pickup'), ('fulfilled', 'Fulfilled'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], default='waiting', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ready_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='holds', to='library.book')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='book_holds', to='users.studentprofile')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'waiting')), fields=['book', 'created_at', 'id'], name='library_hold_queue_idx'), models.Index(condition=models.Q(('status', 'ready')), fields=['expires_at'], name='library_hold_ready_idx'), models.Index(fields=['student', 'status'], name='library_boo_student_b1047b_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['waiting', 'ready'])), fields=('book', 'student'), name='library_hold_one_active_per_student')],
+            },
+        ),
+    ]
@@ -16,6 +16,8 @@ class Book(models.Model):
     total_copies = models.IntegerField()
     available_copies = models.IntegerField()
     shelf_location = models.CharField(max_length=50)
+    # Waiting holds, kept in step by the circulation service so the catalog never counts the queue
+    hold_queue_length = models.PositiveIntegerField(default=0)
     
     class Meta:
         unique_together = ['school', 'isbn']
@@ -45,6 +47,8 @@ class BookBorrowRecord(models.Model):
     returned_date = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='borrowed')
     fine_amount = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    # Set (and fine_amount accrued) by the nightly fine run; cleared on return
+    is_overdue = models.BooleanField(default=False)
     issued_by = models.ForeignKey('users.StaffProfile', on_delete=models.CASCADE)
     
     class Meta:
@@ -52,6 +56,9 @@ class BookBorrowRecord(models.Model):
             models.Index(fields=['book', 'student']),
             models.Index(fields=['borrowed_date', 'status']),
             models.Index(fields=['due_date', 'status']),
+            models.Index(fields=['status', 'due_date']),
+            models.Index(fields=['student', 'status']),
+            models.Index(fields=['student'], condition=models.Q(is_overdue=True), name='library_borrow_overdue_idx'),
         ]
     
     def save(self, *args, **kwargs):
@@ -61,3 +68,69 @@ class BookBorrowRecord(models.Model):
     
     def __str__(self):
         return f"{self.book.title} - {self.student.user.full_name} [{self.book.school.school_name}]"
+
+
+class FinePolicy(models.Model):
+    """Overdue fine rates of one school's library (settings defaults apply to other schools)"""
+    school = models.OneToOneField('schools.School', on_delete=models.CASCADE, related_name='library_fine_policy')
+    daily_rate = models.DecimalField(max_digits=6, decimal_places=2, help_text="Fine per day overdue")
+    grace_days = models.PositiveIntegerField(default=0, help_text="Days after the due date before fines accrue")
+    max_fine = models.DecimalField(
+        max_digits=8, decimal_places=2, null=True, blank=True, help_text="Cap per borrowing (no cap if empty)"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = 'fine policies'
+    
+    def __str__(self):
+        return f"Rs. {self.daily_rate}/day after {self.grace_days} days [{self.school.school_name}]"
+
+
+class BookHold(models.Model):
+    """
+    A student's place in the queue for a title with no copies on the shelf.
+    Holds are served first come, first served when copies are returned.
+    """
+    
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        ('ready', 'Ready for pickup'),
+        ('fulfilled', 'Fulfilled'),
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
+    ]
+    ACTIVE_STATUSES = ['waiting', 'ready']
+    
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='holds')
+    student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE, related_name='book_holds')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Set when a returned copy is set aside for the hold; it is released again after expires_at
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['book', 'student'],
+                condition=models.Q(status__in=['waiting', 'ready']),
+                name='library_hold_one_active_per_student'
+            ),
+        ]
+        indexes = [
+            # The queue: the next hold of a book is the first entry of this index
+            models.Index(
+                fields=['book', 'created_at', 'id'],
+                condition=models.Q(status='waiting'),
+                name='library_hold_queue_idx'
+            ),
+            models.Index(
+                fields=['expires_at'], condition=models.Q(status='ready'), name='library_hold_ready_idx'
+            ),
+            models.Index(fields=['student', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.book.title} - {self.student} ({self.status})"
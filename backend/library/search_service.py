@@ -0,0 +1,286 @@
+"""
+Full-text search over the library catalog.
+
+SQLite keeps an external-content FTS5 table, `library_book_fts`, over title,
+author, ISBN, category and publisher (plus the school ID as a token, so the
+school filter is part of the index lookup). Triggers on `library_book` keep
+it in sync, including bulk inserts and queryset updates that send no
+signals. A table rebuild by a later migration drops the triggers;
+`ensure_search_index` runs after every migrate and puts them back.
+
+PostgreSQL keeps a stored generated `tsvector` column with a GIN index
+(always in sync, no triggers) and a pg_trgm index for typo tolerance.
+
+Every query word matches as a prefix ("harr pot" finds "Harry Potter").
+On SQLite a word that is not the start of any indexed term is replaced by
+the closest indexed terms (edit distance 1, or 2 for longer words) that
+share its first two letters; on PostgreSQL a search with no full-text match
+falls back to trigram word similarity. Results are ranked by relevance, a
+title match counting most, then ISBN, author, category and publisher.
+"""
+import re
+
+from django.db import connection
+
+from .models import Book
+
+MAX_TERMS = 8
+MAX_CORRECTIONS = 3
+# Relevance weights: title, author, isbn, category, publisher, school_id
+BM25_WEIGHTS = '10.0, 6.0, 8.0, 2.0, 1.0, 0.0'
+TEXT_COLUMNS = '{title author isbn category publisher}'
+
+SQLITE_INDEX_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS library_book_fts USING fts5(
+        title, author, isbn, category, publisher, school_id,
+        content='library_book', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS library_book_fts_vocab USING fts5vocab(library_book_fts, 'row')",
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_insert AFTER INSERT ON library_book BEGIN
+        INSERT INTO library_book_fts(rowid, title, author, isbn, category, publisher, school_id)
+        VALUES (new.id, new.title, new.author, new.isbn, new.category, new.publisher, new.school_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_delete AFTER DELETE ON library_book BEGIN
+        INSERT INTO library_book_fts(library_book_fts, rowid, title, author, isbn, category, publisher, school_id)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.publisher, old.school_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS library_book_fts_update
+    AFTER UPDATE OF title, author, isbn, category, publisher, school_id ON library_book BEGIN
+        INSERT INTO library_book_fts(library_book_fts, rowid, title, author, isbn, category, publisher, school_id)
+        VALUES ('delete', old.id, old.title, old.author, old.isbn, old.category, old.publisher, old.school_id);
+        INSERT INTO library_book_fts(rowid, title, author, isbn, category, publisher, school_id)
+        VALUES (new.id, new.title, new.author, new.isbn, new.category, new.publisher, new.school_id);
+    END
+    """,
+]
+SQLITE_TRIGGERS = ('library_book_fts_insert', 'library_book_fts_delete', 'library_book_fts_update')
+
+POSTGRES_INDEX_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    ALTER TABLE library_book ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(isbn, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(author, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'C') ||
+        setweight(to_tsvector('simple', coalesce(publisher, '')), 'D')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS library_book_search_idx ON library_book USING gin (search_vector)",
+    """
+    CREATE INDEX IF NOT EXISTS library_book_trgm_idx
+    ON library_book USING gin ((lower(title || ' ' || author)) gin_trgm_ops)
+    """,
+]
+
+
+def create_search_index(schema_editor):
+    """Create the search index for the current database and index existing books"""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for sql in SQLITE_INDEX_SQL:
+            schema_editor.execute(sql)
+        schema_editor.execute("INSERT INTO library_book_fts(library_book_fts) VALUES ('rebuild')")
+    elif vendor == 'postgresql':
+        for sql in POSTGRES_INDEX_SQL:
+            schema_editor.execute(sql)
+
+
+def drop_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for trigger in SQLITE_TRIGGERS:
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+        schema_editor.execute('DROP TABLE IF EXISTS library_book_fts_vocab')
+        schema_editor.execute('DROP TABLE IF EXISTS library_book_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS library_book_trgm_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS library_book_search_idx')
+        schema_editor.execute('ALTER TABLE library_book DROP COLUMN IF EXISTS search_vector')
+
+
+def ensure_search_index(using='default'):
+    """
+    Recreate the SQLite sync triggers if a table rebuild dropped them, and
+    re-index so writes made without them are searchable. Returns True if
+    the index was repaired.
+    """
+    from django.db import connections
+
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return False
+    with db.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'library_book_fts'")
+        if cursor.fetchone() is None:
+            return False  # library migrations not applied yet
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'library_book' "
+            "AND name IN (%s, %s, %s)",
+            list(SQLITE_TRIGGERS)
+        )
+        if cursor.fetchone()[0] == len(SQLITE_TRIGGERS):
+            return False
+    with db.schema_editor() as schema_editor:
+        create_search_index(schema_editor)
+    return True
+
+
+def search_terms(text):
+    """Lower-cased words of a search string (at most MAX_TERMS)"""
+    return re.findall(r'\w+', text.lower())[:MAX_TERMS]
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def edit_distance(a, b, limit):
+    """Optimal string alignment distance between a and b, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return previous[-1]
+
+
+def _next_prefix(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+class BookSearch:
+    """
+    Ranked search results for Django's Paginator (and so DRF pagination).
+
+    `count()` and slicing each run one ranked query against the index with
+    LIMIT/OFFSET, returning `Book` instances in relevance order.
+    """
+
+    ordered = True
+
+    def __init__(self, text, school_id=None):
+        self.terms = search_terms(text)
+        self.school_id = int(school_id) if school_id else None
+        self._query = None
+        self._count = None
+
+    def _sqlite_term(self, cursor, term):
+        """MATCH expression for one word: itself as a prefix, or its closest indexed spellings"""
+        cursor.execute(
+            'SELECT 1 FROM library_book_fts_vocab WHERE term >= %s AND term < %s LIMIT 1',
+            [term, _next_prefix(term)]
+        )
+        if cursor.fetchone() or len(term) < 4:
+            return f'{_quote(term)}*'
+
+        limit = 1 if len(term) < 8 else 2
+        cursor.execute(
+            'SELECT term, doc FROM library_book_fts_vocab '
+            'WHERE term >= %s AND term < %s AND length(term) BETWEEN %s AND %s',
+            [term[:2], _next_prefix(term[:2]), len(term) - limit, len(term) + limit]
+        )
+        candidates = []
+        for candidate, documents in cursor.fetchall():
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit:
+                candidates.append((distance, -documents, candidate))
+        if not candidates:
+            return f'{_quote(term)}*'
+        corrections = [candidate for *_, candidate in sorted(candidates)[:MAX_CORRECTIONS]]
+        return '(' + ' OR '.join(_quote(candidate) for candidate in corrections) + ')'
+
+    def _sqlite_query(self):
+        with connection.cursor() as cursor:
+            terms = [self._sqlite_term(cursor, term) for term in self.terms]
+        match = f"{TEXT_COLUMNS} : ({' AND '.join(terms)})"
+        if self.school_id:
+            match += f' AND school_id : "{self.school_id}"'
+        count_sql = 'SELECT COUNT(*) FROM library_book_fts WHERE library_book_fts MATCH %s'
+        page_sql = (
+            f'SELECT rowid FROM library_book_fts WHERE library_book_fts MATCH %s '
+            f'ORDER BY bm25(library_book_fts, {BM25_WEIGHTS}), rowid LIMIT %s OFFSET %s'
+        )
+        return count_sql, [match], page_sql, [match]
+
+    def _postgres_query(self):
+        school_filter = ' AND school_id = %s' if self.school_id else ''
+        school_params = [self.school_id] if self.school_id else []
+        tsquery = ' & '.join(f'{term}:*' for term in self.terms)
+        count_sql = f"SELECT COUNT(*) FROM library_book WHERE search_vector @@ to_tsquery('simple', %s){school_filter}"
+        with connection.cursor() as cursor:
+            cursor.execute(count_sql, [tsquery] + school_params)
+            self._count = cursor.fetchone()[0]
+        if self._count:
+            page_sql = (
+                f"SELECT id FROM library_book WHERE search_vector @@ to_tsquery('simple', %s){school_filter} "
+                f"ORDER BY ts_rank_cd(search_vector, to_tsquery('simple', %s)) DESC, id LIMIT %s OFFSET %s"
+            )
+            return count_sql, [tsquery] + school_params, page_sql, [tsquery] + school_params + [tsquery]
+
+        # No full-text match: fall back to trigram word similarity for misspellings
+        text = ' '.join(self.terms)
+        where = f"%s <%% lower(title || ' ' || author){school_filter}"
+        count_sql = f'SELECT COUNT(*) FROM library_book WHERE {where}'
+        page_sql = (
+            f"SELECT id FROM library_book WHERE {where} "
+            f"ORDER BY word_similarity(%s, lower(title || ' ' || author)) DESC, id LIMIT %s OFFSET %s"
+        )
+        self._count = None
+        return count_sql, [text] + school_params, page_sql, [text] + school_params + [text]
+
+    def _prepare(self):
+        if self._query is None:
+            if not self.terms:
+                self._query = (None, [], None, [])
+            elif connection.vendor == 'postgresql':
+                self._query = self._postgres_query()
+            else:
+                self._query = self._sqlite_query()
+        return self._query
+
+    def count(self):
+        if self._count is None:
+            count_sql, count_params, _, _ = self._prepare()
+            if count_sql is None:
+                self._count = 0
+            elif self._count is None:
+                with connection.cursor() as cursor:
+                    cursor.execute(count_sql, count_params)
+                    self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start = index.start or 0
+        stop = index.stop if index.stop is not None else self.count()
+        _, _, page_sql, params = self._prepare()
+        if page_sql is None or stop <= start:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(page_sql, params + [stop - start, start])
+            ids = [row[0] for row in cursor.fetchall()]
+        books = Book.objects.in_bulk(ids)
+        return [books[book_id] for book_id in ids if book_id in books]
@@ -1,14 +1,45 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Book, BookBorrowRecord
+from .circulation_service import MAX_BATCH_SIZE, release_copies, take_copies
+from .models import Book, BookBorrowRecord, BookHold
 from users.serializers import StudentProfileSerializer, StaffProfileSerializer
 
 
 class BookSerializer(serializers.ModelSerializer):
-    """Serializer for Book model"""
+    """
+    Serializer for Book model. Copies on the shelf follow `total_copies`:
+    added copies go to waiting holds first, and only copies on the shelf can
+    be removed.
+    """
     
     class Meta:
         model = Book
         fields = '__all__'
+        # Maintained by the circulation service as books are issued, returned and held
+        read_only_fields = ['available_copies', 'hold_queue_length']
+    
+    def validate_total_copies(self, value):
+        if value < 0:
+            raise serializers.ValidationError('Total copies cannot be negative')
+        return value
+    
+    def create(self, validated_data):
+        validated_data['available_copies'] = validated_data['total_copies']
+        return super().create(validated_data)
+    
+    def update(self, instance, validated_data):
+        added = validated_data.get('total_copies', instance.total_copies) - instance.total_copies
+        with transaction.atomic():
+            if added < 0 and not take_copies(instance.id, -added):
+                raise serializers.ValidationError({'total_copies': 'Only copies on the shelf can be removed'})
+            for field, value in validated_data.items():
+                setattr(instance, field, value)
+            # Only the edited fields, so the circulation counters are never overwritten with stale values
+            instance.save(update_fields=list(validated_data))
+            if added > 0:
+                release_copies(instance.id, added)
+        instance.refresh_from_db(fields=['available_copies', 'hold_queue_length'])
+        return instance
 
 
 class BookBorrowRecordSerializer(serializers.ModelSerializer):
@@ -19,19 +50,12 @@ class BookBorrowRecordSerializer(serializers.ModelSerializer):
     student_name = serializers.CharField(source='student.user.get_full_name', read_only=True)
     student_admission_number = serializers.CharField(source='student.admission_number', read_only=True)
     issued_by_name = serializers.CharField(source='issued_by.user.get_full_name', read_only=True)
-    is_overdue = serializers.SerializerMethodField()
     
     class Meta:
         model = BookBorrowRecord
         fields = '__all__'
-        read_only_fields = ['borrowed_date']
-    
-    def get_is_overdue(self, obj):
-        """Check if the book is overdue"""
-        if obj.status == 'borrowed' and obj.due_date:
-            from django.utils import timezone
-            return obj.due_date < timezone.now().date()
-        return False
+        # Overdue flag and fine are maintained by the fine engine (library/fine_service.py)
+        read_only_fields = ['borrowed_date', 'is_overdue', 'fine_amount']
 
 
 class BookBorrowRecordDetailSerializer(BookBorrowRecordSerializer):
@@ -41,4 +65,26 @@ class BookBorrowRecordDetailSerializer(BookBorrowRecordSerializer):
     issued_by = StaffProfileSerializer(read_only=True)
     
     class Meta(BookBorrowRecordSerializer.Meta):
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+
+class BookHoldSerializer(serializers.ModelSerializer):
+    """Serializer for BookHold model"""
+    book_title = serializers.CharField(source='book.title', read_only=True)
+    book_isbn = serializers.CharField(source='book.isbn', read_only=True)
+    student_name = serializers.CharField(source='student.full_name', read_only=True)
+    student_admission_number = serializers.CharField(source='student.admission_number', read_only=True)
+    
+    class Meta:
+        model = BookHold
+        fields = '__all__'
+        read_only_fields = ['student', 'status', 'created_at', 'ready_at', 'expires_at', 'closed_at']
+
+
+class CirculationBatchSerializer(serializers.Serializer):
+    """Barcodes (ISBNs) checked out or returned for one student at the desk"""
+    student_id = serializers.IntegerField()
+    barcodes = serializers.ListField(
+        child=serializers.CharField(max_length=13), allow_empty=False, max_length=MAX_BATCH_SIZE
+    )
+    due_date = serializers.DateField(required=False)
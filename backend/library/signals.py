@@ -0,0 +1,28 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_migrate
+from django.dispatch import receiver
+
+from .circulation_service import release_copies
+from .models import Book, BookHold
+from .search_service import ensure_search_index
+
+
+@receiver(post_migrate)
+def repair_search_index(sender, using='default', **kwargs):
+    """Migrations that rebuild library_book on SQLite drop the search triggers; put them back"""
+    if sender.name == 'library':
+        ensure_search_index(using)
+
+
+@receiver(post_delete, sender=BookHold)
+def release_deleted_hold(sender, instance, **kwargs):
+    """
+    Holds deleted with their student or book leave the queue: a waiting one
+    comes off the book's queue length, a ready one passes its copy on.
+    """
+    if instance.status == 'waiting':
+        Book.objects.filter(id=instance.book_id, hold_queue_length__gt=0).update(
+            hold_queue_length=F('hold_queue_length') - 1
+        )
+    elif instance.status == 'ready':
+        release_copies(instance.book_id)
@@ -1,3 +1,496 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.db import OperationalError, close_old_connections, connection, models
+from django.db.models import Q
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+
+from .circulation_service import (
+    cancel_hold, checkin_batch, checkin_book, checkout_batch, checkout_book, expire_holds, place_hold, CirculationError
+)
+from .fine_service import compute_fines
+from .models import Book, BookBorrowRecord, BookHold, FinePolicy
+from .search_service import SQLITE_TRIGGERS, BookSearch, ensure_search_index
+from .serializers import BookSerializer
+
+
+def run_concurrently(worker, count):
+    """Run worker(index) in `count` threads released together; returns their results"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+
+    def run(index):
+        try:
+            barrier.wait()
+            results[index] = worker(index)
+        finally:
+            close_old_connections()
+            connection.close()
+
+    threads = [threading.Thread(target=run, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def retry_locked(operation):
+    """SQLite reports a concurrent writer as a lock error instead of waiting; retry like a client would"""
+    while True:
+        try:
+            return operation()
+        except OperationalError as error:
+            if 'locked' not in str(error):
+                raise
+            time.sleep(0.001)
+
+
+class LibraryFixtureMixin:
+    """A school with a librarian, students and one book of COPIES copies"""
+
+    STUDENTS = 16
+    COPIES = 5
+
+    def setUp(self):
+        self.school = School.objects.create(
+            district='Test', block='Test', village='Test', school_name='Circulation School', school_code='CIRC001'
+        )
+        user = User.objects.create_user(
+            username='librarian', email='librarian@test.local', password='test', role='staff', school=self.school
+        )
+        self.librarian = StaffProfile.objects.create(
+            user=user, employee_id='LIB001', department='Library', designation='Librarian', date_of_joining=date.today()
+        )
+        self.students = StudentProfile.objects.bulk_create([
+            StudentProfile(
+                school=self.school,
+                admission_number=f'CIRC{index:03d}',
+                roll_number=str(index),
+                course='Class 10',
+                department='Science',
+                semester=1,
+                date_of_birth=date(2010, 1, 1),
+                address='Test',
+                emergency_contact='0000000000'
+            )
+            for index in range(self.STUDENTS)
+        ])
+        self.book = Book.objects.create(
+            school=self.school,
+            isbn='9780000000001',
+            title='Concurrency in Practice',
+            author='Test Author',
+            publisher='Test',
+            publication_year=2020,
+            category='Computing',
+            total_copies=self.COPIES,
+            available_copies=self.COPIES,
+            shelf_location='A1'
+        )
+
+
+class CirculationStressTest(LibraryFixtureMixin, TransactionTestCase):
+    """Concurrent desks must never oversubscribe a book or drive its inventory negative"""
+
+    THREADS = 16
+
+    def test_concurrent_checkouts_never_oversubscribe(self):
+        def checkout(index):
+            try:
+                return retry_locked(lambda: checkout_book(self.book, self.students[index], self.librarian)) is not None
+            except CirculationError:
+                return False
+
+        results = run_concurrently(checkout, self.THREADS)
+
+        self.book.refresh_from_db()
+        self.assertEqual(sum(results), self.COPIES)
+        self.assertEqual(self.book.available_copies, 0)
+        self.assertEqual(BookBorrowRecord.objects.filter(book=self.book, status='borrowed').count(), self.COPIES)
+
+    def test_concurrent_batch_checkouts_and_returns_keep_inventory_in_bounds(self):
+        # Every desk asks for two copies of the same title at once
+        results = run_concurrently(
+            lambda index: retry_locked(
+                lambda: checkout_batch(self.students[index], [self.book.isbn, self.book.isbn], self.librarian)
+            ),
+            self.THREADS
+        )
+        issued = sum(1 for batch in results for item in batch if item['status'] == 'issued')
+
+        self.book.refresh_from_db()
+        self.assertEqual(issued, self.COPIES)
+        self.assertEqual(self.book.available_copies, 0)
+
+        # Two desks return each loan at the same time; only one return counts
+        records = list(BookBorrowRecord.objects.filter(book=self.book, status='borrowed'))
+
+        def checkin(index):
+            try:
+                retry_locked(lambda: checkin_book(records[index // 2]))
+                return True
+            except CirculationError:
+                return False
+
+        returned = run_concurrently(checkin, 2 * len(records))
+
+        self.book.refresh_from_db()
+        self.assertEqual(sum(returned), len(records))
+        self.assertEqual(self.book.available_copies, self.COPIES)
+        self.assertFalse(BookBorrowRecord.objects.filter(book=self.book, status='borrowed').exists())
+
+    def test_concurrent_returns_serve_the_hold_queue_in_order(self):
+        records = [checkout_book(self.book, self.students[index], self.librarian) for index in range(self.COPIES)]
+        waiting = self.students[self.COPIES:self.COPIES + 3]
+        holds = [place_hold(self.book, student) for student in waiting]
+        with self.assertRaises(CirculationError):
+            place_hold(self.book, waiting[0])
+
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.hold_queue_length, len(holds))
+
+        # Every loan is returned at the same time, once singly and once in a batch
+        def checkin(index):
+            record = records[index // 2]
+            try:
+                if index % 2:
+                    return retry_locked(lambda: checkin_batch(record.student, [self.book.isbn]))[0]['status'] == 'returned'
+                retry_locked(lambda: checkin_book(record))
+                return True
+            except CirculationError:
+                return False
+
+        returned = run_concurrently(checkin, 2 * len(records))
+
+        self.book.refresh_from_db()
+        self.assertEqual(sum(returned), len(records))
+        self.assertEqual(self.book.hold_queue_length, 0)
+        self.assertEqual(self.book.available_copies, self.COPIES - len(holds))
+        self.assertEqual(
+            list(BookHold.objects.filter(book=self.book).order_by('created_at', 'id').values_list('status', flat=True)),
+            ['ready'] * len(holds)
+        )
+
+        # The copy set aside for a hold is issued without touching the shelf
+        checkout_book(self.book, waiting[0], self.librarian)
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.available_copies, self.COPIES - len(holds))
+        self.assertEqual(BookHold.objects.get(id=holds[0].id).status, 'fulfilled')
+
+
+class BookHoldTest(LibraryFixtureMixin, TestCase):
+    """Cancelling, expiring and deleting holds keep the queue and the shelf in step"""
+
+    def setUp(self):
+        super().setUp()
+        self.records = [
+            checkout_book(self.book, self.students[index], self.librarian) for index in range(self.COPIES)
+        ]
+        self.waiting = self.students[self.COPIES:self.COPIES + 3]
+        self.holds = [place_hold(self.book, student) for student in self.waiting]
+
+    def assertBook(self, available, queue_length):
+        self.book.refresh_from_db()
+        self.assertEqual((self.book.available_copies, self.book.hold_queue_length), (available, queue_length))
+
+    def statuses(self):
+        return list(BookHold.objects.filter(id__in=[hold.id for hold in self.holds]).order_by('id').values_list('status', flat=True))
+
+    def test_cancelling_a_waiting_hold_leaves_the_queue(self):
+        cancel_hold(self.holds[0])
+        self.assertBook(0, 2)
+        with self.assertRaises(CirculationError):
+            cancel_hold(self.holds[0])
+
+        checkin_book(self.records[0])
+        self.assertEqual(self.statuses(), ['cancelled', 'ready', 'waiting'])
+        self.assertBook(0, 1)
+
+    def test_cancelling_a_ready_hold_passes_the_copy_on(self):
+        checkin_book(self.records[0])
+        self.assertEqual(self.statuses(), ['ready', 'waiting', 'waiting'])
+
+        cancel_hold(self.holds[0])
+        self.assertEqual(self.statuses(), ['cancelled', 'ready', 'waiting'])
+        self.assertBook(0, 1)
+
+    def test_expired_holds_pass_their_copies_on_then_to_the_shelf(self):
+        checkin_batch(self.students[0], [self.book.isbn])
+        checkin_batch(self.students[1], [self.book.isbn])
+        self.assertEqual(expire_holds()['expired'], 0)
+
+        later = timezone.now() + timedelta(days=30)
+        self.assertEqual(expire_holds(later), {'expired': 2, 'reallocated': 1})
+        self.assertEqual(self.statuses(), ['expired', 'expired', 'ready'])
+        self.assertBook(1, 0)
+
+        self.assertEqual(expire_holds(later + timedelta(days=30)), {'expired': 1, 'reallocated': 0})
+        self.assertBook(2, 0)
+
+    def test_ready_hold_is_fulfilled_by_checkout(self):
+        checkin_book(self.records[0])
+        result = checkout_batch(self.waiting[0], [self.book.isbn], self.librarian)
+        self.assertEqual(result[0]['status'], 'issued')
+        self.assertEqual(self.statuses(), ['fulfilled', 'waiting', 'waiting'])
+        self.assertBook(0, 2)
+
+    def test_deleting_students_keeps_the_queue_in_step(self):
+        checkin_book(self.records[0])
+        self.waiting[1].delete()
+        self.assertBook(0, 1)
+
+        # The copy set aside for a deleted student goes to the next hold
+        self.waiting[0].delete()
+        self.assertEqual(BookHold.objects.get(id=self.holds[2].id).status, 'ready')
+        self.assertBook(0, 0)
+
+    def test_copies_added_to_the_catalog_serve_the_queue_first(self):
+        serializer = BookSerializer(self.book, data={'total_copies': self.COPIES + 4}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        serializer.save()
+        self.assertEqual(self.statuses(), ['ready', 'ready', 'ready'])
+        self.assertBook(1, 0)
+
+        # Copies on loan or set aside for holds cannot be removed
+        serializer = BookSerializer(self.book, data={'total_copies': 1}, partial=True)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.assertBook(1, 0)
+
+
+@override_settings(LIBRARY_FINE_DAILY_RATE='0.50', LIBRARY_FINE_GRACE_DAYS=1)
+class FineComputationTest(LibraryFixtureMixin, TestCase):
+    """Fines follow each school's policy (or the settings defaults) and track the overdue flag"""
+
+    TODAY = date(2026, 3, 31)
+
+    def setUp(self):
+        super().setUp()
+        self.policy = FinePolicy.objects.create(
+            school=self.school, daily_rate=Decimal('2.00'), grace_days=3, max_fine=Decimal('50.00')
+        )
+
+    def borrow(self, index, days_overdue, **fields):
+        return BookBorrowRecord.objects.create(
+            book=self.book,
+            student=self.students[index],
+            due_date=self.TODAY - timedelta(days=days_overdue),
+            issued_by=self.librarian,
+            **fields
+        )
+
+    def assertFine(self, record, fine, overdue):
+        record.refresh_from_db()
+        self.assertEqual((record.fine_amount, record.is_overdue), (Decimal(fine), overdue))
+
+    def test_no_fine_within_the_grace_period(self):
+        within = self.borrow(0, 3)
+        after = self.borrow(1, 4)
+        not_due = self.borrow(2, 0)
+
+        compute_fines(self.TODAY)
+
+        self.assertFine(within, '0.00', True)
+        self.assertFine(after, '2.00', True)
+        self.assertFine(not_due, '0.00', False)
+
+    def test_fine_is_capped_by_the_school_policy(self):
+        record = self.borrow(0, 40)
+        compute_fines(self.TODAY)
+        self.assertFine(record, '50.00', True)
+
+        # Without a cap the fine keeps accruing
+        self.policy.max_fine = None
+        self.policy.save()
+        compute_fines(self.TODAY)
+        self.assertFine(record, '74.00', True)
+
+    def test_schools_without_a_policy_use_the_settings_defaults(self):
+        self.policy.delete()
+        record = self.borrow(0, 10)
+        compute_fines(self.TODAY)
+        self.assertFine(record, '4.50', True)
+
+    def test_returned_late_rows_are_fined_up_to_the_return_date(self):
+        record = self.borrow(
+            0, 10, status='returned', returned_date=self.TODAY - timedelta(days=2), is_overdue=True
+        )
+        compute_fines(self.TODAY)
+        self.assertFine(record, '10.00', False)
+
+        # A later run does not accrue past the return date or pick the row up again
+        self.assertEqual(compute_fines(self.TODAY + timedelta(days=7))['updated'], 0)
+        self.assertFine(record, '10.00', False)
+
+    def test_checkin_settles_the_fine(self):
+        today = timezone.localdate()
+        record = BookBorrowRecord.objects.create(
+            book=self.book,
+            student=self.students[0],
+            due_date=today - timedelta(days=5),
+            issued_by=self.librarian,
+            is_overdue=True
+        )
+        checkin_book(record)
+        self.assertFine(record, '4.00', False)
+
+    def test_rows_no_longer_overdue_are_cleared(self):
+        renewed = self.borrow(0, 10)
+        compute_fines(self.TODAY)
+        self.assertFine(renewed, '14.00', True)
+
+        # Renewed past today: no longer overdue, so the flag and fine are cleared
+        BookBorrowRecord.objects.filter(id=renewed.id).update(due_date=self.TODAY + timedelta(days=7))
+        self.assertEqual(compute_fines(self.TODAY)['updated'], 1)
+        self.assertFine(renewed, '0.00', False)
+
+
+class SearchFixtureMixin:
+    """Two schools' catalogs, bulk-created so only the index triggers keep the search table in step"""
+
+    BOOKS = [
+        # school, isbn, title, author, category, publisher
+        ('north', '9780747532699', "Harry Potter and the Philosopher's Stone", 'J. K. Rowling', 'Fantasy', 'Bloomsbury'),
+        ('north', '9780262033848', 'Introduction to Algorithms', 'Thomas Cormen', 'Computing', 'MIT Press'),
+        ('north', '9780262518802', 'Algorithms Unlocked', 'Thomas Cormen', 'Computing', 'MIT Press'),
+        ('north', '9781000000001', 'Garden Design', 'Ann Green', 'Hobbies', 'Potter Press'),
+        ('south', '9780747538493', 'Harry Potter and the Chamber of Secrets', 'J. K. Rowling', 'Fantasy', 'Bloomsbury'),
+    ]
+
+    def setUp(self):
+        self.schools = {
+            name: School.objects.create(
+                district='Test', block='Test', village='Test',
+                school_name=f'{name.title()} School', school_code=f'SEARCH-{name.upper()}'
+            )
+            for name in ('north', 'south')
+        }
+        Book.objects.bulk_create([
+            Book(
+                school=self.schools[school], isbn=isbn, title=title, author=author, category=category,
+                publisher=publisher, publication_year=2000, total_copies=1, available_copies=1, shelf_location='A1'
+            )
+            for school, isbn, title, author, category, publisher in self.BOOKS
+        ])
+
+    def search(self, text, school='north'):
+        return [book.title for book in BookSearch(text, school_id=self.schools[school].id)[:20]]
+
+
+class BookSearchTest(SearchFixtureMixin, TestCase):
+    """Catalog search: prefixes, typos, ranking and school scoping"""
+
+    def setUp(self):
+        super().setUp()
+        self.staff_user = User.objects.create_user(
+            username='search-staff', email='search-staff@test.local', password='test',
+            role='staff', school=self.schools['north']
+        )
+        self.superuser = User.objects.create_superuser(
+            username='search-admin', email='search-admin@test.local', password='test'
+        )
+
+    def get_titles(self, user, **params):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get('/api/v1/library/books/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [book['title'] for book in response.data['results']]
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.search('harr pot'), ["Harry Potter and the Philosopher's Stone"])
+        self.assertEqual(sorted(self.search('algo')), ['Algorithms Unlocked', 'Introduction to Algorithms'])
+        self.assertEqual(self.search('9780262033'), ['Introduction to Algorithms'])
+        self.assertEqual(self.search('algo potter'), [])
+
+    def test_title_matches_rank_first(self):
+        self.assertEqual(self.search('potter'), ["Harry Potter and the Philosopher's Stone", 'Garden Design'])
+
+    def test_misspelt_words_are_corrected(self):
+        self.assertEqual(sorted(self.search('algoritms')), ['Algorithms Unlocked', 'Introduction to Algorithms'])
+        self.assertEqual(self.search('rowlng'), ["Harry Potter and the Philosopher's Stone"])
+        self.assertEqual(self.search('cormen unlokced'), ['Algorithms Unlocked'])
+        self.assertEqual(self.search('zzzzzz'), [])
+
+    def test_staff_only_search_their_school(self):
+        self.assertEqual(self.get_titles(self.staff_user, search='harry'), ["Harry Potter and the Philosopher's Stone"])
+        # ?school= is ignored for staff
+        south = self.schools['south'].id
+        self.assertEqual(
+            self.get_titles(self.staff_user, search='harry', school=south),
+            ["Harry Potter and the Philosopher's Stone"]
+        )
+        self.assertEqual(len(self.get_titles(self.staff_user)), 4)
+
+    def test_superusers_search_every_school_or_pick_one(self):
+        self.assertEqual(len(self.get_titles(self.superuser, search='harry')), 2)
+        self.assertEqual(
+            self.get_titles(self.superuser, search='harry', school=self.schools['south'].id),
+            ['Harry Potter and the Chamber of Secrets']
+        )
+
+        client = APIClient()
+        client.force_authenticate(self.superuser)
+        self.assertEqual(client.get('/api/v1/library/books/', {'search': 'harry', 'school': 'x'}).status_code, 400)
+
+    def test_results_match_the_previous_search_fields(self):
+        # The old SearchFilter over title, author, isbn, category and publisher: every
+        # word in some field. Word-start queries must find the same books.
+        fields = ['title', 'author', 'isbn', 'category', 'publisher']
+        for text in ['fantasy', 'computing cormen', 'mit press', 'bloomsbury harry', 'potter', 'hobbies green', '978074']:
+            expected = Book.objects.filter(school=self.schools['north'])
+            for word in text.split():
+                query = Q()
+                for field in fields:
+                    query |= Q(**{f'{field}__icontains': word})
+                expected = expected.filter(query)
+            with self.subTest(text=text):
+                self.assertEqual(sorted(self.search(text)), sorted(expected.values_list('title', flat=True)))
+
+
+class SearchIndexRebuildTest(SearchFixtureMixin, TransactionTestCase):
+    """A migration that rebuilds library_book on SQLite drops the index triggers; they are restored"""
+
+    def rebuild_book_table(self, max_length):
+        # Altering a column makes SQLite's schema editor copy the table, as such a migration would
+        old_field = Book._meta.get_field('shelf_location')
+        new_field = models.CharField(max_length=max_length)
+        new_field.set_attributes_from_name('shelf_location')
+        with connection.schema_editor() as schema_editor:
+            schema_editor.alter_field(Book, old_field, new_field)
+
+    def triggers(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'library_book'")
+            return {row[0] for row in cursor.fetchall()}
+
+    def test_rebuilt_table_is_reindexed(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('PostgreSQL keeps the index in a generated column')
+        self.assertEqual(self.triggers(), set(SQLITE_TRIGGERS))
+        self.assertFalse(ensure_search_index())
+
+        self.rebuild_book_table(60)
+        try:
+            self.assertEqual(self.triggers(), set())
+            Book.objects.filter(title='Garden Design').update(title='Garden Planning')
+
+            self.assertTrue(ensure_search_index())
+            self.assertEqual(self.triggers(), set(SQLITE_TRIGGERS))
+            # Writes made while the triggers were missing are indexed too
+            self.assertEqual(self.search('planning'), ['Garden Planning'])
+            self.assertEqual(self.search('design'), [])
+            self.assertEqual(len(self.search('harry', 'south')), 1)
+        finally:
+            self.rebuild_book_table(50)
+            ensure_search_index()
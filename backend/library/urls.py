@@ -5,6 +5,7 @@ from . import views
 router = DefaultRouter()
 router.register(r'books', views.BookViewSet, basename='book')
 router.register(r'borrow-records', views.BookBorrowRecordViewSet, basename='borrow-record')
+router.register(r'holds', views.BookHoldViewSet, basename='book-hold')
 
 urlpatterns = [
     path('', include(router.urls)),
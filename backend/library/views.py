@@ -1,11 +1,14 @@
 from django.shortcuts import render
-from rest_framework import viewsets, status, filters
+from rest_framework import mixins, viewsets, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q
-from .models import Book, BookBorrowRecord
-from .serializers import BookSerializer, BookBorrowRecordSerializer
+from .circulation_service import (
+    CirculationError, cancel_hold, checkin_batch, checkin_book, checkout_batch, checkout_book, place_hold
+)
+from .models import Book, BookBorrowRecord, BookHold
+from .search_service import BookSearch
+from .serializers import BookSerializer, BookBorrowRecordSerializer, BookHoldSerializer, CirculationBatchSerializer
 
 
 class BookViewSet(viewsets.ModelViewSet):
@@ -13,23 +16,42 @@ class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['title', 'author', 'isbn', 'category', 'publisher']
+
+    def get_school_id(self):
+        """Staff see their own school's catalog; superusers may pick one with ?school="""
+        user = self.request.user
+        if user.is_superuser:
+            return self.request.query_params.get('school') or None
+        return user.school_id
 
     def get_queryset(self):
         queryset = super().get_queryset()
-        
-        # Search functionality
-        search = self.request.query_params.get('search')
-        if search:
-            queryset = queryset.filter(
-                Q(title__icontains=search) |
-                Q(author__icontains=search) |
-                Q(isbn__icontains=search)
-            )
-        
+        school_id = self.get_school_id()
+        if school_id:
+            queryset = queryset.filter(school_id=school_id)
         return queryset.order_by('title')
 
+    def list(self, request, *args, **kwargs):
+        """
+        List the catalog. With ?search= the full-text index is queried
+        instead: prefix and typo-tolerant matching, ranked by relevance.
+        """
+        search = request.query_params.get('search', '').strip()
+        if not search:
+            return super().list(request, *args, **kwargs)
+
+        school_id = self.get_school_id()
+        if school_id and not str(school_id).isdigit():
+            return Response({'error': 'school must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        results = BookSearch(search, school_id=school_id)
+        page = self.paginate_queryset(results)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = self.get_serializer(results[:results.count()], many=True)
+        return Response(serializer.data)
+
 
 class BookBorrowRecordViewSet(viewsets.ModelViewSet):
     """ViewSet for book borrow records"""
@@ -90,6 +112,20 @@ class BookBorrowRecordViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    def _desk_student(self, request, student_id):
+        """(student, error response) for a circulation request made at the desk"""
+        from users.models import StudentProfile
+
+        if request.user.role in ('student', 'parent'):
+            return None, Response({'error': 'Only library staff can check books in and out'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            student = StudentProfile.objects.get(id=student_id)
+        except StudentProfile.DoesNotExist:
+            return None, Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+        if not request.user.is_superuser and request.user.school_id != student.school_id:
+            return None, Response({'error': 'Student belongs to another school'}, status=status.HTTP_403_FORBIDDEN)
+        return student, None
+
     @action(detail=False, methods=['post'])
     def issue_book(self, request):
         """Issue a book to a student"""
@@ -104,20 +140,12 @@ class BookBorrowRecordViewSet(viewsets.ModelViewSet):
                 from users.models import StudentProfile
                 student = StudentProfile.objects.get(id=student_id)
             
-            if book.available_copies <= 0:
-                return Response({'error': 'No copies available'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Create borrow record
-            borrow_record = BookBorrowRecord.objects.create(
-                book=book,
-                student=student,
-                issued_by=request.user.staff_profile if hasattr(request.user, 'staff_profile') else None
+            borrow_record = checkout_book(
+                book,
+                student,
+                request.user.staff_profile if hasattr(request.user, 'staff_profile') else None
             )
             
-            # Update available copies
-            book.available_copies -= 1
-            book.save()
-            
             serializer = self.get_serializer(borrow_record)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
             
@@ -129,23 +157,141 @@ class BookBorrowRecordViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def return_book(self, request, pk=None):
         """Return a borrowed book"""
+        borrow_record = self.get_object()
         try:
-            borrow_record = self.get_object()
-            
-            if borrow_record.status != 'borrowed':
-                return Response({'error': 'Book is not currently borrowed'}, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Update record
-            borrow_record.status = 'returned'
-            borrow_record.returned_date = timezone.now().date()
-            borrow_record.save()
-            
-            # Update available copies
-            borrow_record.book.available_copies += 1
-            borrow_record.book.save()
-            
-            serializer = self.get_serializer(borrow_record)
-            return Response(serializer.data)
-            
-        except Exception as e:
+            checkin_book(borrow_record)
+        except CirculationError as e:
             return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        serializer = self.get_serializer(borrow_record)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['post'])
+    def checkout(self, request):
+        """
+        Issue several books to one student in one transaction. Each barcode
+        gets its own result; 207 if some could not be issued.
+        """
+        serializer = CirculationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        student, error = self._desk_student(request, data['student_id'])
+        if error:
+            return error
+        issued_by = getattr(request.user, 'staff_profile', None)
+        if issued_by is None:
+            return Response({'error': 'A staff profile is required to issue books'}, status=status.HTTP_403_FORBIDDEN)
+
+        results = checkout_batch(student, data['barcodes'], issued_by, due_date=data.get('due_date'))
+        issued = sum(1 for result in results if result['status'] == 'issued')
+        return Response({
+            'student_id': student.id,
+            'issued': issued,
+            'failed': len(results) - issued,
+            'results': results
+        }, status=status.HTTP_200_OK if issued == len(results) else status.HTTP_207_MULTI_STATUS)
+
+    @action(detail=False, methods=['post'])
+    def checkin(self, request):
+        """
+        Return several books of one student in one transaction. Each barcode
+        gets its own result; 207 if some were not borrowed by the student.
+        """
+        serializer = CirculationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        student, error = self._desk_student(request, data['student_id'])
+        if error:
+            return error
+
+        results = checkin_batch(student, data['barcodes'])
+        returned = sum(1 for result in results if result['status'] == 'returned')
+        return Response({
+            'student_id': student.id,
+            'returned': returned,
+            'failed': len(results) - returned,
+            'results': results
+        }, status=status.HTTP_200_OK if returned == len(results) else status.HTTP_207_MULTI_STATUS)
+
+
+class BookHoldViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, mixins.CreateModelMixin, viewsets.GenericViewSet):
+    """ViewSet for holds on books with no copies on the shelf"""
+    queryset = BookHold.objects.all()
+    serializer_class = BookHoldSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        user = self.request.user
+
+        if user.role == 'student':
+            queryset = queryset.filter(student__user=user)
+        elif user.role == 'parent':
+            parent_profile = getattr(user, 'parent_profile', None)
+            children_ids = parent_profile.children.values_list('id', flat=True) if parent_profile else []
+            queryset = queryset.filter(student__id__in=children_ids)
+        elif user.is_superuser:
+            school_id = self.request.query_params.get('school')
+            if school_id:
+                queryset = queryset.filter(book__school_id=school_id)
+        else:
+            queryset = queryset.filter(book__school_id=user.school_id)
+
+        book_id = self.request.query_params.get('book')
+        if book_id:
+            queryset = queryset.filter(book_id=book_id)
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset.select_related('book', 'student').order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        """
+        Place a hold on a book with no copies available. Students hold for
+        themselves; library staff pass student_id.
+        """
+        from users.models import StudentProfile
+
+        try:
+            book = Book.objects.get(id=request.data.get('book'))
+        except (Book.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'Book not found'}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.user.role == 'student':
+            student = getattr(request.user, 'student_profile', None)
+            if student is None:
+                return Response({'error': 'Student profile not found'}, status=status.HTTP_404_NOT_FOUND)
+        elif request.user.role == 'parent':
+            return Response({'error': 'Only students and library staff can place holds'}, status=status.HTTP_403_FORBIDDEN)
+        else:
+            try:
+                student = StudentProfile.objects.get(id=request.data.get('student_id'))
+            except (StudentProfile.DoesNotExist, ValueError, TypeError):
+                return Response({'error': 'Student not found'}, status=status.HTTP_404_NOT_FOUND)
+            if not request.user.is_superuser and request.user.school_id != student.school_id:
+                return Response({'error': 'Student belongs to another school'}, status=status.HTTP_403_FORBIDDEN)
+
+        if book.school_id != student.school_id:
+            return Response({'error': 'Book belongs to another school'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hold = place_hold(book, student)
+        except CirculationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(hold)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        """Cancel a hold; a copy set aside for it goes to the next student in the queue"""
+        hold = self.get_object()
+        if request.user.role == 'parent':
+            return Response({'error': 'Only students and library staff can cancel holds'}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            cancel_hold(hold)
+        except CirculationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        hold.refresh_from_db()
+        serializer = self.get_serializer(hold)
+        return Response(serializer.data)
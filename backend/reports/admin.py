@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import ReportCardJob
 
-# Register your models here.
+
+@admin.register(ReportCardJob)
+class ReportCardJobAdmin(admin.ModelAdmin):
+    """Admin configuration for ReportCardJob"""
+    
+    list_display = ['school', 'course', 'semester', 'status', 'completed', 'total_students', 'created_at', 'finished_at']
+    list_filter = ['status', 'school']
+    readonly_fields = ['total_students', 'completed', 'error', 'created_at', 'started_at', 'finished_at']
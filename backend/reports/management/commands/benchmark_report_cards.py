@@ -0,0 +1,76 @@
+"""
+Management command to measure report-card rendering throughput.
+
+Renders synthetic cards (no database or storage) with process pools of
+increasing size, so the cards-per-minute a term-end batch can reach on a
+given machine is known before scheduling it.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.report_card_renderer import render_report_cards
+from reports.report_card_service import CHUNK_SIZE
+
+SUBJECTS = ['English', 'Hindi', 'Mathematics', 'Science', 'Social Science', 'Computer Science', 'Physical Education']
+
+
+def synthetic_card(index):
+    return {
+        'student_id': index,
+        'school_name': 'Government Senior Secondary School, Benchmark',
+        'school_code': 'BM000001',
+        'course': 'Class 10',
+        'semester': 2,
+        'name': f'Student {index}',
+        'admission_number': f'BM{index:06d}',
+        'roll_number': str(index % 60 + 1),
+        'subjects': [
+            (subject, 100, float((index * 7 + column * 13) % 101), 'B', 'Good progress' if column % 3 == 0 else '')
+            for column, subject in enumerate(SUBJECTS)
+        ],
+        'total': 420.0,
+        'total_max': 700.0,
+        'percentage': 60.0,
+        'grade': 'B',
+        'attendance': {
+            'present': 170, 'absent': 12, 'late': 6, 'excused': 2, 'sessions': 190, 'attendance_percentage': 92.63
+        },
+        'generated_on': '2025-03-31',
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measure report-card PDF rendering throughput with process pools'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cards', type=int, default=2000, help='Cards rendered per run')
+        parser.add_argument('--workers', type=int, nargs='+', help='Pool sizes to compare (default: 1 and CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Cards per worker task')
+
+    def handle(self, *args, **options):
+        if options['cards'] <= 0 or options['chunk_size'] <= 0:
+            raise CommandError('--cards and --chunk-size must be positive')
+        pool_sizes = options['workers'] or sorted({1, os.cpu_count() or 1})
+        if min(pool_sizes) <= 0:
+            raise CommandError('--workers must be positive')
+
+        cards = [synthetic_card(index) for index in range(options['cards'])]
+        chunks = [cards[start:start + options['chunk_size']] for start in range(0, len(cards), options['chunk_size'])]
+
+        for workers in pool_sizes:
+            started = time.perf_counter()
+            if workers == 1:
+                rendered = [pdf for chunk in chunks for _, pdf in render_report_cards(chunk)]
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    rendered = [pdf for batch in executor.map(render_report_cards, chunks) for _, pdf in batch]
+            elapsed = time.perf_counter() - started
+            size = sum(len(pdf) for pdf in rendered)
+            self.stdout.write(
+                self.style.SUCCESS(f'{workers} worker(s):') +
+                f'\n- {len(rendered)} cards in {elapsed:.2f}s ({len(rendered) * 60 / elapsed:.0f} per minute)'
+                f'\n- Average size: {size / len(rendered) / 1024:.1f} KiB\n'
+            )
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from reports.models import ReportCardJob
+from reports.report_card_service import CHUNK_SIZE, claim_next_job, run_job
+from schools.models import School
+
+
+class Command(BaseCommand):
+    help = 'Render queued report-card jobs (run every minute), or one class given --school/--course/--semester'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, help='Rendering processes (default: CPU count)')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Cards per worker task')
+        parser.add_argument('--job', type=int, help='Run (or resume) this job ID now')
+        parser.add_argument('--school', type=int, help='School ID for a new job')
+        parser.add_argument('--course', help='Course for a new job')
+        parser.add_argument('--semester', type=int, help='Semester for a new job')
+
+    def handle(self, *args, **options):
+        if options['workers'] is not None and options['workers'] <= 0:
+            raise CommandError('--workers must be positive')
+        if options['chunk_size'] <= 0:
+            raise CommandError('--chunk-size must be positive')
+
+        if options['job'] is not None:
+            job = ReportCardJob.objects.select_related('school').filter(id=options['job']).first()
+            if job is None:
+                raise CommandError(f"Report card job {options['job']} not found")
+            jobs = iter([job])
+        elif options['school'] is not None:
+            if not options['course'] or options['semester'] is None:
+                raise CommandError('--course and --semester are required with --school')
+            if not School.objects.filter(id=options['school']).exists():
+                raise CommandError(f"School {options['school']} not found")
+            job = ReportCardJob.objects.create(
+                school_id=options['school'], course=options['course'], semester=options['semester'], status='running'
+            )
+            jobs = iter([job])
+        else:
+            jobs = iter(claim_next_job, None)
+
+        processed = failed = 0
+        for job in jobs:
+            try:
+                report = run_job(job, workers=options['workers'], chunk_size=options['chunk_size'])
+            except Exception as e:
+                # run_job has marked the job failed; carry on with the queue
+                failed += 1
+                self.stderr.write(f"- Job {job.id} ({job.course}, semester {job.semester}) failed: {str(e)}")
+                continue
+            processed += 1
+            self.stdout.write(
+                f"- Job {job.id} ({job.course}, semester {job.semester}): {report['cards']} cards "
+                f"in {report['seconds']:.2f}s ({report['cards_per_minute']} per minute)"
+            )
+        if failed:
+            self.stdout.write(self.style.WARNING(f'\n{failed} report card jobs failed'))
+        self.stdout.write(self.style.SUCCESS(f'\nProcessed {processed} report card jobs'))
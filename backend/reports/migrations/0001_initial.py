@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('schools', '0001_initial'),
+        ('users', '0006_studentprofile_updated_at_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportCardJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course', models.CharField(max_length=100)),
+                ('semester', models.IntegerField()),
+                ('term_start', models.DateField(blank=True, help_text='First month of attendance shown (all months if empty)', null=True)),
+                ('term_end', models.DateField(blank=True, help_text='Last month of attendance shown', null=True)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('total_students', models.PositiveIntegerField(default=0)),
+                ('completed', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('requested_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_card_jobs', to='schools.school')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('storage_path', models.CharField(max_length=500)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_cards', to='users.studentprofile')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='reports.reportcardjob')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='reportcardjob',
+            index=models.Index(fields=['status', 'created_at'], name='reports_rep_status_7cf311_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reportcardjob',
+            index=models.Index(fields=['school', '-created_at'], name='reports_rep_school__bbf49e_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='reportcard',
+            unique_together={('job', 'student')},
+        ),
+    ]
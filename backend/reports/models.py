@@ -1,3 +1,62 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class ReportCardJob(models.Model):
+    """Batch generation of report-card PDFs for one class, with progress"""
+
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    school = models.ForeignKey('schools.School', on_delete=models.CASCADE, related_name='report_card_jobs')
+    course = models.CharField(max_length=100)
+    semester = models.IntegerField()
+    term_start = models.DateField(null=True, blank=True, help_text="First month of attendance shown (all months if empty)")
+    term_end = models.DateField(null=True, blank=True, help_text="Last month of attendance shown")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    total_students = models.PositiveIntegerField(default=0)
+    completed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched by the worker on a timer while it runs; a running job that stops beating is reclaimed
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['school', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"Report cards {self.course} sem {self.semester} ({self.status}) [{self.school.school_name}]"
+
+    @property
+    def progress(self):
+        """Percentage of the class rendered so far"""
+        if not self.total_students:
+            return 100.0 if self.status == 'completed' else 0.0
+        return round(self.completed * 100 / self.total_students, 1)
+
+
+class ReportCard(models.Model):
+    """A rendered report-card PDF of one student within a job"""
+
+    job = models.ForeignKey(ReportCardJob, on_delete=models.CASCADE, related_name='cards')
+    student = models.ForeignKey('users.StudentProfile', on_delete=models.CASCADE, related_name='report_cards')
+    storage_path = models.CharField(max_length=500)
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ['job', 'student']
+
+    def __str__(self):
+        return f"{self.student} - {self.storage_path}"
@@ -0,0 +1,150 @@
+"""
+Report-card PDF template.
+
+A card is a plain dict built by `report_card_service.gather_report_cards`
+and the page is drawn with the PDF base-14 fonts (nothing embedded), which
+keeps each card to a few kilobytes and a few milliseconds.
+"""
+import fitz
+
+from utils.pdf import BOLD, REGULAR, fit_text, text_width
+
+PAGE_WIDTH, PAGE_HEIGHT = fitz.paper_size('a4')
+MARGIN = 48
+ROW_HEIGHT = 18
+TABLE_BOTTOM = PAGE_HEIGHT - 200
+GRID_COLOR = (0.6, 0.6, 0.6)
+HEADER_FILL = (0.9, 0.92, 0.96)
+
+# Subject table columns: (heading, x position)
+COLUMNS = [('Subject', MARGIN + 6), ('Max', 270), ('Obtained', 320), ('Grade', 390), ('Remarks', 440)]
+REMARKS_WIDTH = PAGE_WIDTH - MARGIN - 446
+SIGNATURE_POSITIONS = (MARGIN, 228, PAGE_WIDTH - MARGIN - 140)
+
+
+def _number(value):
+    return '-' if value is None else f'{value:g}'
+
+
+def _centered(shape, y, text, fontname, fontsize):
+    width = text_width(text, fontname, fontsize)
+    shape.insert_text(((PAGE_WIDTH - width) / 2, y), text, fontname=fontname, fontsize=fontsize)
+
+
+def _header(shape, card):
+    _centered(shape, MARGIN + 16, fit_text(card['school_name'], PAGE_WIDTH - 2 * MARGIN, 16, BOLD), BOLD, 16)
+    _centered(shape, MARGIN + 34, f"Report Card - {card['course']}, Semester {card['semester']}", REGULAR, 11)
+    shape.draw_line((MARGIN, MARGIN + 44), (PAGE_WIDTH - MARGIN, MARGIN + 44))
+    shape.finish(color=(0, 0, 0), width=1)
+
+    y = MARGIN + 66
+    shape.insert_text((MARGIN, y), ['Name:', 'Roll No:'], fontname=BOLD, fontsize=10, lineheight=1.6)
+    shape.insert_text(
+        (MARGIN + 80, y), [fit_text(card['name'], 170, 10), fit_text(card['roll_number'] or '-', 170, 10)],
+        fontname=REGULAR, fontsize=10, lineheight=1.6
+    )
+    shape.insert_text((330, y), ['Admission No:', 'School Code:'], fontname=BOLD, fontsize=10, lineheight=1.6)
+    shape.insert_text(
+        (410, y), [fit_text(card['admission_number'], 130, 10), fit_text(card['school_code'], 130, 10)],
+        fontname=REGULAR, fontsize=10, lineheight=1.6
+    )
+    return y + 40
+
+
+def _subject_table(shape, y, subjects):
+    """
+    Draw the header and rows of the subject table from `y`. Each column is
+    written with one multi-line insert_text call, which is much cheaper than
+    one call per cell.
+    """
+    shape.draw_rect(fitz.Rect(MARGIN, y, PAGE_WIDTH - MARGIN, y + ROW_HEIGHT))
+    shape.finish(color=GRID_COLOR, fill=HEADER_FILL, width=0.5)
+    for row in range(1, len(subjects) + 1):
+        shape.draw_rect(fitz.Rect(MARGIN, y + row * ROW_HEIGHT, PAGE_WIDTH - MARGIN, y + (row + 1) * ROW_HEIGHT))
+    shape.finish(color=GRID_COLOR, width=0.5)
+
+    columns = [
+        [fit_text(name, 210, 10) for name, *_ in subjects],
+        [_number(max_marks) for _, max_marks, *_ in subjects],
+        ['AB' if marks is None else _number(marks) for _, _, marks, *_ in subjects],
+        [grade or '-' for *_, grade, _ in subjects],
+    ]
+    baseline = y + 13
+    for (heading, x), lines in zip(COLUMNS, columns):
+        shape.insert_text((x, baseline), [heading], fontname=BOLD, fontsize=10)
+        if lines:
+            shape.insert_text((x, baseline + ROW_HEIGHT), lines, fontname=REGULAR, fontsize=10, lineheight=ROW_HEIGHT / 10)
+    heading, x = COLUMNS[-1]
+    shape.insert_text((x, baseline), [heading], fontname=BOLD, fontsize=10)
+    remarks = [fit_text(remarks, REMARKS_WIDTH, 9) if remarks else '' for *_, remarks in subjects]
+    if any(remarks):
+        shape.insert_text((x, baseline + ROW_HEIGHT), remarks, fontname=REGULAR, fontsize=9, lineheight=ROW_HEIGHT / 9)
+    return y + (len(subjects) + 1) * ROW_HEIGHT
+
+
+def _footer(shape, y, card):
+    y += 24
+    shape.insert_text((MARGIN, y), 'Result', fontname=BOLD, fontsize=12)
+    y += 18
+    shape.insert_text(
+        (MARGIN, y),
+        f"Total: {_number(card['total'])} / {_number(card['total_max'])}    "
+        f"Percentage: {card['percentage']:.2f}%    Grade: {card['grade'] or '-'}",
+        fontname=REGULAR, fontsize=10
+    )
+
+    attendance = card['attendance']
+    y += 28
+    shape.insert_text((MARGIN, y), 'Attendance', fontname=BOLD, fontsize=12)
+    y += 18
+    shape.insert_text(
+        (MARGIN, y),
+        f"Sessions: {attendance['sessions']}    Present: {attendance['present']}    Late: {attendance['late']}    "
+        f"Absent: {attendance['absent']}    Excused: {attendance['excused']}    "
+        f"Attendance: {attendance['attendance_percentage']}%",
+        fontname=REGULAR, fontsize=10
+    )
+
+    y = PAGE_HEIGHT - MARGIN - 20
+    for x in SIGNATURE_POSITIONS:
+        shape.draw_line((x, y), (x + 140, y))
+    shape.finish(color=(0, 0, 0), width=0.5)
+    for label, x in zip(('Class Teacher', 'Parent', 'Principal'), SIGNATURE_POSITIONS):
+        shape.insert_text((x, y + 14), label, fontname=REGULAR, fontsize=9)
+    shape.insert_text((MARGIN, PAGE_HEIGHT - 20), f"Generated on {card['generated_on']}", fontname=REGULAR, fontsize=7)
+
+
+def render_report_card(card):
+    """Render one report card to PDF bytes"""
+    document = fitz.open()
+    try:
+        page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        shape = page.new_shape()
+        y = _header(shape, card)
+        subjects = card['subjects']
+        rows = int((TABLE_BOTTOM - y) // ROW_HEIGHT) - 1
+        # Long subject lists continue on further pages
+        while len(subjects) > rows:
+            _subject_table(shape, y, subjects[:rows])
+            subjects = subjects[rows:]
+            shape.commit()
+            page = document.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+            shape = page.new_shape()
+            y = MARGIN
+            rows = int((TABLE_BOTTOM - y) // ROW_HEIGHT) - 1
+        y = _subject_table(shape, y, subjects)
+        _footer(shape, y, card)
+        shape.commit()
+        document.set_metadata({
+            'title': f"Report Card - {card['name']}",
+            'subject': f"{card['course']} semester {card['semester']}",
+            'creator': 'Acharya',
+        })
+        return document.tobytes(deflate=True)
+    finally:
+        document.close()
+
+
+def render_report_cards(cards):
+    """Render a batch of cards; returns [(student_id, pdf_bytes)] (process-pool entry point)"""
+    return [(card['student_id'], render_report_card(card)) for card in cards]
@@ -0,0 +1,304 @@
+"""
+Batch report-card generation.
+
+A `ReportCardJob` covers one class (school, course, semester). Everything a
+card shows is gathered with a fixed number of queries for the whole class:
+the result sheet pivot (exams, results, students), one query for teachers'
+remarks and one for the attendance rollup. Cards are plain dicts, rendered
+to PDF in a process pool by `report_card_renderer` in chunks, written to
+storage and recorded as `ReportCard` rows while the job's `completed`
+counter advances. Jobs are resumable: students that already have a card in
+the job are skipped. While a job runs, a thread of its worker updates
+`heartbeat_at` every quarter of `REPORT_CARD_JOB_STALE_MINUTES`, however
+long a chunk takes to render; a job whose heartbeat is older than that (its
+worker was killed) is claimed again by the next worker. `completed` is
+recounted from the job's cards rather than incremented, so a job that two
+workers ended up rendering still counts each card once.
+"""
+import logging
+import os
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+
+from attendance.rollup_service import get_attendance_totals
+from exams.models import Exam, ExamResult
+from exams.result_sheet_service import build_result_sheet
+from exams.results_service import grades_for
+from utils.csv_stream import student_name
+from .models import ReportCard, ReportCardJob
+from .report_card_renderer import render_report_cards
+
+logger = logging.getLogger(__name__)
+
+REPORT_CARD_ROOT = 'reports/report_cards'
+CHUNK_SIZE = 50
+
+
+def _subject_remarks(school_id, course, semester):
+    """{(student_id, subject): remarks} of the class's results, one query"""
+    remarks = {}
+    rows = ExamResult.objects.filter(
+        exam__in=Exam.objects.filter(school_id=school_id, course=course, semester=semester)
+    ).exclude(remarks='').order_by('exam__date', 'id').values_list('student_id', 'exam__subject', 'remarks')
+    for student_id, subject, text in rows:
+        key = (student_id, subject)
+        remarks[key] = f'{remarks[key]}; {text}' if key in remarks else text
+    return remarks
+
+
+def gather_report_cards(job):
+    """Card dicts for every student of the job's class, in roll number order"""
+    sheet = build_result_sheet(job.school_id, job.course, job.semester)
+    students = sheet['students']
+    if not students:
+        return []
+
+    student_ids = [student['id'] for student in students]
+    attendance = get_attendance_totals(student_ids, since=job.term_start, until=job.term_end)
+    remarks = _subject_remarks(job.school_id, job.course, job.semester)
+
+    # Subject grades for the whole matrix at once; absent cells stay ungraded
+    marks = sheet['marks']
+    subject_grades = np.full(marks.shape, '', dtype=object)
+    if marks.size:
+        max_marks = np.broadcast_to(sheet['max_marks'], marks.shape)
+        appeared = ~np.isnan(marks) & (max_marks > 0)
+        if appeared.any():
+            subject_grades[appeared] = grades_for(marks[appeared] * 100 / max_marks[appeared], 100)
+
+    school = job.school
+    generated_on = timezone.localdate().isoformat()
+    max_marks = sheet['max_marks'].tolist()
+    cards = []
+    for index, student in enumerate(students):
+        row = marks[index].tolist()
+        cards.append({
+            'student_id': student['id'],
+            'school_name': school.school_name,
+            'school_code': school.school_code,
+            'course': job.course,
+            'semester': job.semester,
+            'name': student_name(student),
+            'admission_number': student['admission_number'],
+            'roll_number': student['roll_number'],
+            'subjects': [
+                (
+                    subject,
+                    max_marks[column],
+                    None if np.isnan(row[column]) else row[column],
+                    subject_grades[index, column],
+                    remarks.get((student['id'], subject), ''),
+                )
+                for column, subject in enumerate(sheet['subjects'])
+            ],
+            'total': float(sheet['totals'][index]),
+            'total_max': sheet['total_max'],
+            'percentage': float(sheet['percentage'][index]),
+            'grade': sheet['grades'][index],
+            'attendance': attendance[student['id']],
+            'generated_on': generated_on,
+        })
+    return cards
+
+
+def card_path(job, student_id):
+    # Keyed by student ID: admission numbers can be blank or repeated
+    return f"{REPORT_CARD_ROOT}/{job.school_id}/{job.id}/{student_id}.pdf"
+
+
+def _store_cards(job, rendered):
+    """Write rendered PDFs to storage, record them and advance the job's counter"""
+    cards = []
+    for student_id, pdf in rendered:
+        path = card_path(job, student_id)
+        if default_storage.exists(path):
+            default_storage.delete(path)
+        cards.append(ReportCard(
+            job=job,
+            student_id=student_id,
+            storage_path=default_storage.save(path, ContentFile(pdf)),
+            size=len(pdf)
+        ))
+    ReportCard.objects.bulk_create(
+        cards, update_conflicts=True, unique_fields=['job', 'student'], update_fields=['storage_path', 'size']
+    )
+    _update_completed(job)
+    return len(cards)
+
+
+def _update_completed(job):
+    cards = ReportCard.objects.filter(job=OuterRef('pk')).order_by().values('job').annotate(count=Count('id'))
+    ReportCardJob.objects.filter(id=job.id).update(completed=Subquery(cards.values('count')))
+
+
+def stale_after():
+    """How long a running job may go without a heartbeat before it is reclaimed"""
+    return timedelta(minutes=int(getattr(settings, 'REPORT_CARD_JOB_STALE_MINUTES', 10)))
+
+
+@contextmanager
+def heartbeat(job):
+    """
+    Keep touching the job's `heartbeat_at` from a background thread, four
+    times per stale period, until the block exits.
+    """
+    stopped = threading.Event()
+    interval = stale_after().total_seconds() / 4
+
+    def beat():
+        try:
+            while not stopped.wait(interval):
+                try:
+                    ReportCardJob.objects.filter(id=job.id, status='running').update(heartbeat_at=timezone.now())
+                except Exception as e:
+                    # A missed beat is harmless as long as the next one lands
+                    logger.warning(f"Report card job {job.id} heartbeat failed: {str(e)}")
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'report-card-job-{job.id}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stopped.set()
+        thread.join()
+
+
+def run_job(job, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Render the report cards of a job.
+
+    `workers` is the size of the process pool (CPU count by default); with 1
+    the cards are rendered in this process. Returns a dict with the cards
+    rendered, seconds spent and cards per minute.
+    """
+    started = time.perf_counter()
+    now = timezone.now()
+    ReportCardJob.objects.filter(id=job.id).update(status='running', started_at=now, heartbeat_at=now, error='')
+    try:
+        cards = gather_report_cards(job)
+        done = set(ReportCard.objects.filter(job=job).values_list('student_id', flat=True))
+        pending = [card for card in cards if card['student_id'] not in done]
+        ReportCardJob.objects.filter(id=job.id).update(total_students=len(cards), completed=len(cards) - len(pending))
+
+        chunks = [pending[start:start + chunk_size] for start in range(0, len(pending), chunk_size)]
+        rendered_count = 0
+        workers = workers or os.cpu_count() or 1
+        with heartbeat(job):
+            if workers == 1 or len(chunks) <= 1:
+                for chunk in chunks:
+                    rendered_count += _store_cards(job, render_report_cards(chunk))
+            else:
+                # Workers only run the Django-free renderer; storage and the
+                # database are written from this process
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    for rendered in executor.map(render_report_cards, chunks):
+                        rendered_count += _store_cards(job, rendered)
+    except Exception as e:
+        logger.error(f"Report card job {job.id} failed: {str(e)}")
+        ReportCardJob.objects.filter(id=job.id).update(status='failed', error=str(e), finished_at=timezone.now())
+        raise
+
+    ReportCardJob.objects.filter(id=job.id).update(status='completed', finished_at=timezone.now())
+    job.refresh_from_db()
+    elapsed = time.perf_counter() - started
+    return {
+        'cards': rendered_count,
+        'seconds': round(elapsed, 3),
+        'cards_per_minute': round(rendered_count * 60 / elapsed) if elapsed else 0,
+    }
+
+
+def claim_next_job():
+    """
+    Atomically take the oldest pending job, or a running job whose worker
+    stopped beating, or None; safe with several workers.
+    """
+    now = timezone.now()
+    stale_before = now - stale_after()
+    candidates = ReportCardJob.objects.filter(
+        Q(status='pending') |
+        Q(status='running', heartbeat_at__lt=stale_before) |
+        Q(status='running', heartbeat_at__isnull=True, created_at__lt=stale_before)
+    ).order_by('created_at').values_list('id', 'status', 'heartbeat_at')[:10]
+    for job_id, job_status, heartbeat_at in candidates:
+        # Guarded on the values read, so two workers cannot both take a job
+        if ReportCardJob.objects.filter(id=job_id, status=job_status, heartbeat_at=heartbeat_at).update(
+            status='running', heartbeat_at=now
+        ):
+            return ReportCardJob.objects.select_related('school').get(id=job_id)
+    return None
+
+
+class _ZipStream:
+    """Write-only file object collecting zip output for a streaming response"""
+
+    def __init__(self):
+        self.buffer = []
+        self.offset = 0
+
+    def write(self, data):
+        self.buffer.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.buffer)
+        self.buffer = []
+        return data
+
+
+def _zip_entry_name(card, used):
+    """<admission number>.pdf, made unique with the student ID when the number is blank or repeated"""
+    number = ''.join(
+        char if char.isalnum() or char in '-_' else '_' for char in str(card.student.admission_number or '')
+    )
+    name = f"{number}.pdf" if number else f"student_{card.student_id}.pdf"
+    if name in used:
+        name = f"{number or 'student'}_{card.student_id}.pdf"
+    used.add(name)
+    return name
+
+
+def iter_job_zip(job, block_size=64 * 1024):
+    """
+    Yield a zip archive of a job's report cards as it is built, one entry per
+    student named by admission number.
+
+    PDFs are already compressed, so entries are stored rather than deflated
+    and nothing but the current block is held in memory.
+    """
+    stream = _ZipStream()
+    cards = job.cards.select_related('student').order_by('student__roll_number', 'student_id')
+    used_names = set()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for card in cards.iterator(chunk_size=500):
+            name = _zip_entry_name(card, used_names)
+            with default_storage.open(card.storage_path, 'rb') as source, archive.open(name, 'w', force_zip64=True) as entry:
+                while True:
+                    block = source.read(block_size)
+                    if not block:
+                        break
+                    entry.write(block)
+                    yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
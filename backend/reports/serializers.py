@@ -0,0 +1,25 @@
+from rest_framework import serializers
+from .models import ReportCardJob
+
+
+class ReportCardJobSerializer(serializers.ModelSerializer):
+    """Serializer for ReportCardJob; a created job is queued for the report-card worker"""
+    progress = serializers.FloatField(read_only=True)
+    
+    class Meta:
+        model = ReportCardJob
+        fields = [
+            'id', 'school', 'course', 'semester', 'term_start', 'term_end', 'status', 'total_students',
+            'completed', 'progress', 'error', 'requested_by', 'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = [
+            'school', 'status', 'total_students', 'completed', 'error', 'requested_by',
+            'created_at', 'started_at', 'finished_at'
+        ]
+    
+    def validate(self, attrs):
+        term_start = attrs.get('term_start')
+        term_end = attrs.get('term_end')
+        if term_start and term_end and term_start > term_end:
+            raise serializers.ValidationError({'term_end': 'Term end must not be before term start'})
+        return attrs
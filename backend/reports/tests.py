@@ -1,3 +1,109 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
 
-# Create your tests here.
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from exams.models import Exam, ExamResult
+from schools.models import School
+from users.models import StaffProfile, StudentProfile, User
+from .models import ReportCard, ReportCardJob
+from .report_card_service import claim_next_job, iter_job_zip, run_job, stale_after
+
+
+class ReportCardJobTests(TestCase):
+    """Report-card jobs are claimed by one worker, reclaimed when it dies, and resumed"""
+
+    STUDENTS = 3
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.school = School.objects.create(
+            district='Test', block='Test', village='Test', school_name='Report School', school_code='REPORT01'
+        )
+        staff = StaffProfile.objects.create(
+            user=User.objects.create_user(
+                username='report-staff', email='report-staff@test.local', password='test',
+                role='faculty', school=self.school
+            ),
+            employee_id='REP001', department='Science', designation='Teacher', date_of_joining=date(2020, 1, 1)
+        )
+        self.students = [
+            StudentProfile.objects.create(
+                school=self.school, admission_number=f'REP-{index}', roll_number=str(index), course='Class 10',
+                department='Science', semester=1, date_of_birth=date(2010, 1, 1), address='Test',
+                emergency_contact='0000000000'
+            )
+            for index in range(self.STUDENTS)
+        ]
+        exam = Exam.objects.create(
+            school=self.school, name='Maths 1', exam_type='midterm', course='Class 10', subject='Maths',
+            semester=1, date=date(2026, 1, 10), max_marks=100, duration_minutes=60, created_by=staff
+        )
+        for index, student in enumerate(self.students):
+            ExamResult.objects.create(
+                exam=exam, student=student, marks_obtained=50 + index * 10, grade='B', entered_by=staff
+            )
+
+    def create_job(self, **fields):
+        return ReportCardJob.objects.create(school=self.school, course='Class 10', semester=1, **fields)
+
+    def test_jobs_are_claimed_once(self):
+        job = self.create_job()
+        claimed = claim_next_job()
+        self.assertEqual((claimed.id, claimed.status), (job.id, 'running'))
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertIsNone(claim_next_job())
+
+    def test_jobs_that_stop_beating_are_reclaimed(self):
+        stale = timezone.now() - stale_after() - timedelta(minutes=1)
+        dead = self.create_job()
+        ReportCardJob.objects.filter(id=dead.id).update(status='running', heartbeat_at=stale)
+        # Claimed before heartbeats were recorded
+        unbeaten = self.create_job()
+        ReportCardJob.objects.filter(id=unbeaten.id).update(status='running', created_at=stale)
+        alive = self.create_job()
+        ReportCardJob.objects.filter(id=alive.id).update(status='running', heartbeat_at=timezone.now())
+        self.create_job(status='completed')
+
+        self.assertEqual({claim_next_job().id, claim_next_job().id}, {dead.id, unbeaten.id})
+        self.assertIsNone(claim_next_job())
+
+    def test_reclaimed_job_resumes_where_it_stopped(self):
+        job = self.create_job()
+        run_job(job, workers=1)
+        self.assertEqual((job.status, job.total_students, job.completed), ('completed', 3, 3))
+
+        # A worker died after storing one card of a job
+        resumed = self.create_job()
+        first_card = ReportCard.objects.filter(job=job).order_by('student_id').first()
+        ReportCard.objects.create(
+            job=resumed, student=first_card.student, storage_path=first_card.storage_path, size=first_card.size
+        )
+        report = run_job(resumed, workers=1, chunk_size=1)
+        self.assertEqual(report['cards'], self.STUDENTS - 1)
+        self.assertEqual((resumed.status, resumed.completed), ('completed', self.STUDENTS))
+
+        # Running it again renders nothing and counts each card once
+        self.assertEqual(run_job(resumed, workers=1)['cards'], 0)
+        resumed.refresh_from_db()
+        self.assertEqual(resumed.completed, self.STUDENTS)
+
+    def test_zip_has_one_card_per_student(self):
+        job = self.create_job()
+        run_job(job, workers=1)
+
+        with zipfile.ZipFile(io.BytesIO(b''.join(iter_job_zip(job)))) as archive:
+            self.assertEqual(archive.namelist(), ['REP-0.pdf', 'REP-1.pdf', 'REP-2.pdf'])
+            card = job.cards.get(student=self.students[1])
+            with default_storage.open(card.storage_path, 'rb') as stored:
+                self.assertEqual(archive.read('REP-1.pdf'), stored.read())
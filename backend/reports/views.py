@@ -1,3 +1,87 @@
-from django.shortcuts import render
+from django.http import StreamingHttpResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
 
-# Create your views here.
+from utils.file_delivery import serve_file
+from .models import ReportCardJob
+from .report_card_service import iter_job_zip
+from .serializers import ReportCardJobSerializer
+
+
+class ReportCardJobViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                           mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Report-card batches for a class. Creating a job queues it for the
+    `generate_report_cards` worker; poll the job for progress and download
+    the cards once it has completed.
+    """
+    serializer_class = ReportCardJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ReportCardJob.objects.select_related('school')
+        user = self.request.user
+
+        # Report-card batches are for school staff only
+        if user.role in ('student', 'parent'):
+            return queryset.none()
+        if not user.is_superuser:
+            queryset = queryset.filter(school_id=user.school_id) if user.school_id else queryset.none()
+        elif self.request.query_params.get('school', '').isdigit():
+            queryset = queryset.filter(school_id=self.request.query_params['school'])
+        return queryset.order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        if request.user.role in ('student', 'parent'):
+            return Response(
+                {'error': 'Only staff can generate report cards'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        school_id = request.user.school_id
+        if request.user.is_superuser and str(request.data.get('school', '')).isdigit():
+            school_id = int(request.data['school'])
+        if not school_id:
+            return Response({'error': 'school is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = serializer.save(school_id=school_id, requested_by=request.user)
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """Queue a failed job again; cards already rendered are kept"""
+        job = self.get_object()
+        if job.status != 'failed':
+            return Response(
+                {'error': 'Only failed jobs can be retried'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        ReportCardJob.objects.filter(id=job.id, status='failed').update(status='pending', error='')
+        job.refresh_from_db()
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """All cards of the job as a streamed zip, or one student's PDF with ?student="""
+        job = self.get_object()
+        if job.status != 'completed':
+            return Response(
+                {'error': f'Report cards are not ready (job is {job.status})', 'progress': job.progress},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        student_id = request.query_params.get('student')
+        if student_id:
+            card = job.cards.filter(student_id=student_id).first() if student_id.isdigit() else None
+            if card is None:
+                return Response({'error': 'No report card for this student'}, status=status.HTTP_404_NOT_FOUND)
+            return serve_file(request, card.storage_path, content_type='application/pdf')
+
+        response = StreamingHttpResponse(iter_job_zip(job), content_type='application/zip')
+        filename = f"report_cards_{job.course}_sem{job.semester}.zip".replace(' ', '_')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
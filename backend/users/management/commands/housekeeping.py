@@ -0,0 +1,70 @@
+from django.core.management.base import BaseCommand, CommandError
+from utils.housekeeping import get_default_policies, run_housekeeping
+
+
+class Command(BaseCommand):
+    help = 'Purge expired email verifications and JWT blacklist tokens in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows deleted per transaction'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Seconds to pause between batches'
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Run only the named policies (e.g. email_verifications outstanding_tokens)'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report how many rows would be deleted without deleting them'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] <= 0:
+            raise CommandError('--batch-size must be a positive integer')
+
+        policies = get_default_policies()
+        if options['only']:
+            known = {policy.name for policy in policies}
+            unknown = set(options['only']) - known
+            if unknown:
+                raise CommandError(
+                    f'Unknown policies: {", ".join(sorted(unknown))}. '
+                    f'Available: {", ".join(sorted(known))}'
+                )
+            policies = [policy for policy in policies if policy.name in options['only']]
+
+        reports = run_housekeeping(
+            policies=policies,
+            batch_size=options['batch_size'],
+            sleep_seconds=options['sleep'],
+            dry_run=options['dry_run'],
+        )
+
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        total_deleted = 0
+        total_seconds = 0
+        for report in reports:
+            total_deleted += report['deleted']
+            total_seconds += report['seconds']
+            self.stdout.write(
+                f"- {report['policy']}: {verb.lower()} {report['deleted']} rows "
+                f"in {report['batches']} batches ({report['seconds']:.2f}s, "
+                f"older than {report['cutoff']:%Y-%m-%d %H:%M})"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'\nHousekeeping completed: {verb} {total_deleted} rows in {total_seconds:.2f}s'
+            )
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schools', '0001_initial'),
+        ('users', '0005_alter_user_role'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='studentprofile',
+            index=models.Index(fields=['school', 'updated_at', 'id'], name='users_stude_school__ec4b67_idx'),
+        ),
+    ]
@@ -82,11 +82,13 @@ class StudentProfile(models.Model):
     emergency_contact = models.CharField(max_length=15)
     is_hostelite = models.BooleanField(default=False)
     is_active = models.BooleanField(default=False, help_text="When activated, a user account will be created")
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         indexes = [
             models.Index(fields=['school', 'admission_number']),
             models.Index(fields=['school', 'is_active']),
+            models.Index(fields=['school', 'updated_at', 'id']),
         ]
     
     def save(self, *args, **kwargs):
@@ -0,0 +1,23 @@
+"""
+Content-addressed file storage.
+
+Generated files (fee receipts, offer letters) are written to default storage
+under their SHA-256, so regenerating a file with the same bytes reuses the
+stored copy and concurrent workers writing it converge on one path.
+"""
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+
+def store_content_addressed(root, content, extension='pdf'):
+    """Write bytes under `root` keyed by their SHA-256 unless already stored; returns (path, sha256)"""
+    sha256 = hashlib.sha256(content).hexdigest()
+    path = f"{root}/{sha256[:2]}/{sha256}.{extension}"
+    if not default_storage.exists(path):
+        saved_path = default_storage.save(path, ContentFile(content))
+        if saved_path != path:
+            # Another worker wrote the same file first; keep theirs
+            default_storage.delete(saved_path)
+    return path, sha256
@@ -0,0 +1,26 @@
+"""
+Streaming CSV exports.
+
+Class registers and result sheets are exported as CSV a line at a time
+through StreamingHttpResponse: `csv_writer()` returns a writer whose
+writerow() hands back the formatted line instead of buffering it.
+"""
+import csv
+
+
+class Echo:
+    """File-like object whose write() returns the line, for streaming csv.writer output"""
+
+    def write(self, value):
+        return value
+
+
+def csv_writer():
+    """csv.writer whose writerow() returns the CSV line"""
+    return csv.writer(Echo())
+
+
+def student_name(student):
+    """Display name of a student `values()` row (first_name, last_name, admission_number)"""
+    name = f"{student['first_name'] or ''} {student['last_name'] or ''}".strip()
+    return name or f"Student {student['admission_number']}"
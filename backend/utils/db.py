@@ -0,0 +1,62 @@
+"""
+Transaction helpers.
+
+SQLite starts transactions deferred: a transaction that reads before it
+writes only asks for the write lock at its first write, and if another
+connection is writing by then SQLite reports "database is locked" at once
+instead of waiting out the busy timeout. `select_for_update` is a no-op on
+SQLite, so services that read, then write take their lock with `lock_rows`
+as the transaction's first statement, which on SQLite waits for the write
+lock like any other write. `retry_if_locked` reruns a whole transaction
+that still fails on a lock (e.g. the busy timeout ran out).
+"""
+import functools
+import random
+import time
+
+from django.db import OperationalError, connection
+from django.db.models import F
+
+LOCK_RETRY_ATTEMPTS = 8
+LOCK_RETRY_DELAY = 0.01  # seconds, doubled after every attempt
+
+
+def lock_rows(queryset):
+    """
+    Lock the rows of `queryset` until the end of the current transaction.
+
+    Uses SELECT ... FOR UPDATE where the database has row locks. SQLite has
+    none and ignores FOR UPDATE; there a no-op UPDATE of the rows takes the
+    database write lock instead, so call this before the transaction reads.
+    """
+    if connection.features.has_select_for_update:
+        list(queryset.select_for_update().values_list('pk', flat=True))
+    else:
+        pk = queryset.model._meta.pk.attname
+        queryset.update(**{pk: F(pk)})
+
+
+def is_lock_error(error):
+    """True for SQLite's "database is locked" / "database table is locked" errors"""
+    return isinstance(error, OperationalError) and 'locked' in str(error)
+
+
+def retry_if_locked(func):
+    """
+    Rerun `func` when it fails on a locked SQLite database.
+
+    Only the outermost transaction is retried: called inside another atomic
+    block the error propagates so the caller's transaction restarts as a
+    whole. `func` must have no side effects outside its transaction other
+    than `transaction.on_commit` callbacks.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        for attempt in range(LOCK_RETRY_ATTEMPTS):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                if connection.in_atomic_block or not is_lock_error(error) or attempt == LOCK_RETRY_ATTEMPTS - 1:
+                    raise
+                time.sleep(random.uniform(0, LOCK_RETRY_DELAY * 2 ** attempt))
+    return wrapper
@@ -0,0 +1,163 @@
+"""
+Protected file delivery.
+
+After a view has checked access, `serve_file` either hands the transfer to
+the web server (`X-Accel-Redirect` for Nginx, `X-Sendfile` for Apache/Lighttpd)
+so no Python worker is tied up for the download, or streams the file itself
+with support for single byte ranges and conditional `If-None-Match` requests.
+
+The backend is selected by settings.PROTECTED_MEDIA_BACKEND:
+    'python'  - stream from Django (default, works everywhere)
+    'nginx'   - X-Accel-Redirect to PROTECTED_MEDIA_INTERNAL_URL + path
+    'sendfile'- X-Sendfile with the absolute filesystem path
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def get_delivery_backend():
+    return getattr(settings, 'PROTECTED_MEDIA_BACKEND', 'python')
+
+
+def make_etag(storage_path, content_hash=None):
+    """Strong ETag from the content hash, or from size and mtime when no hash is known"""
+    if content_hash:
+        return quote_etag(content_hash)
+    size = default_storage.size(storage_path)
+    try:
+        modified = int(default_storage.get_modified_time(storage_path).timestamp())
+    except (NotImplementedError, AttributeError):
+        modified = 0
+    return quote_etag(f"{size:x}-{modified:x}")
+
+
+def etag_matches(request, etag):
+    """True if the client's If-None-Match already covers this ETag"""
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    return '*' in etags or etag in etags or etag.strip('"') in [tag.strip('"') for tag in etags]
+
+
+def parse_range(header, size):
+    """
+    Parse a single `bytes=` range into an inclusive (start, end) tuple.
+
+    Returns None when the header is absent or not a single range (the whole
+    file is then served), and raises ValueError if the range cannot be
+    satisfied.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None  # Multiple or malformed ranges: serve the full body
+
+    first, last = match.groups()
+    if first == '' and last == '':
+        return None
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            raise ValueError('Empty suffix range')
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError('Range not satisfiable')
+    return start, min(end, size - 1)
+
+
+def _iter_range(file_obj, start, length, block_size=STREAM_BLOCK_SIZE):
+    """Yield `length` bytes of a file starting at `start`, then close it"""
+    try:
+        file_obj.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = file_obj.read(min(block_size, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        file_obj.close()
+
+
+def _content_disposition(filename, as_attachment):
+    disposition = 'attachment' if as_attachment else 'inline'
+    return f"{disposition}; filename*=UTF-8''{quote(filename)}"
+
+
+def _common_headers(response, etag, filename, as_attachment):
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=3600'
+    response['Content-Disposition'] = _content_disposition(filename, as_attachment)
+    return response
+
+
+def serve_file(request, storage_path, content_type=None, filename=None, content_hash=None,
+               as_attachment=False, backend=None):
+    """Build the response that delivers a stored file to an already-authorized client"""
+    backend = backend or get_delivery_backend()
+    filename = filename or os.path.basename(storage_path)
+    content_type = content_type or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    etag = make_etag(storage_path, content_hash)
+
+    if etag_matches(request, etag):
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    if backend == 'nginx':
+        # Nginx serves the bytes (including Range requests) from an `internal` location
+        internal_url = getattr(settings, 'PROTECTED_MEDIA_INTERNAL_URL', '/protected-media/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(f"{internal_url.rstrip('/')}/{storage_path}")
+        return _common_headers(response, etag, filename, as_attachment)
+
+    if backend == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = default_storage.path(storage_path)
+        return _common_headers(response, etag, filename, as_attachment)
+
+    size = default_storage.size(storage_path)
+
+    # Honour Range only if If-Range (when sent) still matches the current version
+    if_range = request.META.get('HTTP_IF_RANGE')
+    range_header = request.META.get('HTTP_RANGE') if not if_range or if_range == etag else None
+
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    file_obj = default_storage.open(storage_path, 'rb')
+
+    if byte_range is None:
+        response = FileResponse(file_obj, content_type=content_type)
+        response['Content-Length'] = str(size)
+        return _common_headers(response, etag, filename, as_attachment)
+
+    start, end = byte_range
+    length = end - start + 1
+    response = StreamingHttpResponse(_iter_range(file_obj, start, length), status=206, content_type=content_type)
+    response['Content-Length'] = str(length)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return _common_headers(response, etag, filename, as_attachment)
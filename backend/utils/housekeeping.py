@@ -0,0 +1,186 @@
+"""
+Housekeeping engine for purging expired rows from unbounded tables.
+
+Rows are deleted in keyset-paged chunks (the next `batch_size` matching
+primary keys after the last one seen), each chunk in its own short
+transaction, with an optional pause between chunks so the purge never holds
+long locks on tables that are written to by live requests (OTP lookups,
+token refreshes).
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+# Default retention (in days) per policy, overridable via settings.HOUSEKEEPING_RETENTION_DAYS
+DEFAULT_RETENTION_DAYS = {
+    'email_verifications': 7,
+    'document_upload_sessions': 1,
+    'orphan_document_blobs': 7,
+    'blacklisted_tokens': 1,
+    'outstanding_tokens': 1,
+    'sync_tombstones': 90,
+}
+
+
+class RetentionPolicy:
+    """Describes which rows of a model are eligible for purging"""
+
+    def __init__(self, name, model_label, date_field, retention_days, extra_filters=None):
+        self.name = name
+        self.model_label = model_label
+        self.date_field = date_field
+        self.retention_days = retention_days
+        self.extra_filters = extra_filters or {}
+
+    @property
+    def model(self):
+        return apps.get_model(self.model_label)
+
+    def get_cutoff(self, now=None):
+        now = now or timezone.now()
+        return now - timedelta(days=self.retention_days)
+
+    def get_queryset(self, cutoff):
+        """Rows whose date field is older than the cutoff"""
+        queryset = self.model._default_manager.filter(**{f'{self.date_field}__lt': cutoff})
+        if self.extra_filters:
+            queryset = queryset.filter(**self.extra_filters)
+        return queryset
+
+    def __str__(self):
+        return f"{self.name} ({self.model_label}, {self.retention_days}d)"
+
+
+def get_retention_days():
+    """Retention per policy: the defaults with settings.HOUSEKEEPING_RETENTION_DAYS applied"""
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'HOUSEKEEPING_RETENTION_DAYS', {})}
+
+
+def get_default_policies():
+    """
+    Build the retention policies in purge order.
+
+    Blacklisted tokens are purged before outstanding tokens so that the
+    outstanding-token purge never has to cascade into the blacklist table.
+    Email verifications still linked to an application are kept, and only
+    unfinished upload sessions and unreferenced document blobs are purged
+    (their files are removed by the admissions post_delete signals).
+    Offline-sync tombstones are kept long enough for devices to pull them.
+    """
+    retention = get_retention_days()
+
+    return [
+        RetentionPolicy(
+            name='email_verifications',
+            model_label='admissions.EmailVerification',
+            date_field='expires_at',
+            retention_days=retention['email_verifications'],
+            extra_filters={'applications__isnull': True},
+        ),
+        RetentionPolicy(
+            name='document_upload_sessions',
+            model_label='admissions.DocumentUploadSession',
+            date_field='expires_at',
+            retention_days=retention['document_upload_sessions'],
+            extra_filters={'status__in': ['active', 'failed']},
+        ),
+        RetentionPolicy(
+            name='orphan_document_blobs',
+            model_label='admissions.DocumentBlob',
+            date_field='updated_at',
+            retention_days=retention['orphan_document_blobs'],
+            extra_filters={'ref_count': 0},
+        ),
+        RetentionPolicy(
+            name='blacklisted_tokens',
+            model_label='token_blacklist.BlacklistedToken',
+            date_field='token__expires_at',
+            retention_days=retention['blacklisted_tokens'],
+        ),
+        RetentionPolicy(
+            name='outstanding_tokens',
+            model_label='token_blacklist.OutstandingToken',
+            date_field='expires_at',
+            retention_days=retention['outstanding_tokens'],
+        ),
+        RetentionPolicy(
+            name='sync_tombstones',
+            model_label='attendance.SyncTombstone',
+            date_field='deleted_at',
+            retention_days=retention['sync_tombstones'],
+        ),
+    ]
+
+
+def purge_policy(policy, batch_size=1000, sleep_seconds=0.1, dry_run=False, now=None):
+    """
+    Purge the rows matched by a policy in keyset-paged chunks.
+
+    Each chunk is the next `batch_size` matching primary keys after the last
+    one seen, so sparse tables take no empty round-trips. The policy filter is
+    re-applied when deleting, so rows that stopped matching in between (e.g. a
+    blob that gained a reference) are kept.
+
+    Returns a dict with the number of rows deleted, batches run and seconds taken.
+    """
+    started = time.monotonic()
+    cutoff = policy.get_cutoff(now)
+    queryset = policy.get_queryset(cutoff)
+
+    deleted = 0
+    batches = 0
+
+    if dry_run:
+        deleted = queryset.count()
+    else:
+        model_label = policy.model._meta.label
+        last_pk = None
+        while True:
+            page = queryset.order_by('pk')
+            if last_pk is not None:
+                page = page.filter(pk__gt=last_pk)
+            pks = list(page.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                break
+            with transaction.atomic():
+                _, per_model = policy.get_queryset(cutoff).filter(pk__in=pks).delete()
+            deleted += per_model.get(model_label, 0)
+            batches += 1
+            last_pk = pks[-1]
+            if len(pks) < batch_size:
+                break
+            if sleep_seconds:
+                time.sleep(sleep_seconds)
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"Housekeeping {policy.name}: deleted {deleted} rows in {batches} batches "
+        f"({elapsed:.2f}s, cutoff {cutoff.isoformat()})"
+    )
+
+    return {
+        'policy': policy.name,
+        'model': policy.model_label,
+        'cutoff': cutoff,
+        'deleted': deleted,
+        'batches': batches,
+        'seconds': elapsed,
+    }
+
+
+def run_housekeeping(policies=None, batch_size=1000, sleep_seconds=0.1, dry_run=False):
+    """Run every policy in order and return the per-policy reports"""
+    policies = policies if policies is not None else get_default_policies()
+    now = timezone.now()
+    return [
+        purge_policy(policy, batch_size=batch_size, sleep_seconds=sleep_seconds, dry_run=dry_run, now=now)
+        for policy in policies
+    ]
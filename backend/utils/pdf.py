@@ -0,0 +1,64 @@
+"""
+Shared helpers for the PyMuPDF document templates (fee receipts, report
+cards, offer letters).
+
+Kept free of Django imports so process-pool workers rendering documents only
+need PyMuPDF. Text is measured from per-font glyph width tables built once
+per process, and `document_bytes` saves with fixed metadata and no random
+document ID, so a document rendered twice has the same bytes and
+content-addressed storage (`utils.content_storage`) keeps one copy.
+"""
+import fitz
+
+REGULAR = 'helv'
+BOLD = 'hebo'
+
+_CHAR_WIDTHS = {}
+_MEASURED_CHARS = ''.join(chr(code) for code in range(32, 256))
+
+
+def text_width(text, fontname, fontsize):
+    """Width of text in points from a per-font table of glyph widths (measured once per process)"""
+    widths = _CHAR_WIDTHS.get(fontname)
+    if widths is None:
+        lengths = fitz.Font(fontname).char_lengths(_MEASURED_CHARS, fontsize=1)
+        widths = _CHAR_WIDTHS[fontname] = dict(zip(_MEASURED_CHARS, lengths))
+    return sum(widths.get(char, 0.6) for char in text) * fontsize
+
+
+def fit_text(text, width, fontsize, fontname=REGULAR):
+    """Truncate text with an ellipsis so it fits in `width` points"""
+    text = str(text)
+    if text_width(text, fontname, fontsize) <= width:
+        return text
+    while text and text_width(text + '...', fontname, fontsize) > width:
+        text = text[:-1]
+    return text + '...'
+
+
+def wrap_text(text, width, fontsize, fontname=REGULAR):
+    """Split a paragraph into lines no wider than `width` points"""
+    lines = []
+    line = ''
+    for word in text.split():
+        candidate = f'{line} {word}' if line else word
+        if line and text_width(candidate, fontname, fontsize) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = candidate
+    if line:
+        lines.append(line)
+    return lines
+
+
+def document_bytes(document, title):
+    """Save a document to PDF bytes with fixed metadata, so identical content gives identical bytes"""
+    document.set_metadata({
+        'title': title,
+        'creator': 'Acharya',
+        'producer': 'Acharya',
+        'creationDate': '',
+        'modDate': '',
+    })
+    return document.tobytes(deflate=True, no_new_id=True)